@@ -0,0 +1,352 @@
+"""
+Micro-benchmarks for the markdown extraction and replacement hot path.
+
+Generates deterministic synthetic markdown (10 KB to 50 MB, 10 to 100k
+image references) and times the ImageExtractor functions the processor
+runs on every document. Results are compared with a stored baseline and
+the run fails when a function got slower than the threshold allows;
+cases that look slower are re-measured once before failing, to ride out
+noisy neighbours.
+
+Timings are divided by a fixed calibration workload measured in the same
+run, so a baseline recorded on one machine stays usable on another.
+
+    python benchmarks/extractor_bench.py              # compare with baseline
+    python benchmarks/extractor_bench.py --quick      # skip the 50 MB case
+    python benchmarks/extractor_bench.py --save       # record a new baseline
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import re
+import shutil
+import sys
+import tempfile
+import timeit
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ieeU.extractor import ImageExtractor
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines", "extractor.json")
+DEFAULT_THRESHOLD = 0.25
+REPEAT = 5
+MIN_RUN_TIME = 0.2
+
+KB = 1024
+MB = 1024 * KB
+
+# (name, markdown size in bytes, image references)
+CASES: Tuple[Tuple[str, int, int], ...] = (
+    ("10KB-10", 10 * KB, 10),
+    ("1MB-1k", 1 * MB, 1000),
+    ("1MB-10k", 1 * MB, 10000),
+    ("10MB-10k", 10 * MB, 10000),
+    ("50MB-100k", 50 * MB, 100000),
+)
+QUICK_MAX_SIZE = 10 * MB
+
+# replace_images does one str.replace over the whole document per
+# replacement; cases where size * references exceeds this are skipped
+REPLACE_IMAGES_MAX_WORK = 2 * 10 ** 9
+
+# Share of referenced images that exist on disk; the rest exercise the
+# missing-file branch of get_image_paths_from_references
+EXISTING_RATIO = 0.9
+
+_WORDS = (
+    "model", "figure", "results", "training", "layer", "attention", "dataset",
+    "the", "of", "and", "a", "to", "we", "show", "loss", "accuracy", "table",
+    "baseline", "proposed", "method", "network", "input", "output", "section",
+)
+
+
+def _sentence(rng: random.Random) -> str:
+    words = [rng.choice(_WORDS) for _ in range(rng.randint(6, 18))]
+    return " ".join(words).capitalize() + "."
+
+
+def _reference(rng: random.Random, index: int) -> Tuple[str, str]:
+    """Return (markdown for one image reference, the path it points at)."""
+    name = f"{rng.getrandbits(64):016x}{index:06d}"
+    kind = index % 10
+    if kind == 7:
+        path = f"images/{name}.png"
+        return f'<img src="{path}" alt="Figure {index}">', path
+    if kind == 8:
+        path = f"images/{name} copy.jpg"
+        return f"![Figure {index}](<{path}>)", path
+    if kind == 9:
+        path = f"images/{name}.svg"
+        return f'![]({path} "vector figure")', path
+    path = f"images/{name}.jpg"
+    return f"![]({path})", path
+
+
+def generate_markdown(size: int, references: int, seed: int = 0) -> Tuple[str, List[str]]:
+    """
+    Deterministic MinerU-like markdown of about size bytes.
+
+    Returns the markdown and the referenced paths in document order. The
+    references are spread evenly through paragraphs, headings, tables and
+    display math; one in ten is an HTML <img>, one a <path with spaces>
+    and one an .svg, which get_image_paths_from_references ignores.
+    """
+    rng = random.Random(seed)
+    parts: List[str] = []
+    paths: List[str] = []
+    written = 0
+    text_per_reference = max(0, size - references * 60) / max(references, 1)
+
+    def emit(block: str):
+        nonlocal written
+        parts.append(block)
+        written += len(block) + 1
+
+    for index in range(references):
+        target = (index + 1) * text_per_reference
+        while written < target:
+            roll = rng.random()
+            if roll < 0.05:
+                emit(f"## {rng.randint(1, 9)}.{rng.randint(1, 9)} {_sentence(rng)}\n")
+            elif roll < 0.1:
+                emit("| a | b | c |\n| --- | --- | --- |\n| 1 | 2 | 3 |\n")
+            elif roll < 0.15:
+                emit(f"$$\n\\mathcal{{L}} = \\sum_i x_{{{index}}}^2\n$$\n")
+            else:
+                emit(" ".join(_sentence(rng) for _ in range(rng.randint(2, 6))) + "\n")
+        markdown, path = _reference(rng, index)
+        emit(markdown + "\n")
+        paths.append(path)
+
+    while written < size:
+        emit(" ".join(_sentence(rng) for _ in range(4)) + "\n")
+
+    return "\n".join(parts), paths
+
+
+def _create_images(base_dir: str, paths: Sequence[str], seed: int = 0):
+    rng = random.Random(seed)
+    os.makedirs(os.path.join(base_dir, "images"), exist_ok=True)
+    for path in paths:
+        if rng.random() < EXISTING_RATIO:
+            open(os.path.join(base_dir, path), 'wb').close()
+
+
+def measure(func: Callable[[], object], repeat: int = REPEAT) -> float:
+    """Best per-call time of repeat runs, each at least MIN_RUN_TIME long."""
+    timer = timeit.Timer(func)
+    number, total = timer.autorange()
+    if total < MIN_RUN_TIME:
+        number = max(number, int(number * MIN_RUN_TIME / max(total, 1e-9)))
+    gc.collect()
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+
+_CALIBRATION_PATTERN = re.compile(r'!\[([^\]]*)\]\(([^)]*)\)')
+
+
+def _calibration_workload(text: str):
+    found = {}
+    for match in _CALIBRATION_PATTERN.finditer(text):
+        found[match.group(2)] = os.path.splitext(match.group(2).lower())[1]
+    text.replace("![", "![ ")
+    return found
+
+
+def calibrate() -> float:
+    """Seconds for a fixed regex/dict/str workload shaped like the hot path."""
+    text, _ = generate_markdown(256 * KB, 256, seed=1)
+    return measure(lambda: _calibration_workload(text))
+
+
+class CaseResult:
+    def __init__(self, case: str, function: str, seconds: float, calibration: float):
+        self.case = case
+        self.function = function
+        self.seconds = seconds
+        self.relative = seconds / calibration
+        self.baseline: Optional[float] = None
+
+    @property
+    def key(self) -> str:
+        return f"{self.case}/{self.function}"
+
+    @property
+    def change(self) -> Optional[float]:
+        if not self.baseline:
+            return None
+        return self.relative / self.baseline - 1.0
+
+
+def run_case(name: str, size: int, references: int, work_dir: str, calibration: float) -> List[CaseResult]:
+    content, paths = generate_markdown(size, references)
+    base_dir = os.path.join(work_dir, name)
+    _create_images(base_dir, paths)
+    md_path = os.path.join(base_dir, "full.md")
+    with open(md_path, 'w', encoding='utf-8') as f:
+        f.write(content)
+
+    refs = ImageExtractor.extract_image_references(content)
+    if len(refs) != references:
+        raise RuntimeError(f"{name}: expected {references} references, found {len(refs)}")
+
+    replacements = {
+        content[ref.start:ref.end]: f"[Figure {ref.figure_num}]\n\nA synthetic figure.\n"
+        for ref in refs
+    }
+
+    def render(ref):
+        return f"[Figure {ref.figure_num}]\n\nA synthetic figure.\n"
+
+    functions: List[Tuple[str, Callable[[], object]]] = [
+        ("extract_image_references", lambda: ImageExtractor.extract_image_references(content)),
+        ("scan_file", lambda: ImageExtractor.scan_file(md_path)),
+        ("get_image_paths_from_references",
+         lambda: ImageExtractor.get_image_paths_from_references(refs, base_dir)),
+        ("rewrite_images", lambda: ImageExtractor.rewrite_images(content, render)),
+    ]
+    if len(content) * len(replacements) <= REPLACE_IMAGES_MAX_WORK:
+        functions.append(
+            ("replace_images", lambda: ImageExtractor.replace_images(content, replacements))
+        )
+
+    results = [
+        CaseResult(name, function, measure(func), calibration)
+        for function, func in functions
+    ]
+    shutil.rmtree(base_dir, ignore_errors=True)
+    return results
+
+
+def run(cases: Sequence[Tuple[str, int, int]], on_result=None) -> Tuple[float, List[CaseResult]]:
+    calibration = calibrate()
+    work_dir = tempfile.mkdtemp(prefix="ieeu_extractor_bench_")
+    results: List[CaseResult] = []
+    try:
+        for name, size, references in cases:
+            for result in run_case(name, size, references, work_dir, calibration):
+                results.append(result)
+                if on_result is not None:
+                    on_result(result)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return calibration, results
+
+
+def load_baseline(path: str) -> Dict[str, float]:
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f).get("results", {})
+
+
+def save_baseline(path: str, calibration: float, results: Sequence[CaseResult]):
+    """Merge results into the baseline file, keeping cases that were not run."""
+    merged = load_baseline(path)
+    merged.update({result.key: round(result.relative, 4) for result in results})
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "calibration_seconds": calibration,
+            "results": dict(sorted(merged.items())),
+        }, f, indent=2)
+        f.write("\n")
+
+
+def compare(results: Sequence[CaseResult], baseline: Dict[str, float], threshold: float) -> List[CaseResult]:
+    """Attach baseline values to results and return the ones that regressed."""
+    regressions = []
+    for result in results:
+        result.baseline = baseline.get(result.key)
+        change = result.change
+        if change is not None and change > threshold:
+            regressions.append(result)
+    return regressions
+
+
+HEADER = f"{'case':<10} {'function':<32} {'time(ms)':>10} {'relative':>10} {'baseline':>10} {'change':>8}"
+
+
+def format_row(result: CaseResult) -> str:
+    baseline = f"{result.baseline:>10.2f}" if result.baseline else f"{'-':>10}"
+    change = f"{result.change * 100:>+7.1f}%" if result.change is not None else f"{'-':>8}"
+    return (
+        f"{result.case:<10} {result.function:<32} {result.seconds * 1000:>10.3f} "
+        f"{result.relative:>10.2f} {baseline} {change}"
+    )
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--quick", action="store_true",
+                        help=f"Only cases up to {QUICK_MAX_SIZE // MB} MB")
+    parser.add_argument("--cases", help="Comma-separated case names to run")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="Baseline JSON file")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Allowed slowdown before failing (0.25 = 25%%)")
+    parser.add_argument("--save", action="store_true", help="Record results as the new baseline")
+    args = parser.parse_args(argv)
+
+    cases = [case for case in CASES if not args.quick or case[1] <= QUICK_MAX_SIZE]
+    if args.cases:
+        wanted = set(args.cases.split(","))
+        unknown = wanted - {case[0] for case in CASES}
+        if unknown:
+            parser.error(f"unknown cases: {', '.join(sorted(unknown))}")
+        cases = [case for case in cases if case[0] in wanted]
+
+    baseline = load_baseline(args.baseline)
+    print(HEADER)
+
+    def report(result: CaseResult):
+        compare([result], baseline, args.threshold)
+        print(format_row(result), flush=True)
+
+    calibration, results = run(cases, on_result=report)
+    print(f"\ncalibration: {calibration * 1000:.3f} ms; relative = time / calibration")
+
+    if args.save:
+        save_baseline(args.baseline, calibration, results)
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    if not baseline:
+        print(f"No baseline at {args.baseline}; run with --save to record one")
+        return 0
+
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        # Confirm on a second run before failing; keep each function's best time
+        suspects = {result.case for result in regressions}
+        print(f"\nRe-running {', '.join(sorted(suspects))} to confirm regressions")
+        _, rerun = run([case for case in cases if case[0] in suspects])
+        best = {result.key: result for result in rerun}
+        results = [
+            best[result.key] if result.key in best and best[result.key].relative < result.relative
+            else result
+            for result in results
+        ]
+        regressions = compare(results, baseline, args.threshold)
+        for result in regressions:
+            print(format_row(result))
+
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%}:")
+        for result in regressions:
+            print(f"  {result.key}: {result.change:+.1%}")
+        return 1
+
+    print(f"No regressions beyond {args.threshold:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,244 @@
+"""asyncio-based VLM description engine."""
+
+import asyncio
+from typing import Callable, Dict, List, Optional, Tuple
+
+try:
+    import aiohttp
+except ImportError:  # pragma: no cover - optional dependency
+    aiohttp = None
+
+from .backends import Backend
+from .constants import DEFAULT_BATCH_SIZE
+from .controller import AIMDController
+from .results import APIErrorType, BatchResult, BatchSizeType
+from .scheduler import SlidingWindowScheduler, WorkItem
+from .steps import Blocking, Call, Join, Reply, Send, Sleep, Spawn, WaitFirst
+from .vlm import CANCEL_CHECK_INTERVAL, Outcome, Steps, VLMClient
+
+AIOHTTP_AVAILABLE = aiohttp is not None
+
+
+class AsyncVLMEngine:
+    """
+    在单个事件循环上并发描述图片
+
+    与 VLMClient.describe_images_batch 保持相同的接口和 BatchResult 结构，
+    但每个在途请求只占用一个协程而不是一个线程，适合高并发上限的端点。
+    选择后端、重试、对冲、缓存和打包都复用 VLMClient 的请求流程，这里只
+    提供 aiohttp 传输；读图、编码和缓存访问在默认线程池中执行，避免阻塞
+    事件循环。
+    """
+
+    def __init__(self, client: VLMClient):
+        if not AIOHTTP_AVAILABLE:
+            raise RuntimeError("async engine requires aiohttp: pip install 'ieeU[async]'")
+        self.client = client
+        self.config = client.config
+        self.logger = client.logger
+
+    def _classify_error(self, error: BaseException, status: Optional[int] = None) -> APIErrorType:
+        if isinstance(error, asyncio.TimeoutError):
+            return APIErrorType.TIMEOUT
+
+        if isinstance(error, aiohttp.ClientConnectionError):
+            return APIErrorType.NETWORK_ERROR
+
+        if status is not None:
+            error_type = VLMClient._classify_status(status)
+            if error_type:
+                return error_type
+
+        return VLMClient._classify_message(error)
+
+    async def _send(self, http: 'aiohttp.ClientSession', backend: Backend, payload: bytearray) -> Reply:
+        """异步引擎的传输：发送请求并读取JSON响应"""
+        status = None
+        headers = None
+        try:
+            async with http.post(
+                str(backend.endpoint),
+                headers=backend.headers,
+                data=payload,
+                timeout=aiohttp.ClientTimeout(total=self.config.timeout)
+            ) as response:
+                status = response.status
+                headers = response.headers
+                response.raise_for_status()
+                return Reply(status, headers, await response.json(content_type=None))
+        except Exception as e:
+            return Reply(status, headers, error_type=self._classify_error(e, status))
+
+    async def _perform(self, http: 'aiohttp.ClientSession', step, spawned: List[asyncio.Task]):
+        """在事件循环上执行一个步骤；阻塞操作放进默认线程池"""
+        if isinstance(step, Blocking):
+            return await asyncio.get_running_loop().run_in_executor(None, step.fn, *step.args)
+        if isinstance(step, Sleep):
+            await asyncio.sleep(step.seconds)
+            return None
+        if isinstance(step, Send):
+            return await self._send(http, step.backend, step.payload)
+        if isinstance(step, Call):
+            return await self._run(http, self.client._call_steps(step.body, step.images))
+        if isinstance(step, Join):
+            return await asyncio.wrap_future(step.future)
+        if isinstance(step, Spawn):
+            task = asyncio.ensure_future(self._run(http, step.steps))
+            spawned.append(task)
+            return task
+        if isinstance(step, WaitFirst):
+            done, _ = await asyncio.wait(
+                step.handles, timeout=step.timeout, return_when=asyncio.FIRST_COMPLETED
+            )
+            return {task: task.result() for task in done}
+        raise TypeError(f"unknown step: {step!r}")
+
+    async def _run(self, http: 'aiohttp.ClientSession', steps: Steps):
+        """在事件循环上驱动 VLMClient 的请求流程；结束或被取消时取消它启动的副本请求"""
+        spawned: List[asyncio.Task] = []
+        value = error = None
+        try:
+            while True:
+                try:
+                    step = steps.throw(error) if error is not None else steps.send(value)
+                except StopIteration as stop:
+                    return stop.value
+                value = error = None
+                try:
+                    value = await self._perform(http, step, spawned)
+                except Exception as e:
+                    error = e
+        finally:
+            steps.close()
+            for task in spawned:
+                task.cancel()
+
+    async def describe_image(
+        self,
+        http: 'aiohttp.ClientSession',
+        image_path: str
+    ) -> Tuple[Optional[str], APIErrorType]:
+        """描述单张图片，语义与 VLMClient.describe_image 相同"""
+        return await self._run(http, self.client._describe_image_steps(image_path))
+
+    async def describe_images(
+        self,
+        http: 'aiohttp.ClientSession',
+        image_paths: List[str]
+    ) -> List[Outcome]:
+        """在一个请求中描述多张图片，语义与 VLMClient.describe_images 相同"""
+        return await self._run(http, self.client._describe_images_steps(image_paths))
+
+    async def _describe_items(
+        self,
+        http: 'aiohttp.ClientSession',
+        items: List[WorkItem]
+    ) -> List[Outcome]:
+        if len(items) == 1:
+            return [await self.describe_image(http, items[0].full_path)]
+        return await self.describe_images(http, [item.full_path for item in items])
+
+    async def _describe_all(
+        self,
+        items: List[Tuple[str, str]],
+        controller: AIMDController,
+        on_complete: Optional[Callable[[str, str], None]] = None,
+        on_failed: Optional[Callable[[str], None]] = None
+    ) -> BatchResult:
+        scheduler = SlidingWindowScheduler(
+            items, 
+            controller, 
+            self.client, 
+            self.logger, 
+            on_complete=on_complete, 
+            on_failed=on_failed
+        )
+        cancel_event = self.client.cancel_event
+        loop = asyncio.get_running_loop()
+
+        connector = aiohttp.TCPConnector(limit=self.client.connection_limit(controller.maximum))
+        async with aiohttp.ClientSession(connector=connector) as http:
+            tasks = {}
+
+            while not scheduler.done():
+                paths = self.client._lookahead(scheduler)
+                if paths:
+                    await loop.run_in_executor(None, self.client._prefetch, paths)
+                while scheduler.has_capacity():
+                    items = scheduler.next_items(
+                        self.client.images_per_request, 
+                        self.client._pack_fits
+                    )
+                    task = asyncio.ensure_future(self._describe_items(http, items))
+                    tasks[task] = items
+
+                done, _ = await asyncio.wait(
+                    tasks,
+                    timeout=CANCEL_CHECK_INTERVAL,
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+
+                for task in done:
+                    items = tasks.pop(task)
+
+                    try:
+                        outcomes = task.result()
+                    except Exception as e:
+                        outcomes = [(None, self._classify_error(e))] * len(items)
+
+                    scheduler.complete_items(items, outcomes)
+
+                if cancel_event.is_set():
+                    # 取消在途请求（关闭对应连接）
+                    scheduler.cancel()
+                    for task in tasks:
+                        task.cancel()
+                    await asyncio.gather(*tasks, return_exceptions=True)
+
+        return scheduler.finish()
+
+    def describe_images_batch(
+        self,
+        image_paths: Dict[str, str],
+        batch_size: BatchSizeType = DEFAULT_BATCH_SIZE,
+        on_complete: Optional[Callable[[str, str], None]] = None,
+        on_failed: Optional[Callable[[str], None]] = None
+    ) -> BatchResult:
+        """
+        批量处理图片（异步引擎）
+
+        Args:
+            image_paths: {相对路径: 绝对路径} 的字典
+            batch_size: 初始在途请求数，int 或 "full" 表示一次发送全部；
+                之后由 AIMD 控制器在 [1, maxConcurrency] 内动态调整
+            on_complete: 每张图片描述成功后立即调用 on_complete(相对路径, 描述)
+            on_failed: 图片最终失败时调用 on_failed(相对路径)
+        """
+        if not image_paths:
+            return BatchResult()
+
+        image_paths, groups = self.client._dedupe(image_paths)
+        total = len(image_paths)
+
+        controller = self.client.create_controller(batch_size, total)
+        self.client._prefetched.clear()
+        print(
+            f"\n🚀 异步并发处理 {total} 张图片 "
+            f"(并发数: {controller.limit}, 上限: {controller.maximum}"
+            + (
+                f", 每个请求最多 {self.client.images_per_request} 张)"
+                if self.client.images_per_request > 1 else ")"
+            )
+        )
+
+        try:
+            batch_result = asyncio.run(self._describe_all(
+                list(image_paths.items()),
+                controller,
+                self.client._fan_out_callback(on_complete, groups),
+                self.client._fan_out_callback(on_failed, groups)
+            ))
+        finally:
+            if self.client.preprocessor is not None:
+                self.client.preprocessor.discard()
+        return self.client._fan_out(batch_result, groups)
@@ -0,0 +1,218 @@
+"""Weighted load balancing across several VLM endpoints and API keys."""
+
+import random
+import threading
+import time
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+
+from .ratelimit import RateLimiter
+from .results import APIErrorType
+
+# Weight given to the newest latency sample in a backend's moving average
+LATENCY_EWMA_ALPHA = 0.3
+# Seconds a backend is left out after a 5xx; doubles per consecutive failure
+SERVER_ERROR_EJECT_SECONDS = 10.0
+MAX_EJECT_SECONDS = 300.0
+# A rejected key rarely fixes itself mid-run
+AUTH_ERROR_EJECT_SECONDS = 600.0
+
+
+class Backend:
+    """
+    One endpoint/key/model combination with its own rate limiter.
+
+    Tracks a moving average of seconds per image, request counters and
+    the time until which it is ejected from the pool.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        endpoint: str,
+        key: str,
+        model: str,
+        weight: float = 1.0,
+        limiter: Optional[RateLimiter] = None
+    ):
+        self.name = name
+        self.endpoint = endpoint
+        self.key = key
+        self.model = model
+        self.weight = max(float(weight), 0.0)
+        self.limiter = limiter if limiter is not None else RateLimiter()
+        self.headers = {
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {key}"
+        }
+        self.latency: Optional[float] = None
+        self.ejected_until = 0.0
+        self.consecutive_failures = 0
+        self.requests = 0
+        self.failures = 0
+        self.images = 0
+        self.ejections = 0
+        self.busy_seconds = 0.0
+        self.first_request: Optional[float] = None
+        self.last_request: Optional[float] = None
+
+    def ejected(self, now: float) -> bool:
+        return now < self.ejected_until
+
+    def __repr__(self):
+        return f"Backend({self.name})"
+
+
+class BackendPool:
+    """
+    Picks a backend for every request attempt.
+
+    The choice is random, weighted by configured weight x remaining rate
+    limit headroom / observed seconds per image, so faster backends with
+    quota left take a larger share without starving the others. Backends
+    answering with auth errors or 5xx are ejected for a cooldown; a pool
+    of one never ejects, so a single endpoint behaves as before.
+    """
+
+    def __init__(self, backends: List[Backend], rng: Optional[random.Random] = None, clock=time.monotonic):
+        if not backends:
+            raise ValueError("BackendPool needs at least one backend")
+        self.backends = backends
+        self.rng = rng or random.Random()
+        self.clock = clock
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config) -> 'BackendPool':
+        """
+        Build the pool from config.backends, falling back to the single
+        endpoint/key/modelName. Entries inherit missing fields and rate
+        limits from the top-level settings.
+        """
+        specs = config.backends or [{}]
+        backends = []
+        seen: Dict[str, int] = {}
+        for spec in specs:
+            endpoint = spec.get('endpoint') or config.endpoint
+            key = spec.get('key') or config.key
+            model = spec.get('model_name') or config.model_name
+
+            name = spec.get('name') or f"{urlparse(str(endpoint)).netloc or endpoint}/{model}"
+            seen[name] = seen.get(name, 0) + 1
+            if seen[name] > 1:
+                name = f"{name}#{seen[name]}"
+
+            state_path = None
+            if config.rate_limit_shared:
+                state_path = RateLimiter.state_path_for(endpoint, key)
+            limiter = RateLimiter(
+                spec.get('rpm_limit', config.rpm_limit),
+                spec.get('tpm_limit', config.tpm_limit),
+                state_path
+            )
+            backends.append(Backend(name, endpoint, key, model, spec.get('weight', 1.0), limiter))
+        return cls(backends)
+
+    def __len__(self) -> int:
+        return len(self.backends)
+
+    def signature(self):
+        """(models, endpoints) identifying the pool, for cache keys."""
+        if len(self.backends) == 1:
+            return self.backends[0].model, self.backends[0].endpoint
+        models = ",".join(sorted({str(b.model) for b in self.backends}))
+        endpoints = ",".join(sorted({str(b.endpoint) for b in self.backends}))
+        return models, endpoints
+
+    def _score(self, backend: Backend, default_latency: float) -> float:
+        latency = backend.latency if backend.latency is not None else default_latency
+        return backend.weight * backend.limiter.headroom() / max(latency, 1e-3)
+
+    def choose(self, avoid: Optional[Backend] = None) -> Backend:
+        """Pick a backend, other than avoid whenever another one is available."""
+        if len(self.backends) == 1:
+            return self.backends[0]
+
+        now = self.clock()
+        with self._lock:
+            candidates = [b for b in self.backends if not b.ejected(now)]
+            if avoid is not None and any(b is not avoid for b in candidates):
+                candidates = [b for b in candidates if b is not avoid]
+            if not candidates:
+                # Everything is ejected: try whichever comes back first
+                return min(self.backends, key=lambda b: b.ejected_until)
+
+            known = [b.latency for b in candidates if b.latency is not None]
+            # Unmeasured backends are assumed average so they get tried
+            default_latency = sum(known) / len(known) if known else 1.0
+            scores = [self._score(b, default_latency) for b in candidates]
+            if sum(scores) <= 0:
+                return self.rng.choice(candidates)
+            return self.rng.choices(candidates, weights=scores)[0]
+
+    def has_alternative(self, backend: Backend) -> bool:
+        """Whether another backend is available to retry on right away."""
+        now = self.clock()
+        with self._lock:
+            return any(b is not backend and not b.ejected(now) for b in self.backends)
+
+    def record(self, backend: Backend, seconds: float, result: APIErrorType, images: int = 1) -> float:
+        """
+        Record one attempt's outcome.
+
+        Returns the ejection cooldown in seconds if this attempt ejected the
+        backend, otherwise 0.
+        """
+        now = self.clock()
+        with self._lock:
+            backend.requests += 1
+            backend.busy_seconds += seconds
+            if backend.first_request is None:
+                backend.first_request = now - seconds
+            backend.last_request = now
+
+            if result == APIErrorType.SUCCESS:
+                backend.images += images
+                backend.consecutive_failures = 0
+                per_image = seconds / max(images, 1)
+                if backend.latency is None:
+                    backend.latency = per_image
+                else:
+                    backend.latency += LATENCY_EWMA_ALPHA * (per_image - backend.latency)
+                return 0.0
+
+            backend.failures += 1
+            backend.consecutive_failures += 1
+            if len(self.backends) == 1 or backend.ejected(now):
+                return 0.0
+            if result == APIErrorType.AUTH_ERROR:
+                cooldown = AUTH_ERROR_EJECT_SECONDS
+            elif result == APIErrorType.SERVER_ERROR:
+                cooldown = min(
+                    SERVER_ERROR_EJECT_SECONDS * 2 ** (backend.consecutive_failures - 1),
+                    MAX_EJECT_SECONDS
+                )
+            else:
+                return 0.0
+            backend.ejected_until = now + cooldown
+            backend.ejections += 1
+            return cooldown
+
+    def report(self) -> List[dict]:
+        """Per-backend throughput rows, in configuration order."""
+        rows = []
+        with self._lock:
+            for backend in self.backends:
+                span = 0.0
+                if backend.first_request is not None:
+                    span = backend.last_request - backend.first_request
+                rows.append({
+                    "name": backend.name,
+                    "requests": backend.requests,
+                    "failures": backend.failures,
+                    "images": backend.images,
+                    "images_per_sec": backend.images / span if span > 0 else 0.0,
+                    "latency": backend.busy_seconds / backend.requests if backend.requests else 0.0,
+                    "ejections": backend.ejections,
+                })
+        return rows
@@ -0,0 +1,356 @@
+"""Throughput benchmarks against local mock VLM and MinerU servers."""
+
+import contextlib
+import copy
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - Windows
+    resource = None
+
+from .aio import AIOHTTP_AVAILABLE, AsyncVLMEngine
+from .config import Config
+from .hedge import percentile
+from .logger import Logger
+from .mockserver import LatencyModel, MockMinerUServer, MockVLMServer, synthetic_png
+from .preprocess import ImagePreprocessor, PreprocessOptions
+from .processor import Processor
+from .vlm import VLMClient
+
+MODES = ("vlm", "e2e")
+DEFAULT_BATCH_SIZES = (1, 4, 16)
+DEFAULT_CORPUS_SIZES = (50, 200)
+DEFAULT_LATENCY = "lognormal:0.2:0.5"
+DEFAULT_FIGURES_PER_DOC = 10
+BENCH_IMAGE_SIZE = 64
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process so far, in MB (0 if unknown)."""
+    if resource is None:
+        return 0.0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+class _Latencies:
+    """Per-figure request latencies collected from worker threads or tasks."""
+
+    def __init__(self):
+        self.samples: List[float] = []
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float, figures: int):
+        with self._lock:
+            self.samples.extend([seconds] * figures)
+
+
+class _TimedVLMClient(VLMClient):
+    def __init__(self, config: Config, logger: Logger, latencies: _Latencies):
+        preprocessor = None
+        if config.image_preprocess:
+            preprocessor = ImagePreprocessor(
+                PreprocessOptions.from_config(config),
+                config.preprocess_workers
+            )
+        super().__init__(config, logger, preprocessor=preprocessor)
+        self.latencies = latencies
+
+    def _describe_items(self, items):
+        start = time.perf_counter()
+        try:
+            return super()._describe_items(items)
+        finally:
+            self.latencies.record(time.perf_counter() - start, len(items))
+
+
+class _TimedAsyncEngine(AsyncVLMEngine):
+    def __init__(self, client: VLMClient, latencies: _Latencies):
+        super().__init__(client)
+        self.latencies = latencies
+
+    async def _describe_items(self, http, items):
+        start = time.perf_counter()
+        try:
+            return await super()._describe_items(http, items)
+        finally:
+            self.latencies.record(time.perf_counter() - start, len(items))
+
+
+class BenchResult:
+    """One row of the benchmark report."""
+
+    FIELDS = (
+        "mode", "corpus", "batch_size", "figures", "elapsed", "images_per_sec",
+        "p50", "p95", "p99", "requests_per_figure", "throttled", "errors",
+        "failed", "peak_rss_mb"
+    )
+
+    def __init__(self, mode: str, corpus: int, batch_size: int):
+        self.mode = mode
+        self.corpus = corpus
+        self.batch_size = batch_size
+        self.figures = 0
+        self.elapsed = 0.0
+        self.images_per_sec = 0.0
+        self.p50 = self.p95 = self.p99 = 0.0
+        self.requests_per_figure = 0.0
+        self.throttled = 0
+        self.errors = 0
+        self.failed = 0
+        self.peak_rss_mb = 0.0
+
+    def finish(self, elapsed: float, latencies: List[float], server: MockVLMServer, failed: int):
+        self.elapsed = elapsed
+        self.images_per_sec = self.figures / elapsed if elapsed > 0 else 0.0
+        self.p50 = percentile(latencies, 50)
+        self.p95 = percentile(latencies, 95)
+        self.p99 = percentile(latencies, 99)
+        requests = server.stats.get("requests", 0)
+        self.requests_per_figure = requests / self.figures if self.figures else 0.0
+        self.throttled = server.stats.get("throttled", 0)
+        self.errors = server.stats.get("errors", 0)
+        self.failed = failed
+        self.peak_rss_mb = peak_rss_mb()
+
+    def as_dict(self) -> dict:
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+
+class BenchRunner:
+    """
+    Runs describe (mode "vlm") or full process (mode "e2e") benchmarks.
+
+    Every (corpus size, batch size) pair is one case. In "vlm" mode the
+    corpus size is a number of figures described with one
+    describe_images_batch call; in "e2e" mode it is a number of PDFs run
+    through Processor.process_pdfs against the MinerU stand-in, each
+    parsing into figures_per_doc figures. Latency is the client-side time
+    of each request, counted once per figure it carried, including rate
+    limiter waits and retries. Peak RSS is the process high-water mark, so
+    it only grows across cases.
+    """
+
+    def __init__(
+        self,
+        base_config: Config,
+        vlm_server: MockVLMServer,
+        mineru_server: Optional[MockMinerUServer] = None,
+        work_dir: Optional[str] = None
+    ):
+        self.base_config = base_config
+        self.vlm_server = vlm_server
+        self.mineru_server = mineru_server
+        self.work_dir = work_dir or tempfile.mkdtemp(prefix="ieeu_bench_")
+
+    @classmethod
+    def default_config(cls) -> Config:
+        """Settings independent of the user's settings.json: no caches, no resume."""
+        config = Config()
+        config.key = "bench"
+        config.model_name = "bench-model"
+        config.mineru_token = "bench"
+        config.cache_enabled = False
+        config.parse_cache_enabled = False
+        config.resume = False
+        config.image_preprocess = False
+        return config
+
+    def _config(self) -> Config:
+        config = copy.copy(self.base_config)
+        config.endpoint = self.vlm_server.endpoint
+        if self.mineru_server is not None:
+            config.mineru_base_url = self.mineru_server.api_url
+        return config
+
+    def _engine(self, config: Config, logger: Logger, latencies: _Latencies):
+        client = _TimedVLMClient(config, logger, latencies)
+        if config.engine == "async" and AIOHTTP_AVAILABLE:
+            return client, _TimedAsyncEngine(client, latencies)
+        return client, client
+
+    def _corpus(self, figures: int) -> Dict[str, str]:
+        directory = os.path.join(self.work_dir, f"figures-{figures}")
+        os.makedirs(directory, exist_ok=True)
+        paths = {}
+        for index in range(figures):
+            path = os.path.join(directory, f"fig{index}.png")
+            if not os.path.exists(path):
+                with open(path, 'wb') as f:
+                    f.write(synthetic_png(BENCH_IMAGE_SIZE, BENCH_IMAGE_SIZE, index))
+            paths[f"images/fig{index}.png"] = path
+        return paths
+
+    def _pdfs(self, count: int) -> List[str]:
+        directory = os.path.join(self.work_dir, f"pdfs-{count}")
+        os.makedirs(directory, exist_ok=True)
+        paths = []
+        for index in range(count):
+            path = os.path.join(directory, f"doc{index}.pdf")
+            with open(path, 'wb') as f:
+                f.write(b"%PDF-1.4\n%% synthetic document " + str(index).encode() + b"\n")
+            paths.append(path)
+        return paths
+
+    def run_vlm_case(self, figures: int, batch_size: int) -> BenchResult:
+        image_paths = self._corpus(figures)
+        result = BenchResult("vlm", figures, batch_size)
+        result.figures = len(image_paths)
+        latencies = _Latencies()
+        client, engine = self._engine(self._config(), Logger(verbose=False), latencies)
+
+        self.vlm_server.reset_stats()
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                start = time.perf_counter()
+                batch = engine.describe_images_batch(image_paths, batch_size)
+                elapsed = time.perf_counter() - start
+        finally:
+            client.close()
+
+        result.finish(elapsed, latencies.samples, self.vlm_server, len(batch.failed_paths))
+        return result
+
+    def run_e2e_case(self, documents: int, batch_size: int) -> BenchResult:
+        if self.mineru_server is None:
+            raise ValueError("e2e benchmarks need a MinerU server")
+
+        pdf_paths = self._pdfs(documents)
+        output_dir = tempfile.mkdtemp(dir=self.work_dir)
+        result = BenchResult("e2e", documents, batch_size)
+        result.figures = documents * self.mineru_server.figures_per_doc
+        latencies = _Latencies()
+
+        config = self._config()
+        processor = Processor(config, batch_size=batch_size)
+        processor.journal_dir = os.path.join(self.work_dir, "jobs")
+        processor.vlm_client.close()
+        processor.vlm_client, processor.engine = self._engine(config, processor.logger, latencies)
+
+        self.vlm_server.reset_stats()
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                start = time.perf_counter()
+                outcomes = processor.process_pdfs(pdf_paths, output_dir)
+                elapsed = time.perf_counter() - start
+        finally:
+            processor.close()
+            shutil.rmtree(output_dir, ignore_errors=True)
+
+        failed = sum(
+            len(outcome.failed_images) if outcome.success else self.mineru_server.figures_per_doc
+            for outcome in outcomes.values()
+        )
+        result.finish(elapsed, latencies.samples, self.vlm_server, failed)
+        return result
+
+    def run(
+        self,
+        mode: str,
+        corpus_sizes: Sequence[int],
+        batch_sizes: Sequence[int],
+        on_result=None
+    ) -> List[BenchResult]:
+        run_case = self.run_e2e_case if mode == "e2e" else self.run_vlm_case
+        results = []
+        for corpus in corpus_sizes:
+            for batch_size in batch_sizes:
+                result = run_case(corpus, batch_size)
+                results.append(result)
+                if on_result is not None:
+                    on_result(result)
+        return results
+
+    def close(self):
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+
+HEADER = (
+    f"{'mode':<4} {'corpus':>6} {'batch':>5} {'figures':>7} {'time(s)':>8} "
+    f"{'img/s':>7} {'p50(ms)':>8} {'p95(ms)':>8} {'p99(ms)':>8} "
+    f"{'req/fig':>7} {'429':>4} {'5xx':>4} {'failed':>6} {'RSS(MB)':>8}"
+)
+
+
+def format_row(result: BenchResult) -> str:
+    return (
+        f"{result.mode:<4} {result.corpus:>6} {result.batch_size:>5} {result.figures:>7} "
+        f"{result.elapsed:>8.2f} {result.images_per_sec:>7.1f} "
+        f"{result.p50 * 1000:>8.0f} {result.p95 * 1000:>8.0f} {result.p99 * 1000:>8.0f} "
+        f"{result.requests_per_figure:>7.2f} {result.throttled:>4} {result.errors:>4} "
+        f"{result.failed:>6} {result.peak_rss_mb:>8.1f}"
+    )
+
+
+def _parse_sizes(value: str) -> Tuple[int, ...]:
+    sizes = tuple(int(part) for part in value.split(',') if part.strip())
+    if not sizes or min(sizes) < 1:
+        raise ValueError(f"invalid size list: {value}")
+    return sizes
+
+
+def run_from_args(args) -> List[BenchResult]:
+    """Entry point for `ieeU bench`; args come from the CLI parser."""
+    batch_sizes = _parse_sizes(args.batch_sizes)
+    corpus_sizes = _parse_sizes(args.corpus_sizes)
+
+    config = BenchRunner.default_config()
+    config.max_concurrency = args.max_concurrency or max(batch_sizes)
+    config.engine = args.engine or config.engine
+    config.images_per_request = args.pack or 1
+    config.image_preprocess = args.preprocess
+
+    vlm_server = MockVLMServer(
+        LatencyModel.parse(args.latency),
+        throttle_rate=args.throttle_rate,
+        error_rate=args.error_rate,
+        rpm_limit=args.rpm,
+        seed=args.seed
+    )
+    mineru_server = None
+    if args.mode == "e2e":
+        mineru_server = MockMinerUServer(
+            figures_per_doc=args.figures_per_doc,
+            pages_per_second=args.pages_per_second,
+            seed=args.seed
+        )
+
+    print(
+        f"ieeU bench: mode={args.mode}, latency={args.latency}, "
+        f"429={args.throttle_rate:.0%}, 5xx={args.error_rate:.0%}, rpm={args.rpm or '-'}, "
+        f"engine={config.engine}, maxConcurrency={config.max_concurrency}, "
+        f"pack={config.images_per_request}"
+    )
+    print(HEADER)
+
+    runner = BenchRunner(config, vlm_server, mineru_server)
+    servers = [server for server in (vlm_server, mineru_server) if server is not None]
+    for server in servers:
+        server.start()
+    try:
+        results = runner.run(
+            args.mode,
+            corpus_sizes,
+            batch_sizes,
+            on_result=lambda result: print(format_row(result), flush=True)
+        )
+    finally:
+        for server in servers:
+            server.stop()
+        runner.close()
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump([result.as_dict() for result in results], f, indent=2)
+        print(f"\nResults written to {args.json}")
+    return results
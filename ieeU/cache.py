@@ -0,0 +1,325 @@
+"""On-disk caches for ieeU."""
+
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import Optional
+
+from .constants import (
+    DEFAULT_CACHE_DIR,
+    DEFAULT_CACHE_MAX_MB,
+    DEFAULT_CACHE_MAX_AGE_DAYS,
+    DEFAULT_PARSE_CACHE_MAX_MB
+)
+
+
+def hash_file(path: str, chunk_size: int = 1024 * 1024) -> str:
+    """Return the SHA-256 hex digest of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class DescriptionCache:
+    """
+    Content-addressed cache of VLM figure descriptions.
+
+    Entries are keyed on the image content hash plus everything that
+    influences the answer (model, prompt, endpoint). Entries older than
+    max_age_days are dropped on access, and the least recently used
+    entries are evicted once the stored size exceeds max_bytes.
+    """
+
+    DB_NAME = "descriptions.db"
+
+    def __init__(
+        self,
+        cache_dir: str = DEFAULT_CACHE_DIR,
+        max_bytes: int = DEFAULT_CACHE_MAX_MB * 1024 * 1024,
+        max_age_days: float = DEFAULT_CACHE_MAX_AGE_DAYS
+    ):
+        os.makedirs(cache_dir, exist_ok=True)
+        self.path = os.path.join(cache_dir, self.DB_NAME)
+        self.max_bytes = max_bytes
+        self.max_age = max_age_days * 86400
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            self.path,
+            timeout=30,
+            check_same_thread=False
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS descriptions ("
+            " key TEXT PRIMARY KEY,"
+            " description TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " created REAL NOT NULL,"
+            " accessed REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_accessed ON descriptions (accessed)"
+        )
+        self._conn.commit()
+        self._total_bytes = self._conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM descriptions"
+        ).fetchone()[0]
+
+    @classmethod
+    def from_config(cls, config) -> 'DescriptionCache':
+        return cls(
+            max_bytes=int(config.cache_max_mb * 1024 * 1024),
+            max_age_days=config.cache_max_age_days
+        )
+
+    @staticmethod
+    def make_key(
+        image_hash: str,
+        model_name: Optional[str],
+        prompt: str,
+        endpoint: Optional[str],
+        variant: str = ""
+    ) -> str:
+        """variant identifies image preprocessing; empty keeps keys of unprocessed images stable."""
+        parts = [image_hash, model_name or "", prompt, endpoint or ""]
+        if variant:
+            parts.append(variant)
+
+        digest = hashlib.sha256()
+        for part in parts:
+            digest.update(part.encode('utf-8'))
+            digest.update(b'\0')
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT description, size, created FROM descriptions WHERE key = ?",
+                (key,)
+            ).fetchone()
+
+            if row is None:
+                self.misses += 1
+                return None
+
+            description, size, created = row
+            if self.max_age > 0 and now - created > self.max_age:
+                self._conn.execute("DELETE FROM descriptions WHERE key = ?", (key,))
+                self._conn.commit()
+                self._total_bytes -= size
+                self.misses += 1
+                return None
+
+            self._conn.execute(
+                "UPDATE descriptions SET accessed = ? WHERE key = ?",
+                (now, key)
+            )
+            self._conn.commit()
+            self.hits += 1
+            return description
+
+    def __contains__(self, key: str) -> bool:
+        """Whether get(key) would hit, without counting it or refreshing the entry."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT created FROM descriptions WHERE key = ?",
+                (key,)
+            ).fetchone()
+        if row is None:
+            return False
+        return not (self.max_age > 0 and time.time() - row[0] > self.max_age)
+
+    def put(self, key: str, description: str):
+        now = time.time()
+        size = len(key) + len(description.encode('utf-8'))
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT size FROM descriptions WHERE key = ?",
+                (key,)
+            ).fetchone()
+            if row is not None:
+                self._total_bytes -= row[0]
+
+            self._conn.execute(
+                "INSERT OR REPLACE INTO descriptions "
+                "(key, description, size, created, accessed) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, description, size, now, now)
+            )
+            self._total_bytes += size
+            self._evict(now)
+            self._conn.commit()
+
+    def _evict(self, now: float):
+        """Drop expired entries, then least recently used ones over the size budget."""
+        if self.max_age > 0:
+            cursor = self._conn.execute(
+                "DELETE FROM descriptions WHERE created < ?",
+                (now - self.max_age,)
+            )
+            if cursor.rowcount:
+                self._total_bytes = self._conn.execute(
+                    "SELECT COALESCE(SUM(size), 0) FROM descriptions"
+                ).fetchone()[0]
+
+        if self._total_bytes <= self.max_bytes:
+            return
+
+        rows = self._conn.execute(
+            "SELECT key, size FROM descriptions ORDER BY accessed ASC"
+        )
+        stale = []
+        for key, size in rows:
+            if self._total_bytes <= self.max_bytes:
+                break
+            stale.append((key,))
+            self._total_bytes -= size
+
+        self._conn.executemany("DELETE FROM descriptions WHERE key = ?", stale)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM descriptions"
+            ).fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def _tree_size(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+class ParseCache:
+    """
+    Cache of MinerU parse results: the extracted markdown and its images.
+
+    Entries are keyed on the PDF content hash plus the MinerU model version
+    and stored as directories under cache_dir/parses. Each entry has an
+    entry.json with the markdown's relative path and the entry size; its
+    mtime is the last access, and the least recently used entries are
+    evicted once the total exceeds max_bytes. Entries are written to a
+    temporary directory and renamed into place, so concurrent runs never
+    see a partial entry.
+    """
+
+    DIR_NAME = "parses"
+    ENTRY_FILE = "entry.json"
+
+    def __init__(
+        self,
+        cache_dir: str = DEFAULT_CACHE_DIR,
+        max_bytes: int = DEFAULT_PARSE_CACHE_MAX_MB * 1024 * 1024
+    ):
+        self.root = os.path.join(cache_dir, self.DIR_NAME)
+        os.makedirs(self.root, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config) -> 'ParseCache':
+        return cls(max_bytes=int(config.parse_cache_max_mb * 1024 * 1024))
+
+    @staticmethod
+    def make_key(pdf_hash: str, model_version: str) -> str:
+        return hashlib.sha256(f"{pdf_hash}\0{model_version}".encode('utf-8')).hexdigest()
+
+    def _entry_dir(self, key: str) -> str:
+        return os.path.join(self.root, key)
+
+    def _read_entry(self, entry_dir: str) -> Optional[dict]:
+        try:
+            with open(os.path.join(entry_dir, self.ENTRY_FILE), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def get(self, key: str, dest_dir: str) -> Optional[str]:
+        """
+        Copy a cached result into dest_dir.
+
+        Returns:
+            Path to the copied markdown file, None on a miss
+        """
+        entry_dir = self._entry_dir(key)
+        entry = self._read_entry(entry_dir)
+        if entry is None:
+            return None
+
+        try:
+            shutil.copytree(
+                os.path.join(entry_dir, "files"),
+                dest_dir,
+                dirs_exist_ok=True
+            )
+            os.utime(os.path.join(entry_dir, self.ENTRY_FILE))
+        except OSError:
+            return None
+
+        md_path = os.path.join(dest_dir, *entry["markdown"].split('/'))
+        return md_path if os.path.isfile(md_path) else None
+
+    def put(self, key: str, source_dir: str, md_path: str):
+        """Store the extracted result in source_dir, whose markdown is md_path."""
+        markdown = os.path.relpath(md_path, source_dir).replace(os.sep, '/')
+        staging = tempfile.mkdtemp(prefix=".staging_", dir=self.root)
+
+        try:
+            shutil.copytree(source_dir, os.path.join(staging, "files"))
+            size = _tree_size(staging)
+            with open(os.path.join(staging, self.ENTRY_FILE), 'w', encoding='utf-8') as f:
+                json.dump({"markdown": markdown, "size": size, "created": time.time()}, f)
+
+            entry_dir = self._entry_dir(key)
+            with self._lock:
+                shutil.rmtree(entry_dir, ignore_errors=True)
+                os.rename(staging, entry_dir)
+                self._evict(keep=key)
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+
+    def _evict(self, keep: str):
+        """Drop least recently used entries over the size budget."""
+        entries = []
+        total = 0
+        for name in os.listdir(self.root):
+            entry_dir = os.path.join(self.root, name)
+            entry = self._read_entry(entry_dir)
+            if entry is None:
+                continue
+            accessed = os.path.getmtime(os.path.join(entry_dir, self.ENTRY_FILE))
+            entries.append((accessed, name, entry.get("size", 0)))
+            total += entry.get("size", 0)
+
+        for _, name, size in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if name == keep:
+                continue
+            shutil.rmtree(os.path.join(self.root, name), ignore_errors=True)
+            total -= size
+
+    def __len__(self) -> int:
+        return sum(
+            1 for name in os.listdir(self.root)
+            if self._read_entry(os.path.join(self.root, name)) is not None
+        )
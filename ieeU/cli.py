@@ -3,9 +3,40 @@ import os
 import sys
 
 from .config import Config
+from .constants import ENGINES
 from .processor import Processor
 
 
+def _collect_pdfs(paths):
+    """Expand files and directories (their top-level *.pdf) into unique PDF paths."""
+    pdf_paths = []
+    for path in paths:
+        path = os.path.abspath(path)
+        
+        if os.path.isdir(path):
+            found = sorted(
+                os.path.join(path, name) 
+                for name in os.listdir(path) 
+                if name.lower().endswith('.pdf')
+            )
+            if not found:
+                print(f"警告: 目录中没有PDF文件: {path}")
+            pdf_paths.extend(found)
+            continue
+        
+        if not os.path.isfile(path):
+            print(f"错误: PDF文件不存在: {path}")
+            sys.exit(1)
+        
+        if not path.lower().endswith('.pdf'):
+            print(f"错误: 文件不是PDF格式: {path}")
+            sys.exit(1)
+        
+        pdf_paths.append(path)
+    
+    return list(dict.fromkeys(pdf_paths))
+
+
 def main():
     """Main entry point for ieeU CLI."""
     
@@ -16,6 +47,7 @@ def main():
         epilog="""
 示例:
   ieeU process paper.pdf           # 处理PDF文件
+  ieeU process a.pdf b.pdf ./pdfs  # 批量处理多个PDF或目录
   ieeU process paper.pdf -o ./out  # 指定输出目录
   ieeU run                         # 处理当前目录的full.md (向后兼容)
   ieeU --version                   # 显示版本号
@@ -47,15 +79,23 @@ def main():
   ieeU process paper.pdf
   ieeU process paper.pdf -o ./output
   ieeU process paper.pdf --verbose
+  ieeU process ./papers -o ./output
+  ieeU process paper.pdf --refresh
+  ieeU process paper.pdf --pack 4
+  ieeU process paper.pdf --metrics run.prom
+  ieeU process paper.pdf --trace trace.json
+  ieeU process paper.pdf --hedge 95
         """
     )
     process_parser.add_argument(
-        "pdf_path",
-        help="PDF文件路径"
+        "pdf_paths",
+        nargs="+",
+        metavar="pdf_path",
+        help="PDF文件或包含PDF的目录，可指定多个"
     )
     process_parser.add_argument(
         "--output", "-o",
-        help="输出目录（默认为PDF所在目录）",
+        help="输出目录（默认为各PDF所在目录）",
         default=None
     )
     process_parser.add_argument(
@@ -66,7 +106,54 @@ def main():
     process_parser.add_argument(
         "--batch-size", "-b",
         default="10",
-        help="并发批次大小，数字或'full'表示一次发送全部（默认: 10）"
+        help="初始在途请求数（滑动窗口），之后在 [1, maxConcurrency] 内自动调整；数字或'full'表示从 maxConcurrency 开始（默认: 10）"
+    )
+    process_parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="不使用图片描述缓存"
+    )
+    process_parser.add_argument(
+        "--refresh",
+        action="store_true",
+        help="忽略MinerU解析结果缓存，重新上传解析"
+    )
+    process_parser.add_argument(
+        "--no-resume",
+        action="store_true",
+        help="忽略上次中断留下的任务日志，从头开始"
+    )
+    process_parser.add_argument(
+        "--engine",
+        choices=ENGINES,
+        default=None,
+        help="VLM并发引擎：thread（线程池）或 async（asyncio，需要aiohttp）"
+    )
+    process_parser.add_argument(
+        "--pack",
+        type=int,
+        default=None,
+        metavar="N",
+        help="每个VLM请求打包的图片数（默认: 1，不打包）"
+    )
+    process_parser.add_argument(
+        "--metrics",
+        default=None,
+        metavar="PATH",
+        help="运行结束时写出指标：.prom/.txt 为 Prometheus 文本格式，其他为 JSON"
+    )
+    process_parser.add_argument(
+        "--trace",
+        default=None,
+        metavar="PATH",
+        help="记录各阶段和每次请求的时间线，写出为 Chrome trace 格式的 JSON（可用 Perfetto 打开）"
+    )
+    process_parser.add_argument(
+        "--hedge",
+        type=float,
+        default=None,
+        metavar="P",
+        help="请求耗时超过近期延迟的第P百分位（如 95）仍未返回时，再发一份副本取先返回的结果；0 关闭对冲（覆盖配置）"
     )
     
     # run command (backward compatibility)
@@ -88,7 +175,151 @@ def main():
     run_parser.add_argument(
         "--batch-size", "-b",
         default="10",
-        help="并发批次大小，数字或'full'表示一次发送全部（默认: 10）"
+        help="初始在途请求数（滑动窗口），之后在 [1, maxConcurrency] 内自动调整；数字或'full'表示从 maxConcurrency 开始（默认: 10）"
+    )
+    run_parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="不使用图片描述缓存"
+    )
+    run_parser.add_argument(
+        "--no-resume",
+        action="store_true",
+        help="忽略上次中断留下的任务日志，从头开始"
+    )
+    run_parser.add_argument(
+        "--engine",
+        choices=ENGINES,
+        default=None,
+        help="VLM并发引擎：thread（线程池）或 async（asyncio，需要aiohttp）"
+    )
+    run_parser.add_argument(
+        "--pack",
+        type=int,
+        default=None,
+        metavar="N",
+        help="每个VLM请求打包的图片数（默认: 1，不打包）"
+    )
+    run_parser.add_argument(
+        "--metrics",
+        default=None,
+        metavar="PATH",
+        help="运行结束时写出指标：.prom/.txt 为 Prometheus 文本格式，其他为 JSON"
+    )
+    run_parser.add_argument(
+        "--trace",
+        default=None,
+        metavar="PATH",
+        help="记录各阶段和每次请求的时间线，写出为 Chrome trace 格式的 JSON（可用 Perfetto 打开）"
+    )
+    run_parser.add_argument(
+        "--hedge",
+        type=float,
+        default=None,
+        metavar="P",
+        help="请求耗时超过近期延迟的第P百分位（如 95）仍未返回时，再发一份副本取先返回的结果；0 关闭对冲（覆盖配置）"
+    )
+    
+    # bench command
+    bench_parser = subparsers.add_parser(
+        "bench",
+        help="用本地模拟的VLM和MinerU服务测量吞吐量",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+示例:
+  ieeU bench
+  ieeU bench --batch-sizes 1,8,32 --corpus-sizes 100,500
+  ieeU bench --latency uniform:0.1:0.5 --throttle-rate 0.05 --error-rate 0.02
+  ieeU bench --mode e2e --corpus-sizes 4 --figures-per-doc 20
+  ieeU bench --json results.json
+        """
+    )
+    bench_parser.add_argument(
+        "--mode",
+        choices=("vlm", "e2e"),
+        default="vlm",
+        help="vlm：只测图片描述；e2e：完整的 process 流程（上传、解析、下载、描述、写出）"
+    )
+    bench_parser.add_argument(
+        "--batch-sizes",
+        default="1,4,16",
+        help="逗号分隔的窗口大小列表（默认: 1,4,16）"
+    )
+    bench_parser.add_argument(
+        "--corpus-sizes",
+        default="50,200",
+        help="逗号分隔的语料规模：vlm模式为图片数，e2e模式为PDF数（默认: 50,200）"
+    )
+    bench_parser.add_argument(
+        "--figures-per-doc",
+        type=int,
+        default=10,
+        help="e2e模式下每个模拟PDF的图片数（默认: 10）"
+    )
+    bench_parser.add_argument(
+        "--pages-per-second",
+        type=float,
+        default=20.0,
+        help="模拟MinerU每个文档每秒解析的页数（默认: 20）"
+    )
+    bench_parser.add_argument(
+        "--latency",
+        default="lognormal:0.2:0.5",
+        help="模拟VLM延迟分布：秒数、fixed:S、uniform:低:高、lognormal:中位数:sigma、exp:均值"
+    )
+    bench_parser.add_argument(
+        "--throttle-rate",
+        type=float,
+        default=0.0,
+        help="随机返回429的请求比例（默认: 0）"
+    )
+    bench_parser.add_argument(
+        "--error-rate",
+        type=float,
+        default=0.0,
+        help="随机返回500的请求比例（默认: 0）"
+    )
+    bench_parser.add_argument(
+        "--rpm",
+        type=float,
+        default=0,
+        help="模拟服务端每分钟请求数上限，超出返回429和Retry-After（默认: 不限）"
+    )
+    bench_parser.add_argument(
+        "--max-concurrency",
+        type=int,
+        default=None,
+        help="客户端并发上限（默认: 最大的窗口大小）"
+    )
+    bench_parser.add_argument(
+        "--engine",
+        choices=ENGINES,
+        default=None,
+        help="VLM并发引擎：thread（线程池）或 async（asyncio，需要aiohttp）"
+    )
+    bench_parser.add_argument(
+        "--pack",
+        type=int,
+        default=None,
+        metavar="N",
+        help="每个VLM请求打包的图片数（默认: 1）"
+    )
+    bench_parser.add_argument(
+        "--preprocess",
+        action="store_true",
+        help="包含图片预处理（需要Pillow）"
+    )
+    bench_parser.add_argument(
+        "--seed",
+        type=int,
+        default=0,
+        help="随机种子（默认: 0）"
+    )
+    bench_parser.add_argument(
+        "--json",
+        default=None,
+        metavar="PATH",
+        help="把结果另存为JSON，便于比较不同版本"
     )
     
     args = parser.parse_args()
@@ -97,17 +328,41 @@ def main():
         parser.print_help()
         sys.exit(0)
     
+    if args.command == "bench":
+        from .bench import run_from_args
+        
+        try:
+            run_from_args(args)
+        except ValueError as e:
+            print(f"错误: {e}")
+            sys.exit(1)
+        except KeyboardInterrupt:
+            sys.exit(130)
+        return
+    
     config = Config.load()
+    if getattr(args, "no_cache", False):
+        config.cache_enabled = False
+    if getattr(args, "no_resume", False):
+        config.resume = False
+    if getattr(args, "refresh", False):
+        config.refresh_parse = True
+    if getattr(args, "engine", None):
+        config.engine = args.engine
+    if getattr(args, "pack", None):
+        config.images_per_request = args.pack
+    if getattr(args, "metrics", None):
+        config.metrics_path = args.metrics
+    if getattr(args, "trace", None):
+        config.trace_path = args.trace
+    if args.hedge is not None:
+        config.hedge_percentile = args.hedge
     
     if args.command == "process":
-        pdf_path = os.path.abspath(args.pdf_path)
+        pdf_paths = _collect_pdfs(args.pdf_paths)
         
-        if not os.path.isfile(pdf_path):
-            print(f"错误: PDF文件不存在: {pdf_path}")
-            sys.exit(1)
-        
-        if not pdf_path.lower().endswith('.pdf'):
-            print(f"错误: 文件不是PDF格式: {pdf_path}")
+        if not pdf_paths:
+            print("错误: 没有找到PDF文件")
             sys.exit(1)
         
         if not config.mineru_token:
@@ -126,13 +381,16 @@ def main():
         if output_dir:
             output_dir = os.path.abspath(output_dir)
             os.makedirs(output_dir, exist_ok=True)
-        else:
-            output_dir = os.path.dirname(pdf_path)
         
         verbose = getattr(args, "verbose", False)
         batch_size = args.batch_size if args.batch_size == "full" else int(args.batch_size)
         processor = Processor(config, verbose, batch_size)
-        processor.process_pdf(pdf_path, output_dir)
+        try:
+            processor.process_pdfs(pdf_paths, output_dir)
+        except KeyboardInterrupt:
+            sys.exit(130)
+        finally:
+            processor.close()
     
     elif args.command == "run":
         verbose = getattr(args, "verbose", False)
@@ -152,7 +410,12 @@ def main():
             sys.exit(1)
         
         processor = Processor(config, verbose, batch_size)
-        processor.process_directory(directory)
+        try:
+            processor.process_directory(directory)
+        except KeyboardInterrupt:
+            sys.exit(130)
+        finally:
+            processor.close()
     
     else:
         parser.print_help()
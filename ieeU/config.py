@@ -1,12 +1,29 @@
 import json
 import os
-from typing import Optional
+from typing import List, Optional
 from .constants import (
     DEFAULT_CONFIG_DIR,
     DEFAULT_CONFIG_FILE,
     DEFAULT_TIMEOUT,
     DEFAULT_RETRIES,
-    DEFAULT_MAX_CONCURRENCY
+    DEFAULT_MAX_CONCURRENCY,
+    DEFAULT_CACHE_MAX_MB,
+    DEFAULT_CACHE_MAX_AGE_DAYS,
+    DEFAULT_ENGINE,
+    DEFAULT_RPM_LIMIT,
+    DEFAULT_TPM_LIMIT,
+    DEFAULT_IMAGE_MAX_PIXELS,
+    DEFAULT_IMAGE_FORMAT,
+    DEFAULT_IMAGE_QUALITY,
+    DEFAULT_DOWNLOAD_STALL_TIMEOUT,
+    DEFAULT_DOWNLOAD_SEGMENTS,
+    DEFAULT_MINERU_TIMEOUT,
+    DEFAULT_MINERU_MODEL_VERSION,
+    DEFAULT_MINERU_BASE_URL,
+    DEFAULT_PARSE_CACHE_MAX_MB,
+    DEFAULT_IMAGES_PER_REQUEST,
+    DEFAULT_PACK_MAX_MB,
+    DEFAULT_HEDGE_MAX_RATIO
 )
 
 
@@ -15,10 +32,41 @@ class Config:
         self.endpoint: Optional[str] = None
         self.key: Optional[str] = None
         self.model_name: Optional[str] = None
+        self.backends: List[dict] = []
         self.mineru_token: Optional[str] = None
         self.timeout: int = DEFAULT_TIMEOUT
         self.retries: int = DEFAULT_RETRIES
         self.max_concurrency: int = DEFAULT_MAX_CONCURRENCY
+        self.engine: str = DEFAULT_ENGINE
+        self.rpm_limit: float = DEFAULT_RPM_LIMIT
+        self.tpm_limit: float = DEFAULT_TPM_LIMIT
+        self.rate_limit_shared: bool = False
+        self.image_preprocess: bool = True
+        self.image_max_pixels: int = DEFAULT_IMAGE_MAX_PIXELS
+        self.image_format: str = DEFAULT_IMAGE_FORMAT
+        self.image_quality: int = DEFAULT_IMAGE_QUALITY
+        self.image_trim: bool = True
+        self.preprocess_workers: int = 0
+        self.download_stall_timeout: float = DEFAULT_DOWNLOAD_STALL_TIMEOUT
+        self.download_segments: int = DEFAULT_DOWNLOAD_SEGMENTS
+        self.mineru_timeout: float = DEFAULT_MINERU_TIMEOUT
+        self.mineru_model_version: str = DEFAULT_MINERU_MODEL_VERSION
+        self.mineru_base_url: str = DEFAULT_MINERU_BASE_URL
+        self.images_per_request: int = DEFAULT_IMAGES_PER_REQUEST
+        self.pack_max_mb: float = DEFAULT_PACK_MAX_MB
+        self.hedge_percentile: float = 0
+        self.hedge_max_ratio: float = DEFAULT_HEDGE_MAX_RATIO
+        self.metrics_path: Optional[str] = None
+        self.trace_path: Optional[str] = None
+        self.dedup: bool = True
+        self.dedup_distance: int = 0
+        self.cache_enabled: bool = True
+        self.resume: bool = True
+        self.parse_cache_enabled: bool = True
+        self.parse_cache_max_mb: float = DEFAULT_PARSE_CACHE_MAX_MB
+        self.refresh_parse: bool = False
+        self.cache_max_mb: float = DEFAULT_CACHE_MAX_MB
+        self.cache_max_age_days: float = DEFAULT_CACHE_MAX_AGE_DAYS
     
     @classmethod
     def load(cls) -> 'Config':
@@ -35,6 +83,7 @@ class Config:
                 config.endpoint = data.get('endpoint')
                 config.key = data.get('key')
                 config.model_name = data.get('modelName')
+                config.backends = cls._parse_backends(data.get('backends'))
                 config.timeout = data.get('timeout', DEFAULT_TIMEOUT)
                 config.retries = data.get('retries', DEFAULT_RETRIES)
                 config.max_concurrency = data.get(
@@ -42,11 +91,110 @@ class Config:
                     DEFAULT_MAX_CONCURRENCY
                 )
                 config.mineru_token = data.get('mineruToken')
+                config.engine = data.get('engine', DEFAULT_ENGINE)
+                config.rpm_limit = data.get('rpmLimit', DEFAULT_RPM_LIMIT)
+                config.tpm_limit = data.get('tpmLimit', DEFAULT_TPM_LIMIT)
+                config.rate_limit_shared = data.get('rateLimitShared', False)
+                config.image_preprocess = data.get('imagePreprocess', True)
+                config.image_max_pixels = data.get(
+                    'imageMaxPixels',
+                    DEFAULT_IMAGE_MAX_PIXELS
+                )
+                config.image_format = data.get('imageFormat', DEFAULT_IMAGE_FORMAT)
+                config.image_quality = data.get('imageQuality', DEFAULT_IMAGE_QUALITY)
+                config.image_trim = data.get('imageTrim', True)
+                config.preprocess_workers = data.get('preprocessWorkers', 0)
+                config.download_stall_timeout = data.get(
+                    'downloadStallTimeout',
+                    DEFAULT_DOWNLOAD_STALL_TIMEOUT
+                )
+                config.download_segments = data.get(
+                    'downloadSegments',
+                    DEFAULT_DOWNLOAD_SEGMENTS
+                )
+                config.mineru_timeout = data.get(
+                    'mineruTimeout',
+                    DEFAULT_MINERU_TIMEOUT
+                )
+                config.mineru_model_version = data.get(
+                    'mineruModelVersion',
+                    DEFAULT_MINERU_MODEL_VERSION
+                )
+                config.images_per_request = data.get(
+                    'imagesPerRequest',
+                    DEFAULT_IMAGES_PER_REQUEST
+                )
+                config.pack_max_mb = data.get('packMaxSizeMB', DEFAULT_PACK_MAX_MB)
+                config.hedge_percentile = data.get('hedgePercentile', 0)
+                config.hedge_max_ratio = data.get('hedgeMaxRatio', DEFAULT_HEDGE_MAX_RATIO)
+                config.mineru_base_url = data.get(
+                    'mineruBaseUrl',
+                    DEFAULT_MINERU_BASE_URL
+                )
+                config.metrics_path = data.get('metricsFile')
+                config.trace_path = data.get('traceFile')
+                config.dedup = data.get('dedup', True)
+                config.dedup_distance = data.get('dedupDistance', 0)
+                config.cache_enabled = data.get('cache', True)
+                config.resume = data.get('resume', True)
+                config.parse_cache_enabled = data.get('parseCache', True)
+                config.parse_cache_max_mb = data.get(
+                    'parseCacheMaxSizeMB',
+                    DEFAULT_PARSE_CACHE_MAX_MB
+                )
+                config.cache_max_mb = data.get(
+                    'cacheMaxSizeMB',
+                    DEFAULT_CACHE_MAX_MB
+                )
+                config.cache_max_age_days = data.get(
+                    'cacheMaxAgeDays',
+                    DEFAULT_CACHE_MAX_AGE_DAYS
+                )
         
         config._apply_env_overrides()
+        config._fill_from_backends()
         
         return config
     
+    @staticmethod
+    def _parse_backends(entries) -> List[dict]:
+        """
+        backends: [{endpoint, key, modelName, weight, rpmLimit, tpmLimit, name}]
+        
+        Missing fields fall back to the top-level settings.
+        """
+        if not entries:
+            return []
+        if not isinstance(entries, list):
+            raise ValueError("Invalid config: backends must be a list")
+        
+        names = {
+            'endpoint': 'endpoint',
+            'key': 'key',
+            'modelName': 'model_name',
+            'weight': 'weight',
+            'rpmLimit': 'rpm_limit',
+            'tpmLimit': 'tpm_limit',
+            'name': 'name'
+        }
+        backends = []
+        for entry in entries:
+            if not isinstance(entry, dict):
+                raise ValueError("Invalid config: each backend must be an object")
+            backends.append({
+                names[field]: value for field, value in entry.items() if field in names
+            })
+        return backends
+    
+    def _fill_from_backends(self):
+        """Only backends configured: the first one stands in for endpoint/key/modelName"""
+        if not self.backends:
+            return
+        first = self.backends[0]
+        self.endpoint = self.endpoint or first.get('endpoint')
+        self.key = self.key or first.get('key')
+        self.model_name = self.model_name or first.get('model_name')
+    
     def _apply_env_overrides(self):
         if 'IEEU_ENDPOINT' in os.environ:
             self.endpoint = os.environ['IEEU_ENDPOINT']
@@ -58,6 +206,10 @@ class Config:
             self.mineru_token = os.environ['IEEU_MINERU_TOKEN']
     
     def validate(self) -> bool:
+        for index, backend in enumerate(self.backends):
+            for field, name in (('endpoint', 'endpoint'), ('key', 'key'), ('model_name', 'modelName')):
+                if not (backend.get(field) or getattr(self, field)):
+                    raise ValueError(f"Missing required config: backends[{index}].{name}")
         if not self.endpoint:
             raise ValueError("Missing required config: endpoint")
         if not self.key:
@@ -70,7 +222,13 @@ class Config:
         return (
             f"Config(endpoint={self.endpoint}, "
             f"model_name={self.model_name}, "
+            f"backends={len(self.backends) or 1}, "
             f"timeout={self.timeout}, "
             f"retries={self.retries}, "
-            f"max_concurrency={self.max_concurrency})"
+            f"max_concurrency={self.max_concurrency}, "
+            f"engine={self.engine}, "
+            f"rpm_limit={self.rpm_limit}, "
+            f"tpm_limit={self.tpm_limit}, "
+            f"image_preprocess={self.image_preprocess}, "
+            f"cache_enabled={self.cache_enabled})"
         )
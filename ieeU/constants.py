@@ -6,7 +6,33 @@ DEFAULT_TIMEOUT = 60
 DEFAULT_RETRIES = 3
 DEFAULT_MAX_CONCURRENCY = 5
 DEFAULT_BATCH_SIZE = 10
+DEFAULT_ENGINE = "thread"
+ENGINES = ("thread", "async")
 OUTPUT_SUFFIX = "_ie.md"
+DEFAULT_RPM_LIMIT = 0
+DEFAULT_TPM_LIMIT = 0
+ESTIMATED_IMAGE_TOKENS = 1000
+ESTIMATED_COMPLETION_TOKENS = 500
+DEFAULT_IMAGE_MAX_PIXELS = 2_000_000
+DEFAULT_IMAGE_FORMAT = "original"
+DEFAULT_IMAGE_QUALITY = 85
+IMAGE_FORMATS = ("original", "jpeg", "png", "webp")
+DEFAULT_DOWNLOAD_STALL_TIMEOUT = 60
+DEFAULT_DOWNLOAD_SEGMENTS = 1
+MINERU_BATCH_LIMIT = 200
+DEFAULT_MINERU_BASE_URL = "https://mineru.net/api/v4"
+DEFAULT_MINERU_MODEL_VERSION = "vlm"
+DEFAULT_MINERU_TIMEOUT = 600
+DEFAULT_POLL_MIN_INTERVAL = 2
+DEFAULT_POLL_MAX_INTERVAL = 30
+DEFAULT_CACHE_DIR = os.path.join(DEFAULT_CONFIG_DIR, "cache")
+DEFAULT_CACHE_MAX_MB = 100
+DEFAULT_CACHE_MAX_AGE_DAYS = 30
+DEFAULT_PARSE_CACHE_MAX_MB = 1024
+DEFAULT_JOURNAL_DIR = os.path.join(DEFAULT_CONFIG_DIR, "jobs")
+DEFAULT_IMAGES_PER_REQUEST = 1
+DEFAULT_PACK_MAX_MB = 8
+DEFAULT_HEDGE_MAX_RATIO = 0.1
 
 PROMPT_TEMPLATE = """You are an expert at describing academic figures. Convert images into concise, structured textual descriptions.
 
@@ -25,3 +51,25 @@ Requirements:
 - For graphs: state axis labels, series names, and key trends in flowing prose
 - Maximum 150-300 words per figure
 """
+
+PACKED_PROMPT_TEMPLATE = """You are an expert at describing academic figures. Convert images into concise, structured textual descriptions.
+
+You will receive {count} images. Describe each image separately, in the order given, with exactly one numbered block per image from 1 to {count}:
+```figure 1
+[Description of image 1]
+```
+```figure 2
+[Description of image 2]
+```
+
+Requirements:
+- Never merge images or skip a number; every block describes only its own image
+- Write in ONE cohesive paragraph OR a single structured list (not both)
+- NO markdown formatting (no headers, no bold, no nested sections)
+- Preserve all text labels exactly as shown
+- Include: main purpose, key components, data values/formulas, and logical flow
+- Be precise and direct - avoid filler phrases like "This figure illustrates...", "The chart shows..."
+- For flowcharts: list steps with arrows (→) inline
+- For graphs: state axis labels, series names, and key trends in flowing prose
+- Maximum 150-300 words per figure
+"""
@@ -0,0 +1,69 @@
+"""Adaptive concurrency control for VLM requests."""
+
+import math
+import time
+from typing import List, Tuple
+
+from .logger import Logger
+from .results import APIErrorType
+
+THROTTLE_ERRORS = (APIErrorType.RATE_LIMIT, APIErrorType.CONCURRENCY_ERROR)
+
+
+class AIMDController:
+    """
+    加性增、乘性减（AIMD）并发控制器
+
+    - 遇到限流（RATE_LIMIT / CONCURRENCY_ERROR）时并发数乘以 decrease_factor
+    - 连续成功一整个窗口（limit 次）后并发数加一，直到 maximum
+
+    每次降档后 epoch 加一；在降档之前发出的请求再返回限流错误时不会重复
+    降档，相当于每个往返时间最多降一次。
+    """
+
+    def __init__(
+        self,
+        initial: int,
+        maximum: int,
+        logger: Logger,
+        minimum: int = 1,
+        decrease_factor: float = 0.5
+    ):
+        self.maximum = max(1, maximum)
+        self.minimum = max(1, min(minimum, self.maximum))
+        self.limit = max(self.minimum, min(initial, self.maximum))
+        self.decrease_factor = decrease_factor
+        self.logger = logger
+        self.epoch = 0
+        self.reached_minimum = False
+        self._successes = 0
+        self.history: List[Tuple[float, int]] = [(time.time(), self.limit)]
+
+    @staticmethod
+    def is_throttle(error_type: APIErrorType) -> bool:
+        return error_type in THROTTLE_ERRORS
+
+    def _set_limit(self, limit: int, reason: str):
+        old = self.limit
+        self.limit = limit
+        self.history.append((time.time(), limit))
+        self.logger.log_concurrency_change(old, limit, reason)
+
+    def on_success(self):
+        self._successes += 1
+        if self._successes >= self.limit and self.limit < self.maximum:
+            self._successes = 0
+            self._set_limit(self.limit + 1, "probe")
+
+    def on_throttle(self, epoch: int):
+        """请求在 epoch 时发出并被限流"""
+        self._successes = 0
+        if epoch < self.epoch:
+            return
+
+        self.epoch += 1
+        new_limit = max(self.minimum, int(math.floor(self.limit * self.decrease_factor)))
+        if new_limit == self.minimum:
+            self.reached_minimum = True
+        if new_limit != self.limit:
+            self._set_limit(new_limit, "throttled")
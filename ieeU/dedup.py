@@ -0,0 +1,120 @@
+"""Deduplication of identical and near-identical figures."""
+
+import threading
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Optional, Tuple
+
+try:
+    from PIL import Image
+except ImportError:  # pragma: no cover - optional dependency
+    Image = None
+
+from .cache import hash_file
+
+
+def dhash(path: str, hash_size: int = 8) -> Optional[int]:
+    """Difference hash of an image, or None if it cannot be decoded."""
+    if Image is None:
+        return None
+
+    try:
+        with Image.open(path) as image:
+            image.seek(0)
+            small = image.convert('L').resize((hash_size + 1, hash_size), Image.LANCZOS)
+    except Exception:
+        return None
+
+    pixels = small.tobytes()
+    value = 0
+    for row in range(hash_size):
+        for col in range(hash_size):
+            left = pixels[row * (hash_size + 1) + col]
+            right = pixels[row * (hash_size + 1) + col + 1]
+            value = (value << 1) | (1 if left > right else 0)
+    return value
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count('1')
+
+
+def group_duplicates(
+    image_paths: Dict[str, str],
+    max_distance: int = 0,
+    content_hash: Callable[[str], str] = hash_file
+) -> Dict[str, List[str]]:
+    """
+    Group figures that would get the same description.
+
+    Byte-identical files always share a group; with max_distance > 0 (and
+    Pillow installed) figures whose perceptual hashes differ by at most that
+    many bits are merged too. Returns {representative: [members]} where the
+    representative is the first member in document order and members include
+    it. Unreadable files stay in their own group.
+    """
+    groups: Dict[str, List[str]] = {}
+    by_hash: Dict[str, str] = {}
+
+    for rel_path, full_path in image_paths.items():
+        try:
+            digest = content_hash(full_path)
+        except OSError:
+            groups[rel_path] = [rel_path]
+            continue
+
+        representative = by_hash.setdefault(digest, rel_path)
+        groups.setdefault(representative, []).append(rel_path)
+
+    if max_distance <= 0 or Image is None:
+        return groups
+
+    fingerprints: List[Tuple[str, int]] = []
+    merged: Dict[str, List[str]] = {}
+    for representative, members in groups.items():
+        fingerprint = dhash(image_paths[representative])
+        if fingerprint is None:
+            merged[representative] = members
+            continue
+
+        for other, other_fingerprint in fingerprints:
+            if hamming(fingerprint, other_fingerprint) <= max_distance:
+                merged[other].extend(members)
+                break
+        else:
+            fingerprints.append((representative, fingerprint))
+            merged[representative] = members
+
+    return merged
+
+
+class InflightRegistry:
+    """
+    Coalesces identical requests that are in flight at the same time.
+
+    The first caller for a key becomes the leader and runs the request;
+    later callers get the leader's Future and wait on it instead of sending
+    their own copy.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, Future] = {}
+        self.coalesced = 0
+
+    def join(self, key: str) -> Tuple[Future, bool]:
+        """Return (future, is_leader) for key."""
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                self.coalesced += 1
+                return future, False
+
+            future = Future()
+            self._inflight[key] = future
+            return future, True
+
+    def resolve(self, key: str, result):
+        with self._lock:
+            future = self._inflight.pop(key, None)
+        if future is not None and not future.done():
+            future.set_result(result)
@@ -1,13 +1,44 @@
 import os
 import re
-from typing import Dict, List, Tuple
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+# ![alt](path "title") or ![alt](<path with spaces>), and HTML <img ... src="...">
+_IMAGE_PATTERN = re.compile(
+    r'!\[(?P<alt>[^\]]*)\]\(\s*(?P<path><[^>]*>|[^)]*?)'
+    r'(?:\s+(?P<quote>["\'])(?P<title>[^)]*?)(?P=quote))?\s*\)'
+    r'|<img\b(?P<attrs>[^>]*)>',
+    re.IGNORECASE
+)
+_HTML_ATTR_PATTERN = re.compile(
+    r'\b(src|alt|title)\s*=\s*(?:"([^"]*)"|\'([^\']*)\'|([^\s>]+))',
+    re.IGNORECASE
+)
+
+Renderer = Callable[['ImageReference'], Optional[str]]
 
 
 class ImageReference:
-    def __init__(self, path: str, line: int, figure_num: int):
+    __slots__ = ('path', 'line', 'figure_num', 'start', 'end', 'alt', 'title', 'html')
+    
+    def __init__(
+        self, 
+        path: str, 
+        line: int, 
+        figure_num: int,
+        start: int = -1,
+        end: int = -1,
+        alt: str = "",
+        title: Optional[str] = None,
+        html: bool = False
+    ):
         self.path = path
         self.line = line
         self.figure_num = figure_num
+        self.start = start
+        self.end = end
+        self.alt = alt
+        self.title = title
+        self.html = html
     
     def __repr__(self):
         return (
@@ -27,28 +58,138 @@ class ImageExtractor:
         return sorted(md_files)
     
     @staticmethod
-    def extract_image_references(content: str) -> List[ImageReference]:
-        references = []
-        
-        pattern = r'!\[([^\]]*)\]\(([^)]+)\)'
-        
-        matches = list(re.finditer(pattern, content))
+    def _scan(
+        text: str, 
+        line: int = 1, 
+        figure_num: int = 1
+    ) -> Iterator[ImageReference]:
+        """
+        Tokenize image references in one pass.
         
-        figure_counter = 1
-        for match in matches:
-            image_path = match.group(2)
+        Line numbers are tracked incrementally by counting newlines between
+        consecutive matches, so the scan stays linear in the text length.
+        """
+        position = 0
+        for match in _IMAGE_PATTERN.finditer(text):
+            line += text.count('\n', position, match.start())
+            position = match.start()
             
-            line = content[:match.start()].count('\n') + 1
+            if match.group('attrs') is not None:
+                attrs = {}
+                for attr in _HTML_ATTR_PATTERN.finditer(match.group('attrs')):
+                    value = next(v for v in attr.groups()[1:] if v is not None)
+                    attrs.setdefault(attr.group(1).lower(), value)
+                if 'src' not in attrs:
+                    continue
+                path, alt, title, html = attrs['src'], attrs.get('alt', ""), attrs.get('title'), True
+            else:
+                path = match.group('path')
+                if path.startswith('<') and path.endswith('>'):
+                    path = path[1:-1]
+                alt, title, html = match.group('alt'), match.group('title'), False
             
-            references.append(ImageReference(
-                path=image_path,
+            yield ImageReference(
+                path=path,
                 line=line,
-                figure_num=figure_counter
-            ))
-            figure_counter += 1
+                figure_num=figure_num,
+                start=match.start(),
+                end=match.end(),
+                alt=alt,
+                title=title,
+                html=html
+            )
+            figure_num += 1
+    
+    @staticmethod
+    def extract_image_references(content: str) -> List[ImageReference]:
+        return list(ImageExtractor._scan(content))
+    
+    @staticmethod
+    def rewrite_images(content: str, render: Renderer) -> str:
+        """
+        Replace every image reference in one linear pass.
+        
+        render(ref) returns the replacement text, or None to keep the
+        reference as written.
+        """
+        parts = []
+        position = 0
+        for ref in ImageExtractor._scan(content):
+            replacement = render(ref)
+            if replacement is None:
+                continue
+            parts.append(content[position:ref.start])
+            parts.append(replacement)
+            position = ref.end
         
+        if not parts:
+            return content
+        parts.append(content[position:])
+        return ''.join(parts)
+    
+    @staticmethod
+    def _scan_lines(f) -> Iterator[Tuple[str, List[ImageReference]]]:
+        """Yield (line, references in it), numbering figures across the file."""
+        figure_num = 1
+        for line_num, line in enumerate(f, 1):
+            references = list(ImageExtractor._scan(line, line_num, figure_num))
+            figure_num += len(references)
+            yield line, references
+    
+    @staticmethod
+    def scan_file(path: str) -> List[ImageReference]:
+        """
+        Collect image references from a file without loading it whole.
+        
+        The file is read line by line, so a reference must not span lines;
+        start/end are offsets within the reference's line.
+        """
+        references = []
+        with open(path, 'r', encoding='utf-8') as f:
+            for _, line_references in ImageExtractor._scan_lines(f):
+                references.extend(line_references)
         return references
     
+    @staticmethod
+    def rewrite_line(
+        line: str, 
+        references: List[ImageReference], 
+        render: Renderer
+    ) -> Tuple[str, int]:
+        """Apply render to the references scanned from line; return (text, replaced)."""
+        parts = []
+        position = 0
+        for ref in references:
+            replacement = render(ref)
+            if replacement is None:
+                continue
+            parts.append(line[position:ref.start])
+            parts.append(replacement)
+            position = ref.end
+        
+        if not parts:
+            return line, 0
+        replaced = len(parts) // 2
+        parts.append(line[position:])
+        return ''.join(parts), replaced
+    
+    @staticmethod
+    def rewrite_file(src_path: str, dst_path: str, render: Renderer) -> int:
+        """
+        Stream src_path to dst_path, replacing image references.
+        
+        Figures are numbered exactly as scan_file() numbers them. Returns
+        the number of references replaced.
+        """
+        replaced = 0
+        with open(src_path, 'r', encoding='utf-8') as src, \
+             open(dst_path, 'w', encoding='utf-8') as dst:
+            for line, references in ImageExtractor._scan_lines(src):
+                text, count = ImageExtractor.rewrite_line(line, references, render)
+                dst.write(text)
+                replaced += count
+        return replaced
+    
     @staticmethod
     def replace_images(
         content: str, 
@@ -0,0 +1,100 @@
+"""Hedged VLM requests: duplicate the slowest in-flight calls."""
+
+import threading
+from collections import deque
+from typing import Optional, Sequence
+
+# Per-image latencies kept for the percentile estimate
+HEDGE_WINDOW = 256
+# No hedging until this many requests have completed
+HEDGE_MIN_SAMPLES = 20
+# How often a call whose request has not gone out yet is checked again
+HEDGE_POLL_SECONDS = 0.05
+
+
+def percentile(values: Sequence[float], q: float) -> float:
+    """Linear-interpolated percentile, q in [0, 100]; 0.0 for no values."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * q / 100.0
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+class CallState:
+    """
+    Shared between a (possibly hedged) call and the request loop running it.
+
+    The loop records the backend it sent to, so the duplicate can go
+    elsewhere, and when the current attempt's request went out (None while
+    it waits on the rate limiter or backs off), so the hedge clock only
+    runs while a request is on the wire. It stops retrying once the call
+    is cancelled.
+    """
+
+    def __init__(self, avoid=None):
+        self.avoid = avoid
+        self.backend = None
+        self.sent: Optional[float] = None
+        self.cancelled = threading.Event()
+
+
+class HedgePolicy:
+    """
+    Decides when to send a duplicate request and caps how many are sent.
+
+    A call whose request has been on the wire for longer than the given
+    percentile of recent successful request latencies (per image, scaled
+    by the images in the request) gets one duplicate, as long as
+    duplicates stay within max_ratio of all calls. A percentile of 0
+    disables hedging.
+    """
+
+    def __init__(
+        self,
+        percentile: float = 0,
+        max_ratio: float = 0.1,
+        min_samples: int = HEDGE_MIN_SAMPLES,
+        window: int = HEDGE_WINDOW
+    ):
+        self.percentile = float(percentile or 0)
+        self.max_ratio = max(float(max_ratio), 0.0)
+        self.min_samples = min_samples
+        self.calls = 0
+        self.hedges = 0
+        self._latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config) -> 'HedgePolicy':
+        return cls(config.hedge_percentile, config.hedge_max_ratio)
+
+    @property
+    def enabled(self) -> bool:
+        return 0 < self.percentile < 100 and self.max_ratio > 0
+
+    def record(self, seconds: float, images: int = 1):
+        """Record a successful request's latency."""
+        with self._lock:
+            self._latencies.append(seconds / max(images, 1))
+
+    def delay(self, images: int = 1) -> Optional[float]:
+        """
+        Count a new call and return how long to wait before hedging it,
+        or None if it should not be hedged.
+        """
+        with self._lock:
+            self.calls += 1
+            if not self.enabled or len(self._latencies) < self.min_samples:
+                return None
+            return percentile(self._latencies, self.percentile) * max(images, 1)
+
+    def try_hedge(self) -> bool:
+        """Reserve one duplicate request if the hedge ratio allows it."""
+        with self._lock:
+            if self.hedges + 1 > self.max_ratio * self.calls:
+                return False
+            self.hedges += 1
+            return True
@@ -0,0 +1,145 @@
+"""Crash-safe per-document job journals."""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+from .constants import DEFAULT_JOURNAL_DIR
+
+FSYNC_EVERY = 16
+FSYNC_INTERVAL = 1.0
+
+
+class Journal:
+    """
+    Append-only JSON-lines record of one document's progress.
+
+    Records the MinerU batch the document was uploaded to, the result zip
+    URL once parsing finished, and every figure description as it arrives,
+    so an interrupted run can resume polling or skip described figures.
+    Each record is flushed to the OS immediately, which survives the
+    process being killed; fsync is batched to every FSYNC_EVERY records or
+    FSYNC_INTERVAL seconds, and forced on flush() and close(). A torn last
+    line from a crash is ignored on load. The file is only opened for
+    appending at the first record, so journals of documents that never
+    make progress hold no file handle.
+    """
+
+    def __init__(self, path: str, fresh: bool = False):
+        self.path = path
+        self.batch_id: Optional[str] = None
+        self.data_id: Optional[str] = None
+        self.zip_url: Optional[str] = None
+        self.figures: Dict[str, str] = {}
+
+        self._lock = threading.Lock()
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if fresh and os.path.exists(path):
+            os.remove(path)
+        self._load()
+        self._file = None
+        self._closed = False
+
+    @staticmethod
+    def key_for(*parts: Optional[str]) -> str:
+        digest = hashlib.sha256()
+        for part in parts:
+            digest.update((part or "").encode('utf-8'))
+            digest.update(b'\0')
+        return digest.hexdigest()[:32]
+
+    @classmethod
+    def for_document(
+        cls,
+        key: str,
+        journal_dir: str = DEFAULT_JOURNAL_DIR,
+        fresh: bool = False
+    ) -> 'Journal':
+        return cls(os.path.join(journal_dir, f"{key}.jsonl"), fresh)
+
+    @property
+    def resumable(self) -> bool:
+        return bool(self.batch_id or self.zip_url or self.figures)
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                self._apply(record)
+
+    def _apply(self, record: dict):
+        kind = record.get("type")
+        if kind == "batch":
+            self.batch_id = record.get("batch_id")
+            self.data_id = record.get("data_id")
+        elif kind == "zip":
+            self.zip_url = record.get("url")
+        elif kind == "reset":
+            self.batch_id = self.data_id = self.zip_url = None
+        elif kind == "figure":
+            self.figures[record["path"]] = record["description"]
+
+    def _append(self, record: dict):
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            if self._closed:
+                return
+            if self._file is None:
+                self._file = open(self.path, 'a', encoding='utf-8')
+            self._apply(record)
+            self._file.write(line)
+            self._file.flush()
+            self._unsynced += 1
+            now = time.monotonic()
+            if self._unsynced >= FSYNC_EVERY or now - self._last_sync >= FSYNC_INTERVAL:
+                self._sync(now)
+
+    def _sync(self, now: float):
+        os.fsync(self._file.fileno())
+        self._unsynced = 0
+        self._last_sync = now
+
+    def record_batch(self, batch_id: str, data_id: str):
+        self._append({"type": "batch", "batch_id": batch_id, "data_id": data_id})
+
+    def record_zip(self, url: str):
+        self._append({"type": "zip", "url": url})
+
+    def reset_parse(self):
+        """Forget the batch and zip so the next run uploads the document again."""
+        self._append({"type": "reset"})
+
+    def record_figure(self, rel_path: str, description: str):
+        self._append({"type": "figure", "path": rel_path, "description": description})
+
+    def flush(self):
+        with self._lock:
+            if self._file is not None and self._unsynced:
+                self._file.flush()
+                self._sync(time.monotonic())
+
+    def close(self):
+        self.flush()
+        with self._lock:
+            self._closed = True
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def discard(self):
+        """The document is finished; delete its journal."""
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
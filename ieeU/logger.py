@@ -1,5 +1,9 @@
+import threading
 from datetime import datetime
-from typing import Dict
+from typing import Dict, Optional
+
+from .metrics import Metrics
+from .trace import Tracer
 
 
 class Logger:
@@ -9,10 +13,24 @@ class Logger:
             'total': 0,
             'success': 0,
             'failed': 0,
+            'cache_hits': 0,
+            'cache_misses': 0,
+            'concurrency': [],
+            'dedup_saved': 0,
+            'packed_images': 0,
+            'packed_requests': 0,
+            'pack_fallbacks': 0,
+            'hedges': 0,
+            'hedge_wins': 0,
+            'stages': [],
+            'backends': [],
             'start_time': None,
             'end_time': None
         }
         self.errors = []
+        self.metrics = Metrics()
+        self.tracer = Tracer(enabled=False)
+        self._lock = threading.Lock()
     
     def log_progress(
         self, 
@@ -28,11 +46,116 @@ class Logger:
         else:
             self.stats['failed'] += 1
             status = "✗"
+        self.metrics.inc('images_total', result="success" if success else "failed")
         
         print(
             f"Processing {current}/{total}: {image_path} ... {status}"
         )
     
+    def log_cache(self, image_path: str, hit: bool):
+        with self._lock:
+            if hit:
+                self.stats['cache_hits'] += 1
+            else:
+                self.stats['cache_misses'] += 1
+        self.metrics.inc('cache_lookups_total', cache="description", result="hit" if hit else "miss")
+        
+        if self.verbose:
+            print(f"Cache {'hit' if hit else 'miss'}: {image_path}")
+    
+    def log_parse_cache(self, hit: bool):
+        self.metrics.inc('cache_lookups_total', cache="parse", result="hit" if hit else "miss")
+    
+    def log_dedup(self, saved: int):
+        with self._lock:
+            self.stats['dedup_saved'] += saved
+        self.metrics.inc('dedup_saved_total', saved)
+    
+    def log_request(
+        self, 
+        endpoint: str, 
+        seconds: float, 
+        result: str, 
+        uploaded_bytes: int = 0
+    ):
+        """One HTTP attempt; retries are logged as separate requests"""
+        self.metrics.observe('request_duration_seconds', seconds, endpoint=endpoint, result=result)
+        if uploaded_bytes:
+            self.metrics.inc('uploaded_bytes_total', uploaded_bytes, endpoint=endpoint)
+    
+    def log_retry(self, error_type: str, sleep_seconds: float):
+        self.metrics.inc('retries_total', error_type=error_type)
+        self.metrics.inc('retry_sleep_seconds_total', sleep_seconds, error_type=error_type)
+    
+    def log_tokens(self, usage: Optional[dict]):
+        """usage: the response's usage field (prompt_tokens / completion_tokens)"""
+        if not isinstance(usage, dict):
+            return
+        for kind in ('prompt', 'completion'):
+            tokens = usage.get(f'{kind}_tokens')
+            if isinstance(tokens, (int, float)) and tokens > 0:
+                self.metrics.inc('tokens_total', tokens, kind=kind)
+    
+    def log_mineru_phase(self, phase: str, seconds: float):
+        """Per-document MinerU time; phase is upload, parse or download"""
+        self.metrics.observe('mineru_phase_seconds', seconds, phase=phase)
+    
+    def log_inflight(self, requests_in_flight: int):
+        self.metrics.observe('vlm_inflight_requests', requests_in_flight)
+    
+    def log_backend_request(self, backend: str, result: str, images: int = 0):
+        self.metrics.inc('backend_requests_total', backend=backend, result=result)
+        if images:
+            self.metrics.inc('backend_images_total', images, backend=backend)
+    
+    def log_backend_ejected(self, backend: str, error_type: str, seconds: float):
+        self.metrics.inc('backend_ejections_total', backend=backend, error_type=error_type)
+        print(f"🚫 后端 {backend} 返回 {error_type}，暂停使用 {seconds:.0f} 秒")
+    
+    def log_backends(self, rows):
+        """rows: per-backend dicts from BackendPool.report()"""
+        self.stats['backends'] = list(rows)
+    
+    def log_hedge(self, outcome: str):
+        """outcome: won (the duplicate answered first), lost or failed"""
+        with self._lock:
+            self.stats['hedges'] += 1
+            if outcome == "won":
+                self.stats['hedge_wins'] += 1
+        self.metrics.inc('hedges_total', outcome=outcome)
+    
+    def log_pack(self, images: int, fallbacks: int):
+        with self._lock:
+            self.stats['packed_images'] += images
+            self.stats['packed_requests'] += 1
+            self.stats['pack_fallbacks'] += fallbacks
+        
+        if fallbacks:
+            print(f"📦 打包请求缺少 {fallbacks}/{images} 个有效描述，改为单图请求")
+    
+    def log_concurrency_change(self, old: int, new: int, reason: str):
+        self.stats['concurrency'].append(new)
+        self.metrics.set('vlm_concurrency_limit', new)
+        
+        if new < old:
+            print(f"📉 并发数调整: {old} → {new} ({reason})")
+        elif self.verbose:
+            print(f"📈 并发数调整: {old} → {new} ({reason})")
+    
+    def log_connection_reuse(self, label: str, requests_sent: int, connections: int):
+        if not self.verbose or requests_sent == 0:
+            return
+        
+        reused = max(requests_sent - connections, 0)
+        print(
+            f"{label} connections: {requests_sent} requests over "
+            f"{connections} connections ({reused / requests_sent:.0%} reused)"
+        )
+    
+    def log_stages(self, stages):
+        """stages: [(name, busy seconds, items, utilization)] from Pipeline.utilization()"""
+        self.stats['stages'] = list(stages)
+    
     def log_error(self, image_path: str, error: str):
         error_msg = f"Error for {image_path}: {error}"
         self.errors.append(error_msg)
@@ -48,6 +171,52 @@ class Logger:
         print(f"Success: {self.stats['success']}")
         print(f"Failed: {self.stats['failed']}")
         
+        cache_lookups = self.stats['cache_hits'] + self.stats['cache_misses']
+        if cache_lookups:
+            print(
+                f"Cache: {self.stats['cache_hits']} hits, "
+                f"{self.stats['cache_misses']} misses"
+            )
+        
+        if self.stats['dedup_saved']:
+            print(f"Deduplicated: {self.stats['dedup_saved']} requests saved")
+        
+        if self.stats['packed_requests']:
+            print(
+                f"Packed: {self.stats['packed_images']} images in "
+                f"{self.stats['packed_requests']} requests, "
+                f"{self.stats['pack_fallbacks']} single-image fallbacks"
+            )
+        
+        if self.stats['hedges']:
+            print(
+                f"Hedged: {self.stats['hedges']} slow requests duplicated, "
+                f"duplicate answered first {self.stats['hedge_wins']} times"
+            )
+        
+        if self.stats['concurrency']:
+            levels = self.stats['concurrency']
+            print(
+                f"Concurrency: {len(levels)} adjustments, "
+                f"min {min(levels)}, max {max(levels)}, final {levels[-1]}"
+            )
+        
+        if self.stats['stages']:
+            print("Stage utilization:")
+            for name, busy, items, utilization in self.stats['stages']:
+                print(f"  {name:<9} {utilization:>4.0%}  ({items} docs, {busy:.1f}s busy)")
+        
+        if len(self.stats['backends']) > 1:
+            print("Backends:")
+            for row in self.stats['backends']:
+                print(
+                    f"  {row['name']}: {row['images']} images, "
+                    f"{row['images_per_sec']:.2f} img/s, "
+                    f"{row['requests']} requests ({row['failures']} failed), "
+                    f"avg {row['latency']:.2f}s"
+                    + (f", ejected {row['ejections']}x" if row['ejections'] else "")
+                )
+        
         if self.errors:
             print(f"\nErrors ({len(self.errors)}):")
             for error in self.errors[:10]:
@@ -57,6 +226,26 @@ class Logger:
         
         print("=" * 50)
     
+    def export_metrics(self, path: str):
+        """Write run metrics: Prometheus text for .prom/.txt paths, JSON otherwise"""
+        try:
+            self.metrics.write(path)
+        except OSError as e:
+            print(f"⚠️ 指标写出失败: {e}")
+            return
+        print(f"Metrics: {path}")
+    
+    def export_trace(self, path: str):
+        """Write the recorded timeline as a Chrome trace-event JSON file"""
+        if not self.tracer.enabled:
+            return
+        try:
+            self.tracer.write(path)
+        except OSError as e:
+            print(f"⚠️ 时间线写出失败: {e}")
+            return
+        print(f"Trace: {path} ({len(self.tracer.events)} events)")
+    
     def log_file_info(self, filename: str, image_count: int):
         print(f"\nProcessing: {filename}")
         print(f"Found {image_count} images...")
@@ -0,0 +1,209 @@
+"""Run metrics with JSON and Prometheus text export."""
+
+import json
+import math
+import os
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+PREFIX = "ieeu_"
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+PHASE_BUCKETS = (0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1800.0)
+CONCURRENCY_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512)
+
+# name: (type, help, histogram buckets)
+DEFINITIONS: Dict[str, Tuple[str, str, Optional[Sequence[float]]]] = {
+    "request_duration_seconds": (
+        "histogram", "Request latency by endpoint and result", LATENCY_BUCKETS),
+    "retries_total": (
+        "counter", "Retried requests by error type", None),
+    "retry_sleep_seconds_total": (
+        "counter", "Seconds spent backing off before retries, by error type", None),
+    "uploaded_bytes_total": (
+        "counter", "Request body bytes sent, by endpoint", None),
+    "tokens_total": (
+        "counter", "Tokens reported in response usage, by kind", None),
+    "mineru_phase_seconds": (
+        "histogram", "Per-document MinerU upload, parse and download time", PHASE_BUCKETS),
+    "vlm_concurrency_limit": (
+        "gauge", "Current adaptive VLM concurrency limit", None),
+    "vlm_inflight_requests": (
+        "histogram", "VLM requests in flight when a request is sent", CONCURRENCY_BUCKETS),
+    "cache_lookups_total": (
+        "counter", "Cache lookups by cache and result", None),
+    "images_total": (
+        "counter", "Images finished, by result", None),
+    "dedup_saved_total": (
+        "counter", "Requests saved by deduplicating identical images", None),
+    "backend_requests_total": (
+        "counter", "VLM requests by backend and result", None),
+    "backend_images_total": (
+        "counter", "Images described, by backend", None),
+    "hedges_total": (
+        "counter", "Duplicate requests sent for slow calls, by which copy answered first", None),
+    "backend_ejections_total": (
+        "counter", "Times a backend was taken out of rotation, by backend and error type", None),
+}
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+class _Histogram:
+    __slots__ = ('buckets', 'counts', 'count', 'sum', 'min', 'max')
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def observe(self, value: float):
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+                break
+        self.count += 1
+        self.sum += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        rows = []
+        total = 0
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            rows.append((_format_number(bound), total))
+        rows.append(("+Inf", self.count))
+        return rows
+
+    def as_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "min": self.min if self.count else None,
+            "max": self.max if self.count else None,
+            "buckets": dict(self.cumulative()),
+        }
+
+
+def _format_number(value: float) -> str:
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value)) if abs(value) < 1e15 else repr(value)
+    return repr(value)
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+class Metrics:
+    """
+    Thread-safe registry of the metrics in DEFINITIONS.
+
+    Each metric holds one series per label combination. as_dict() gives a
+    JSON-friendly snapshot; to_prometheus() the text exposition format,
+    with names prefixed by "ieeu_".
+    """
+
+    def __init__(self):
+        self._series: Dict[str, Dict[LabelKey, object]] = {name: {} for name in DEFINITIONS}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(labels: Dict[str, object]) -> LabelKey:
+        return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+    def _kind(self, name: str, expected: str):
+        kind = DEFINITIONS[name][0]
+        if kind != expected:
+            raise ValueError(f"{name} is a {kind}, not a {expected}")
+
+    def inc(self, name: str, amount: float = 1, **labels):
+        self._kind(name, "counter")
+        key = self._key(labels)
+        with self._lock:
+            series = self._series[name]
+            series[key] = series.get(key, 0) + amount
+
+    def set(self, name: str, value: float, **labels):
+        self._kind(name, "gauge")
+        with self._lock:
+            self._series[name][self._key(labels)] = value
+
+    def observe(self, name: str, value: float, **labels):
+        self._kind(name, "histogram")
+        key = self._key(labels)
+        with self._lock:
+            series = self._series[name]
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = _Histogram(DEFINITIONS[name][2])
+            histogram.observe(value)
+
+    def get(self, name: str, **labels):
+        """Current value of a counter or gauge, or the histogram; None if never recorded."""
+        with self._lock:
+            return self._series[name].get(self._key(labels))
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            snapshot = {}
+            for name, series in self._series.items():
+                if not series:
+                    continue
+                kind = DEFINITIONS[name][0]
+                snapshot[name] = {
+                    "type": kind,
+                    "series": [
+                        {
+                            "labels": dict(key),
+                            **(value.as_dict() if kind == "histogram" else {"value": value}),
+                        }
+                        for key, value in sorted(series.items())
+                    ],
+                }
+            return snapshot
+
+    def to_prometheus(self) -> str:
+        lines = []
+        with self._lock:
+            for name, series in self._series.items():
+                if not series:
+                    continue
+                kind, help_text, _ = DEFINITIONS[name]
+                full_name = PREFIX + name
+                lines.append(f"# HELP {full_name} {help_text}")
+                lines.append(f"# TYPE {full_name} {kind}")
+                for key, value in sorted(series.items()):
+                    if kind != "histogram":
+                        lines.append(f"{full_name}{_labels(key)} {_format_number(value)}")
+                        continue
+                    for bound, count in value.cumulative():
+                        lines.append(f"{full_name}_bucket{_labels(key, ('le', bound))} {count}")
+                    lines.append(f"{full_name}_sum{_labels(key)} {_format_number(value.sum)}")
+                    lines.append(f"{full_name}_count{_labels(key)} {value.count}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str):
+        """Write to path: Prometheus text for .prom/.txt files, JSON otherwise."""
+        if os.path.splitext(path)[1].lower() in (".prom", ".txt"):
+            text = self.to_prometheus()
+        else:
+            text = json.dumps(self.as_dict(), indent=2, ensure_ascii=False) + "\n"
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(tmp_path, path)
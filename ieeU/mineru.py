@@ -1,149 +1,367 @@
 """MinerU API client for PDF parsing."""
 
-import io
 import os
+import posixpath
 import time
 import zipfile
-from typing import Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
 
 import requests
 
+from .constants import (
+    DEFAULT_DOWNLOAD_STALL_TIMEOUT,
+    DEFAULT_DOWNLOAD_SEGMENTS,
+    DEFAULT_MINERU_TIMEOUT,
+    DEFAULT_MINERU_MODEL_VERSION,
+    DEFAULT_MINERU_BASE_URL,
+    MINERU_BATCH_LIMIT
+)
+from .cache import ParseCache, hash_file
+from .download import download_file
+from .extractor import ImageExtractor
 from .logger import Logger
+from .poller import AdaptivePoller
+from .session import PooledSession
+
+UPLOAD_WORKERS = 8
 
 
 class MinerUClient:
     """Client for MinerU cloud API."""
     
-    BASE_URL = "https://mineru.net/api/v4"
+    BASE_URL = DEFAULT_MINERU_BASE_URL
     
-    def __init__(self, token: str, logger: Logger):
+    def __init__(
+        self, 
+        token: str, 
+        logger: Logger,
+        stall_timeout: float = DEFAULT_DOWNLOAD_STALL_TIMEOUT,
+        download_segments: int = DEFAULT_DOWNLOAD_SEGMENTS,
+        poll_timeout: float = DEFAULT_MINERU_TIMEOUT,
+        model_version: str = DEFAULT_MINERU_MODEL_VERSION,
+        parse_cache: Optional[ParseCache] = None,
+        refresh: bool = False,
+        base_url: Optional[str] = None
+    ):
         self.token = token
         self.logger = logger
+        self.stall_timeout = stall_timeout
+        self.download_segments = download_segments
+        self.poll_timeout = poll_timeout
+        self.model_version = model_version
+        self.parse_cache = parse_cache
+        self.refresh = refresh
+        if base_url:
+            self.BASE_URL = base_url.rstrip('/')
+        self._cache_keys: Dict[str, str] = {}
+        # (batch_id, data_id) -> when the upload finished, for parse timing
+        self._uploaded_at: Dict[Tuple[str, str], float] = {}
+        self.session = PooledSession()
         self.headers = {
             "Content-Type": "application/json",
             "Authorization": f"Bearer {token}"
         }
     
-    def _upload_file(self, pdf_path: str) -> Optional[str]:
+    @classmethod
+    def from_config(
+        cls, 
+        config, 
+        logger: Logger, 
+        parse_cache: Optional[ParseCache] = None
+    ) -> 'MinerUClient':
+        return cls(
+            config.mineru_token or "",
+            logger,
+            config.download_stall_timeout,
+            config.download_segments,
+            config.mineru_timeout,
+            config.mineru_model_version,
+            parse_cache,
+            config.refresh_parse,
+            config.mineru_base_url
+        )
+    
+    def _parse_cache_key(self, pdf_path: str, pdf_hash: Optional[str] = None) -> Optional[str]:
+        if self.parse_cache is None:
+            return None
+        
+        key = self._cache_keys.get(pdf_path)
+        if key is None:
+            try:
+                key = ParseCache.make_key(pdf_hash or hash_file(pdf_path), self.model_version)
+            except OSError:
+                return None
+            self._cache_keys[pdf_path] = key
+        return key
+    
+    def load_cached(
+        self, 
+        pdf_path: str, 
+        work_dir: str,
+        pdf_hash: Optional[str] = None
+    ) -> Optional[Tuple[str, Optional[str]]]:
         """
-        Upload PDF file and get batch_id.
+        Look up a previous parse of the same PDF and model version.
+        
+        pdf_hash, when the caller has already hashed the file, saves
+        reading it again.
         
         Returns:
-            batch_id if successful, None otherwise
+            (markdown_path, images_dir) copied into work_dir, None on a miss
+            or when refreshing
+        """
+        key = self._parse_cache_key(pdf_path, pdf_hash)
+        if key is None or self.refresh:
+            return None
+        
+        md_path = self.parse_cache.get(key, work_dir)
+        self.logger.log_parse_cache(md_path is not None)
+        if md_path is None:
+            return None
+        
+        print(f"使用缓存的解析结果: {os.path.basename(pdf_path)}")
+        return md_path, self._find_images_dir(md_path)
+    
+    def _request_upload_urls(
+        self, 
+        pdf_paths: Dict[str, str]
+    ) -> Optional[Tuple[str, List[str]]]:
         """
-        filename = os.path.basename(pdf_path)
+        Request upload URLs for several files in one batch call.
         
-        # Step 1: Get upload URL
+        Args:
+            pdf_paths: Mapping of data_id to PDF path, in upload order
+            
+        Returns:
+            (batch_id, upload URLs in the same order) or None if failed
+        """
         url = f"{self.BASE_URL}/file-urls/batch"
         data = {
-            "files": [{"name": filename}],
-            "model_version": "vlm"
+            "files": [
+                {"name": os.path.basename(path), "data_id": data_id}
+                for data_id, path in pdf_paths.items()
+            ],
+            "model_version": self.model_version
         }
         
+        started = time.monotonic()
         try:
-            response = requests.post(url, headers=self.headers, json=data)
-            response.raise_for_status()
-            result = response.json()
-            
-            if result.get("code") != 0:
+            with self.logger.tracer.span("request upload urls", "mineru", files=len(pdf_paths)):
+                response = self.session.post(url, headers=self.headers, json=data)
+                response.raise_for_status()
+                result = response.json()
+        except requests.exceptions.RequestException as e:
+            self.logger.log_request("mineru_batch", time.monotonic() - started, "error")
+            for path in pdf_paths.values():
+                self.logger.log_error(path, f"Request failed: {e}")
+            return None
+        self.logger.log_request("mineru_batch", time.monotonic() - started, "success")
+        
+        if result.get("code") != 0:
+            for path in pdf_paths.values():
                 self.logger.log_error(
-                    pdf_path, 
+                    path, 
                     f"MinerU API error: {result.get('msg', 'Unknown error')}"
                 )
-                return None
+            return None
+        
+        file_urls = result["data"]["file_urls"]
+        if len(file_urls) != len(pdf_paths):
+            for path in pdf_paths.values():
+                self.logger.log_error(path, "No upload URL returned")
+            return None
+        
+        return result["data"]["batch_id"], file_urls
+    
+    def _put_file(self, upload_url: str, pdf_path: str) -> bool:
+        started = time.monotonic()
+        try:
+            size = os.path.getsize(pdf_path)
+            with self.logger.tracer.span("upload", "mineru", file=os.path.basename(pdf_path)), \
+                 open(pdf_path, 'rb') as f:
+                upload_response = self.session.put(upload_url, data=f)
+        except (OSError, requests.exceptions.RequestException) as e:
+            self.logger.log_request("mineru_upload", time.monotonic() - started, "error")
+            self.logger.log_error(pdf_path, f"Upload failed: {e}")
+            return False
+        
+        elapsed = time.monotonic() - started
+        ok = upload_response.status_code == 200
+        self.logger.log_request("mineru_upload", elapsed, "success" if ok else "error", size)
+        if not ok:
+            self.logger.log_error(
+                pdf_path, 
+                f"Upload failed: {upload_response.status_code}"
+            )
+            return False
+        
+        self.logger.log_mineru_phase("upload", elapsed)
+        print(f"文件上传成功: {os.path.basename(pdf_path)}")
+        return True
+    
+    def _upload_batch(
+        self, 
+        pdf_paths: Dict[str, str]
+    ) -> Tuple[Optional[str], Dict[str, str]]:
+        """
+        Upload a batch of PDFs in parallel.
+        
+        Returns:
+            (batch_id, {data_id: pdf_path} of the files that were uploaded)
+        """
+        requested = self._request_upload_urls(pdf_paths)
+        if not requested:
+            return None, {}
+        
+        batch_id, file_urls = requested
+        items = list(pdf_paths.items())
+        workers = min(UPLOAD_WORKERS, len(items))
+        self.session.resize(workers)
+        
+        def upload(item):
+            (data_id, path), upload_url = item
+            if not self._put_file(upload_url, path):
+                return False
+            self._uploaded_at[(batch_id, data_id)] = time.monotonic()
+            return True
+        
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            uploaded = list(executor.map(upload, zip(items, file_urls)))
+        
+        return batch_id, {
+            data_id: path 
+            for (data_id, path), ok in zip(items, uploaded) 
+            if ok
+        }
+    
+    def _poll_batches(
+        self, 
+        batches: List[Tuple[str, Dict[str, str]]]
+    ) -> Iterator[Tuple[str, str, Optional[str]]]:
+        """
+        Poll every batch from one loop and yield documents as they finish.
+        
+        Poll timing comes from AdaptivePoller: intervals follow the observed
+        page throughput, with backoff and jitter, and a batch only times out
+        after poll_timeout seconds without progress.
+        
+        Yields:
+            (data_id, pdf_path, full_zip_url), with None as the URL if the
+            document failed or timed out
+        """
+        poller = AdaptivePoller(timeout=self.poll_timeout)
+        for batch_id, pdf_paths in batches:
+            poller.track(batch_id, pdf_paths)
+        
+        while poller.active:
+            batch, wait = poller.next_due()
+            if wait > 0:
+                with self.logger.tracer.span("poll wait", "mineru"):
+                    time.sleep(wait)
             
-            batch_id = result["data"]["batch_id"]
-            file_urls = result["data"]["file_urls"]
+            url = f"{self.BASE_URL}/extract-results/batch/{batch.batch_id}"
+            started = time.monotonic()
+            try:
+                with self.logger.tracer.span("poll", "mineru", batch=batch.batch_id):
+                    response = self.session.get(url, headers=self.headers)
+                    response.raise_for_status()
+                    result = response.json()
+                self.logger.log_request("mineru_poll", time.monotonic() - started, "success")
+            except requests.exceptions.RequestException as e:
+                self.logger.log_request("mineru_poll", time.monotonic() - started, "error")
+                print(f"查询请求失败: {e}")
+                poller.on_error(batch)
+                result = None
             
-            if not file_urls:
-                self.logger.log_error(pdf_path, "No upload URL returned")
-                return None
+            if result is not None and result.get("code") != 0:
+                print(f"查询失败: {result.get('msg', 'Unknown error')}")
+                for data_id in poller.drop(batch):
+                    yield data_id, batch.pdf_paths[data_id], None
+                continue
             
-            upload_url = file_urls[0]
+            if result is not None:
+                tasks = result["data"].get("extract_result", [])
+                for data_id, zip_url in poller.update(batch, tasks):
+                    name = os.path.basename(batch.pdf_paths[data_id])
+                    uploaded_at = self._uploaded_at.pop((batch.batch_id, data_id), None)
+                    if zip_url:
+                        if uploaded_at is not None:
+                            self.logger.log_mineru_phase("parse", time.monotonic() - uploaded_at)
+                        print(f"解析完成: {name}")
+                    else:
+                        task = next((t for t in tasks if batch.resolve(t) == data_id), {})
+                        print(f"解析失败 [{name}]: {task.get('err_msg', 'Unknown error')}")
+                    yield data_id, batch.pdf_paths[data_id], zip_url
             
-            # Step 2: Upload file
-            with open(pdf_path, 'rb') as f:
-                upload_response = requests.put(upload_url, data=f)
-                
-                if upload_response.status_code != 200:
-                    self.logger.log_error(
-                        pdf_path, 
-                        f"Upload failed: {upload_response.status_code}"
-                    )
-                    return None
+            if not batch.pending:
+                poller.drop(batch)
+                continue
             
-            print(f"文件上传成功: {filename}")
-            return batch_id
+            if poller.expired(batch):
+                print(f"超时: 超过 {self.poll_timeout} 秒没有解析进度")
+                for data_id in poller.drop(batch):
+                    yield data_id, batch.pdf_paths[data_id], None
+                continue
             
-        except requests.exceptions.RequestException as e:
-            self.logger.log_error(pdf_path, f"Request failed: {e}")
+            total = len(batch.pdf_paths)
+            if batch.running:
+                print(
+                    f"解析中: {total - len(batch.pending)}/{total} 个文件完成, "
+                    f"{batch.pages_done}/{batch.pages_total} 页..."
+                )
+            elif self.logger.verbose:
+                print(f"状态: 等待中 ({len(batch.pending)} 个文件)...")
+        
+        if self.logger.verbose:
+            print(f"MinerU 查询次数: {poller.polls}")
+    
+    @staticmethod
+    def _find_markdown_member(names: List[str]) -> Optional[str]:
+        """Pick the markdown entry from the zip index, preferring full.md."""
+        candidates = [name for name in names if name.endswith('.md')]
+        if not candidates:
             return None
+        
+        for name in candidates:
+            if posixpath.basename(name) == 'full.md':
+                return name
+        return min(candidates, key=lambda name: (name.count('/'), name))
     
-    def _poll_result(
+    def _extract_selected(
         self, 
-        batch_id: str, 
-        timeout: int = 300,
-        poll_interval: int = 5
+        zf: zipfile.ZipFile, 
+        extract_dir: str
     ) -> Optional[str]:
         """
-        Poll for extraction result.
+        Extract only the markdown and the images it references.
+        
+        Layout JSON, origin PDFs and page renders in the archive are skipped.
         
-        Args:
-            batch_id: Batch ID from upload
-            timeout: Max wait time in seconds
-            poll_interval: Seconds between polls
-            
         Returns:
-            full_zip_url if successful, None otherwise
+            Path to extracted markdown file, None if the archive has none
         """
-        url = f"{self.BASE_URL}/extract-results/batch/{batch_id}"
-        start_time = time.time()
+        names = zf.namelist()
+        md_member = self._find_markdown_member(names)
+        if not md_member:
+            return None
         
-        while time.time() - start_time < timeout:
-            try:
-                response = requests.get(url, headers=self.headers)
-                response.raise_for_status()
-                result = response.json()
-                
-                if result.get("code") != 0:
-                    print(f"查询失败: {result.get('msg', 'Unknown error')}")
-                    return None
-                
-                extract_results = result["data"].get("extract_result", [])
-                
-                if not extract_results:
-                    time.sleep(poll_interval)
-                    continue
-                
-                task = extract_results[0]
-                state = task.get("state", "")
-                
-                if state == "done":
-                    print("解析完成!")
-                    return task.get("full_zip_url")
-                
-                elif state == "failed":
-                    err_msg = task.get("err_msg", "Unknown error")
-                    print(f"解析失败: {err_msg}")
-                    return None
-                
-                elif state == "running":
-                    progress = task.get("extract_progress", {})
-                    extracted = progress.get("extracted_pages", 0)
-                    total = progress.get("total_pages", 0)
-                    print(f"解析中: {extracted}/{total} 页...")
-                
-                elif state in ("pending", "waiting-file", "converting"):
-                    print(f"状态: {state}...")
-                
-                time.sleep(poll_interval)
-                
-            except requests.exceptions.RequestException as e:
-                print(f"查询请求失败: {e}")
-                time.sleep(poll_interval)
+        content = zf.read(md_member).decode('utf-8')
+        md_dir = posixpath.dirname(md_member)
+        members = set(names)
+        
+        wanted = {md_member}
+        for ref in ImageExtractor.extract_image_references(content):
+            member = posixpath.normpath(posixpath.join(md_dir, ref.path))
+            if member in members:
+                wanted.add(member)
         
-        print(f"超时: 等待超过 {timeout} 秒")
-        return None
+        for member in wanted:
+            zf.extract(member, extract_dir)
+        
+        if self.logger.verbose:
+            print(f"解压 {len(wanted)}/{len(names)} 个文件")
+        return os.path.join(extract_dir, *md_member.split('/'))
     
     def _download_and_extract(
         self, 
@@ -151,35 +369,171 @@ class MinerUClient:
         extract_dir: str
     ) -> Optional[str]:
         """
-        Download zip and extract to directory.
+        Download zip and extract the markdown and its images to directory.
         
         Returns:
             Path to extracted markdown file, None if failed
         """
+        zip_path = os.path.join(extract_dir, "result.zip")
+        
+        started = time.monotonic()
         try:
             print(f"下载结果文件...")
-            response = requests.get(zip_url, timeout=120)
-            response.raise_for_status()
+            try:
+                with self.logger.tracer.span("download", "mineru"):
+                    size = download_file(
+                        self.session, 
+                        zip_url, 
+                        zip_path, 
+                        self.stall_timeout, 
+                        self.download_segments
+                    )
+            except Exception:
+                self.logger.log_request("mineru_download", time.monotonic() - started, "error")
+                raise
+            self.logger.log_request("mineru_download", time.monotonic() - started, "success")
+            print(f"下载完成: {size / 1024 / 1024:.1f} MB")
             
-            # Extract zip in memory
-            with zipfile.ZipFile(io.BytesIO(response.content)) as zf:
-                zf.extractall(extract_dir)
+            with self.logger.tracer.span("extract", "mineru"), zipfile.ZipFile(zip_path) as zf:
+                md_path = self._extract_selected(zf, extract_dir)
+            os.remove(zip_path)
             
-            # Find markdown file
-            for root, dirs, files in os.walk(extract_dir):
-                for f in files:
-                    if f.endswith('.md'):
-                        md_path = os.path.join(root, f)
-                        print(f"找到 Markdown: {f}")
-                        return md_path
+            if not md_path:
+                print("未找到 Markdown 文件")
+                return None
             
-            print("未找到 Markdown 文件")
-            return None
+            self.logger.log_mineru_phase("download", time.monotonic() - started)
+            print(f"找到 Markdown: {os.path.basename(md_path)}")
+            return md_path
             
         except Exception as e:
             print(f"下载/解压失败: {e}")
             return None
     
+    @staticmethod
+    def _find_images_dir(md_path: str) -> Optional[str]:
+        images_dir = os.path.join(os.path.dirname(md_path), "images")
+        return images_dir if os.path.isdir(images_dir) else None
+    
+    def poll_pdfs(
+        self, 
+        pdf_paths: List[str],
+        resume: Optional[Dict[str, Tuple[str, str]]] = None,
+        on_uploaded: Optional[Callable[[str, str, str], None]] = None
+    ) -> Iterator[Tuple[str, str, Optional[str]]]:
+        """
+        Upload PDFs with MinerU batch API and wait for them to be parsed.
+        
+        All files are uploaded first, in batches of at most MINERU_BATCH_LIMIT
+        with parallel uploads, then each batch is polled as a whole and
+        documents are yielded in completion order.
+        
+        Args:
+            pdf_paths: Paths to PDF files
+            resume: {pdf_path: (batch_id, data_id)} for files uploaded by an
+                earlier run; these are polled again instead of re-uploaded
+            on_uploaded: Called as on_uploaded(pdf_path, batch_id, data_id)
+                after each successful upload
+        
+        Yields:
+            (data_id, pdf_path, full_zip_url), with None as the URL for
+            documents that failed to upload or parse
+        """
+        resume = resume or {}
+        resumed: Dict[str, Dict[str, str]] = {}
+        for path in pdf_paths:
+            if path in resume:
+                batch_id, data_id = resume[path]
+                resumed.setdefault(batch_id, {})[data_id] = path
+        batches = list(resumed.items())
+        if resumed:
+            print(f"\n恢复 {sum(len(b) for b in resumed.values())} 个已上传 PDF 的解析")
+        
+        new_paths = [path for path in pdf_paths if path not in resume]
+        for start in range(0, len(new_paths), MINERU_BATCH_LIMIT):
+            chunk = {
+                str(index): new_paths[index]
+                for index in range(start, min(start + MINERU_BATCH_LIMIT, len(new_paths)))
+            }
+            print(f"\n正在使用 MinerU 解析 {len(chunk)} 个 PDF...")
+            batch_id, uploaded = self._upload_batch(chunk)
+            for data_id, path in chunk.items():
+                if data_id not in uploaded:
+                    yield data_id, path, None
+            if batch_id and uploaded:
+                batches.append((batch_id, uploaded))
+                if on_uploaded is not None:
+                    for data_id, path in uploaded.items():
+                        on_uploaded(path, batch_id, data_id)
+        
+        yield from self._poll_batches(batches)
+    
+    def fetch_result(
+        self, 
+        data_id: str, 
+        zip_url: str, 
+        work_dir: str,
+        pdf_path: Optional[str] = None
+    ) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Download a parsed document into its own subdirectory of work_dir.
+        
+        When pdf_path is given and the parse cache is enabled, the extracted
+        result is also stored in the cache.
+        
+        Returns:
+            Tuple of (markdown_path, images_dir) or (None, None) if failed
+        """
+        extract_dir = os.path.join(work_dir, data_id)
+        os.makedirs(extract_dir, exist_ok=True)
+        md_path = self._download_and_extract(zip_url, extract_dir)
+        if not md_path:
+            return None, None
+        
+        key = self._parse_cache_key(pdf_path) if pdf_path else None
+        if key is not None:
+            try:
+                self.parse_cache.put(key, extract_dir, md_path)
+            except OSError as e:
+                print(f"⚠️ 解析结果缓存失败: {e}")
+        
+        return md_path, self._find_images_dir(md_path)
+    
+    def parse_pdfs(
+        self, 
+        pdf_paths: List[str], 
+        work_dir: str
+    ) -> Iterator[Tuple[str, Optional[str], Optional[str]]]:
+        """
+        Parse many PDFs using MinerU batch API.
+        
+        Args:
+            pdf_paths: Paths to PDF files
+            work_dir: Directory to extract results; each document gets its own
+                subdirectory
+            
+        Yields:
+            (pdf_path, markdown_path, images_dir) in completion order, with
+            (pdf_path, None, None) for documents that failed; documents in
+            the parse cache come first, without contacting MinerU
+        """
+        to_parse = []
+        for index, pdf_path in enumerate(pdf_paths):
+            cached = self.load_cached(pdf_path, os.path.join(work_dir, f"cached_{index}"))
+            if cached:
+                yield (pdf_path,) + cached
+            else:
+                to_parse.append(pdf_path)
+        
+        if not to_parse:
+            return
+        
+        for data_id, pdf_path, zip_url in self.poll_pdfs(to_parse):
+            if not zip_url:
+                yield pdf_path, None, None
+                continue
+            yield (pdf_path,) + self.fetch_result(data_id, zip_url, work_dir, pdf_path)
+    
     def parse_pdf(
         self, 
         pdf_path: str, 
@@ -195,28 +549,6 @@ class MinerUClient:
         Returns:
             Tuple of (markdown_path, images_dir) or (None, None) if failed
         """
-        print(f"\n正在使用 MinerU 解析 PDF: {os.path.basename(pdf_path)}")
-        
-        # Upload
-        batch_id = self._upload_file(pdf_path)
-        if not batch_id:
-            return None, None
-        
-        # Poll for result
-        zip_url = self._poll_result(batch_id)
-        if not zip_url:
-            return None, None
-        
-        # Download and extract
-        md_path = self._download_and_extract(zip_url, work_dir)
-        if not md_path:
-            return None, None
-        
-        # Find images directory
-        md_dir = os.path.dirname(md_path)
-        images_dir = os.path.join(md_dir, "images")
-        
-        if not os.path.isdir(images_dir):
-            images_dir = None
-        
-        return md_path, images_dir
+        for _, md_path, images_dir in self.parse_pdfs([pdf_path], work_dir):
+            return md_path, images_dir
+        return None, None
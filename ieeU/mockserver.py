@@ -0,0 +1,494 @@
+"""Local stand-ins for the VLM chat endpoint and the MinerU v4 API."""
+
+import abc
+import io
+import json
+import math
+import random
+import re
+import struct
+import threading
+import time
+import uuid
+import zipfile
+import zlib
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Deque, Dict, List, Optional, Tuple
+
+_RANGE = re.compile(r'bytes=(\d*)-(\d*)')
+
+Reply = Tuple[int, bytes, Dict[str, str]]
+
+
+def synthetic_png(width: int, height: int, seed: int) -> bytes:
+    """A valid RGB PNG of random noise; different seeds give different bytes."""
+    rng = random.Random(seed)
+    row_size = width * 3
+    raw = b''.join(
+        b'\x00' + rng.getrandbits(row_size * 8).to_bytes(row_size, 'little')
+        for _ in range(height)
+    )
+
+    def chunk(tag: bytes, data: bytes) -> bytes:
+        crc = zlib.crc32(tag + data) & 0xffffffff
+        return struct.pack('>I', len(data)) + tag + data + struct.pack('>I', crc)
+
+    header = struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)
+    return (
+        b'\x89PNG\r\n\x1a\n'
+        + chunk(b'IHDR', header)
+        + chunk(b'IDAT', zlib.compress(raw))
+        + chunk(b'IEND', b'')
+    )
+
+
+class LatencyModel:
+    """
+    Random service times in seconds.
+
+    Built from a spec string: "0.1" or "fixed:0.1", "uniform:LOW:HIGH",
+    "lognormal:MEDIAN:SIGMA" (heavy tail) or "exp:MEAN".
+    """
+
+    KINDS = ("fixed", "uniform", "lognormal", "exp")
+
+    def __init__(
+        self,
+        kind: str = "fixed",
+        a: float = 0.0,
+        b: float = 0.0,
+        rng: Optional[random.Random] = None
+    ):
+        if kind not in self.KINDS:
+            raise ValueError(f"unknown latency distribution: {kind}")
+        self.kind = kind
+        self.a = a
+        self.b = b
+        self.rng = rng or random.Random()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def parse(cls, spec: str, rng: Optional[random.Random] = None) -> 'LatencyModel':
+        parts = str(spec).split(':')
+        try:
+            if len(parts) == 1:
+                return cls("fixed", float(parts[0]), rng=rng)
+            values = [float(value) for value in parts[1:]]
+        except ValueError:
+            raise ValueError(f"invalid latency spec: {spec}") from None
+
+        kind = parts[0]
+        if kind in ("fixed", "exp") and len(values) == 1:
+            return cls(kind, values[0], rng=rng)
+        if kind in ("uniform", "lognormal") and len(values) == 2:
+            return cls(kind, values[0], values[1], rng=rng)
+        raise ValueError(f"invalid latency spec: {spec}")
+
+    def sample(self) -> float:
+        with self._lock:
+            if self.kind == "uniform":
+                return self.rng.uniform(self.a, self.b)
+            if self.kind == "lognormal":
+                return self.a * math.exp(self.rng.gauss(0.0, self.b))
+            if self.kind == "exp":
+                return self.rng.expovariate(1.0 / self.a) if self.a > 0 else 0.0
+            return self.a
+
+    def __repr__(self):
+        return f"LatencyModel({self.kind}, {self.a}, {self.b})"
+
+
+class FaultInjector:
+    """
+    Decides which requests fail.
+
+    throttle_rate and error_rate are per-request probabilities of a 429 or
+    a 500. With rpm_limit > 0, requests beyond that many in any 60 second
+    window get a 429 with a Retry-After header, like a real rate limiter.
+    """
+
+    WINDOW = 60.0
+
+    def __init__(
+        self,
+        throttle_rate: float = 0.0,
+        error_rate: float = 0.0,
+        rpm_limit: float = 0,
+        rng: Optional[random.Random] = None,
+        clock=time.monotonic
+    ):
+        self.throttle_rate = throttle_rate
+        self.error_rate = error_rate
+        self.rpm_limit = rpm_limit
+        self.rng = rng or random.Random()
+        self.clock = clock
+        self._accepted: Deque[float] = deque()
+        self._lock = threading.Lock()
+
+    def check(self) -> Optional[Tuple[int, Dict[str, str]]]:
+        """Return (status, headers) for a request that should fail, else None."""
+        with self._lock:
+            if self.rpm_limit > 0:
+                now = self.clock()
+                while self._accepted and now - self._accepted[0] >= self.WINDOW:
+                    self._accepted.popleft()
+                if len(self._accepted) >= self.rpm_limit:
+                    wait = self.WINDOW - (now - self._accepted[0])
+                    return 429, {"Retry-After": f"{max(wait, 0.001):.3f}"}
+                self._accepted.append(now)
+
+            roll = self.rng.random()
+            if roll < self.throttle_rate:
+                return 429, {}
+            if roll < self.throttle_rate + self.error_rate:
+                return 500, {}
+        return None
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately; without this, delayed ACKs
+    # add ~40ms to every keep-alive response
+    disable_nagle_algorithm = True
+
+    def _body(self) -> bytes:
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b''
+
+    def _reply(self, reply: Reply):
+        status, body, headers = reply
+        try:
+            self.send_response(status)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            # The client gave up on the request, e.g. a cancelled hedge
+            self.close_connection = True
+
+    def _dispatch(self, method: str):
+        self._reply(self.server.mock.handle(method, self.path, self.headers, self._body()))
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def do_PUT(self):
+        self._dispatch("PUT")
+
+    def log_message(self, *args):
+        pass
+
+
+def _json(status: int, payload, headers: Optional[Dict[str, str]] = None) -> Reply:
+    headers = dict(headers or {})
+    headers["Content-Type"] = "application/json"
+    return status, json.dumps(payload).encode('utf-8'), headers
+
+
+class MockServer(abc.ABC):
+    """
+    A threaded HTTP server on 127.0.0.1 with a random free port; use as a context manager.
+
+    Subclasses answer requests by implementing handle().
+    """
+
+    def __init__(self):
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        self._server.daemon_threads = True
+        self._server.mock = self
+        self._thread: Optional[threading.Thread] = None
+        self._stats_lock = threading.Lock()
+        self.stats: Dict[str, int] = {}
+        self.reset_stats()
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def reset_stats(self):
+        with self._stats_lock:
+            self.stats = {}
+
+    def _count(self, name: str, amount: int = 1):
+        with self._stats_lock:
+            self.stats[name] = self.stats.get(name, 0) + amount
+
+    @abc.abstractmethod
+    def handle(self, method: str, path: str, headers, body: bytes) -> Reply:
+        """Answer one request; runs on the server's handler threads."""
+
+    def start(self) -> 'MockServer':
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+class MockVLMServer(MockServer):
+    """
+    OpenAI-compatible chat completions endpoint.
+
+    Each request sleeps for latency.sample() (plus per_image_latency for
+    every image after the first) and answers with one figure block, or
+    with numbered blocks when several images are packed into the request.
+    429s are answered immediately, 500s after the sampled latency.
+    """
+
+    def __init__(
+        self,
+        latency: Optional[LatencyModel] = None,
+        throttle_rate: float = 0.0,
+        error_rate: float = 0.0,
+        rpm_limit: float = 0,
+        per_image_latency: float = 0.0,
+        seed: Optional[int] = None
+    ):
+        rng = random.Random(seed)
+        self.latency = latency or LatencyModel()
+        self.latency.rng = rng
+        self.per_image_latency = per_image_latency
+        self.faults = FaultInjector(throttle_rate, error_rate, rpm_limit, rng)
+        super().__init__()
+
+    @property
+    def endpoint(self) -> str:
+        return f"{self.base_url}/v1/chat/completions"
+
+    def handle(self, method: str, path: str, headers, body: bytes) -> Reply:
+        if method != "POST":
+            return _json(404, {"error": {"message": "not found"}})
+
+        self._count("requests")
+        fault = self.faults.check()
+        if fault is not None and fault[0] == 429:
+            self._count("throttled")
+            return _json(429, {"error": {"message": "rate limit exceeded"}}, fault[1])
+
+        try:
+            request = json.loads(body)
+            content = request["messages"][0]["content"]
+        except (ValueError, KeyError, IndexError, TypeError):
+            return _json(400, {"error": {"message": "invalid request"}})
+        images = sum(1 for part in content if part.get("type") == "image_url")
+
+        time.sleep(self.latency.sample() + self.per_image_latency * max(images - 1, 0))
+
+        if fault is not None:
+            self._count("errors")
+            return _json(fault[0], {"error": {"message": "injected server error"}}, fault[1])
+
+        self._count("images", images)
+        if images > 1:
+            text = "\n".join(
+                f"```figure {number}\nSynthetic description of image {number}.\n```"
+                for number in range(1, images + 1)
+            )
+        else:
+            text = "```figure\nSynthetic description of the image.\n```"
+
+        return _json(200, {
+            "choices": [{"message": {"role": "assistant", "content": text}}],
+            "usage": {
+                "prompt_tokens": 1000 * images,
+                "completion_tokens": 100,
+                "total_tokens": 1000 * images + 100
+            }
+        })
+
+
+class _Document:
+    __slots__ = ('name', 'data_id', 'uploaded_at', 'failed', 'zip_bytes')
+
+    def __init__(self, name: str, data_id: Optional[str], failed: bool):
+        self.name = name
+        self.data_id = data_id
+        self.uploaded_at: Optional[float] = None
+        self.failed = failed
+        self.zip_bytes: Optional[bytes] = None
+
+
+class MockMinerUServer(MockServer):
+    """
+    The parts of the MinerU v4 batch API that MinerUClient uses.
+
+    Upload URLs point back at this server. Parsing of a document starts
+    when its upload finishes, waits queue_delay seconds, then extracts
+    pages_per_second pages per second while reporting extract_progress.
+    Finished documents serve a synthetic result zip with a full.md that
+    references figures_per_doc distinct PNG figures, plus the layout and
+    origin files a real result carries. Zip downloads honour Range
+    requests. failure_rate is the chance a document ends up "failed".
+    """
+
+    API_PREFIX = "/api/v4"
+
+    def __init__(
+        self,
+        figures_per_doc: int = 10,
+        pages_per_doc: int = 10,
+        pages_per_second: float = 20.0,
+        queue_delay: float = 0.0,
+        latency: Optional[LatencyModel] = None,
+        failure_rate: float = 0.0,
+        image_size: int = 64,
+        seed: Optional[int] = None
+    ):
+        self.rng = random.Random(seed)
+        self.figures_per_doc = figures_per_doc
+        self.pages_per_doc = max(1, pages_per_doc)
+        self.pages_per_second = pages_per_second
+        self.queue_delay = queue_delay
+        self.latency = latency or LatencyModel()
+        self.latency.rng = self.rng
+        self.failure_rate = failure_rate
+        self.image_size = image_size
+        self.batches: Dict[str, List[_Document]] = {}
+        self._lock = threading.Lock()
+        super().__init__()
+
+    @property
+    def api_url(self) -> str:
+        return f"{self.base_url}{self.API_PREFIX}"
+
+    def handle(self, method: str, path: str, headers, body: bytes) -> Reply:
+        self._count("requests")
+        time.sleep(self.latency.sample())
+
+        if method == "POST" and path == f"{self.API_PREFIX}/file-urls/batch":
+            return self._create_batch(body)
+
+        parts = path.strip('/').split('/')
+        if method == "PUT" and len(parts) == 3 and parts[0] == "upload":
+            return self._upload(parts[1], parts[2], body)
+        if method == "GET" and path.startswith(f"{self.API_PREFIX}/extract-results/batch/"):
+            return self._results(parts[-1])
+        if method == "GET" and len(parts) == 3 and parts[0] == "results":
+            return self._download(parts[1], parts[2], headers.get("Range"))
+        return _json(404, {"code": -1, "msg": "not found"})
+
+    def _create_batch(self, body: bytes) -> Reply:
+        try:
+            files = json.loads(body)["files"]
+        except (ValueError, KeyError, TypeError):
+            return _json(200, {"code": -1, "msg": "invalid request"})
+
+        batch_id = uuid.uuid4().hex
+        with self._lock:
+            self.batches[batch_id] = [
+                _Document(
+                    entry.get("name", f"{index}.pdf"),
+                    entry.get("data_id"),
+                    self.rng.random() < self.failure_rate
+                )
+                for index, entry in enumerate(files)
+            ]
+        urls = [f"{self.base_url}/upload/{batch_id}/{index}" for index in range(len(files))]
+        return _json(200, {"code": 0, "data": {"batch_id": batch_id, "file_urls": urls}})
+
+    def _document(self, batch_id: str, index: str) -> Optional[_Document]:
+        documents = self.batches.get(batch_id)
+        if documents is None or not index.isdigit() or int(index) >= len(documents):
+            return None
+        return documents[int(index)]
+
+    def _upload(self, batch_id: str, index: str, body: bytes) -> Reply:
+        document = self._document(batch_id, index)
+        if document is None:
+            return 404, b'', {}
+        self._count("uploaded_bytes", len(body))
+        document.uploaded_at = time.monotonic()
+        return 200, b'', {}
+
+    def _results(self, batch_id: str) -> Reply:
+        documents = self.batches.get(batch_id)
+        if documents is None:
+            return _json(200, {"code": -1, "msg": "batch not found"})
+
+        now = time.monotonic()
+        tasks = []
+        for index, document in enumerate(documents):
+            task = {"file_name": document.name, "state": "waiting-file", "err_msg": ""}
+            if document.data_id is not None:
+                task["data_id"] = document.data_id
+
+            if document.uploaded_at is not None:
+                elapsed = now - document.uploaded_at - self.queue_delay
+                pages = min(self.pages_per_doc, int(max(elapsed, 0.0) * self.pages_per_second))
+                if elapsed < 0:
+                    task["state"] = "pending"
+                elif pages < self.pages_per_doc:
+                    task["state"] = "running"
+                    task["extract_progress"] = {
+                        "extracted_pages": pages,
+                        "total_pages": self.pages_per_doc
+                    }
+                elif document.failed:
+                    task["state"] = "failed"
+                    task["err_msg"] = "injected parse failure"
+                else:
+                    task["state"] = "done"
+                    task["full_zip_url"] = f"{self.base_url}/results/{batch_id}/{index}.zip"
+            tasks.append(task)
+
+        return _json(200, {"code": 0, "data": {"batch_id": batch_id, "extract_result": tasks}})
+
+    def _build_zip(self, seed: int) -> bytes:
+        buffer = io.BytesIO()
+        paragraphs = []
+        with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as zf:
+            for figure in range(self.figures_per_doc):
+                name = f"images/fig{figure}.png"
+                zf.writestr(name, synthetic_png(self.image_size, self.image_size, seed * 100003 + figure))
+                paragraphs.append(f"Paragraph {figure} of synthetic text.\n\n![]({name})\n")
+            zf.writestr("full.md", "# Synthetic document\n\n" + "\n".join(paragraphs))
+            zf.writestr("layout.json", json.dumps({"pages": self.pages_per_doc}))
+            zf.writestr("origin.pdf", b"%PDF-1.4\n" + b"0" * 1024)
+        return buffer.getvalue()
+
+    def _download(self, batch_id: str, name: str, range_header: Optional[str]) -> Reply:
+        index = name[:-len(".zip")] if name.endswith(".zip") else name
+        document = self._document(batch_id, index)
+        if document is None:
+            return 404, b'', {}
+
+        with self._lock:
+            if document.zip_bytes is None:
+                documents = list(self.batches)
+                document.zip_bytes = self._build_zip(documents.index(batch_id) * 1000 + int(index))
+        data = document.zip_bytes
+        headers = {"Content-Type": "application/zip", "Accept-Ranges": "bytes"}
+
+        match = _RANGE.match(range_header or "")
+        if not match or not (match.group(1) or match.group(2)):
+            self._count("downloaded_bytes", len(data))
+            return 200, data, headers
+
+        if match.group(1):
+            start = int(match.group(1))
+            end = int(match.group(2)) if match.group(2) else len(data) - 1
+        else:
+            start, end = max(0, len(data) - int(match.group(2))), len(data) - 1
+        end = min(end, len(data) - 1)
+        if start > end:
+            headers["Content-Range"] = f"bytes */{len(data)}"
+            return 416, b'', headers
+
+        headers["Content-Range"] = f"bytes {start}-{end}/{len(data)}"
+        self._count("downloaded_bytes", end - start + 1)
+        return 206, data[start:end + 1], headers
@@ -0,0 +1,166 @@
+"""Copy-free construction of chat-completion request bodies."""
+
+import binascii
+import json
+import mmap
+import os
+from typing import List, Optional, Sequence, Tuple, Union
+
+# Multiple of 3 so every chunk encodes to whole base64 quads.
+ENCODE_CHUNK_SIZE = 3 * 64 * 1024
+
+_PLACEHOLDER = "\x00IEEU_IMAGE_{}\x00"
+
+ImageSource = Union[str, bytes, bytearray, memoryview]
+
+
+def _base64_length(size: int) -> int:
+    return (size + 2) // 3 * 4
+
+
+class ImageData:
+    """
+    Image bytes to embed in a request.
+
+    Either a file path, which is memory-mapped while the body is built, or
+    a bytes-like object such as the output of preprocessing.
+    """
+    __slots__ = ('source', 'mime')
+
+    def __init__(self, source: ImageSource, mime: str):
+        self.source = source
+        self.mime = mime
+
+    def open(self) -> Tuple[memoryview, Optional[mmap.mmap]]:
+        if not isinstance(self.source, str):
+            return memoryview(self.source), None
+
+        if os.path.getsize(self.source) == 0:
+            return memoryview(b''), None
+
+        with open(self.source, 'rb') as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return memoryview(mapped), mapped
+
+
+def _encode_into(body: bytearray, offset: int, data: memoryview) -> int:
+    """base64-encode data into body[offset:] chunk by chunk; return the new offset."""
+    for start in range(0, len(data), ENCODE_CHUNK_SIZE):
+        encoded = binascii.b2a_base64(data[start:start + ENCODE_CHUNK_SIZE], newline=False)
+        body[offset:offset + len(encoded)] = encoded
+        offset += len(encoded)
+    return offset
+
+
+def build_chat_body(
+    model: Optional[str],
+    prompt: str,
+    images: Sequence[ImageData],
+    max_tokens: int = 4096
+) -> bytearray:
+    """
+    Serialize a chat-completion request into a single pre-sized buffer.
+
+    The JSON around the images is rendered once with placeholders, and each
+    image is base64-encoded straight into its slot, so the only full-size
+    allocation per request is the returned body itself.
+    """
+    content: List[dict] = [{"type": "text", "text": prompt}]
+    for index, image in enumerate(images):
+        content.append({
+            "type": "image_url",
+            "image_url": {"url": f"data:{image.mime};base64,{_PLACEHOLDER.format(index)}"}
+        })
+
+    template = json.dumps({
+        "model": model,
+        "messages": [{"role": "user", "content": content}],
+        "max_tokens": max_tokens
+    }, ensure_ascii=False)
+
+    pieces = []
+    rest = template
+    for index in range(len(images)):
+        marker = json.dumps(_PLACEHOLDER.format(index))[1:-1]
+        head, rest = rest.split(marker, 1)
+        pieces.append(head.encode('utf-8'))
+    pieces.append(rest.encode('utf-8'))
+
+    views = []
+    try:
+        for image in images:
+            views.append(image.open())
+
+        size = sum(len(piece) for piece in pieces)
+        size += sum(_base64_length(len(view)) for view, _ in views)
+        body = bytearray(size)
+
+        offset = 0
+        for piece, (view, _) in zip(pieces, views):
+            body[offset:offset + len(piece)] = piece
+            offset += len(piece)
+            offset = _encode_into(body, offset, view)
+        body[offset:offset + len(pieces[-1])] = pieces[-1]
+        return body
+    finally:
+        for view, mapped in views:
+            view.release()
+            if mapped is not None:
+                mapped.close()
+
+
+def _model_prefix(model: Optional[str]) -> bytes:
+    return ('{"model": ' + json.dumps(model, ensure_ascii=False)).encode('utf-8')
+
+
+def replace_model(body: bytearray, old: Optional[str], new: Optional[str]) -> bytearray:
+    """
+    Point a body from build_chat_body at another model.
+
+    "model" is the first key of the rendered JSON, so only the prefix is
+    rewritten; the body is returned unchanged when the model is the same.
+    """
+    if old == new:
+        return body
+    old_prefix = _model_prefix(old)
+    if not body.startswith(old_prefix):
+        return body
+    replaced = bytearray(_model_prefix(new))
+    replaced += memoryview(body)[len(old_prefix):]
+    return replaced
+
+
+class BodyReader:
+    """
+    File-like view over a request body.
+
+    requests streams objects with read() in blocks instead of copying them,
+    and uses __len__ for Content-Length; seek() lets it rewind on redirects.
+    """
+
+    def __init__(self, body: Union[bytes, bytearray]):
+        self._view = memoryview(body)
+        self._pos = 0
+
+    def __len__(self) -> int:
+        return len(self._view)
+
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0:
+            size = len(self._view) - self._pos
+        chunk = self._view[self._pos:self._pos + size]
+        self._pos += len(chunk)
+        return chunk.tobytes()
+
+    def tell(self) -> int:
+        return self._pos
+
+    def seek(self, offset: int, whence: int = 0) -> int:
+        if whence == 0:
+            self._pos = offset
+        elif whence == 1:
+            self._pos += offset
+        else:
+            self._pos = len(self._view) + offset
+        self._pos = max(0, min(self._pos, len(self._view)))
+        return self._pos
@@ -0,0 +1,169 @@
+"""Staged pipeline with bounded queues between stages."""
+
+import queue
+import threading
+import time
+from typing import Callable, Iterable, List, Optional
+
+from .trace import Tracer
+
+DEFAULT_QUEUE_SIZE = 2
+
+_DONE = object()
+
+
+class Stage:
+    """流水线中的一个阶段：func 接收上一阶段的产出并返回交给下一阶段的对象"""
+
+    def __init__(self, name: str, func: Callable, workers: int = 1):
+        self.name = name
+        self.func = func
+        self.workers = max(1, workers)
+        self.busy = 0.0
+        self.items = 0
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        with self._lock:
+            self.busy += seconds
+            self.items += 1
+
+
+class Pipeline:
+    """
+    分阶段流水线
+
+    数据源（如 MinerU 解析结果的迭代器）和每个阶段各自运行在独立线程中，
+    阶段之间用有界队列连接：下游繁忙时上游最多领先 queue_size 个文档，
+    从而在描述第 N 个文档的图片时，第 N+1 个文档仍在解析或下载。
+
+    阶段函数抛出的异常不会中断流水线，该对象被丢弃并记录到 errors。
+    每个阶段记录忙碌时间，用于在结束时报告利用率。cancel() 后数据源停止
+    产出，队列中剩余的对象不再交给阶段函数。传入 tracer 时每个对象在
+    每个阶段的处理各记录一个 span，线程按阶段命名。
+    """
+
+    def __init__(
+        self,
+        source_name: str,
+        stages: List[Stage],
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+        on_error: Optional[Callable] = None,
+        tracer: Optional[Tracer] = None
+    ):
+        self.source = Stage(source_name, None)
+        self.stages = stages
+        self.queue_size = max(1, queue_size)
+        self.on_error = on_error
+        self.tracer = tracer or Tracer(enabled=False)
+        self.errors = []
+        self.elapsed = 0.0
+        self.cancelled = threading.Event()
+
+    @property
+    def all_stages(self) -> List[Stage]:
+        return [self.source] + self.stages
+
+    def _feed(self, items: Iterable, out: queue.Queue):
+        iterator = iter(items)
+        try:
+            while not self.cancelled.is_set():
+                start = time.monotonic()
+                try:
+                    with self.tracer.span(self.source.name, "stage"):
+                        item = next(iterator)
+                except StopIteration:
+                    break
+                except Exception as e:
+                    self.errors.append((None, e))
+                    break
+                self.source.record(time.monotonic() - start)
+                out.put(item)
+        finally:
+            out.put(_DONE)
+
+    def _work(self, stage: Stage, inbox: queue.Queue, out: queue.Queue, remaining: List[int]):
+        while True:
+            item = inbox.get()
+            if item is _DONE:
+                # 让同阶段的其他线程也能看到结束标记，最后一个线程通知下游
+                inbox.put(_DONE)
+                with stage._lock:
+                    remaining[0] -= 1
+                    last = remaining[0] == 0
+                if last:
+                    out.put(_DONE)
+                return
+
+            if self.cancelled.is_set():
+                continue
+
+            start = time.monotonic()
+            try:
+                with self.tracer.span(stage.name, "stage", item=getattr(item, "name", repr(item))):
+                    result = stage.func(item)
+            except Exception as e:
+                self.errors.append((item, e))
+                if self.on_error:
+                    self.on_error(item, e)
+                continue
+            finally:
+                stage.record(time.monotonic() - start)
+
+            out.put(result)
+
+    def run(self, items: Iterable) -> List:
+        """运行流水线直至数据源耗尽，返回最后一个阶段的产出（按完成顺序）"""
+        start = time.monotonic()
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in self.stages]
+        # 最后一个阶段的产出不限长度，由调用方收集
+        queues.append(queue.Queue())
+
+        threads = [threading.Thread(
+            target=self._feed, 
+            args=(items, queues[0]), 
+            name=self.source.name, 
+            daemon=True
+        )]
+        for index, stage in enumerate(self.stages):
+            remaining = [stage.workers]
+            for worker in range(stage.workers):
+                threads.append(threading.Thread(
+                    target=self._work,
+                    args=(stage, queues[index], queues[index + 1], remaining),
+                    name=f"{stage.name}-{worker}" if stage.workers > 1 else stage.name,
+                    daemon=True
+                ))
+
+        for thread in threads:
+            thread.start()
+
+        outputs = []
+        sink = queues[-1]
+        while True:
+            item = sink.get()
+            if item is _DONE:
+                break
+            outputs.append(item)
+
+        for thread in threads:
+            thread.join()
+
+        self.elapsed = time.monotonic() - start
+        return outputs
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def utilization(self) -> List[tuple]:
+        """[(name, busy seconds, items, utilization)]，利用率按阶段线程数归一"""
+        rows = []
+        for stage in self.all_stages:
+            capacity = self.elapsed * stage.workers
+            rows.append((
+                stage.name,
+                stage.busy,
+                stage.items,
+                stage.busy / capacity if capacity > 0 else 0.0
+            ))
+        return rows
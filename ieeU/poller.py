@@ -0,0 +1,186 @@
+"""Adaptive scheduling of MinerU batch result polls."""
+
+import os
+import random
+import time
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from .constants import (
+    DEFAULT_MINERU_TIMEOUT,
+    DEFAULT_POLL_MIN_INTERVAL,
+    DEFAULT_POLL_MAX_INTERVAL
+)
+
+BACKOFF_FACTOR = 1.5
+RATE_SMOOTHING = 0.5
+DEFAULT_JITTER = 0.2
+
+
+class BatchProgress:
+    """What the poller knows about one MinerU batch."""
+
+    def __init__(self, batch_id: str, pdf_paths: Dict[str, str], now: float, interval: float):
+        self.batch_id = batch_id
+        self.pdf_paths = pdf_paths
+        self.pending: Set[str] = set(pdf_paths)
+        self.tasks: Dict[str, Tuple[str, int]] = {}
+        self.rate: Optional[float] = None
+        self.interval = interval
+        self.last_poll: Optional[float] = None
+        self.last_progress = now
+        self.next_poll = now
+        self.running = 0
+        self.pages_done = 0
+        self.pages_total = 0
+
+        self._by_name: Dict[str, Optional[str]] = {}
+        for data_id, path in pdf_paths.items():
+            name = os.path.basename(path)
+            self._by_name[name] = None if name in self._by_name else data_id
+
+    def resolve(self, task: dict) -> Optional[str]:
+        """Match a task in extract_result back to its data_id."""
+        data_id = task.get("data_id")
+        if data_id in self.pdf_paths:
+            return data_id
+        return self._by_name.get(task.get("file_name"))
+
+
+class AdaptivePoller:
+    """
+    Decides when to poll each of several MinerU batches.
+
+    After each poll the next interval is derived from the page throughput
+    observed in extract_progress: while documents are running the poller
+    waits roughly until the closest one should finish, and while nothing
+    measurable happens (queued, converting, request errors) it backs off
+    exponentially. Intervals are clamped to [min_interval, max_interval]
+    and jittered. A batch only times out after timeout seconds without any
+    progress (no page extracted, state change or finished document), so
+    long books are not cut off; timeout <= 0 waits forever.
+    """
+
+    def __init__(
+        self,
+        timeout: float = DEFAULT_MINERU_TIMEOUT,
+        min_interval: float = DEFAULT_POLL_MIN_INTERVAL,
+        max_interval: float = DEFAULT_POLL_MAX_INTERVAL,
+        jitter: float = DEFAULT_JITTER,
+        clock: Callable[[], float] = time.monotonic,
+        rng: Callable[[], float] = random.random
+    ):
+        self.timeout = timeout
+        self.min_interval = min_interval
+        self.max_interval = max(min_interval, max_interval)
+        self.jitter = jitter
+        self.clock = clock
+        self.rng = rng
+        self.batches: Dict[str, BatchProgress] = {}
+        self.polls = 0
+
+    @property
+    def active(self) -> bool:
+        return bool(self.batches)
+
+    def track(self, batch_id: str, pdf_paths: Dict[str, str]) -> BatchProgress:
+        batch = BatchProgress(batch_id, pdf_paths, self.clock(), self.min_interval)
+        self.batches[batch_id] = batch
+        return batch
+
+    def next_due(self) -> Tuple[BatchProgress, float]:
+        """Return the batch to poll next and how many seconds to wait for it."""
+        batch = min(self.batches.values(), key=lambda b: b.next_poll)
+        return batch, max(0.0, batch.next_poll - self.clock())
+
+    def drop(self, batch: BatchProgress) -> List[str]:
+        """Stop tracking a batch; return its unfinished data_ids."""
+        self.batches.pop(batch.batch_id, None)
+        return sorted(batch.pending, key=lambda data_id: (len(data_id), data_id))
+
+    def _schedule(self, batch: BatchProgress, interval: float, now: float):
+        interval = min(self.max_interval, max(self.min_interval, interval))
+        batch.interval = interval
+        spread = 1 + self.jitter * (2 * self.rng() - 1)
+        batch.next_poll = now + interval * spread
+
+    def on_error(self, batch: BatchProgress):
+        """A poll request failed; back off."""
+        now = self.clock()
+        self.polls += 1
+        self._schedule(batch, batch.interval * BACKOFF_FACTOR, now)
+
+    def update(self, batch: BatchProgress, tasks: List[dict]) -> List[Tuple[str, Optional[str]]]:
+        """
+        Record one poll's extract_result list.
+
+        Returns [(data_id, full_zip_url)] for documents that finished in this
+        poll, with None as the URL for failed ones.
+        """
+        now = self.clock()
+        self.polls += 1
+        elapsed = now - batch.last_poll if batch.last_poll is not None else None
+        batch.last_poll = now
+
+        finished = []
+        progressed = False
+        new_pages = 0
+        remaining_pages = []
+        batch.running = batch.pages_done = batch.pages_total = 0
+
+        for task in tasks:
+            data_id = batch.resolve(task)
+            if data_id not in batch.pending:
+                continue
+
+            state = task.get("state", "")
+            progress = task.get("extract_progress") or {}
+            extracted = progress.get("extracted_pages", 0) or 0
+            total = progress.get("total_pages", 0) or 0
+
+            previous_state, previous_pages = batch.tasks.get(data_id, ("", 0))
+            if state != previous_state or extracted > previous_pages:
+                progressed = True
+            if previous_state == "running" and state == "running":
+                new_pages += max(0, extracted - previous_pages)
+            batch.tasks[data_id] = (state, extracted)
+
+            if state == "done":
+                finished.append((data_id, task.get("full_zip_url")))
+            elif state == "failed":
+                finished.append((data_id, None))
+            elif state == "running":
+                batch.running += 1
+                batch.pages_done += extracted
+                batch.pages_total += total
+                if total > extracted:
+                    remaining_pages.append(total - extracted)
+
+        for data_id, _ in finished:
+            batch.pending.discard(data_id)
+
+        if elapsed and batch.running and elapsed > 0:
+            sample = new_pages / elapsed
+            batch.rate = sample if batch.rate is None else (
+                RATE_SMOOTHING * sample + (1 - RATE_SMOOTHING) * batch.rate
+            )
+
+        if finished or progressed:
+            batch.last_progress = now
+
+        if finished:
+            # Other documents of the batch tend to finish close together
+            interval = self.min_interval
+        elif remaining_pages and batch.rate:
+            per_document = batch.rate / batch.running
+            interval = min(remaining_pages) / per_document
+        else:
+            interval = batch.interval * BACKOFF_FACTOR
+
+        self._schedule(batch, interval, now)
+        return finished
+
+    def expired(self, batch: BatchProgress) -> bool:
+        """True once a batch has gone timeout seconds without progress."""
+        if self.timeout <= 0:
+            return False
+        return self.clock() - batch.last_progress >= self.timeout
@@ -0,0 +1,224 @@
+"""Image preprocessing before VLM upload."""
+
+import io
+import multiprocessing
+import os
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Dict, Iterable, Optional, Tuple
+
+try:
+    from PIL import Image, ImageChops
+except ImportError:  # pragma: no cover - optional dependency
+    Image = None
+
+from .constants import (
+    DEFAULT_IMAGE_MAX_PIXELS,
+    DEFAULT_IMAGE_FORMAT,
+    DEFAULT_IMAGE_QUALITY
+)
+
+PILLOW_AVAILABLE = Image is not None
+
+EXTENSION_MIME_TYPES = {
+    '.jpg': 'image/jpeg',
+    '.jpeg': 'image/jpeg',
+    '.png': 'image/png',
+    '.gif': 'image/gif',
+    '.bmp': 'image/bmp',
+    '.webp': 'image/webp',
+}
+
+FORMAT_MIME_TYPES = {
+    'JPEG': 'image/jpeg',
+    'PNG': 'image/png',
+    'WEBP': 'image/webp',
+}
+
+
+def detect_mime(data: bytes, path: str = "") -> str:
+    """Sniff the MIME type from magic bytes, falling back to the file extension."""
+    if data.startswith(b'\xff\xd8\xff'):
+        return 'image/jpeg'
+    if data.startswith(b'\x89PNG\r\n\x1a\n'):
+        return 'image/png'
+    if data[:6] in (b'GIF87a', b'GIF89a'):
+        return 'image/gif'
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        return 'image/webp'
+    if data.startswith(b'BM'):
+        return 'image/bmp'
+
+    ext = os.path.splitext(path.lower())[1]
+    return EXTENSION_MIME_TYPES.get(ext, 'image/jpeg')
+
+
+class PreprocessOptions:
+    """
+    Settings for the preprocessing stage.
+
+    format is 'original' (keep JPEG/PNG/WebP, GIF/BMP become PNG) or one of
+    'jpeg', 'png', 'webp'. max_pixels <= 0 disables downscaling.
+    """
+
+    def __init__(
+        self,
+        max_pixels: int = DEFAULT_IMAGE_MAX_PIXELS,
+        image_format: str = DEFAULT_IMAGE_FORMAT,
+        quality: int = DEFAULT_IMAGE_QUALITY,
+        trim: bool = True
+    ):
+        self.max_pixels = int(max_pixels or 0)
+        self.image_format = (image_format or DEFAULT_IMAGE_FORMAT).lower()
+        self.quality = int(quality)
+        self.trim = trim
+
+    @classmethod
+    def from_config(cls, config) -> 'PreprocessOptions':
+        return cls(
+            config.image_max_pixels,
+            config.image_format,
+            config.image_quality,
+            config.image_trim
+        )
+
+    def signature(self) -> str:
+        """Identifies the transformation, so cached descriptions depend on it."""
+        return (
+            f"max_pixels={self.max_pixels};format={self.image_format};"
+            f"quality={self.quality};trim={int(self.trim)}"
+        )
+
+
+def _trim_borders(image):
+    """Crop uniform borders matching the top-left pixel colour."""
+    rgb = image.convert('RGB')
+    background = Image.new('RGB', rgb.size, rgb.getpixel((0, 0)))
+    diff = ImageChops.difference(rgb, background)
+    # Ignore faint JPEG noise around the border
+    diff = diff.point(lambda value: 255 if value > 16 else 0)
+    bbox = diff.getbbox()
+    if bbox and bbox != (0, 0) + image.size:
+        return image.crop(bbox)
+    return image
+
+
+def _target_format(source_format: Optional[str], options: PreprocessOptions) -> str:
+    if options.image_format != 'original':
+        return options.image_format.upper()
+    if source_format in FORMAT_MIME_TYPES:
+        return source_format
+    return 'PNG'
+
+
+def preprocess_image(path: str, options: PreprocessOptions) -> Tuple[bytes, str]:
+    """
+    Load an image and return (bytes, mime type) ready for upload.
+
+    Without Pillow only the MIME type is corrected. With Pillow the first
+    frame is taken, whitespace borders trimmed, the image downscaled to the
+    pixel budget and re-encoded; the original bytes are kept if nothing
+    changed and re-encoding would not make them smaller.
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+
+    mime = detect_mime(data, path)
+    if not PILLOW_AVAILABLE:
+        return data, mime
+
+    try:
+        image = Image.open(io.BytesIO(data))
+        source_format = image.format
+        image.seek(0)
+        image.load()
+    except Exception:
+        return data, mime
+
+    changed = getattr(image, 'n_frames', 1) > 1
+
+    if options.trim:
+        trimmed = _trim_borders(image)
+        changed = changed or trimmed.size != image.size
+        image = trimmed
+
+    width, height = image.size
+    if options.max_pixels > 0 and width * height > options.max_pixels:
+        scale = (options.max_pixels / float(width * height)) ** 0.5
+        size = (max(1, int(width * scale)), max(1, int(height * scale)))
+        image = image.resize(size, Image.LANCZOS)
+        changed = True
+
+    target = _target_format(source_format, options)
+    changed = changed or target != source_format
+
+    if target == 'JPEG' and image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+    elif image.mode == 'P':
+        image = image.convert('RGBA')
+
+    output = io.BytesIO()
+    save_kwargs = {'quality': options.quality} if target in ('JPEG', 'WEBP') else {'optimize': True}
+    image.save(output, format=target, **save_kwargs)
+    encoded = output.getvalue()
+
+    if not changed and len(encoded) >= len(data):
+        return data, mime
+    return encoded, FORMAT_MIME_TYPES[target]
+
+
+class ImagePreprocessor:
+    """
+    Runs preprocess_image in a process pool.
+
+    prefetch() submits figures ahead of their requests so the CPU-bound work
+    overlaps with the network-bound VLM calls; load() then waits only for
+    the figure it needs, and discard() drops results nobody will load.
+
+    Workers are spawned rather than forked: the pool starts lazily, when
+    the HTTP session, hedge pool and other threads already exist, and
+    forking a threaded process can copy locks in a held state.
+    """
+
+    def __init__(self, options: PreprocessOptions, workers: Optional[int] = None):
+        self.options = options
+        self.workers = workers or os.cpu_count() or 1
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._futures: Dict[str, Future] = {}
+
+    def _pool(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    def prefetch(self, paths: Iterable[str]):
+        if not PILLOW_AVAILABLE:
+            return
+
+        pool = self._pool()
+        for path in paths:
+            if path not in self._futures:
+                self._futures[path] = pool.submit(preprocess_image, path, self.options)
+
+    def load(self, path: str) -> Tuple[bytes, str]:
+        future = self._futures.pop(path, None)
+        if future is not None:
+            try:
+                return future.result()
+            except Exception:
+                pass
+        return preprocess_image(path, self.options)
+
+    def discard(self):
+        """Cancel prefetched figures that were never loaded and free their results."""
+        for future in self._futures.values():
+            future.cancel()
+        self._futures.clear()
+
+    def shutdown(self):
+        self.discard()
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
@@ -2,12 +2,22 @@ import os
 import shutil
 import tempfile
 from typing import Dict, List, Optional, Tuple
+from .aio import AIOHTTP_AVAILABLE, AsyncVLMEngine
+from .cache import DescriptionCache, ParseCache, hash_file
 from .config import Config
-from .constants import OUTPUT_SUFFIX, DEFAULT_BATCH_SIZE
+from .constants import OUTPUT_SUFFIX, DEFAULT_BATCH_SIZE, DEFAULT_JOURNAL_DIR
 from .extractor import ImageExtractor, ImageReference
+from .journal import Journal
 from .logger import Logger
 from .mineru import MinerUClient
+from .pipeline import Pipeline, Stage
+from .preprocess import ImagePreprocessor, PreprocessOptions
+from .trace import Tracer
 from .vlm import VLMClient, BatchResult, BatchSizeType
+from .writer import OrderedMarkdownWriter
+
+FETCH_WORKERS = 2
+INTERRUPTED_MESSAGE = "\n⏹️ 已中断，进度已保存到任务日志，重新运行同一命令即可继续"
 
 
 class ProcessResult:
@@ -17,15 +27,70 @@ class ProcessResult:
         self.images_dir: Optional[str] = None
         self.fallback_md_path: Optional[str] = None
         self.api_failed: bool = False
+        self.interrupted: bool = False
         self.failed_images: List[str] = []
 
 
+class DocumentJob:
+    """A PDF moving through the parse, fetch, describe and write stages."""
+    
+    def __init__(
+        self, 
+        pdf_path: str, 
+        output_dir: str, 
+        mineru_client: MinerUClient, 
+        work_dir: str,
+        journal: Optional[Journal] = None
+    ):
+        self.pdf_path = pdf_path
+        self.output_dir = output_dir
+        self.mineru_client = mineru_client
+        self.work_dir = work_dir
+        self.journal = journal
+        self.output_name = os.path.splitext(os.path.basename(pdf_path))[0]
+        self.data_id: Optional[str] = None
+        self.zip_url: Optional[str] = None
+        self.resumed_zip: bool = False
+        self.md_path: Optional[str] = None
+        self.images_dir: Optional[str] = None
+        self.batch_result: Optional[BatchResult] = None
+        self.writer: Optional[OrderedMarkdownWriter] = None
+        self.result = ProcessResult()
+    
+    @property
+    def name(self) -> str:
+        return os.path.basename(self.pdf_path)
+    
+    @property
+    def output_path(self) -> str:
+        return os.path.join(self.output_dir, f"{self.output_name}.md")
+
+
 class Processor:
     def __init__(self, config: Config, verbose: bool = False, batch_size: BatchSizeType = DEFAULT_BATCH_SIZE):
         self.config = config
         self.logger = Logger(verbose)
-        self.vlm_client = VLMClient(config, self.logger)
+        if config.trace_path:
+            self.logger.tracer = Tracer()
+        cache = DescriptionCache.from_config(config) if config.cache_enabled else None
+        preprocessor = None
+        if config.image_preprocess:
+            preprocessor = ImagePreprocessor(
+                PreprocessOptions.from_config(config),
+                config.preprocess_workers
+            )
+        self.vlm_client = VLMClient(config, self.logger, cache, preprocessor)
+        self.parse_cache = ParseCache.from_config(config) if config.parse_cache_enabled else None
+        self.engine = self._create_engine()
         self.batch_size = batch_size
+        self.journal_dir = DEFAULT_JOURNAL_DIR
+    
+    def _create_engine(self):
+        if self.config.engine == "async":
+            if AIOHTTP_AVAILABLE:
+                return AsyncVLMEngine(self.vlm_client)
+            print("⚠️ 未安装 aiohttp，使用线程池引擎 (pip install 'ieeU[async]')")
+        return self.vlm_client
     
     def _build_replacement(
         self, 
@@ -34,6 +99,114 @@ class Processor:
     ) -> str:
         return f"```figure {ref.figure_num}\n{description}\n```\n"
     
+    def _render(
+        self, 
+        ref: ImageReference, 
+        description: Optional[str]
+    ) -> Optional[str]:
+        if description is None:
+            self.logger.log_error(ref.path, "No description generated")
+            return None
+        return self._build_replacement(ref, description)
+    
+    def close(self):
+        self.vlm_client.close()
+    
+    def _log_vlm_connection_reuse(self):
+        self.logger.log_connection_reuse(
+            "VLM", 
+            *self.vlm_client.session.connection_stats()
+        )
+    
+    def _export_metrics(self):
+        if self.config.metrics_path:
+            self.logger.export_metrics(self.config.metrics_path)
+    
+    def _export_trace(self):
+        """中断时同样写出，便于分析变慢的运行"""
+        if self.config.trace_path:
+            self.logger.export_trace(self.config.trace_path)
+    
+    def _open_journal(self, kind: str, path: str, file_hash: Optional[str] = None) -> Optional[Journal]:
+        """
+        打开文档的任务日志；--no-resume 时丢弃旧日志重新开始
+        
+        file_hash 为已算好的文件哈希，省去再读一遍文件。
+        """
+        try:
+            key = Journal.key_for(
+                kind, 
+                os.path.abspath(path), 
+                file_hash or hash_file(path), 
+                self.config.model_name, 
+                self.config.endpoint
+            )
+            return Journal.for_document(key, self.journal_dir, fresh=not self.config.resume)
+        except OSError as e:
+            print(f"⚠️ 无法创建任务日志: {e}")
+            return None
+    
+    @staticmethod
+    def _close_journals(journals):
+        """保存可恢复的日志，删除没有任何进度的日志"""
+        for journal in journals:
+            if journal is None:
+                continue
+            if journal.resumable:
+                journal.close()
+            else:
+                journal.discard()
+    
+    def _describe(
+        self, 
+        image_paths: Dict[str, str], 
+        journal: Optional[Journal],
+        writer: Optional[OrderedMarkdownWriter] = None
+    ) -> BatchResult:
+        """
+        描述图片，跳过任务日志中已完成的图片，并把新结果逐张写入日志
+
+        给定 writer 时，每张图片完成或最终失败后立即通知它，输出随之
+        按文档顺序增量写出。
+        """
+        done = {}
+        if journal is not None:
+            done = {
+                rel_path: description 
+                for rel_path, description in journal.figures.items() 
+                if rel_path in image_paths
+            }
+        if done:
+            print(f"♻️ 从任务日志恢复 {len(done)} 张图片的描述")
+        
+        remaining = {
+            rel_path: full_path 
+            for rel_path, full_path in image_paths.items() 
+            if rel_path not in done
+        }
+        
+        def on_complete(rel_path: str, description: str):
+            if journal is not None:
+                journal.record_figure(rel_path, description)
+            if writer is not None:
+                writer.resolve(rel_path, description)
+        
+        if writer is not None:
+            writer.expect(image_paths)
+            for rel_path, description in done.items():
+                writer.resolve(rel_path, description)
+        
+        batch_result = BatchResult()
+        if remaining:
+            batch_result = self.engine.describe_images_batch(
+                remaining, 
+                self.batch_size,
+                on_complete=on_complete,
+                on_failed=writer.fail if writer is not None else None
+            )
+        batch_result.results.update(done)
+        return batch_result
+    
     def _copy_fallback_output(
         self,
         md_path: str,
@@ -52,106 +225,250 @@ class Processor:
         
         return fallback_md, fallback_images
     
-    def _process_markdown_content(
+    def _describe_markdown(
         self,
-        content: str,
-        base_dir: str,
-        filename: str
-    ) -> Tuple[str, BatchResult]:
-        references = ImageExtractor.extract_image_references(content)
+        md_path: str,
+        journal: Optional[Journal] = None,
+        writer: Optional[OrderedMarkdownWriter] = None
+    ) -> BatchResult:
+        filename = os.path.basename(md_path)
+        references = ImageExtractor.scan_file(md_path)
         
         if not references:
             print(f"No images found in {filename}")
-            return content, BatchResult()
+            return BatchResult()
         
         self.logger.log_file_info(filename, len(references))
         
         image_paths = ImageExtractor.get_image_paths_from_references(
             references, 
-            base_dir
+            os.path.dirname(md_path)
         )
         
         if not image_paths:
             print(f"No valid image paths found")
-            return content, BatchResult()
+            return BatchResult()
         
-        batch_result = self.vlm_client.describe_images_batch(image_paths, self.batch_size)
+        return self._describe(image_paths, journal, writer)
+    
+    def _fetch_document(self, job: DocumentJob) -> DocumentJob:
+        if job.zip_url and not job.md_path:
+            job.md_path, job.images_dir = job.mineru_client.fetch_result(
+                job.data_id, job.zip_url, job.work_dir, job.pdf_path
+            )
+            if not job.md_path and job.resumed_zip and job.journal is not None:
+                # 结果链接可能已过期，下次运行重新上传
+                job.journal.reset_parse()
+        return job
+    
+    def _describe_document(self, job: DocumentJob) -> DocumentJob:
+        if not job.md_path:
+            return job
         
-        replacements = {}
-        for ref in references:
-            if ref.path in batch_result.results:
-                new_text = self._build_replacement(ref, batch_result.results[ref.path])
-                old_text = f"![]({ref.path})"
-                replacements[old_text] = new_text
-            else:
-                self.logger.log_error(
-                    ref.path, 
-                    "No description generated"
-                )
+        job.writer = OrderedMarkdownWriter(job.md_path, job.output_path, self._render)
+        job.batch_result = self._describe_markdown(job.md_path, job.journal, job.writer)
+        return job
+    
+    def _write_document(self, job: DocumentJob) -> DocumentJob:
+        result = job.result
+        if not job.md_path:
+            print(f"MinerU 解析失败: {os.path.basename(job.pdf_path)}")
+            result.success = False
+            return job
+        
+        batch_result = job.batch_result
+        
+        if batch_result.cancelled:
+            # 已按顺序写出的部分保留，重新运行时从任务日志继续
+            job.writer.close()
+            result.success = False
+            result.interrupted = True
+            return job
         
-        if replacements:
-            return ImageExtractor.replace_images(content, replacements), batch_result
+        if batch_result.api_completely_failed:
+            job.writer.discard()
+            print("\n⚠️ VLM API无法使用，输出MinerU原始结果")
+            fallback_md, fallback_images = self._copy_fallback_output(
+                job.md_path, job.images_dir or "", job.output_dir, job.output_name
+            )
+            result.api_failed = True
+            result.fallback_md_path = fallback_md
+            result.images_dir = fallback_images
+            print(f"\n输出文件: {fallback_md}")
+            print(f"图片目录: {fallback_images}")
+            if job.journal is not None:
+                job.journal.discard()
+            return job
+        
+        output_path = job.output_path
+        job.writer.finish(batch_result.results)
+        
+        result.output_path = output_path
+        result.failed_images = batch_result.failed_paths
+        if job.journal is not None:
+            job.journal.discard()
         
-        return content, batch_result
+        print(f"\n输出文件: {output_path}")
+        
+        if batch_result.failed_paths:
+            print(f"⚠️ {len(batch_result.failed_paths)} 张图片处理失败")
+        
+        return job
     
-    def process_pdf(self, pdf_path: str, output_dir: str) -> ProcessResult:
+    def _on_stage_error(self, job: DocumentJob, error: Exception):
+        print(f"Error processing {job.pdf_path}: {error}")
+        job.result.success = False
+        if job.writer is not None:
+            job.writer.close()
+    
+    @staticmethod
+    def _assign_output_names(jobs):
+        """
+        同一输出目录下同名的 PDF（如 a/x.pdf 和 b/x.pdf 配合 -o）依次改名为
+        x-2、x-3……，避免输出和回退文件互相覆盖
+        """
+        taken = set()
+        for job in jobs:
+            base = job.output_name
+            suffix = 1
+            while (os.path.normcase(job.output_dir), job.output_name.lower()) in taken:
+                suffix += 1
+                job.output_name = f"{base}-{suffix}"
+            taken.add((os.path.normcase(job.output_dir), job.output_name.lower()))
+            if suffix > 1:
+                print(f"⚠️ 输出文件重名，{job.pdf_path} 输出为 {job.output_name}.md")
+    
+    def process_pdfs(
+        self, 
+        pdf_paths: List[str], 
+        output_dir: Optional[str] = None
+    ) -> Dict[str, ProcessResult]:
+        """
+        Parse PDFs with one MinerU batch and describe them in a pipeline.
+        
+        Parsing, downloading, describing and writing run as separate stages
+        connected by bounded queues, so one document's figures are described
+        while the next is still being parsed or downloaded. Outputs go to
+        output_dir, or next to each PDF when it is None. Returns a
+        ProcessResult per PDF path, in input order.
+        """
         self.logger.log_start()
-        result = ProcessResult()
-        
-        pdf_name = os.path.splitext(os.path.basename(pdf_path))[0]
         
-        mineru_client = MinerUClient(self.config.mineru_token or "", self.logger)
+        mineru_client = MinerUClient.from_config(self.config, self.logger, self.parse_cache)
         
         temp_dir = tempfile.mkdtemp(prefix="ieeu_")
-        
-        try:
-            md_path, images_dir = mineru_client.parse_pdf(pdf_path, temp_dir)
-            
-            if not md_path:
-                print("MinerU 解析失败")
-                result.success = False
-                return result
-            
-            with open(md_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-            
-            md_dir = os.path.dirname(md_path)
-            processed_content, batch_result = self._process_markdown_content(
-                content,
-                md_dir,
-                os.path.basename(md_path)
+        jobs = {
+            pdf_path: DocumentJob(
+                pdf_path, 
+                output_dir or os.path.dirname(pdf_path), 
+                mineru_client, 
+                os.path.join(temp_dir, str(index))
             )
+            for index, pdf_path in enumerate(pdf_paths)
+        }
+        self._assign_output_names(jobs.values())
+        
+        # 命中解析缓存的直接描述；从任务日志恢复：已有结果链接的直接下载，
+        # 已上传的继续查询。每个 PDF 只哈希一次，解析缓存和任务日志共用
+        parsed_jobs = []
+        resume = {}
+        for pdf_path, job in jobs.items():
+            try:
+                pdf_hash = hash_file(pdf_path)
+            except OSError:
+                pdf_hash = None
+            cached = mineru_client.load_cached(pdf_path, os.path.join(job.work_dir, "cached"), pdf_hash)
+            job.journal = self._open_journal("process", pdf_path, pdf_hash)
+            if cached:
+                job.md_path, job.images_dir = cached
+                parsed_jobs.append(job)
+                continue
             
-            if batch_result.api_completely_failed:
-                print("\n⚠️ VLM API无法使用，输出MinerU原始结果")
-                fallback_md, fallback_images = self._copy_fallback_output(
-                    md_path, images_dir or "", output_dir, pdf_name
-                )
-                result.api_failed = True
-                result.fallback_md_path = fallback_md
-                result.images_dir = fallback_images
-                print(f"\n输出文件: {fallback_md}")
-                print(f"图片目录: {fallback_images}")
-                return result
+            journal = job.journal
+            if journal is None:
+                continue
+            if journal.zip_url:
+                job.data_id = journal.data_id or "0"
+                job.zip_url = journal.zip_url
+                job.resumed_zip = True
+                parsed_jobs.append(job)
+            elif journal.batch_id:
+                resume[pdf_path] = (journal.batch_id, journal.data_id)
+        to_poll = [path for path in pdf_paths if jobs[path] not in parsed_jobs]
+        
+        def on_uploaded(pdf_path: str, batch_id: str, data_id: str):
+            if jobs[pdf_path].journal is not None:
+                jobs[pdf_path].journal.record_batch(batch_id, data_id)
+        
+        def parsed():
+            resumed = sum(1 for job in parsed_jobs if job.resumed_zip)
+            if resumed:
+                print(f"\n♻️ 从任务日志恢复 {resumed} 个已解析的 PDF")
+            yield from parsed_jobs
             
-            output_path = os.path.join(output_dir, f"{pdf_name}.md")
-            with open(output_path, 'w', encoding='utf-8') as f:
-                f.write(processed_content)
+            if not to_poll:
+                return
             
-            result.output_path = output_path
-            result.failed_images = batch_result.failed_paths
+            for data_id, pdf_path, zip_url in mineru_client.poll_pdfs(to_poll, resume, on_uploaded):
+                job = jobs[pdf_path]
+                job.data_id = data_id
+                job.zip_url = zip_url
+                if job.journal is not None:
+                    if zip_url:
+                        job.journal.record_zip(zip_url)
+                    else:
+                        job.journal.reset_parse()
+                yield job
+        
+        pipeline = Pipeline(
+            "parse",
+            [
+                Stage("fetch", self._fetch_document, FETCH_WORKERS),
+                Stage("describe", self._describe_document),
+                Stage("write", self._write_document),
+            ],
+            on_error=self._on_stage_error,
+            tracer=self.logger.tracer
+        )
+        
+        try:
+            pipeline.run(parsed())
             
-            print(f"\n输出文件: {output_path}")
+            self.logger.log_connection_reuse(
+                "MinerU", 
+                *mineru_client.session.connection_stats()
+            )
             
-            if batch_result.failed_paths:
-                print(f"⚠️ {len(batch_result.failed_paths)} 张图片处理失败")
+            if len(pdf_paths) > 1:
+                failed = [path for path in pdf_paths if not jobs[path].result.success]
+                print(f"\n完成 {len(pdf_paths) - len(failed)}/{len(pdf_paths)} 个 PDF")
+                for path in failed:
+                    print(f"  ❌ {path}")
             
+            self.logger.log_stages(pipeline.utilization())
+            self._log_vlm_connection_reuse()
+            self.logger.log_backends(self.vlm_client.backends.report())
             self.logger.log_summary()
+            self._export_metrics()
+        
+        except KeyboardInterrupt:
+            pipeline.cancel()
+            self.vlm_client.cancel()
+            print(INTERRUPTED_MESSAGE)
+            raise
             
         finally:
+            for job in jobs.values():
+                if job.writer is not None:
+                    job.writer.close()
+            self._close_journals(job.journal for job in jobs.values())
             shutil.rmtree(temp_dir, ignore_errors=True)
+            self._export_trace()
         
-        return result
+        return {path: jobs[path].result for path in pdf_paths}
+    
+    def process_pdf(self, pdf_path: str, output_dir: str) -> ProcessResult:
+        return self.process_pdfs([pdf_path], output_dir)[pdf_path]
     
     def _process_single_file(
         self, 
@@ -160,10 +477,7 @@ class Processor:
         result = ProcessResult()
         filename = os.path.basename(file_path)
         
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-        
-        references = ImageExtractor.extract_image_references(content)
+        references = ImageExtractor.scan_file(file_path)
         
         if not references:
             print(f"No images found in {filename}")
@@ -177,43 +491,50 @@ class Processor:
             os.path.dirname(file_path)
         )
         
-        batch_result = self.vlm_client.describe_images_batch(image_paths, self.batch_size)
+        base_name = os.path.splitext(filename)[0]
+        output_filename = f"{base_name}{OUTPUT_SUFFIX}"
+        output_path = os.path.join(
+            os.path.dirname(file_path), 
+            output_filename
+        )
+        writer = OrderedMarkdownWriter(file_path, output_path, self._render)
+        
+        journal = self._open_journal("run", file_path)
+        try:
+            batch_result = self._describe(image_paths, journal, writer)
+        except BaseException:
+            writer.close()
+            raise
+        finally:
+            self._close_journals([journal])
+        
+        if batch_result.cancelled:
+            writer.close()
+            result.success = False
+            result.interrupted = True
+            return result
         
         if batch_result.api_completely_failed:
+            writer.discard()
             print(f"\n⚠️ VLM API无法使用，跳过文件 {filename}")
             result.api_failed = True
             return result
         
-        replacements = {}
-        for ref in references:
-            if ref.path in batch_result.results:
-                new_text = self._build_replacement(ref, batch_result.results[ref.path])
-                old_text = f"![]({ref.path})"
-                replacements[old_text] = new_text
-            else:
+        if any(ref.path in batch_result.results for ref in references):
+            writer.finish(batch_result.results)
+            
+            result.output_path = output_path
+            self.logger.log_output(output_filename)
+        else:
+            writer.discard()
+            for ref in references:
                 self.logger.log_error(
                     ref.path, 
                     "No description generated"
                 )
         
-        if replacements:
-            new_content = ImageExtractor.replace_images(
-                content, 
-                replacements
-            )
-            
-            base_name = os.path.splitext(filename)[0]
-            output_filename = f"{base_name}{OUTPUT_SUFFIX}"
-            output_path = os.path.join(
-                os.path.dirname(file_path), 
-                output_filename
-            )
-            
-            with open(output_path, 'w', encoding='utf-8') as f:
-                f.write(new_content)
-            
-            result.output_path = output_path
-            self.logger.log_output(output_filename)
+        if journal is not None:
+            journal.discard()
         
         result.failed_images = batch_result.failed_paths
         
@@ -240,11 +561,17 @@ class Processor:
         
         for file_path in md_files:
             try:
-                result = self._process_single_file(file_path)
+                with self.logger.tracer.span("file", "stage", file=os.path.basename(file_path)):
+                    result = self._process_single_file(file_path)
                 if result.api_failed:
                     api_failed = True
                     break
                 total_failed += len(result.failed_images)
+            except KeyboardInterrupt:
+                self.vlm_client.cancel()
+                print(INTERRUPTED_MESSAGE)
+                self._export_trace()
+                raise
             except Exception as e:
                 print(f"Error processing {file_path}: {e}")
                 continue
@@ -254,4 +581,8 @@ class Processor:
         elif total_failed > 0:
             print(f"\n⚠️ 共 {total_failed} 张图片处理失败")
         
+        self._log_vlm_connection_reuse()
+        self.logger.log_backends(self.vlm_client.backends.report())
         self.logger.log_summary()
+        self._export_metrics()
+        self._export_trace()
@@ -0,0 +1,272 @@
+"""Shared request/token rate limiting for VLM calls."""
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Mapping, Optional
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+from .constants import DEFAULT_CONFIG_DIR
+
+_DURATION_PART = re.compile(r'(\d+(?:\.\d+)?)(ms|s|m|h)')
+_DURATION_UNITS = {'ms': 0.001, 's': 1.0, 'm': 60.0, 'h': 3600.0}
+
+
+def parse_duration(value: Optional[str]) -> Optional[float]:
+    """Parse '20', '1.5', '20ms', '6m0s' or '1h2m' into seconds."""
+    if value is None:
+        return None
+    value = str(value).strip()
+    if not value:
+        return None
+
+    try:
+        return float(value)
+    except ValueError:
+        pass
+
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        return None
+    return sum(float(amount) * _DURATION_UNITS[unit] for amount, unit in parts)
+
+
+def parse_retry_after(value: Optional[str], now: Optional[float] = None) -> Optional[float]:
+    """Parse a Retry-After header (delta seconds or HTTP date) into seconds to wait."""
+    if value is None:
+        return None
+
+    seconds = parse_duration(value)
+    if seconds is not None:
+        return max(seconds, 0.0)
+
+    try:
+        retry_at = parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+    return max(retry_at - (now if now is not None else time.time()), 0.0)
+
+
+def _parse_reset(value: Optional[str], now: float) -> Optional[float]:
+    """x-ratelimit-reset* may be a duration or an absolute epoch in s/ms."""
+    seconds = parse_duration(value)
+    if seconds is None:
+        return None
+    if seconds > 1e12:
+        return max(seconds / 1000.0 - now, 0.0)
+    if seconds > 1e9:
+        return max(seconds - now, 0.0)
+    return seconds
+
+
+class RateLimiter:
+    """
+    Token-bucket limiter for requests/minute and tokens/minute.
+
+    Callers reserve capacity before each send and sleep for the returned
+    delay, so concurrent workers are paced instead of bursting in lockstep.
+    Retry-After and x-ratelimit-* response headers block or drain the
+    buckets for everyone. With state_path set, the bucket state lives in a
+    JSON file guarded by an flock'd lock file, so several processes using
+    the same key share one budget.
+
+    A limit of 0 disables that bucket; header feedback still applies.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: float = 0,
+        tokens_per_minute: float = 0,
+        state_path: Optional[str] = None
+    ):
+        self.rpm = float(requests_per_minute or 0)
+        self.tpm = float(tokens_per_minute or 0)
+        self.state_path = state_path if fcntl is not None else None
+        self.waited_seconds = 0.0
+        self._lock = threading.Lock()
+        self._state = self._initial_state(time.time())
+
+    @staticmethod
+    def state_path_for(endpoint: Optional[str], key: Optional[str]) -> str:
+        digest = hashlib.sha256(f"{endpoint}\0{key}".encode('utf-8')).hexdigest()[:16]
+        return os.path.join(DEFAULT_CONFIG_DIR, "ratelimit", f"{digest}.json")
+
+    @classmethod
+    def from_config(cls, config) -> 'RateLimiter':
+        state_path = None
+        if config.rate_limit_shared:
+            state_path = cls.state_path_for(config.endpoint, config.key)
+        return cls(config.rpm_limit, config.tpm_limit, state_path)
+
+    def _initial_state(self, now: float) -> dict:
+        return {
+            'requests': self.rpm,
+            'tokens': self.tpm,
+            'updated': now,
+            'blocked_until': 0.0
+        }
+
+    def _locked(self, update, write: bool = True):
+        """
+        Run update(state, now) under the thread lock and, if shared, the file lock.
+
+        With write=False the shared state is only read: no file lock, no
+        write-back. os.replace() swaps the state file atomically, so the
+        read still sees a complete state.
+        """
+        with self._lock:
+            if self.state_path is None:
+                return update(self._state, time.time())
+            if not write:
+                return update(self._read_shared_state(), time.time())
+
+            os.makedirs(os.path.dirname(self.state_path), exist_ok=True)
+            with open(self.state_path + ".lock", 'a') as lock_file:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+                try:
+                    state = self._read_shared_state()
+                    result = update(state, time.time())
+                    tmp_path = f"{self.state_path}.{os.getpid()}.tmp"
+                    with open(tmp_path, 'w', encoding='utf-8') as f:
+                        json.dump(state, f)
+                    os.replace(tmp_path, self.state_path)
+                    return result
+                finally:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def _read_shared_state(self) -> dict:
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return self._initial_state(time.time())
+
+        defaults = self._initial_state(time.time())
+        defaults.update(state)
+        return defaults
+
+    def _refill(self, state: dict, now: float):
+        elapsed = max(now - state['updated'], 0.0)
+        if self.rpm:
+            state['requests'] = min(self.rpm, state['requests'] + elapsed * self.rpm / 60.0)
+        if self.tpm:
+            state['tokens'] = min(self.tpm, state['tokens'] + elapsed * self.tpm / 60.0)
+        state['updated'] = now
+
+    def reserve(self, tokens: int = 0) -> float:
+        """Reserve one request (and tokens); return seconds to wait before sending."""
+        def update(state, now):
+            self._refill(state, now)
+            delay = max(state['blocked_until'] - now, 0.0)
+
+            if self.rpm:
+                state['requests'] -= 1
+                if state['requests'] < 0:
+                    delay = max(delay, -state['requests'] * 60.0 / self.rpm)
+            if self.tpm and tokens:
+                state['tokens'] -= tokens
+                if state['tokens'] < 0:
+                    delay = max(delay, -state['tokens'] * 60.0 / self.tpm)
+
+            self.waited_seconds += delay
+            return delay
+
+        return self._locked(update)
+
+    def acquire(self, tokens: int = 0) -> float:
+        """Blocking form of reserve()."""
+        delay = self.reserve(tokens)
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+    def headroom(self) -> float:
+        """Fraction of the request/token budget available now: 0 while blocked, 1 if unlimited."""
+        def update(state, now):
+            self._refill(state, now)
+            if state['blocked_until'] > now:
+                return 0.0
+            fraction = 1.0
+            if self.rpm:
+                fraction = min(fraction, max(state['requests'], 0.0) / self.rpm)
+            if self.tpm:
+                fraction = min(fraction, max(state['tokens'], 0.0) / self.tpm)
+            return fraction
+
+        return self._locked(update, write=False)
+
+    def adjust_tokens(self, delta: int):
+        """Correct a reservation once actual usage is known (positive = used more)."""
+        if not self.tpm or not delta:
+            return
+
+        def update(state, now):
+            self._refill(state, now)
+            state['tokens'] = min(self.tpm, state['tokens'] - delta)
+
+        self._locked(update)
+
+    def block_for(self, seconds: float):
+        """Hold back every worker for the given number of seconds."""
+        if seconds <= 0:
+            return
+
+        def update(state, now):
+            state['blocked_until'] = max(state['blocked_until'], now + seconds)
+
+        self._locked(update)
+
+    def update_from_headers(self, headers: Optional[Mapping[str, str]]) -> Optional[float]:
+        """
+        Apply Retry-After and x-ratelimit-* headers.
+
+        Returns the Retry-After delay in seconds if the response carried one.
+        """
+        if not headers:
+            return None
+
+        now = time.time()
+        retry_after = parse_retry_after(headers.get('Retry-After'), now)
+        remaining_requests = parse_duration(
+            headers.get('x-ratelimit-remaining-requests')
+            or headers.get('x-ratelimit-remaining')
+        )
+        remaining_tokens = parse_duration(headers.get('x-ratelimit-remaining-tokens'))
+        reset_requests = _parse_reset(
+            headers.get('x-ratelimit-reset-requests')
+            or headers.get('x-ratelimit-reset'),
+            now
+        )
+        reset_tokens = _parse_reset(headers.get('x-ratelimit-reset-tokens'), now)
+
+        if retry_after is None and remaining_requests is None and remaining_tokens is None:
+            return None
+
+        def update(state, now):
+            self._refill(state, now)
+            block = retry_after or 0.0
+
+            if remaining_requests is not None:
+                if self.rpm:
+                    state['requests'] = min(state['requests'], remaining_requests)
+                if remaining_requests <= 0 and reset_requests:
+                    block = max(block, reset_requests)
+            if remaining_tokens is not None:
+                if self.tpm:
+                    state['tokens'] = min(state['tokens'], remaining_tokens)
+                if remaining_tokens <= 0 and reset_tokens:
+                    block = max(block, reset_tokens)
+
+            if block > 0:
+                state['blocked_until'] = max(state['blocked_until'], now + block)
+
+        self._locked(update)
+        return retry_after
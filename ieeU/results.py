@@ -0,0 +1,30 @@
+"""Shared result and error types for VLM description."""
+
+from enum import Enum
+from typing import Dict, List, Optional
+
+# Type alias for batch_size parameter
+BatchSizeType = int | str  # int or "full"
+
+
+class APIErrorType(Enum):
+    """API错误类型枚举"""
+    SUCCESS = "success"
+    AUTH_ERROR = "auth_error"          # API密钥问题 (401, 403)
+    RATE_LIMIT = "rate_limit"          # 并发限制 (429)
+    CONCURRENCY_ERROR = "concurrency"  # 并发相关错误
+    SERVER_ERROR = "server_error"      # 服务器错误 (5xx)
+    TIMEOUT = "timeout"                # 超时
+    NETWORK_ERROR = "network_error"    # 网络错误
+    UNKNOWN = "unknown"                # 未知错误
+
+
+class BatchResult:
+    """批次处理结果"""
+    def __init__(self):
+        self.results: Dict[str, str] = {}
+        self.failed_paths: List[str] = []
+        self.error_type: Optional[APIErrorType] = None
+        self.should_fallback_sequential: bool = False
+        self.api_completely_failed: bool = False
+        self.cancelled: bool = False
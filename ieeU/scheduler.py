@@ -0,0 +1,227 @@
+"""Continuous sliding-window scheduling of figure descriptions."""
+
+import heapq
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .controller import AIMDController
+from .logger import Logger
+from .results import APIErrorType, BatchResult
+
+DEFAULT_MAX_ATTEMPTS = 2
+
+
+class WorkItem:
+    """一张待描述的图片及其已尝试次数"""
+    __slots__ = ('index', 'rel_path', 'full_path', 'attempts', 'epoch', 'deferred')
+
+    def __init__(self, index: int, rel_path: str, full_path: str):
+        self.index = index
+        self.rel_path = rel_path
+        self.full_path = full_path
+        self.attempts = 0
+        self.epoch = 0
+        self.deferred = False
+
+    def __lt__(self, other: 'WorkItem') -> bool:
+        return (self.deferred, self.index) < (other.deferred, other.index)
+
+
+class SlidingWindowScheduler:
+    """
+    滑动窗口调度器
+
+    始终保持 controller.limit 个请求在途：任一请求完成后立即补位，失败的
+    图片重新排队，而不是等整批结束后再顺序重试。待处理队列按图片在文档中
+    的顺序排列，靠前的图片（包括普通重试）总是先发出，使按顺序增量写出的
+    输出尽早推进；被限流的图片则排到新任务之后，与新任务交替执行。并发
+    上限由 AIMD 控制器根据限流情况动态调整。调度器只负责簿记，由线程池或
+    事件循环驱动：
+
+        while scheduler.has_capacity():
+            submit(scheduler.next_item())
+        ...
+        scheduler.complete(item, description, error_type)
+
+    client 提供完全失败的判定策略（VLMClient）。每张图片成功后立即调用
+    on_complete(相对路径, 描述)，便于调用方逐张持久化结果；图片最终失败
+    （不再重试）时调用 on_failed(相对路径)。
+    """
+
+    def __init__(
+        self,
+        items: List[Tuple[str, str]],
+        controller: AIMDController,
+        client,
+        logger: Logger,
+        max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+        on_complete: Optional[Callable[[str, str], None]] = None,
+        on_failed: Optional[Callable[[str], None]] = None
+    ):
+        self.controller = controller
+        self.client = client
+        self.logger = logger
+        self.max_attempts = max_attempts
+        self.on_complete = on_complete
+        self.on_failed = on_failed
+        self.total = len(items)
+        # 按文档顺序建立，本身已满足堆的性质
+        self.pending: List[WorkItem] = [
+            WorkItem(index, rel_path, full_path) 
+            for index, (rel_path, full_path) in enumerate(items)
+        ]
+        self.in_flight = 0
+        self.aborted = False
+        self.cancelled = False
+        self.failures: List[Tuple[str, str, APIErrorType]] = []
+        self.result = BatchResult()
+        self._failed: Dict[str, APIErrorType] = {}
+
+    def has_capacity(self) -> bool:
+        return (
+            not self.aborted
+            and not self.cancelled
+            and bool(self.pending)
+            and self.in_flight < self.controller.limit
+        )
+
+    def _pop(self) -> WorkItem:
+        item = heapq.heappop(self.pending)
+        item.attempts += 1
+        item.epoch = self.controller.epoch
+        return item
+
+    def _trace_window(self):
+        """时间线上的在途请求数与并发上限，用于观察窗口空闲"""
+        self.logger.tracer.counter(
+            "VLM window", 
+            in_flight=self.in_flight, 
+            idle=max(self.controller.limit - self.in_flight, 0)
+        )
+
+    def next_item(self) -> WorkItem:
+        item = self._pop()
+        self.in_flight += 1
+        self.logger.log_inflight(self.in_flight)
+        self._trace_window()
+        return item
+
+    def next_items(
+        self,
+        count: int,
+        fits: Optional[Callable[[List[WorkItem], WorkItem], bool]] = None
+    ) -> List[WorkItem]:
+        """
+        取出最多 count 张图片放进同一个请求，只占用一个在途名额
+
+        fits(已选图片, 候选图片) 返回 False 时停止添加（如超出请求体积上限）；
+        第一张图片总会被取出。
+        """
+        items = [self._pop()]
+        while len(items) < count and self.pending:
+            if fits is not None and not fits(items, self.pending[0]):
+                break
+            items.append(self._pop())
+        self.in_flight += 1
+        self.logger.log_inflight(self.in_flight)
+        self._trace_window()
+        return items
+
+    def upcoming(self, count: int) -> List[WorkItem]:
+        """按发出顺序返回接下来最多 count 张待处理的图片（不取出）"""
+        return heapq.nsmallest(count, self.pending)
+
+    def done(self) -> bool:
+        if self.cancelled:
+            return True
+        return self.in_flight == 0 and (self.aborted or not self.pending)
+    
+    def cancel(self):
+        """用户中断：不再提交新请求，也不再等待在途请求"""
+        self.cancelled = True
+
+    def complete(
+        self,
+        item: WorkItem,
+        description: Optional[str],
+        error_type: APIErrorType
+    ):
+        """记录一次请求的结果，并决定重试、降级或中止"""
+        self.in_flight -= 1
+        self._trace_window()
+        self._record(item, description, error_type)
+
+    def complete_items(
+        self,
+        items: List[WorkItem],
+        outcomes: List[Tuple[Optional[str], APIErrorType]]
+    ):
+        """记录一个打包请求的结果：释放一个在途名额，逐张处理结果"""
+        self.in_flight -= 1
+        self._trace_window()
+        for item, (description, error_type) in zip(items, outcomes):
+            self._record(item, description, error_type)
+
+    def _record(
+        self,
+        item: WorkItem,
+        description: Optional[str],
+        error_type: APIErrorType
+    ):
+        if description:
+            self.controller.on_success()
+            self.result.results[item.rel_path] = description
+            if self.on_complete is not None:
+                self.on_complete(item.rel_path, description)
+            self.logger.log_progress(
+                len(self.result.results),
+                self.total,
+                item.rel_path,
+                True
+            )
+            return
+
+        self.failures.append((item.rel_path, item.full_path, error_type))
+
+        if error_type == APIErrorType.AUTH_ERROR and not self.result.results:
+            if not self.aborted and self.client._is_api_completely_failed(self.failures):
+                print("\n❌ API完全无法使用，将输出原始MinerU结果")
+                self.aborted = True
+            self._failed[item.rel_path] = error_type
+            return
+
+        if self.controller.is_throttle(error_type):
+            item.deferred = True
+            self.controller.on_throttle(item.epoch)
+            if self.controller.reached_minimum:
+                self.result.should_fallback_sequential = True
+
+        if error_type != APIErrorType.AUTH_ERROR and item.attempts < self.max_attempts:
+            heapq.heappush(self.pending, item)
+            return
+
+        self._failed[item.rel_path] = error_type
+        if self.on_failed is not None:
+            self.on_failed(item.rel_path)
+        self.logger.log_progress(
+            len(self.result.results) + len(self._failed),
+            self.total,
+            item.rel_path,
+            False
+        )
+
+    def finish(self) -> BatchResult:
+        if self.aborted:
+            self.result.api_completely_failed = True
+            self._failed.update(
+                (item.rel_path, APIErrorType.AUTH_ERROR) for item in self.pending
+            )
+            self.pending.clear()
+
+        if self.cancelled:
+            self.result.cancelled = True
+            self.pending.clear()
+
+        self.result.failed_paths = list(self._failed)
+        if self._failed:
+            self.result.error_type = list(self._failed.values())[-1]
+        return self.result
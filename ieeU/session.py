@@ -0,0 +1,73 @@
+"""Pooled keep-alive HTTP sessions shared by worker threads."""
+
+from typing import Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_POOL_CONNECTIONS = 10
+
+
+class PooledSession(requests.Session):
+    """
+    A requests.Session whose connection pool can grow with concurrency.
+
+    One instance is shared by all worker threads of a client so that
+    TCP/TLS connections to the same host are kept alive and reused.
+    """
+
+    def __init__(self, pool_size: int = DEFAULT_POOL_CONNECTIONS):
+        super().__init__()
+        self.pool_size = 0
+        self._retired_requests = 0
+        self._retired_connections = 0
+        self.resize(pool_size)
+
+    def resize(self, pool_size: int):
+        """Grow the per-host pool so every concurrent worker can hold a connection."""
+        pool_size = max(1, int(pool_size))
+        if pool_size <= self.pool_size:
+            return
+
+        old_adapters = set(self.adapters.values())
+        for adapter in old_adapters:
+            requests_count, connections = self._adapter_stats(adapter)
+            self._retired_requests += requests_count
+            self._retired_connections += connections
+
+        adapter = HTTPAdapter(
+            pool_connections=DEFAULT_POOL_CONNECTIONS,
+            pool_maxsize=pool_size
+        )
+        self.mount("https://", adapter)
+        self.mount("http://", adapter)
+        self.pool_size = pool_size
+
+        for old in old_adapters:
+            old.close()
+
+    @staticmethod
+    def _adapter_stats(adapter) -> Tuple[int, int]:
+        pools = getattr(getattr(adapter, "poolmanager", None), "pools", None)
+        if pools is None:
+            return 0, 0
+
+        requests_count = 0
+        connections = 0
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            requests_count += getattr(pool, "num_requests", 0)
+            connections += getattr(pool, "num_connections", 0)
+        return requests_count, connections
+
+    def connection_stats(self) -> Tuple[int, int]:
+        """Return (requests sent, connections opened) over the session lifetime."""
+        requests_count = self._retired_requests
+        connections = self._retired_connections
+        for adapter in set(self.adapters.values()):
+            adapter_requests, adapter_connections = self._adapter_stats(adapter)
+            requests_count += adapter_requests
+            connections += adapter_connections
+        return requests_count, connections
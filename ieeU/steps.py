@@ -0,0 +1,100 @@
+"""
+Steps yielded by the VLM request flows.
+
+The flows in VLMClient (backend choice, retries, hedging, caching,
+deduplication, pack splitting) are generators that never block: whenever
+they need I/O they yield one of these steps and are resumed with its
+result. VLMClient runs them on threads, AsyncVLMEngine on an event loop,
+so both engines share every decision and differ only in the transport.
+
+An exception raised while performing a step is thrown back into the
+flow at the yield.
+"""
+
+from typing import Any, Callable, Iterable, Optional
+
+
+class Blocking:
+    """Call fn(*args) off the event loop (file, cache and encoding work)."""
+    __slots__ = ('fn', 'args')
+
+    def __init__(self, fn: Callable, *args):
+        self.fn = fn
+        self.args = args
+
+
+class Sleep:
+    """Wait for the given number of seconds."""
+    __slots__ = ('seconds',)
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+
+
+class Send:
+    """POST a request body to a backend; resumed with a Reply."""
+    __slots__ = ('backend', 'payload')
+
+    def __init__(self, backend, payload: bytearray):
+        self.backend = backend
+        self.payload = payload
+
+
+class Call:
+    """Run a complete (possibly hedged) API call; resumed with (content, error type)."""
+    __slots__ = ('image_path', 'body', 'images')
+
+    def __init__(self, image_path: str, body: bytearray, images: int = 1):
+        self.image_path = image_path
+        self.body = body
+        self.images = images
+
+
+class Join:
+    """Wait for a concurrent.futures.Future resolved by another flow."""
+    __slots__ = ('future',)
+
+    def __init__(self, future):
+        self.future = future
+
+
+class Spawn:
+    """
+    Start another flow concurrently; resumed with a handle for WaitFirst.
+
+    Spawned flows still running when the flow that started them ends are
+    cancelled where the driver can interrupt them.
+    """
+    __slots__ = ('steps',)
+
+    def __init__(self, steps):
+        self.steps = steps
+
+
+class WaitFirst:
+    """
+    Wait until at least one handle finishes or timeout (None: forever) passes.
+
+    Resumed with {handle: result} for the handles that have finished.
+    """
+    __slots__ = ('handles', 'timeout')
+
+    def __init__(self, handles: Iterable, timeout: Optional[float] = None):
+        self.handles = list(handles)
+        self.timeout = timeout
+
+
+class Reply:
+    """
+    Outcome of a Send.
+
+    status and headers are None when no response arrived; error_type is
+    None when the request succeeded and data holds the decoded JSON.
+    """
+    __slots__ = ('status', 'headers', 'data', 'error_type')
+
+    def __init__(self, status: Optional[int] = None, headers=None, data: Any = None, error_type=None):
+        self.status = status
+        self.headers = headers
+        self.data = data
+        self.error_type = error_type
@@ -0,0 +1,129 @@
+"""Timeline tracing in Chrome trace-event format."""
+
+import asyncio
+import json
+import os
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+from typing import Iterator, List, Optional
+
+
+class Tracer:
+    """
+    Records spans, instants and counters for chrome://tracing or Perfetto.
+
+    Each span is a complete ("X") event on the track of the thread that
+    ran it; coroutines get a track per asyncio task, so concurrent
+    requests of the async engine do not overlap on one line. Tracks are
+    named after their thread or task. A disabled tracer records nothing
+    and its span() costs one attribute check.
+    """
+
+    def __init__(self, enabled: bool = True, clock=time.perf_counter):
+        self.enabled = enabled
+        self.clock = clock
+        self.events: List[dict] = []
+        self._origin = clock()
+        self._pid = os.getpid()
+        # Thread idents and task ids are reused once their owner is gone,
+        # so tracks are remembered per live thread / task object instead
+        self._thread_tracks = threading.local()
+        self._task_tracks: 'weakref.WeakKeyDictionary[asyncio.Task, int]' = weakref.WeakKeyDictionary()
+        self._next_tid = 1
+        self._lock = threading.Lock()
+        if enabled:
+            self.events.append({
+                "name": "process_name", "ph": "M", "pid": self._pid, "tid": 0,
+                "args": {"name": "ieeU"},
+            })
+
+    def _now(self) -> float:
+        return (self.clock() - self._origin) * 1e6
+
+    def _track(self) -> int:
+        try:
+            task = asyncio.current_task()
+        except RuntimeError:
+            task = None
+
+        if task is None:
+            tid = getattr(self._thread_tracks, "tid", None)
+        else:
+            tid = self._task_tracks.get(task)
+        if tid is not None:
+            return tid
+
+        with self._lock:
+            tid = self._next_tid
+            self._next_tid += 1
+            name = f"async task {tid}" if task is not None else threading.current_thread().name
+            self.events.append({
+                "name": "thread_name", "ph": "M", "pid": self._pid, "tid": tid,
+                "args": {"name": name},
+            })
+            if task is None:
+                self._thread_tracks.tid = tid
+            else:
+                self._task_tracks[task] = tid
+        return tid
+
+    def _emit(self, event: dict):
+        event["pid"] = self._pid
+        with self._lock:
+            self.events.append(event)
+
+    @contextmanager
+    def span(self, name: str, cat: str = "", **args) -> Iterator[Optional[dict]]:
+        """
+        Time the with-block as one span.
+
+        Yields the span's args dict (None when disabled) so results known
+        only at the end, such as an error type, can be attached.
+        """
+        if not self.enabled:
+            yield None
+            return
+
+        tid = self._track()
+        start = self._now()
+        try:
+            yield args
+        except BaseException as e:
+            args["error"] = type(e).__name__
+            raise
+        finally:
+            event = {"name": name, "ph": "X", "ts": start, "dur": self._now() - start, "tid": tid}
+            if cat:
+                event["cat"] = cat
+            if args:
+                event["args"] = args
+            self._emit(event)
+
+    def instant(self, name: str, cat: str = "", **args):
+        if not self.enabled:
+            return
+        event = {"name": name, "ph": "i", "s": "t", "ts": self._now(), "tid": self._track()}
+        if cat:
+            event["cat"] = cat
+        if args:
+            event["args"] = args
+        self._emit(event)
+
+    def counter(self, name: str, **values: float):
+        """A counter track, drawn as a stacked area chart of values."""
+        if not self.enabled:
+            return
+        self._emit({"name": name, "ph": "C", "ts": self._now(), "tid": 0, "args": values})
+
+    def write(self, path: str):
+        with self._lock:
+            events = list(self.events)
+        events.sort(key=lambda event: event.get("ts", -1))
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+        os.replace(tmp_path, path)
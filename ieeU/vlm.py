@@ -1,59 +1,119 @@
-import base64
-import json
+import os
 import re
+import threading
 import time
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from enum import Enum
-from typing import Dict, List, Optional, Tuple
+from concurrent.futures import FIRST_COMPLETED, wait
+from typing import Callable, Dict, Generator, Iterable, List, Optional, Set, Tuple
 import requests
 
+from .backends import Backend, BackendPool
+from .cache import DescriptionCache, hash_file
 from .config import Config
-from .constants import PROMPT_TEMPLATE, DEFAULT_BATCH_SIZE
+from .constants import (
+    PROMPT_TEMPLATE,
+    PACKED_PROMPT_TEMPLATE,
+    DEFAULT_BATCH_SIZE,
+    ESTIMATED_IMAGE_TOKENS,
+    ESTIMATED_COMPLETION_TOKENS
+)
+from .controller import AIMDController
+from .dedup import InflightRegistry, group_duplicates
+from .hedge import HEDGE_POLL_SECONDS, CallState, HedgePolicy
 from .logger import Logger
+from .payload import BodyReader, ImageData, build_chat_body, replace_model
+from .preprocess import ImagePreprocessor, detect_mime
+from .ratelimit import RateLimiter
+from .results import APIErrorType, BatchResult, BatchSizeType
+from .scheduler import SlidingWindowScheduler, WorkItem
+from .session import PooledSession
+from .steps import Blocking, Call, Join, Reply, Send, Sleep, Spawn, WaitFirst
+from .workers import DaemonThreadPool
 
-# Type alias for batch_size parameter
-BatchSizeType = int | str  # int or "full"
+# 等待结果时检查用户中断的间隔（秒）
+CANCEL_CHECK_INTERVAL = 0.2
+# 打包请求中每张图片预留的输出token数
+PACKED_MAX_TOKENS_PER_IMAGE = 1024
+# 预处理的提前量：调度器前方的窗口数
+PREFETCH_WINDOWS = 2
 
+_FIGURE_BLOCK = re.compile(r'```figure\n([\s\S]*?)\n```')
+_NUMBERED_FIGURE_BLOCK = re.compile(r'```figure[ \t]+(\d+)[ \t]*\n([\s\S]*?)\n```')
 
-class APIErrorType(Enum):
-    """API错误类型枚举"""
-    SUCCESS = "success"
-    AUTH_ERROR = "auth_error"          # API密钥问题 (401, 403)
-    RATE_LIMIT = "rate_limit"          # 并发限制 (429)
-    CONCURRENCY_ERROR = "concurrency"  # 并发相关错误
-    SERVER_ERROR = "server_error"      # 服务器错误 (5xx)
-    TIMEOUT = "timeout"                # 超时
-    NETWORK_ERROR = "network_error"    # 网络错误
-    UNKNOWN = "unknown"                # 未知错误
-
-
-class BatchResult:
-    """批次处理结果"""
-    def __init__(self):
-        self.results: Dict[str, str] = {}
-        self.failed_paths: List[str] = []
-        self.error_type: Optional[APIErrorType] = None
-        self.should_fallback_sequential: bool = False
-        self.api_completely_failed: bool = False
-
+Outcome = Tuple[Optional[str], APIErrorType]
+# 请求流程：产出 steps 中的步骤，由线程或事件循环执行后继续
+Steps = Generator[object, object, object]
 
 class VLMClient:
-    def __init__(self, config: Config, logger: Logger):
+    def __init__(
+        self, 
+        config: Config, 
+        logger: Logger, 
+        cache: Optional[DescriptionCache] = None,
+        preprocessor: Optional[ImagePreprocessor] = None
+    ):
         self.config = config
         self.logger = logger
+        self.cache = cache
+        self.preprocessor = preprocessor
+        self.inflight = InflightRegistry()
+        self._hashes: Dict[str, str] = {}
+        self._prefetched: Set[str] = set()
+        self.cancel_event = threading.Event()
+        self.session = PooledSession(config.max_concurrency)
+        self.backends = BackendPool.from_config(config)
+        self.hedge = HedgePolicy.from_config(config)
+        self._hedge_pool: Optional[DaemonThreadPool] = None
+        self.images_per_request = max(1, int(config.images_per_request))
+        self.pack_max_bytes = int(config.pack_max_mb * 1024 * 1024)
         self._consecutive_failures = 0
         self._max_consecutive_failures = 3
         self._concurrency_failed = False
     
-    def _encode_image(self, image_path: str) -> Optional[str]:
+    @property
+    def rate_limiter(self) -> RateLimiter:
+        """第一个后端的限速器（单端点配置时即唯一的限速器）"""
+        return self.backends.backends[0].limiter
+    
+    @rate_limiter.setter
+    def rate_limiter(self, limiter: RateLimiter):
+        self.backends.backends[0].limiter = limiter
+    
+    def _load_image(self, image_path: str) -> Optional[ImageData]:
+        """读取（并预处理）图片；未预处理的文件在构建请求体时才映射进内存"""
         try:
-            with open(image_path, 'rb') as f:
-                image_data = f.read()
-                return base64.b64encode(image_data).decode('utf-8')
+            with self.logger.tracer.span("load image", "vlm", image=os.path.basename(image_path)):
+                if self.preprocessor is not None:
+                    image_data, mime = self.preprocessor.load(image_path)
+                    return ImageData(image_data, mime)
+                
+                with open(image_path, 'rb') as f:
+                    header = f.read(16)
+                return ImageData(image_path, detect_mime(header, image_path))
         except Exception as e:
             self.logger.log_error(image_path, f"Failed to read image: {e}")
             return None
     
+    @staticmethod
+    def _classify_status(status_code: int) -> Optional[APIErrorType]:
+        """根据HTTP状态码分类错误类型"""
+        if status_code in (401, 403):
+            return APIErrorType.AUTH_ERROR
+        elif status_code == 429:
+            return APIErrorType.RATE_LIMIT
+        elif status_code >= 500:
+            return APIErrorType.SERVER_ERROR
+        return None
+    
+    @staticmethod
+    def _classify_message(error: Exception) -> APIErrorType:
+        """根据错误消息中的并发相关关键词分类"""
+        error_msg = str(error).lower()
+        concurrency_keywords = ['concurrent', 'rate limit', 'too many', 'throttl', 'quota']
+        if any(kw in error_msg for kw in concurrency_keywords):
+            return APIErrorType.CONCURRENCY_ERROR
+        
+        return APIErrorType.UNKNOWN
+    
     def _classify_error(self, error: Exception, response: Optional[requests.Response] = None) -> APIErrorType:
         """根据异常和响应分类错误类型"""
         if isinstance(error, requests.exceptions.Timeout):
@@ -63,133 +123,413 @@ class VLMClient:
             return APIErrorType.NETWORK_ERROR
         
         if response is not None:
-            status_code = response.status_code
-            if status_code in (401, 403):
-                return APIErrorType.AUTH_ERROR
-            elif status_code == 429:
-                return APIErrorType.RATE_LIMIT
-            elif status_code >= 500:
-                return APIErrorType.SERVER_ERROR
+            error_type = self._classify_status(response.status_code)
+            if error_type:
+                return error_type
         
         if isinstance(error, requests.exceptions.HTTPError):
             if hasattr(error, 'response') and error.response is not None:
-                status_code = error.response.status_code
-                if status_code in (401, 403):
-                    return APIErrorType.AUTH_ERROR
-                elif status_code == 429:
-                    return APIErrorType.RATE_LIMIT
-                elif status_code >= 500:
-                    return APIErrorType.SERVER_ERROR
-        
-        # 检查错误消息中的并发相关关键词
-        error_msg = str(error).lower()
-        concurrency_keywords = ['concurrent', 'rate limit', 'too many', 'throttl', 'quota']
-        if any(kw in error_msg for kw in concurrency_keywords):
-            return APIErrorType.CONCURRENCY_ERROR
+                error_type = self._classify_status(error.response.status_code)
+                if error_type:
+                    return error_type
         
-        return APIErrorType.UNKNOWN
+        return self._classify_message(error)
     
-    def _call_api(self, image_path: str, base64_image: str) -> Tuple[Optional[str], APIErrorType]:
-        """调用API，返回结果和错误类型"""
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {self.config.key}"
-        }
-        
-        payload = {
-            "model": self.config.model_name,
-            "messages": [
-                {
-                    "role": "user",
-                    "content": [
-                        {
-                            "type": "text",
-                            "text": PROMPT_TEMPLATE
-                        },
-                        {
-                            "type": "image_url",
-                            "image_url": {
-                                "url": f"data:image/jpeg;base64,{base64_image}"
-                            }
-                        }
-                    ]
-                }
-            ],
-            "max_tokens": 4096
-        }
+    def _body_for(self, backend: Backend, body: bytearray) -> bytearray:
+        """后端使用不同模型时改写请求体中的 model 字段"""
+        return replace_model(body, self.config.model_name, backend.model)
+    
+    def _record_backend(self, backend: Backend, seconds: float, result: APIErrorType, images: int):
+        """记录后端的一次请求结果；认证错误或5xx会让该后端暂时退出负载均衡"""
+        ejected = self.backends.record(backend, seconds, result, images)
+        if result == APIErrorType.SUCCESS:
+            self.hedge.record(seconds, images)
+        self.logger.log_backend_request(
+            backend.name, 
+            result.value, 
+            images if result == APIErrorType.SUCCESS else 0
+        )
+        if ejected:
+            self.logger.log_backend_ejected(backend.name, result.value, ejected)
+    
+    def _fails_over(self, backend: Backend, error_type: APIErrorType) -> bool:
+        """认证错误和5xx在还有其他可用后端时立即换后端重试，不退避"""
+        return (
+            error_type in (APIErrorType.AUTH_ERROR, APIErrorType.SERVER_ERROR)
+            and self.backends.has_alternative(backend)
+        )
+    
+    @staticmethod
+    def _prompt(count: int) -> str:
+        if count > 1:
+            return PACKED_PROMPT_TEMPLATE.format(count=count)
+        return PROMPT_TEMPLATE
+    
+    def _build_body(self, images: List[ImageData]) -> bytearray:
+        """构建请求体：图片以base64直接写入预分配的缓冲区；多张图片使用打包提示词"""
+        with self.logger.tracer.span("encode", "vlm", images=len(images)):
+            return build_chat_body(
+                self.config.model_name,
+                self._prompt(len(images)),
+                images,
+                max_tokens=max(4096, PACKED_MAX_TOKENS_PER_IMAGE * len(images))
+            )
+    
+    def _estimate_tokens(self, images: int = 1) -> int:
+        """估算单次请求消耗的token数，用于TPM限速"""
+        return (
+            len(self._prompt(images)) // 4 
+            + images * (ESTIMATED_IMAGE_TOKENS + ESTIMATED_COMPLETION_TOKENS)
+        )
+    
+    def _record_usage(self, data: dict, estimated_tokens: int, limiter: RateLimiter):
+        """用响应中的usage修正所用后端的TPM预留量并计入token指标"""
+        usage = data.get('usage') if isinstance(data, dict) else None
+        if not usage:
+            return
+        self.logger.log_tokens(usage)
+        if usage.get('total_tokens'):
+            limiter.adjust_tokens(int(usage['total_tokens']) - estimated_tokens)
+    
+    def _backoff(self, error_type: APIErrorType, seconds: float) -> Steps:
+        """记录一次重试并等待"""
+        self.logger.log_retry(error_type.value, seconds)
+        with self.logger.tracer.span("retry sleep", "retry", error_type=error_type.value):
+            yield Sleep(seconds)
+    
+    def _request_steps(
+        self, 
+        body: bytearray, 
+        images: int = 1,
+        call: Optional[CallState] = None
+    ) -> Steps:
+        """
+        调用API的重试循环，返回结果和错误类型；每次尝试都重新选择后端
+        
+        call 由对冲请求传入：记录所用后端，副本据此避开；被取消后不再重试。
+        """
+        tracer = self.logger.tracer
         
         last_error_type = APIErrorType.UNKNOWN
         
+        estimated_tokens = self._estimate_tokens(images)
+        
         for attempt in range(self.config.retries):
-            response = None
-            try:
-                response = requests.post(
-                    str(self.config.endpoint),
-                    headers=headers,
-                    json=payload,
-                    timeout=self.config.timeout
-                )
-                
-                response.raise_for_status()
-                
-                data = response.json()
-                content = data['choices'][0]['message']['content']
-                
-                return content, APIErrorType.SUCCESS
+            if self.cancel_event.is_set() or (call is not None and call.cancelled.is_set()):
+                break
+            backend = self.backends.choose(avoid=call.avoid if call is not None else None)
+            if call is not None:
+                call.backend = backend
+            limiter = backend.limiter
+            payload = self._body_for(backend, body)
             
-            except requests.exceptions.Timeout as e:
-                last_error_type = APIErrorType.TIMEOUT
-                if attempt < self.config.retries - 1:
-                    time.sleep(2 ** attempt)
-                    continue
+            with tracer.span("rate limit wait", "vlm"):
+                yield Sleep(limiter.reserve(estimated_tokens))
+            started = time.monotonic()
+            if call is not None:
+                call.sent = started
+            try:
+                with tracer.span(
+                    "vlm request", "request", 
+                    attempt=attempt + 1, images=images, backend=backend.name
+                ) as span:
+                    reply = yield Send(backend, payload)
+                    if span is not None and reply.status is not None:
+                        span["status"] = reply.status
+            except GeneratorExit:
+                # 对冲请求中落后的一方被取消
+                self.logger.log_request("vlm", time.monotonic() - started, "cancelled", len(payload))
+                raise
+            elapsed = time.monotonic() - started
+            if call is not None:
+                call.sent = None
             
-            except requests.exceptions.HTTPError as e:
-                last_error_type = self._classify_error(e, response)
-                if last_error_type == APIErrorType.AUTH_ERROR:
-                    return None, last_error_type
-                if last_error_type == APIErrorType.RATE_LIMIT:
-                    if attempt < self.config.retries - 1:
-                        time.sleep(5 * (attempt + 1))
-                        continue
-                if attempt < self.config.retries - 1:
-                    time.sleep(2 ** attempt)
-                    continue
+            retry_after = None
+            if reply.headers is not None:
+                retry_after = limiter.update_from_headers(reply.headers)
+            error_type = reply.error_type
+            if error_type is None:
+                try:
+                    content = reply.data['choices'][0]['message']['content']
+                    self._record_usage(reply.data, estimated_tokens, limiter)
+                except Exception as e:
+                    error_type = self._classify_message(e)
             
-            except requests.exceptions.RequestException as e:
-                last_error_type = self._classify_error(e, response)
-                if attempt < self.config.retries - 1:
-                    time.sleep(2 ** attempt)
-                    continue
+            result = error_type or APIErrorType.SUCCESS
+            self.logger.log_request("vlm", elapsed, result.value, len(payload))
+            self._record_backend(backend, elapsed, result, images)
+            if error_type is None:
+                return content, APIErrorType.SUCCESS
             
-            except Exception as e:
-                last_error_type = self._classify_error(e, response)
-                if attempt < self.config.retries - 1:
-                    time.sleep(2 ** attempt)
-                    continue
+            last_error_type = error_type
+            if attempt == self.config.retries - 1:
+                break
+            if self._fails_over(backend, error_type):
+                self.logger.log_retry(error_type.value, 0)
+                continue
+            if error_type == APIErrorType.AUTH_ERROR:
+                break
+            if error_type == APIErrorType.RATE_LIMIT:
+                # 没有 Retry-After 时退避同样作用于该后端的所有请求
+                if retry_after is None:
+                    retry_after = 5 * (attempt + 1)
+                    limiter.block_for(retry_after)
+                self.logger.log_retry(error_type.value, retry_after)
+                tracer.instant("rate limited", "retry", retry_after=retry_after)
+                continue
+            yield from self._backoff(error_type, 2 ** attempt)
         
         return None, last_error_type
     
-    def _parse_response(self, response_text: str) -> Optional[str]:
-        pattern = r'```figure\n([\s\S]*?)\n```'
-        match = re.search(pattern, response_text)
+    def _call_steps(self, body: bytearray, images: int = 1) -> Steps:
+        """
+        调用API；开启对冲时超过近期延迟分位数仍未返回的请求再发一份副本
+        （有其他后端时发往其他后端），取先成功的结果并取消另一个
+        
+        线程引擎中的HTTP请求无法中途打断，落后的请求只是不再重试，结果被丢弃；
+        异步引擎会真正取消它。
+        """
+        delay = self.hedge.delay(images)
+        if delay is None:
+            return (yield from self._request_steps(body, images))
+        
+        primary = CallState()
+        called = time.monotonic()
+        calls = {(yield Spawn(self._request_steps(body, images, primary))): primary}
+        while True:
+            hedge_in = self._hedge_in(primary, delay, called)
+            timeout = HEDGE_POLL_SECONDS if hedge_in is None else max(hedge_in, 0.0)
+            finished = yield WaitFirst(calls, timeout)
+            if finished or self.cancel_event.is_set():
+                break
+            hedge_in = self._hedge_in(primary, delay, called)
+            if hedge_in is None or hedge_in > 0:
+                continue
+            if self.hedge.try_hedge():
+                self.logger.tracer.instant("hedge", "retry", images=images, after=round(delay, 3))
+                duplicate = CallState(avoid=primary.backend)
+                calls[(yield Spawn(self._request_steps(body, images, duplicate)))] = duplicate
+            break
+        
+        result: Outcome = (None, APIErrorType.UNKNOWN)
+        pending = set(calls)
+        while pending:
+            finished = yield WaitFirst(pending)
+            for handle, result in finished.items():
+                pending.discard(handle)
+                if result[1] != APIErrorType.SUCCESS:
+                    continue
+                for state in calls.values():
+                    state.cancelled.set()
+                if len(calls) > 1:
+                    self.logger.log_hedge("lost" if calls[handle] is primary else "won")
+                return result
+        
+        if len(calls) > 1:
+            self.logger.log_hedge("failed")
+        return result
+    
+    def _hedge_in(self, call: CallState, delay: float, called: float) -> Optional[float]:
+        """
+        距离对冲还有多少秒（<= 0 表示现在），None 表示暂不计时
         
-        if match:
-            return match.group(1).strip()
+        对冲延迟按纯HTTP耗时统计，所以计时从请求真正发出开始，不含限速等待
+        和重试退避。有其他后端时，等待中的请求从调用开始计时，副本可以改走
+        其他后端；只有一个后端时不计时，副本只会排在同一个限速器后面。
+        """
+        now = time.monotonic()
+        if call.sent is not None:
+            return call.sent + delay - now
+        if len(self.backends) > 1:
+            return called + delay - now
+        return None
+    
+    def _call_api(
+        self, 
+        image_path: str, 
+        body: bytearray, 
+        images: int = 1
+    ) -> Tuple[Optional[str], APIErrorType]:
+        """调用API（按需对冲），返回结果和错误类型"""
+        return self._run(self._call_steps(body, images))
+    
+    def _send(self, backend: Backend, payload: bytearray) -> Reply:
+        """线程引擎的传输：同步发送请求并读取JSON响应"""
+        response = None
+        try:
+            response = self.session.post(
+                str(backend.endpoint),
+                headers=backend.headers,
+                data=BodyReader(payload),
+                timeout=self.config.timeout
+            )
+            response.raise_for_status()
+            return Reply(response.status_code, response.headers, response.json())
+        except Exception as e:
+            if response is None:
+                return Reply(error_type=self._classify_error(e))
+            return Reply(
+                response.status_code, 
+                response.headers, 
+                error_type=self._classify_error(e, response)
+            )
+    
+    def _hedge_executor(self) -> DaemonThreadPool:
+        if self._hedge_pool is None:
+            # 每个工作线程最多同时等待原请求和副本
+            self._hedge_pool = DaemonThreadPool(
+                max_workers=2 * max(1, int(self.config.max_concurrency)),
+                thread_name_prefix="hedge"
+            )
+        return self._hedge_pool
+    
+    def _perform(self, step):
+        """在当前线程中执行一个步骤"""
+        if isinstance(step, Blocking):
+            return step.fn(*step.args)
+        if isinstance(step, Sleep):
+            if step.seconds > 0:
+                time.sleep(step.seconds)
+            return None
+        if isinstance(step, Send):
+            return self._send(step.backend, step.payload)
+        if isinstance(step, Call):
+            return self._call_api(step.image_path, step.body, step.images)
+        if isinstance(step, Join):
+            return step.future.result()
+        if isinstance(step, Spawn):
+            return self._hedge_executor().submit(self._run, step.steps)
+        if isinstance(step, WaitFirst):
+            done, _ = wait(step.handles, timeout=step.timeout, return_when=FIRST_COMPLETED)
+            return {future: future.result() for future in done}
+        raise TypeError(f"unknown step: {step!r}")
+    
+    def _run(self, steps: Steps):
+        """在线程中驱动一个请求流程直到结束，返回其结果"""
+        value = error = None
+        try:
+            while True:
+                try:
+                    step = steps.throw(error) if error is not None else steps.send(value)
+                except StopIteration as stop:
+                    return stop.value
+                value = error = None
+                try:
+                    value = self._perform(step)
+                except Exception as e:
+                    error = e
+        finally:
+            steps.close()
+    
+    def _parse_response(self, response_text: str, count: Optional[int] = None):
+        """
+        解析模型输出
         
-        return response_text.strip() if response_text else None
+        count 为 None 时返回单张图片的描述；否则按编号拆分 count 个
+        ```figure N``` 块，返回长度为 count 的列表，缺失、为空、编号越界
+        或重复的块对应 None。
+        """
+        if count is None:
+            match = _FIGURE_BLOCK.search(response_text)
+            
+            if match:
+                return match.group(1).strip()
+            
+            return response_text.strip() if response_text else None
+        
+        blocks: List[Optional[str]] = [None] * count
+        if not response_text:
+            return blocks
+        
+        duplicated = set()
+        for match in _NUMBERED_FIGURE_BLOCK.finditer(response_text):
+            index = int(match.group(1)) - 1
+            description = match.group(2).strip()
+            if not 0 <= index < count or not description or '```' in description:
+                continue
+            if blocks[index] is not None:
+                duplicated.add(index)
+            blocks[index] = description
+        
+        for index in duplicated:
+            blocks[index] = None
+        return blocks
+    
+    def _content_hash(self, image_path: str) -> str:
+        """图片内容哈希（按路径记忆，去重和缓存共用）"""
+        digest = self._hashes.get(image_path)
+        if digest is None:
+            digest = hash_file(image_path)
+            self._hashes[image_path] = digest
+        return digest
+    
+    def _cache_key(self, image_path: str, packed: bool = False) -> Optional[str]:
+        """
+        计算缓存键（图片内容哈希 + 模型 + 提示词 + 端点）
+        
+        packed 为 True 时使用打包提示词，打包请求得到的描述与单图请求的分开缓存
+        """
+        try:
+            image_hash = self._content_hash(image_path)
+        except OSError:
+            return None
+        
+        models, endpoints = self.backends.signature()
+        return DescriptionCache.make_key(
+            image_hash,
+            models,
+            PACKED_PROMPT_TEMPLATE if packed else PROMPT_TEMPLATE,
+            endpoints,
+            self.preprocessor.options.signature() if self.preprocessor else ""
+        )
     
     def describe_image(self, image_path: str) -> Tuple[Optional[str], APIErrorType]:
-        """描述单张图片，返回描述和错误类型"""
-        base64_image = self._encode_image(image_path)
+        """描述单张图片，返回描述和错误类型；相同内容的并发请求只发送一次"""
+        return self._run(self._describe_image_steps(image_path))
+    
+    def _describe_image_steps(self, image_path: str) -> Steps:
+        request_key = yield Blocking(self._cache_key, image_path)
+        if request_key is None:
+            return (yield from self._lookup_steps(image_path, None))
+        
+        future, is_leader = self.inflight.join(request_key)
+        if not is_leader:
+            self.logger.log_dedup(1)
+            return (yield Join(future))
         
-        if not base64_image:
+        result: Outcome = (None, APIErrorType.UNKNOWN)
+        try:
+            result = yield from self._lookup_steps(image_path, request_key)
+        finally:
+            self.inflight.resolve(request_key, result)
+        return result
+    
+    def _lookup_steps(self, image_path: str, cache_key: Optional[str]) -> Steps:
+        if self.cache is not None and cache_key:
+            cached = yield Blocking(self.cache.get, cache_key)
+            self.logger.log_cache(image_path, cached is not None)
+            if cached is not None:
+                return cached, APIErrorType.SUCCESS
+        
+        return (yield from self._request_image_steps(image_path, cache_key))
+    
+    def _request_image_steps(self, image_path: str, cache_key: Optional[str]) -> Steps:
+        """为单张图片发送一次请求（不查缓存），成功后写入缓存"""
+        image = yield Blocking(self._load_image, image_path)
+        
+        if image is None:
             return None, APIErrorType.UNKNOWN
         
         try:
-            response, error_type = self._call_api(image_path, base64_image)
+            body = yield Blocking(self._build_body, [image])
+            del image
+            response, error_type = yield Call(image_path, body)
             
             if response:
-                return self._parse_response(response), APIErrorType.SUCCESS
+                description = self._parse_response(response)
+                if description and self.cache is not None and cache_key:
+                    yield Blocking(self.cache.put, cache_key, description)
+                return description, APIErrorType.SUCCESS
             
             return None, error_type
         
@@ -197,81 +537,174 @@ class VLMClient:
             self.logger.log_error(image_path, str(e))
             return None, self._classify_error(e)
     
-    def _process_batch_concurrent(
-        self, 
-        batch_items: List[Tuple[str, str]],
-        concurrency: int
-    ) -> Tuple[Dict[str, str], List[Tuple[str, str, APIErrorType]]]:
-        """并发处理一批图片"""
-        results = {}
-        failures = []
-        
-        with ThreadPoolExecutor(max_workers=concurrency) as executor:
-            futures = {
-                executor.submit(self.describe_image, full_path): (rel_path, full_path)
-                for rel_path, full_path in batch_items
-            }
-            
-            for future in as_completed(futures):
-                rel_path, full_path = futures[future]
-                
-                try:
-                    description, error_type = future.result()
-                    
-                    if description:
-                        results[rel_path] = description
-                    else:
-                        failures.append((rel_path, full_path, error_type))
-                
-                except Exception as e:
-                    error_type = self._classify_error(e)
-                    failures.append((rel_path, full_path, error_type))
+    def describe_images(self, image_paths: List[str]) -> List[Outcome]:
+        """
+        在一个请求中描述多张图片，返回与 image_paths 一一对应的 (描述, 错误类型)
         
-        return results, failures
+        命中缓存的图片和其他线程正在请求的相同图片不放进请求；响应中缺失或
+        格式不对的块改用单图请求补齐。
+        """
+        return self._run(self._describe_images_steps(image_paths))
     
-    def _process_sequential(
-        self, 
-        items: List[Tuple[str, str]],
-        progress_offset: int = 0,
-        total: int = 0
-    ) -> Tuple[Dict[str, str], List[Tuple[str, str, APIErrorType]]]:
-        """顺序处理图片（降级模式）"""
-        results = {}
-        failures = []
-        
-        for i, (rel_path, full_path) in enumerate(items):
-            current = progress_offset + i + 1
+    def _describe_images_steps(self, image_paths: List[str]) -> Steps:
+        outcomes: List[Optional[Outcome]] = [None] * len(image_paths)
+        keys = []
+        for path in image_paths:
+            keys.append((yield Blocking(self._cache_key, path)))
+        todo: List[int] = []
+        leaders: List[int] = []
+        followers = []
+        
+        for index, (path, key) in enumerate(zip(image_paths, keys)):
+            if key is None:
+                todo.append(index)
+                continue
             
-            description, error_type = self.describe_image(full_path)
+            if self.cache is not None:
+                # 单图请求的描述也可用于打包模式
+                cached = yield Blocking(self.cache.get, key)
+                if cached is None:
+                    packed_key = yield Blocking(self._cache_key, path, True)
+                    cached = yield Blocking(self.cache.get, packed_key)
+                self.logger.log_cache(path, cached is not None)
+                if cached is not None:
+                    outcomes[index] = (cached, APIErrorType.SUCCESS)
+                    continue
             
-            if description:
-                results[rel_path] = description
-                self.logger.log_progress(current, total or len(items), rel_path, True)
-            else:
-                failures.append((rel_path, full_path, error_type))
-                self.logger.log_progress(current, total or len(items), rel_path, False)
-                
-                # 检查是否是认证错误
-                if error_type == APIErrorType.AUTH_ERROR:
-                    print("\n❌ API认证失败，请检查API密钥配置")
-                    return results, failures
+            future, is_leader = self.inflight.join(key)
+            if not is_leader:
+                self.logger.log_dedup(1)
+                followers.append((index, future))
+                continue
+            leaders.append(index)
+            todo.append(index)
         
-        return results, failures
+        try:
+            requested = yield from self._request_pack_steps(
+                [image_paths[index] for index in todo], 
+                [keys[index] for index in todo]
+            )
+            for index, outcome in zip(todo, requested):
+                outcomes[index] = outcome
+        finally:
+            for index in leaders:
+                self.inflight.resolve(keys[index], outcomes[index] or (None, APIErrorType.UNKNOWN))
+        
+        for index, future in followers:
+            outcomes[index] = yield Join(future)
+        return outcomes
     
-    def _should_fallback_to_sequential(self, failures: List[Tuple[str, str, APIErrorType]]) -> bool:
-        """判断是否应该降级到顺序处理"""
-        if not failures:
+    def _request_pack_steps(self, image_paths: List[str], cache_keys: List[Optional[str]]) -> Steps:
+        """发送打包请求并拆分结果，缺失的块退回单图请求"""
+        outcomes: List[Outcome] = [(None, APIErrorType.UNKNOWN)] * len(image_paths)
+        images = []
+        loaded = []
+        for index, path in enumerate(image_paths):
+            image = yield Blocking(self._load_image, path)
+            if image is not None:
+                images.append(image)
+                loaded.append(index)
+        
+        if len(loaded) < 2:
+            for index in loaded:
+                outcomes[index] = yield from self._request_image_steps(image_paths[index], cache_keys[index])
+            return outcomes
+        
+        response = None
+        try:
+            body = yield Blocking(self._build_body, images)
+            del images
+            response, error_type = yield Call(image_paths[loaded[0]], body, len(loaded))
+        except Exception as e:
+            self.logger.log_error(image_paths[loaded[0]], str(e))
+            error_type = self._classify_error(e)
+        
+        if not response:
+            for index in loaded:
+                outcomes[index] = (None, error_type)
+            return outcomes
+        
+        descriptions = self._parse_response(response, len(loaded))
+        missing = []
+        for index, description in zip(loaded, descriptions):
+            if not description:
+                missing.append(index)
+                continue
+            outcomes[index] = (description, APIErrorType.SUCCESS)
+            if self.cache is not None and cache_keys[index]:
+                packed_key = yield Blocking(self._cache_key, image_paths[index], True)
+                if packed_key:
+                    yield Blocking(self.cache.put, packed_key, description)
+        
+        self.logger.log_pack(len(loaded), len(missing))
+        for index in missing:
+            outcomes[index] = yield from self._request_image_steps(image_paths[index], cache_keys[index])
+        return outcomes
+    
+    def _pack_fits(self, items: List[WorkItem], candidate: WorkItem) -> bool:
+        """打包时图片原始字节数之和不超过 packMaxSizeMB"""
+        try:
+            size = sum(os.path.getsize(item.full_path) for item in items + [candidate])
+        except OSError:
             return False
+        return size <= self.pack_max_bytes
+    
+    def _describe_items(self, items: List[WorkItem]) -> List[Outcome]:
+        if len(items) == 1:
+            return [self.describe_image(items[0].full_path)]
+        return self.describe_images([item.full_path for item in items])
+    
+    def _dedupe(self, image_paths: Dict[str, str]) -> Tuple[Dict[str, str], Dict[str, List[str]]]:
+        """合并重复图片，返回 (需要请求的图片, {代表图片: 组内全部图片})"""
+        if not self.config.dedup:
+            return image_paths, {rel_path: [rel_path] for rel_path in image_paths}
+        
+        groups = group_duplicates(
+            image_paths, 
+            self.config.dedup_distance, 
+            self._content_hash
+        )
+        saved = len(image_paths) - len(groups)
+        if saved:
+            print(f"\n🔁 去重: {len(image_paths)} 张图片合并为 {len(groups)} 个请求")
+            self.logger.log_dedup(saved)
+        
+        return {rel_path: image_paths[rel_path] for rel_path in groups}, groups
+    
+    @staticmethod
+    def _fan_out(batch_result: BatchResult, groups: Dict[str, List[str]]) -> BatchResult:
+        """把代表图片的描述（或失败）分发给组内每一张图片"""
+        failed = set(batch_result.failed_paths)
+        failed_paths = []
+        
+        for representative, members in groups.items():
+            for rel_path in members:
+                if representative in batch_result.results:
+                    batch_result.results[rel_path] = batch_result.results[representative]
+                elif representative in failed:
+                    failed_paths.append(rel_path)
+        
+        batch_result.failed_paths = failed_paths
+        return batch_result
+    
+    @staticmethod
+    def _fan_out_callback(
+        callback: Optional[Callable],
+        groups: Dict[str, List[str]]
+    ) -> Optional[Callable]:
+        """把代表图片的完成（或失败）回调转发给组内每一张图片"""
+        if callback is None:
+            return None
         
-        error_types = [f[2] for f in failures]
-        
-        # 如果大部分是速率限制或并发错误，则降级
-        concurrency_errors = sum(1 for e in error_types if e in (
-            APIErrorType.RATE_LIMIT, 
-            APIErrorType.CONCURRENCY_ERROR
-        ))
+        def notify(representative: str, *args):
+            for rel_path in groups.get(representative, [representative]):
+                callback(rel_path, *args)
         
-        return concurrency_errors >= len(failures) * 0.5
+        return notify
+    
+    def cancel(self):
+        """用户中断：停止提交和重试请求，正在进行的批次尽快返回"""
+        self.cancel_event.set()
     
     def _is_api_completely_failed(self, failures: List[Tuple[str, str, APIErrorType]]) -> bool:
         """判断API是否完全无法使用"""
@@ -284,162 +717,141 @@ class VLMClient:
         auth_errors = sum(1 for e in error_types if e == APIErrorType.AUTH_ERROR)
         return auth_errors == len(failures)
     
+    def _lookahead(self, scheduler: SlidingWindowScheduler) -> List[str]:
+        """
+        调度器前方约 PREFETCH_WINDOWS 个窗口内尚未预处理的图片
+        
+        只预处理即将发出的图片，而不是整篇文档，使驻留内存的预处理结果
+        与在途请求数同量级。
+        """
+        if self.preprocessor is None:
+            return []
+        count = PREFETCH_WINDOWS * scheduler.controller.limit * self.images_per_request
+        paths = []
+        for item in scheduler.upcoming(count):
+            if item.full_path not in self._prefetched:
+                self._prefetched.add(item.full_path)
+                paths.append(item.full_path)
+        return paths
+    
+    def _prefetch(self, image_paths: Iterable[str]):
+        """提前预处理图片；已有缓存描述的图片不会被读取，跳过"""
+        if self.preprocessor is None or not image_paths:
+            return
+        misses = []
+        for path in image_paths:
+            keys = [self._cache_key(path)]
+            if self.images_per_request > 1:
+                keys.append(self._cache_key(path, True))
+            if self.cache is None or not any(key is not None and key in self.cache for key in keys):
+                misses.append(path)
+        self.preprocessor.prefetch(misses)
+    
+    def connection_limit(self, maximum: int) -> int:
+        """连接数上限：开启对冲时每个在途请求可能同时有一份副本"""
+        return maximum * 2 if self.hedge.enabled else maximum
+    
+    def create_controller(self, batch_size: BatchSizeType, total: int) -> AIMDController:
+        """根据批次大小和 maxConcurrency 创建并发控制器"""
+        maximum = max(1, min(int(self.config.max_concurrency), total))
+        initial = maximum if batch_size == "full" else int(batch_size)
+        return AIMDController(initial, maximum, self.logger)
+    
     def describe_images_batch(
         self, 
         image_paths: Dict[str, str],
-        batch_size: BatchSizeType = DEFAULT_BATCH_SIZE
+        batch_size: BatchSizeType = DEFAULT_BATCH_SIZE,
+        on_complete: Optional[Callable[[str, str], None]] = None,
+        on_failed: Optional[Callable[[str], None]] = None
     ) -> BatchResult:
         """
         批量处理图片
         
         Args:
             image_paths: {相对路径: 绝对路径} 的字典
-            batch_size: 每批处理数量，int 或 "full" 表示一次发送全部
+            batch_size: 初始在途请求数（滑动窗口大小），int 或 "full" 表示一次发送全部；
+                之后由 AIMD 控制器在 [1, maxConcurrency] 内动态调整
+            on_complete: 每张图片描述成功后立即调用 on_complete(相对路径, 描述)
+            on_failed: 图片最终失败（不再重试）时调用 on_failed(相对路径)
         
         返回BatchResult包含:
         - results: 成功处理的描述
         - failed_paths: 处理失败的路径
-        - should_fallback_sequential: 是否应降级为顺序处理
+        - should_fallback_sequential: 是否曾因限流降到顺序处理
         - api_completely_failed: API是否完全失败
+        - cancelled: 是否被用户中断（不等待在途请求）
         """
-        batch_result = BatchResult()
-        total = len(image_paths)
+        if not image_paths:
+            return BatchResult()
         
-        if total == 0:
-            return batch_result
-        
-        items = list(image_paths.items())
-        
-        effective_batch_size = total if batch_size == "full" else int(batch_size)
-        concurrency = effective_batch_size
-        
-        processed = 0
-        
-        first_batch = items[:min(effective_batch_size, len(items))]
-        print(f"\n🚀 尝试并发处理 (批次大小: {len(first_batch)}, 并发数: {concurrency})")
-        
-        results, failures = self._process_batch_concurrent(first_batch, concurrency)
-        batch_result.results.update(results)
-        processed += len(first_batch)
-        
-        # 更新进度
-        for rel_path in results:
-            self.logger.log_progress(
-                len(batch_result.results), 
-                total, 
-                rel_path, 
-                True
-            )
-        
-        # 分析第一批结果
-        if self._is_api_completely_failed(failures):
-            print("\n❌ API完全无法使用，将输出原始MinerU结果")
-            batch_result.api_completely_failed = True
-            batch_result.failed_paths = [f[0] for f in failures]
-            return batch_result
+        image_paths, groups = self._dedupe(image_paths)
+        total = len(image_paths)
         
-        if self._should_fallback_to_sequential(failures):
-            print("\n⚠️ 检测到并发限制，降级为顺序处理模式")
-            batch_result.should_fallback_sequential = True
-            
-            # 重试失败的图片（顺序模式）
-            retry_items = [(f[0], f[1]) for f in failures]
-            retry_results, retry_failures = self._process_sequential(
-                retry_items, 
-                len(batch_result.results), 
-                total
-            )
-            batch_result.results.update(retry_results)
-            
-            # 处理剩余图片（顺序模式）
-            remaining_items = items[processed:]
-            if remaining_items:
-                print(f"\n📝 顺序处理剩余 {len(remaining_items)} 张图片")
-                remaining_results, remaining_failures = self._process_sequential(
-                    remaining_items,
-                    len(batch_result.results),
-                    total
-                )
-                batch_result.results.update(remaining_results)
-                batch_result.failed_paths.extend([f[0] for f in remaining_failures])
-            
-            batch_result.failed_paths.extend([f[0] for f in retry_failures])
-            return batch_result
-        
-        # 处理第一批的失败项
-        if failures:
-            # 重试失败的项
-            retry_items = [(f[0], f[1]) for f in failures]
-            retry_results, retry_failures = self._process_sequential(
-                retry_items,
-                len(batch_result.results),
-                total
-            )
-            batch_result.results.update(retry_results)
-            batch_result.failed_paths.extend([f[0] for f in retry_failures])
-        
-        # 继续并发处理剩余批次
-        while processed < len(items):
-            batch_start = processed
-            batch_end = min(processed + effective_batch_size, len(items))
-            batch_items = items[batch_start:batch_end]
-            
-            print(f"\n🚀 处理批次 {batch_start // effective_batch_size + 2} ({len(batch_items)} 张)")
-            
-            results, failures = self._process_batch_concurrent(batch_items, concurrency)
-            batch_result.results.update(results)
-            processed = batch_end
-            
-            # 更新进度
-            for rel_path in results:
-                self.logger.log_progress(
-                    len(batch_result.results), 
-                    total, 
-                    rel_path, 
-                    True
-                )
-            
-            # 检查是否需要降级
-            if self._should_fallback_to_sequential(failures):
-                print("\n⚠️ 检测到并发限制，降级为顺序处理模式")
-                batch_result.should_fallback_sequential = True
+        controller = self.create_controller(batch_size, total)
+        self.session.resize(self.connection_limit(controller.maximum))
+        
+        self._prefetched.clear()
+        
+        scheduler = SlidingWindowScheduler(
+            list(image_paths.items()), 
+            controller, 
+            self, 
+            self.logger,
+            on_complete=self._fan_out_callback(on_complete, groups),
+            on_failed=self._fan_out_callback(on_failed, groups)
+        )
+        print(
+            f"\n🚀 并发处理 {total} 张图片 "
+            f"(并发数: {controller.limit}, 上限: {controller.maximum}"
+            + (f", 每个请求最多 {self.images_per_request} 张)" if self.images_per_request > 1 else ")")
+        )
+        
+        # 守护线程：中断后阻塞在 session.post() 的请求不会拖住进程退出
+        executor = DaemonThreadPool(max_workers=controller.maximum, thread_name_prefix="request")
+        futures = {}
+        try:
+            while not scheduler.done():
+                self._prefetch(self._lookahead(scheduler))
+                while scheduler.has_capacity():
+                    items = scheduler.next_items(self.images_per_request, self._pack_fits)
+                    futures[executor.submit(self._describe_items, items)] = items
                 
-                # 重试失败的
-                retry_items = [(f[0], f[1]) for f in failures]
-                retry_results, retry_failures = self._process_sequential(
-                    retry_items,
-                    len(batch_result.results),
-                    total
+                done, _ = wait(
+                    futures, 
+                    timeout=CANCEL_CHECK_INTERVAL, 
+                    return_when=FIRST_COMPLETED
                 )
-                batch_result.results.update(retry_results)
                 
-                # 顺序处理剩余
-                remaining_items = items[processed:]
-                if remaining_items:
-                    print(f"\n📝 顺序处理剩余 {len(remaining_items)} 张图片")
-                    remaining_results, remaining_failures = self._process_sequential(
-                        remaining_items,
-                        len(batch_result.results),
-                        total
-                    )
-                    batch_result.results.update(remaining_results)
-                    batch_result.failed_paths.extend([f[0] for f in remaining_failures])
+                for future in done:
+                    items = futures.pop(future)
+                    
+                    try:
+                        outcomes = future.result()
+                    except Exception as e:
+                        outcomes = [(None, self._classify_error(e))] * len(items)
+                    
+                    scheduler.complete_items(items, outcomes)
                 
-                batch_result.failed_paths.extend([f[0] for f in retry_failures])
-                break
-            
-            # 重试失败的项
-            if failures:
-                retry_items = [(f[0], f[1]) for f in failures]
-                retry_results, retry_failures = self._process_sequential(
-                    retry_items,
-                    len(batch_result.results),
-                    total
-                )
-                batch_result.results.update(retry_results)
-                batch_result.failed_paths.extend([f[0] for f in retry_failures])
-        
-        return batch_result
+                if self.cancel_event.is_set():
+                    scheduler.cancel()
+        except BaseException:
+            self.cancel()
+            raise
+        finally:
+            # 中断时不等待在途请求，未开始的任务直接取消
+            executor.shutdown(wait=not self.cancel_event.is_set(), cancel_futures=True)
+            if self.preprocessor is not None:
+                self.preprocessor.discard()
+        
+        return self._fan_out(scheduler.finish(), groups)
+    
+    def close(self):
+        """释放连接池和预处理进程池"""
+        if self.preprocessor is not None:
+            self.preprocessor.shutdown()
+        if self._hedge_pool is not None:
+            self._hedge_pool.shutdown(wait=False, cancel_futures=True)
+        self.session.close()
     
     # 保持向后兼容的简单接口
     def describe_images_batch_simple(
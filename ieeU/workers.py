@@ -0,0 +1,84 @@
+"""Worker threads for in-flight HTTP requests that must not delay exit."""
+
+import queue
+import threading
+from concurrent.futures import Future
+from typing import List
+
+
+class DaemonThreadPool:
+    """
+    A minimal ThreadPoolExecutor whose workers are daemon threads.
+
+    concurrent.futures joins its (non-daemon) workers at interpreter exit,
+    so after Ctrl-C a worker blocked in session.post() keeps the process
+    alive until the request times out. Requests abandoned by a cancelled
+    batch are worthless, so these workers are simply dropped at exit.
+
+    Supports submit() and shutdown(wait, cancel_futures) like the stdlib
+    executor; threads are started on demand up to max_workers.
+    """
+
+    def __init__(self, max_workers: int, thread_name_prefix: str = "worker"):
+        if max_workers <= 0:
+            raise ValueError("max_workers must be greater than 0")
+        self.max_workers = max_workers
+        self.thread_name_prefix = thread_name_prefix
+        self._queue: 'queue.SimpleQueue' = queue.SimpleQueue()
+        self._idle = threading.Semaphore(0)
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+        self._shutdown = False
+
+    def submit(self, fn, *args, **kwargs) -> Future:
+        with self._lock:
+            if self._shutdown:
+                raise RuntimeError("cannot schedule new futures after shutdown")
+            future: Future = Future()
+            self._queue.put((future, fn, args, kwargs))
+            if not self._idle.acquire(blocking=False) and len(self._threads) < self.max_workers:
+                thread = threading.Thread(
+                    target=self._work,
+                    name=f"{self.thread_name_prefix}_{len(self._threads)}",
+                    daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+            return future
+
+    def _work(self):
+        while True:
+            task = self._queue.get()
+            if task is None:
+                return
+            future, fn, args, kwargs = task
+            if future.set_running_or_notify_cancel():
+                try:
+                    future.set_result(fn(*args, **kwargs))
+                except BaseException as e:
+                    future.set_exception(e)
+            del task, future
+            self._idle.release()
+
+    def shutdown(self, wait: bool = True, cancel_futures: bool = False):
+        with self._lock:
+            self._shutdown = True
+            if cancel_futures:
+                while True:
+                    try:
+                        task = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if task is not None:
+                        task[0].cancel()
+            for _ in self._threads:
+                self._queue.put(None)
+        if wait:
+            for thread in self._threads:
+                thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
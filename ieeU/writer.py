@@ -0,0 +1,134 @@
+"""Incremental, order-preserving output of rewritten markdown."""
+
+import os
+import threading
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from .extractor import ImageExtractor, ImageReference
+
+# render(ref, description) 返回替换文本；description 为 None 表示没有描述，
+# 返回 None 则保留原始引用
+Renderer = Callable[[ImageReference, Optional[str]], Optional[str]]
+
+
+class OrderedMarkdownWriter:
+    """
+    按文档顺序增量写出改写后的 Markdown
+
+    源文件逐行读取，一行中的图片全部有了描述或已最终失败后立即写出并
+    flush，乱序到达的描述先缓存，等前面的图片完成后再一起写出，因此
+    tail 输出文件的下游程序可以尽早开始处理。只有 expect() 登记过的图片
+    需要等待，其余引用直接交给 render（描述为 None）。
+
+    输出文件在第一张图片描述成功（或 finish()）时才创建，API 完全不可用时
+    不会留下只有开头的输出文件。resolve() / fail() 是线程安全的，可以直接
+    作为 on_complete / on_failed 回调。
+    """
+
+    def __init__(self, src_path: str, dst_path: str, render: Renderer):
+        self.src_path = src_path
+        self.dst_path = dst_path
+        self.render = render
+        self.pending: Set[str] = set()
+        self.descriptions: Dict[str, str] = {}
+        self.replaced = 0
+        self.lines_written = 0
+
+        self._lock = threading.Lock()
+        self._src = None
+        self._dst = None
+        self._lines: Optional[Iterator[Tuple[str, List[ImageReference]]]] = None
+        self._held: Optional[Tuple[str, List[ImageReference]]] = None
+        self._closed = False
+
+    @property
+    def started(self) -> bool:
+        return self._dst is not None
+
+    def expect(self, rel_paths: Iterable[str]):
+        """登记将会收到描述或失败通知的图片"""
+        with self._lock:
+            self.pending.update(
+                rel_path for rel_path in rel_paths
+                if rel_path not in self.descriptions
+            )
+
+    def resolve(self, rel_path: str, description: str):
+        with self._lock:
+            self.descriptions[rel_path] = description
+            self.pending.discard(rel_path)
+            if self._closed:
+                return
+            if self._dst is None:
+                self._open()
+            self._advance()
+
+    def fail(self, rel_path: str):
+        with self._lock:
+            self.pending.discard(rel_path)
+            if self._dst is not None and not self._closed:
+                self._advance()
+
+    def finish(self, descriptions: Optional[Dict[str, str]] = None) -> int:
+        """
+        写出剩余内容并关闭，返回替换数量
+
+        descriptions 为批次的最终结果，补上没有经过 resolve() 的描述；
+        仍没有描述的图片保留原样。
+        """
+        with self._lock:
+            if descriptions:
+                self.descriptions.update(descriptions)
+            self.pending.clear()
+            if not self._closed:
+                if self._dst is None:
+                    self._open()
+                self._advance()
+                self._close()
+        return self.replaced
+
+    def close(self):
+        """停止写出，已写出的部分保留"""
+        with self._lock:
+            self._close()
+
+    def discard(self):
+        """停止写出并删除已创建的输出文件"""
+        with self._lock:
+            created = self._dst is not None
+            self._close()
+            if created and os.path.exists(self.dst_path):
+                os.remove(self.dst_path)
+
+    def _open(self):
+        self._src = open(self.src_path, 'r', encoding='utf-8')
+        self._lines = ImageExtractor._scan_lines(self._src)
+        self._dst = open(self.dst_path, 'w', encoding='utf-8')
+
+    def _render(self, ref: ImageReference) -> Optional[str]:
+        return self.render(ref, self.descriptions.get(ref.path))
+
+    def _advance(self):
+        while True:
+            if self._held is None:
+                self._held = next(self._lines, None)
+                if self._held is None:
+                    break
+
+            line, references = self._held
+            if any(ref.path in self.pending for ref in references):
+                break
+
+            text, replaced = ImageExtractor.rewrite_line(line, references, self._render)
+            self._dst.write(text)
+            self.replaced += replaced
+            self.lines_written += 1
+            self._held = None
+
+        self._dst.flush()
+
+    def _close(self):
+        self._closed = True
+        for f in (self._src, self._dst):
+            if f is not None and not f.closed:
+                f.close()
@@ -0,0 +1,17 @@
+import pytest
+
+
+class FakeClock:
+    """Manually advanced stand-in for time.monotonic."""
+
+    def __init__(self, start: float = 0.0):
+        self.now = start
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(request):
+    """A FakeClock; parametrize indirectly to start it elsewhere than 0."""
+    return FakeClock(getattr(request, "param", 0.0))
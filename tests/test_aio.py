@@ -0,0 +1,154 @@
+import pytest
+import json
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+pytest.importorskip("aiohttp")
+
+from ieeU.aio import AsyncVLMEngine
+from ieeU.config import Config
+from ieeU.logger import Logger
+from ieeU.vlm import VLMClient, APIErrorType
+
+
+def _make_handler(status):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        
+        def do_POST(self):
+            self.rfile.read(int(self.headers["Content-Length"]))
+            body = json.dumps({
+                "choices": [{"message": {"content": "```figure\nA chart\n```"}}]
+            }).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        
+        def log_message(self, *args):
+            pass
+    
+    return Handler
+
+
+def _make_pack_handler():
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        
+        def do_POST(self):
+            request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            count = sum(
+                1 for part in request["messages"][0]["content"] 
+                if part["type"] == "image_url"
+            )
+            if count == 1:
+                content = "```figure\nA chart\n```"
+            else:
+                # The last block is always missing
+                content = "\n".join(f"```figure {i}\nChart {i}\n```" for i in range(1, count))
+            body = json.dumps({"choices": [{"message": {"content": content}}]}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        
+        def log_message(self, *args):
+            pass
+    
+    return Handler
+
+
+def _serve(status, handler=None):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler or _make_handler(status))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+@pytest.fixture
+def images(tmp_path):
+    paths = {}
+    for i in range(20):
+        path = tmp_path / f"fig{i}.png"
+        path.write_bytes(b"png" * (i + 1))
+        paths[f"images/fig{i}.png"] = str(path)
+    return paths
+
+
+def _engine(server):
+    config = Config()
+    config.endpoint = f"http://127.0.0.1:{server.server_address[1]}/v1/chat/completions"
+    config.key = "test-key"
+    config.model_name = "test-model"
+    config.retries = 1
+    return AsyncVLMEngine(VLMClient(config, Logger(verbose=False)))
+
+
+class TestAsyncVLMEngine:
+    
+    def test_batch_empty_paths(self):
+        server = _serve(200)
+        try:
+            result = _engine(server).describe_images_batch({})
+        finally:
+            server.shutdown()
+        assert result.results == {}
+        assert result.api_completely_failed is False
+    
+    def test_batch_all_success(self, images):
+        server = _serve(200)
+        try:
+            result = _engine(server).describe_images_batch(images, "full")
+        finally:
+            server.shutdown()
+        
+        assert result.results == {rel: "A chart" for rel in images}
+        assert result.failed_paths == []
+    
+    def test_batch_api_auth_failure(self, images):
+        server = _serve(401)
+        try:
+            result = _engine(server).describe_images_batch(images, 5)
+        finally:
+            server.shutdown()
+        
+        assert result.api_completely_failed is True
+        assert sorted(result.failed_paths) == sorted(images)
+    
+    def test_rate_limit_retries_sequentially(self, images, monkeypatch):
+        calls = []
+        
+        async def fake_describe(self, http, path):
+            calls.append(path)
+            if len(calls) <= len(images):
+                return None, APIErrorType.RATE_LIMIT
+            return "Description", APIErrorType.SUCCESS
+        
+        monkeypatch.setattr(AsyncVLMEngine, "describe_image", fake_describe)
+        server = _serve(200)
+        try:
+            result = _engine(server).describe_images_batch(images, 10)
+        finally:
+            server.shutdown()
+        
+        assert result.should_fallback_sequential is True
+        assert len(result.results) == len(images)
+    
+    def test_packed_requests_fall_back_for_missing_blocks(self, images):
+        server = _serve(200, _make_pack_handler())
+        try:
+            engine = _engine(server)
+            engine.client.images_per_request = 4
+            result = engine.describe_images_batch(images, 2)
+        finally:
+            server.shutdown()
+        
+        assert len(result.results) == len(images)
+        assert result.failed_paths == []
+        assert list(result.results.values()).count("A chart") == 5
+        assert engine.logger.stats['packed_requests'] == 5
@@ -0,0 +1,310 @@
+import pytest
+import json
+import os
+import random
+import sys
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ieeU.backends import (
+    AUTH_ERROR_EJECT_SECONDS,
+    SERVER_ERROR_EJECT_SECONDS,
+    Backend,
+    BackendPool,
+)
+from ieeU.bench import BenchRunner
+from ieeU.config import Config
+from ieeU.logger import Logger
+from ieeU.mockserver import MockVLMServer, synthetic_png
+from ieeU.payload import ImageData, build_chat_body, replace_model
+from ieeU.ratelimit import RateLimiter
+from ieeU.results import APIErrorType
+from ieeU.aio import AIOHTTP_AVAILABLE, AsyncVLMEngine
+from ieeU.vlm import VLMClient
+
+
+def _pool(clock, *names, **kwargs):
+    backends = [Backend(name, f"http://{name}/v1", "key", "model", **kwargs) for name in names]
+    return BackendPool(backends, rng=random.Random(0), clock=clock)
+
+
+def _share(pool, draws=2000):
+    counts = {backend.name: 0 for backend in pool.backends}
+    for _ in range(draws):
+        counts[pool.choose().name] += 1
+    return {name: count / draws for name, count in counts.items()}
+
+
+# Well past 0, so a backend's ejected_until of 0 means "never ejected"
+@pytest.mark.parametrize("clock", [100.0], indirect=True)
+class TestBackendPool:
+
+    def test_unmeasured_backends_share_evenly(self, clock):
+        share = _share(_pool(clock, "a", "b"))
+        assert share["a"] == pytest.approx(0.5, abs=0.05)
+
+    def test_faster_backend_gets_more(self, clock):
+        pool = _pool(clock, "fast", "slow")
+        fast, slow = pool.backends
+        pool.record(fast, 1.0, APIErrorType.SUCCESS)
+        pool.record(slow, 3.0, APIErrorType.SUCCESS)
+
+        share = _share(pool)
+
+        assert share["fast"] == pytest.approx(0.75, abs=0.05)
+
+    def test_latency_is_per_image(self, clock):
+        pool = _pool(clock, "a", "b")
+        backend = pool.backends[0]
+
+        pool.record(backend, 4.0, APIErrorType.SUCCESS, images=4)
+        pool.record(backend, 2.0, APIErrorType.SUCCESS)
+
+        assert backend.latency == pytest.approx(1.0 + 0.3 * (2.0 - 1.0))
+
+    def test_weight(self, clock):
+        pool = _pool(clock, "a", "b")
+        pool.backends[0].weight = 3
+
+        assert _share(pool)["a"] == pytest.approx(0.75, abs=0.05)
+
+    def test_exhausted_quota_is_avoided(self, clock):
+        pool = _pool(clock, "a", "b")
+        pool.backends[0].limiter.block_for(60)
+
+        assert _share(pool, 200)["b"] == 1.0
+
+    def test_server_error_ejects_with_growing_cooldown(self, clock):
+        pool = _pool(clock, "a", "b")
+        a = pool.backends[0]
+
+        assert pool.record(a, 0.1, APIErrorType.SERVER_ERROR) == SERVER_ERROR_EJECT_SECONDS
+        assert _share(pool, 100)["b"] == 1.0
+        assert not pool.has_alternative(pool.backends[1])
+
+        clock.now += SERVER_ERROR_EJECT_SECONDS
+        assert pool.record(a, 0.1, APIErrorType.SERVER_ERROR) == 2 * SERVER_ERROR_EJECT_SECONDS
+
+        clock.now += 2 * SERVER_ERROR_EJECT_SECONDS
+        pool.record(a, 0.1, APIErrorType.SUCCESS)
+        assert pool.record(a, 0.1, APIErrorType.SERVER_ERROR) == SERVER_ERROR_EJECT_SECONDS
+        assert a.ejections == 3
+
+    def test_auth_error_ejects(self, clock):
+        pool = _pool(clock, "a", "b")
+
+        assert pool.record(pool.backends[0], 0.1, APIErrorType.AUTH_ERROR) == AUTH_ERROR_EJECT_SECONDS
+
+    @pytest.mark.parametrize("error_type", [
+        APIErrorType.TIMEOUT, APIErrorType.RATE_LIMIT, APIErrorType.NETWORK_ERROR
+    ])
+    def test_other_errors_do_not_eject(self, clock, error_type):
+        pool = _pool(clock, "a", "b")
+
+        assert pool.record(pool.backends[0], 0.1, error_type) == 0
+
+    def test_single_backend_never_ejects(self, clock):
+        pool = _pool(clock, "only")
+
+        assert pool.record(pool.backends[0], 0.1, APIErrorType.AUTH_ERROR) == 0
+        assert pool.choose().name == "only"
+
+    def test_all_ejected_picks_first_to_return(self, clock):
+        pool = _pool(clock, "a", "b")
+        pool.record(pool.backends[0], 0.1, APIErrorType.AUTH_ERROR)
+        pool.record(pool.backends[1], 0.1, APIErrorType.SERVER_ERROR)
+
+        assert pool.choose().name == "b"
+
+    def test_report(self, clock):
+        pool = _pool(clock, "a", "b")
+        a = pool.backends[0]
+        pool.record(a, 1.0, APIErrorType.SUCCESS, images=2)
+        clock.now += 1.0
+        pool.record(a, 1.0, APIErrorType.SERVER_ERROR)
+
+        row, idle = pool.report()
+
+        assert row["requests"] == 2
+        assert row["failures"] == 1
+        assert row["images"] == 2
+        assert row["images_per_sec"] == pytest.approx(1.0)
+        assert row["latency"] == pytest.approx(1.0)
+        assert idle["requests"] == 0
+        assert idle["images_per_sec"] == 0.0
+
+
+class TestFromConfig:
+
+    def test_single_endpoint(self):
+        config = Config()
+        config.endpoint = "https://api.example.com/v1/chat/completions"
+        config.key = "k"
+        config.model_name = "m"
+        config.rpm_limit = 60
+
+        pool = BackendPool.from_config(config)
+
+        backend, = pool.backends
+        assert backend.name == "api.example.com/m"
+        assert backend.limiter.rpm == 60
+        assert pool.signature() == ("m", config.endpoint)
+
+    def test_entries_inherit_top_level(self):
+        config = Config()
+        config.key = "shared"
+        config.model_name = "m"
+        config.tpm_limit = 1000
+        config.backends = [
+            {"endpoint": "http://a/v1", "tpm_limit": 50},
+            {"endpoint": "http://a/v1", "key": "other", "model_name": "m2", "weight": 2},
+        ]
+
+        a, b = BackendPool.from_config(config).backends
+
+        assert (a.key, a.model, a.limiter.tpm) == ("shared", "m", 50)
+        assert (b.key, b.model, b.limiter.tpm, b.weight) == ("other", "m2", 1000, 2)
+        assert b.headers["Authorization"] == "Bearer other"
+
+    def test_duplicate_names_are_numbered(self):
+        config = Config()
+        config.backends = [
+            {"endpoint": "http://a/v1", "key": "1", "model_name": "m"},
+            {"endpoint": "http://a/v1", "key": "2", "model_name": "m"},
+        ]
+
+        names = [b.name for b in BackendPool.from_config(config).backends]
+
+        assert names == ["a/m", "a/m#2"]
+
+    def test_load_settings(self, tmp_path):
+        (tmp_path / "settings.json").write_text(json.dumps({
+            "key": "shared",
+            "backends": [
+                {"endpoint": "http://a/v1", "modelName": "m", "rpmLimit": 10, "name": "primary"},
+                {"endpoint": "http://b/v1", "key": "kb", "modelName": "m"},
+            ]
+        }), encoding='utf-8')
+
+        with patch('ieeU.config.DEFAULT_CONFIG_DIR', str(tmp_path)), \
+                patch.dict(os.environ, {}, clear=True):
+            config = Config.load()
+
+        assert config.validate()
+        assert config.endpoint == "http://a/v1"
+        assert config.model_name == "m"
+        assert config.backends[0] == {
+            "endpoint": "http://a/v1", "model_name": "m", "rpm_limit": 10, "name": "primary"
+        }
+
+    def test_validate_reports_incomplete_backend(self):
+        config = Config()
+        config.endpoint = "http://a/v1"
+        config.model_name = "m"
+        config.backends = [{"key": "k"}, {"endpoint": "http://b/v1"}]
+
+        with pytest.raises(ValueError, match=r"backends\[1\]\.key"):
+            config.validate()
+
+
+class TestRateLimiterHeadroom:
+
+    def test_unlimited(self):
+        assert RateLimiter().headroom() == 1.0
+
+    def test_fraction_of_tightest_bucket(self):
+        limiter = RateLimiter(requests_per_minute=10, tokens_per_minute=1000)
+        limiter.reserve(tokens=500)
+
+        assert limiter.headroom() == pytest.approx(0.5, abs=0.01)
+
+    def test_blocked(self):
+        limiter = RateLimiter()
+        limiter.block_for(10)
+
+        assert limiter.headroom() == 0.0
+
+
+class TestReplaceModel:
+
+    def test_swaps_model(self):
+        body = build_chat_body("m1", "prompt", [ImageData(b"png", "image/png")])
+
+        replaced = replace_model(body, "m1", "模型-2")
+
+        data = json.loads(bytes(replaced))
+        assert data["model"] == "模型-2"
+        assert data == {**json.loads(bytes(body)), "model": "模型-2"}
+
+    def test_same_model_is_unchanged(self):
+        body = build_chat_body("m1", "prompt", [])
+
+        assert replace_model(body, "m1", "m1") is body
+
+
+class TestVLMClientBackends:
+
+    @pytest.fixture
+    def image_paths(self, tmp_path):
+        paths = {}
+        for index in range(8):
+            path = tmp_path / f"fig{index}.png"
+            path.write_bytes(synthetic_png(8, 8, index))
+            paths[f"images/fig{index}.png"] = str(path)
+        return paths
+
+    def _config(self, *servers):
+        config = BenchRunner.default_config()
+        config.retries = 3
+        config.backends = [{"endpoint": server.endpoint, "name": f"s{i}"} for i, server in enumerate(servers)]
+        return config
+
+    def test_spreads_requests(self, image_paths):
+        with MockVLMServer(seed=1) as first, MockVLMServer(seed=2) as second:
+            logger = Logger(verbose=False)
+            client = VLMClient(self._config(first, second), logger)
+            client.backends.rng = random.Random(0)
+            try:
+                batch = client.describe_images_batch(image_paths, batch_size=2)
+            finally:
+                client.close()
+
+        assert len(batch.results) == 8
+        assert first.stats.get("requests", 0) > 0 and second.stats.get("requests", 0) > 0
+        rows = client.backends.report()
+        assert sum(row["images"] for row in rows) == 8
+        assert logger.metrics.get('backend_images_total', backend="s0") == rows[0]["images"]
+
+    def test_failing_backend_is_ejected(self, image_paths):
+        with MockVLMServer(error_rate=1.0, seed=1) as broken, MockVLMServer(seed=2) as healthy:
+            logger = Logger(verbose=False)
+            config = self._config(broken, healthy)
+            config.max_concurrency = 1
+            client = VLMClient(config, logger)
+            try:
+                batch = client.describe_images_batch(image_paths, batch_size=1)
+            finally:
+                client.close()
+
+        assert len(batch.results) == 8
+        assert broken.stats["requests"] == 1
+        assert healthy.stats["images"] == 8
+        # Retried on the healthy backend straight away, without backing off
+        assert logger.metrics.get('retry_sleep_seconds_total', error_type="server_error") == 0
+        assert logger.metrics.get('backend_ejections_total', backend="s0", error_type="server_error") == 1
+
+    @pytest.mark.skipif(not AIOHTTP_AVAILABLE, reason="aiohttp not installed")
+    def test_async_engine_fails_over(self, image_paths):
+        with MockVLMServer(error_rate=1.0, seed=1) as broken, MockVLMServer(seed=2) as healthy:
+            config = self._config(broken, healthy)
+            config.max_concurrency = 1
+            client = VLMClient(config, Logger(verbose=False))
+            try:
+                batch = AsyncVLMEngine(client).describe_images_batch(image_paths, 1)
+            finally:
+                client.close()
+
+        assert len(batch.results) == 8
+        assert broken.stats["requests"] == 1
+        assert client.backends.report()[1]["images"] == 8
@@ -0,0 +1,220 @@
+import pytest
+import functools
+import os
+import random
+import sys
+from unittest.mock import patch
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ieeU.bench import BenchRunner, percentile
+from ieeU.logger import Logger
+from ieeU.mineru import MinerUClient
+from ieeU.mockserver import (
+    FaultInjector,
+    LatencyModel,
+    MockMinerUServer,
+    MockServer,
+    MockVLMServer,
+    synthetic_png,
+)
+from ieeU.poller import AdaptivePoller
+from ieeU.vlm import VLMClient
+
+
+def _config(endpoint, **overrides):
+    config = BenchRunner.default_config()
+    config.endpoint = endpoint
+    config.retries = 1
+    for name, value in overrides.items():
+        setattr(config, name, value)
+    return config
+
+
+@pytest.fixture
+def vlm_server():
+    with MockVLMServer(seed=1) as server:
+        yield server
+
+
+@pytest.fixture
+def image_paths(tmp_path):
+    paths = {}
+    for index in range(3):
+        path = tmp_path / f"fig{index}.png"
+        path.write_bytes(synthetic_png(8, 8, index))
+        paths[f"images/fig{index}.png"] = str(path)
+    return paths
+
+
+class TestLatencyModel:
+
+    @pytest.mark.parametrize("spec, kind, a, b", [
+        ("0.25", "fixed", 0.25, 0.0),
+        ("fixed:0.1", "fixed", 0.1, 0.0),
+        ("uniform:0.1:0.3", "uniform", 0.1, 0.3),
+        ("lognormal:0.2:0.5", "lognormal", 0.2, 0.5),
+        ("exp:0.4", "exp", 0.4, 0.0),
+    ])
+    def test_parse(self, spec, kind, a, b):
+        model = LatencyModel.parse(spec)
+        assert (model.kind, model.a, model.b) == (kind, a, b)
+
+    @pytest.mark.parametrize("spec", ["", "slow", "uniform:0.1", "fixed:x", "gamma:1:2"])
+    def test_parse_invalid(self, spec):
+        with pytest.raises(ValueError):
+            LatencyModel.parse(spec)
+
+    def test_uniform_samples_within_bounds(self):
+        model = LatencyModel.parse("uniform:0.1:0.2", rng=random.Random(3))
+        samples = [model.sample() for _ in range(100)]
+        assert all(0.1 <= sample <= 0.2 for sample in samples)
+
+
+class TestFaultInjector:
+
+    def test_rpm_limit_sets_retry_after(self):
+        now = [0.0]
+        faults = FaultInjector(rpm_limit=2, clock=lambda: now[0])
+
+        assert faults.check() is None
+        now[0] = 10.0
+        assert faults.check() is None
+        status, headers = faults.check()
+        assert status == 429
+        assert float(headers["Retry-After"]) == pytest.approx(50.0)
+
+        now[0] = 60.0
+        assert faults.check() is None
+
+    def test_rates(self):
+        assert FaultInjector(throttle_rate=1.0).check() == (429, {})
+        assert FaultInjector(error_rate=1.0).check() == (500, {})
+        assert FaultInjector().check() is None
+
+
+class TestMockServer:
+
+    def test_handle_must_be_overridden(self):
+        class Forgetful(MockServer):
+            pass
+
+        with pytest.raises(TypeError):
+            Forgetful()
+
+
+class TestMockVLMServer:
+
+    def test_describes_images(self, vlm_server, image_paths):
+        client = VLMClient(_config(vlm_server.endpoint), Logger(verbose=False))
+        try:
+            batch = client.describe_images_batch(image_paths, batch_size=2)
+        finally:
+            client.close()
+
+        assert sorted(batch.results) == sorted(image_paths)
+        assert batch.failed_paths == []
+        assert vlm_server.stats["requests"] == 3
+        assert vlm_server.stats["images"] == 3
+
+    def test_packed_request_gets_numbered_blocks(self, vlm_server, image_paths):
+        config = _config(vlm_server.endpoint, images_per_request=3)
+        client = VLMClient(config, Logger(verbose=False))
+        try:
+            batch = client.describe_images_batch(image_paths, batch_size=1)
+        finally:
+            client.close()
+
+        assert len(batch.results) == 3
+        assert vlm_server.stats["requests"] == 1
+        assert vlm_server.stats["images"] == 3
+
+    def test_injected_errors(self, image_paths):
+        with MockVLMServer(error_rate=1.0, seed=1) as server:
+            client = VLMClient(_config(server.endpoint), Logger(verbose=False))
+            try:
+                batch = client.describe_images_batch(image_paths, batch_size=1)
+            finally:
+                client.close()
+
+        assert batch.results == {}
+        assert server.stats["errors"] == server.stats["requests"]
+
+    def test_rejects_get(self, vlm_server):
+        assert requests.get(vlm_server.endpoint).status_code == 404
+
+
+class TestMockMinerUServer:
+
+    def test_parse_pdfs(self, tmp_path):
+        pdfs = []
+        for index in range(2):
+            path = tmp_path / f"doc{index}.pdf"
+            path.write_bytes(b"%PDF-1.4 " + bytes([index]))
+            pdfs.append(str(path))
+        fast_poller = functools.partial(AdaptivePoller, min_interval=0.01, max_interval=0.01)
+
+        with MockMinerUServer(figures_per_doc=3, pages_per_second=1000, seed=1) as server:
+            client = MinerUClient("token", Logger(verbose=False), base_url=server.api_url)
+            with patch('ieeU.mineru.AdaptivePoller', fast_poller):
+                parsed = list(client.parse_pdfs(pdfs, str(tmp_path / "work")))
+
+        assert sorted(pdf for pdf, _, _ in parsed) == pdfs
+        for _, md_path, images_dir in parsed:
+            with open(md_path, encoding='utf-8') as f:
+                markdown = f.read()
+            assert markdown.count("![") == 3
+            assert len(os.listdir(images_dir)) == 3
+
+    def test_range_download(self):
+        with MockMinerUServer(figures_per_doc=1, pages_per_second=1000, seed=1) as server:
+            created = requests.post(
+                f"{server.api_url}/file-urls/batch",
+                json={"files": [{"name": "a.pdf", "data_id": "a"}]}
+            ).json()["data"]
+            requests.put(created["file_urls"][0], data=b"%PDF")
+            url = f"{server.base_url}/results/{created['batch_id']}/0.zip"
+
+            full = requests.get(url)
+            part = requests.get(url, headers={"Range": "bytes=10-19"})
+            tail = requests.get(url, headers={"Range": "bytes=-4"})
+            missing = requests.get(f"{server.base_url}/results/none/0.zip")
+
+        assert full.status_code == 200
+        assert full.content.startswith(b"PK")
+        assert part.status_code == 206
+        assert part.content == full.content[10:20]
+        assert part.headers["Content-Range"] == f"bytes 10-19/{len(full.content)}"
+        assert tail.content == full.content[-4:]
+        assert missing.status_code == 404
+
+
+class TestBenchRunner:
+
+    def test_percentile(self):
+        assert percentile([], 50) == 0.0
+        assert percentile([3.0], 99) == 3.0
+        assert percentile([1.0, 2.0, 3.0, 4.0, 5.0], 50) == 3.0
+        assert percentile([1.0, 2.0, 3.0, 4.0, 5.0], 100) == 5.0
+        assert percentile([1.0, 2.0], 50) == pytest.approx(1.5)
+
+    def test_vlm_cases(self, vlm_server, tmp_path):
+        runner = BenchRunner(BenchRunner.default_config(), vlm_server, work_dir=str(tmp_path))
+        seen = []
+        results = runner.run("vlm", [4], [1, 2], on_result=seen.append)
+
+        assert results == seen
+        assert [(r.corpus, r.batch_size) for r in results] == [(4, 1), (4, 2)]
+        for result in results:
+            assert result.figures == 4
+            assert result.failed == 0
+            assert result.requests_per_figure == 1.0
+            assert result.images_per_sec > 0
+            assert result.p50 <= result.p99
+
+    def test_e2e_needs_mineru_server(self, vlm_server, tmp_path):
+        runner = BenchRunner(BenchRunner.default_config(), vlm_server, work_dir=str(tmp_path))
+        with pytest.raises(ValueError):
+            runner.run_e2e_case(1, 1)
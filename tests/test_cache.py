@@ -0,0 +1,195 @@
+import pytest
+import os
+import sys
+import threading
+from unittest.mock import Mock, patch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ieeU.cache import DescriptionCache, ParseCache, hash_file
+from ieeU.config import Config
+from ieeU.logger import Logger
+from ieeU.vlm import VLMClient, APIErrorType
+
+
+class TestDescriptionCache:
+    
+    @pytest.fixture
+    def cache(self, tmp_path):
+        cache = DescriptionCache(str(tmp_path), max_bytes=1024 * 1024)
+        yield cache
+        cache.close()
+    
+    def test_get_miss_then_hit(self, cache):
+        assert cache.get("k1") is None
+        cache.put("k1", "A diagram")
+        assert cache.get("k1") == "A diagram"
+        assert cache.hits == 1
+        assert cache.misses == 1
+    
+    def test_contains_does_not_count(self, cache):
+        cache.put("k1", "A diagram")
+        
+        assert "k1" in cache
+        assert "k2" not in cache
+        assert (cache.hits, cache.misses) == (0, 0)
+    
+    def test_key_depends_on_all_parts(self):
+        base = DescriptionCache.make_key("hash", "model", "prompt", "endpoint")
+        assert base == DescriptionCache.make_key("hash", "model", "prompt", "endpoint")
+        assert base != DescriptionCache.make_key("other", "model", "prompt", "endpoint")
+        assert base != DescriptionCache.make_key("hash", "model2", "prompt", "endpoint")
+        assert base != DescriptionCache.make_key("hash", "model", "prompt2", "endpoint")
+        assert base != DescriptionCache.make_key("hash", "model", "prompt", "endpoint2")
+    
+    def test_lru_eviction_by_size(self, tmp_path):
+        cache = DescriptionCache(str(tmp_path), max_bytes=250)
+        cache.put("a", "x" * 100)
+        cache.put("b", "x" * 100)
+        cache.get("a")
+        cache.put("c", "x" * 100)
+        
+        assert cache.get("a") is not None
+        assert cache.get("b") is None
+        assert cache.get("c") is not None
+        cache.close()
+    
+    def test_expired_entries_are_dropped(self, tmp_path):
+        cache = DescriptionCache(str(tmp_path), max_age_days=1)
+        with patch("ieeU.cache.time.time", return_value=1000.0):
+            cache.put("a", "old")
+        with patch("ieeU.cache.time.time", return_value=1000.0 + 2 * 86400):
+            assert cache.get("a") is None
+        assert len(cache) == 0
+        cache.close()
+    
+    def test_persists_across_instances(self, tmp_path):
+        cache = DescriptionCache(str(tmp_path))
+        cache.put("a", "persisted")
+        cache.close()
+        
+        reopened = DescriptionCache(str(tmp_path))
+        assert reopened.get("a") == "persisted"
+        reopened.close()
+    
+    def test_concurrent_access(self, cache):
+        def worker(n):
+            for i in range(50):
+                cache.put(f"{n}-{i}", "desc")
+                assert cache.get(f"{n}-{i}") == "desc"
+        
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        
+        assert len(cache) == 400
+    
+    def test_hash_file(self, tmp_path):
+        path = tmp_path / "img.png"
+        path.write_bytes(b"abc")
+        assert hash_file(str(path)) == (
+            "ba7816bf8f01cfea414140de5dae2223b00361a396177a9cb410ff61f20015ad"
+        )
+
+
+class TestVLMClientCache:
+    
+    @pytest.fixture
+    def vlm_client(self, tmp_path):
+        config = Config()
+        config.endpoint = "https://api.example.com/v1/chat/completions"
+        config.key = "test-key"
+        config.model_name = "test-model"
+        cache = DescriptionCache(str(tmp_path / "cache"))
+        return VLMClient(config, Logger(verbose=False), cache)
+    
+    @patch.object(VLMClient, '_call_api')
+    def test_second_call_served_from_cache(self, mock_call, vlm_client, tmp_path):
+        mock_call.return_value = ("```figure\nA plot\n```", APIErrorType.SUCCESS)
+        image = tmp_path / "fig.png"
+        image.write_bytes(b"image-bytes")
+        
+        first = vlm_client.describe_image(str(image))
+        second = vlm_client.describe_image(str(image))
+        
+        assert first == ("A plot", APIErrorType.SUCCESS)
+        assert second == ("A plot", APIErrorType.SUCCESS)
+        assert mock_call.call_count == 1
+        assert vlm_client.logger.stats['cache_hits'] == 1
+        assert vlm_client.logger.stats['cache_misses'] == 1
+    
+    @patch.object(VLMClient, '_call_api')
+    def test_failures_are_not_cached(self, mock_call, vlm_client, tmp_path):
+        mock_call.return_value = (None, APIErrorType.SERVER_ERROR)
+        image = tmp_path / "fig.png"
+        image.write_bytes(b"image-bytes")
+        
+        vlm_client.describe_image(str(image))
+        vlm_client.describe_image(str(image))
+        
+        assert mock_call.call_count == 2
+    
+    @patch.object(VLMClient, '_call_api')
+    def test_cached_images_are_not_prefetched(self, mock_call, vlm_client, tmp_path):
+        mock_call.return_value = ("```figure\nA plot\n```", APIErrorType.SUCCESS)
+        paths = {}
+        for name in ("cached", "new"):
+            image = tmp_path / f"{name}.png"
+            image.write_bytes(name.encode())
+            paths[name] = str(image)
+        vlm_client.describe_image(paths["cached"])
+        vlm_client.preprocessor = Mock()
+        vlm_client.preprocessor.options.signature.return_value = ""
+        vlm_client.preprocessor.load.return_value = (b"png", "image/png")
+        
+        vlm_client.describe_images_batch(paths, 1)
+        
+        vlm_client.preprocessor.prefetch.assert_called_once_with([paths["new"]])
+        vlm_client.preprocessor.discard.assert_called_once()
+
+
+class TestParseCache:
+    
+    @staticmethod
+    def _extracted(root, name="doc", size=10):
+        doc = root / name
+        (doc / "images").mkdir(parents=True)
+        (doc / "full.md").write_text("![](images/a.jpg)\n", encoding='utf-8')
+        (doc / "images" / "a.jpg").write_bytes(b"x" * size)
+        return root, str(doc / "full.md")
+    
+    def test_round_trip(self, tmp_path):
+        cache = ParseCache(str(tmp_path / "cache"))
+        source, md_path = self._extracted(tmp_path / "src")
+        key = ParseCache.make_key("pdfhash", "vlm")
+        
+        assert cache.get(key, str(tmp_path / "miss")) is None
+        cache.put(key, str(source), md_path)
+        
+        restored = cache.get(key, str(tmp_path / "dest"))
+        assert restored == os.path.join(str(tmp_path / "dest"), "doc", "full.md")
+        assert os.path.isfile(os.path.join(str(tmp_path / "dest"), "doc", "images", "a.jpg"))
+        assert len(cache) == 1
+    
+    def test_key_depends_on_model_version(self):
+        assert ParseCache.make_key("h", "vlm") != ParseCache.make_key("h", "pipeline")
+    
+    def test_evicts_least_recently_used(self, tmp_path):
+        cache = ParseCache(str(tmp_path / "cache"), max_bytes=2500)
+        keys = []
+        for i in range(3):
+            source, md_path = self._extracted(tmp_path / f"src{i}", size=1000)
+            key = ParseCache.make_key(f"h{i}", "vlm")
+            keys.append(key)
+            cache.put(key, str(source), md_path)
+            entry = os.path.join(cache.root, key, ParseCache.ENTRY_FILE)
+            os.utime(entry, (1000 + i, 1000 + i))
+            if i == 1:
+                # touch the first entry so the second one is the oldest
+                cache.get(keys[0], str(tmp_path / "touch"))
+        
+        assert cache.get(keys[1], str(tmp_path / "d1")) is None
+        assert cache.get(keys[0], str(tmp_path / "d0")) is not None
+        assert cache.get(keys[2], str(tmp_path / "d2")) is not None
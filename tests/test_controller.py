@@ -0,0 +1,116 @@
+import pytest
+import os
+import sys
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ieeU.config import Config
+from ieeU.controller import AIMDController
+from ieeU.logger import Logger
+from ieeU.results import APIErrorType
+from ieeU.vlm import VLMClient
+
+
+@pytest.fixture
+def logger():
+    return Logger(verbose=False)
+
+
+class TestAIMDController:
+    
+    def test_initial_limit_is_bounded(self, logger):
+        assert AIMDController(10, 5, logger).limit == 5
+        assert AIMDController(0, 5, logger).limit == 1
+    
+    def test_multiplicative_decrease_on_throttle(self, logger):
+        controller = AIMDController(8, 8, logger)
+        controller.on_throttle(controller.epoch)
+        assert controller.limit == 4
+        controller.on_throttle(controller.epoch)
+        assert controller.limit == 2
+    
+    def test_stale_throttles_decrease_once(self, logger):
+        controller = AIMDController(8, 8, logger)
+        epoch = controller.epoch
+        for _ in range(8):
+            controller.on_throttle(epoch)
+        assert controller.limit == 4
+    
+    def test_additive_increase_after_full_window(self, logger):
+        controller = AIMDController(2, 4, logger)
+        controller.on_success()
+        assert controller.limit == 2
+        controller.on_success()
+        assert controller.limit == 3
+        for _ in range(3):
+            controller.on_success()
+        assert controller.limit == 4
+        for _ in range(10):
+            controller.on_success()
+        assert controller.limit == 4
+    
+    def test_recovers_after_reaching_minimum(self, logger):
+        controller = AIMDController(2, 4, logger)
+        controller.on_throttle(controller.epoch)
+        assert controller.limit == 1
+        assert controller.reached_minimum is True
+        
+        controller.on_success()
+        assert controller.limit == 2
+    
+    def test_changes_are_logged(self, logger):
+        controller = AIMDController(4, 4, logger)
+        controller.on_throttle(controller.epoch)
+        assert logger.stats['concurrency'] == [2]
+        assert [limit for _, limit in controller.history] == [4, 2]
+    
+    def test_is_throttle(self):
+        assert AIMDController.is_throttle(APIErrorType.RATE_LIMIT)
+        assert AIMDController.is_throttle(APIErrorType.CONCURRENCY_ERROR)
+        assert not AIMDController.is_throttle(APIErrorType.AUTH_ERROR)
+        assert not AIMDController.is_throttle(APIErrorType.TIMEOUT)
+
+
+class TestBatchUsesMaxConcurrency:
+    
+    @pytest.fixture
+    def vlm_client(self):
+        config = Config()
+        config.endpoint = "https://api.example.com/v1/chat/completions"
+        config.key = "test-key"
+        config.model_name = "test-model"
+        config.max_concurrency = 3
+        return VLMClient(config, Logger(verbose=False))
+    
+    def test_controller_capped_by_max_concurrency(self, vlm_client):
+        controller = vlm_client.create_controller(10, 100)
+        assert controller.limit == 3
+        assert controller.maximum == 3
+    
+    def test_full_batch_starts_at_max_concurrency(self, vlm_client):
+        controller = vlm_client.create_controller("full", 100)
+        assert controller.limit == 3
+    
+    def test_small_document_caps_at_total(self, vlm_client):
+        controller = vlm_client.create_controller(10, 2)
+        assert controller.maximum == 2
+    
+    @patch.object(VLMClient, 'describe_image')
+    def test_transient_throttle_recovers(self, mock_describe, vlm_client):
+        calls = [0]
+        
+        def side_effect(path):
+            calls[0] += 1
+            if calls[0] <= 2:
+                return None, APIErrorType.RATE_LIMIT
+            return "Description", APIErrorType.SUCCESS
+        
+        mock_describe.side_effect = side_effect
+        image_paths = {f"img{i}.jpg": f"/path/img{i}.jpg" for i in range(30)}
+        
+        result = vlm_client.describe_images_batch(image_paths)
+        
+        assert len(result.results) == 30
+        assert result.should_fallback_sequential is True
+        assert vlm_client.logger.stats['concurrency'][-1] == 3
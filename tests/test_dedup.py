@@ -0,0 +1,139 @@
+import pytest
+import os
+import sys
+import threading
+import time
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ieeU.config import Config
+from ieeU.dedup import InflightRegistry, group_duplicates, hamming
+from ieeU.logger import Logger
+from ieeU.vlm import VLMClient, APIErrorType
+
+
+def _write(tmp_path, name, data):
+    path = tmp_path / name
+    path.write_bytes(data)
+    return str(path)
+
+
+@pytest.fixture
+def vlm_client():
+    config = Config()
+    config.endpoint = "https://api.example.com/v1/chat/completions"
+    config.key = "test-key"
+    config.model_name = "test-model"
+    return VLMClient(config, Logger(verbose=False))
+
+
+class TestGroupDuplicates:
+    
+    def test_groups_byte_identical_files(self, tmp_path):
+        paths = {
+            "a.png": _write(tmp_path, "a.png", b"logo"),
+            "b.png": _write(tmp_path, "b.png", b"chart"),
+            "c.png": _write(tmp_path, "c.png", b"logo"),
+        }
+        
+        groups = group_duplicates(paths)
+        
+        assert groups == {"a.png": ["a.png", "c.png"], "b.png": ["b.png"]}
+    
+    def test_missing_files_stay_separate(self, tmp_path):
+        paths = {"a.png": str(tmp_path / "missing"), "b.png": str(tmp_path / "missing")}
+        assert group_duplicates(paths) == {"a.png": ["a.png"], "b.png": ["b.png"]}
+    
+    def test_near_duplicates_by_perceptual_hash(self, tmp_path):
+        pillow = pytest.importorskip("PIL.Image")
+        
+        def stripes(offset, invert=False):
+            image = pillow.new("L", (64, 64))
+            values = [((x // 8) % 2) * 200 + offset for y in range(64) for x in range(64)]
+            image.putdata([255 - v if invert else v for v in values])
+            return image
+        
+        stripes(0).save(tmp_path / "a.png")
+        stripes(3).save(tmp_path / "b.png")
+        stripes(0, invert=True).save(tmp_path / "c.png")
+        paths = {name: str(tmp_path / name) for name in ("a.png", "b.png", "c.png")}
+        
+        assert len(group_duplicates(paths, max_distance=0)) == 3
+        groups = group_duplicates(paths, max_distance=4)
+        assert groups["a.png"] == ["a.png", "b.png"]
+        assert groups["c.png"] == ["c.png"]
+    
+    def test_hamming(self):
+        assert hamming(0b1011, 0b0001) == 2
+
+
+class TestInflightRegistry:
+    
+    def test_second_caller_waits_for_leader(self):
+        registry = InflightRegistry()
+        future, leader = registry.join("k")
+        follower_future, follower_leader = registry.join("k")
+        
+        assert leader is True
+        assert follower_leader is False
+        assert follower_future is future
+        
+        registry.resolve("k", ("desc", APIErrorType.SUCCESS))
+        assert follower_future.result() == ("desc", APIErrorType.SUCCESS)
+        assert registry.join("k")[1] is True
+        assert registry.coalesced == 1
+
+
+class TestBatchDedup:
+    
+    @patch.object(VLMClient, '_call_api')
+    def test_duplicates_sent_once_and_fanned_out(self, mock_call, vlm_client, tmp_path):
+        mock_call.return_value = ("```figure\nLogo\n```", APIErrorType.SUCCESS)
+        paths = {
+            f"images/{i}.png": _write(tmp_path, f"{i}.png", b"same-bytes")
+            for i in range(5)
+        }
+        paths["images/other.png"] = _write(tmp_path, "other.png", b"other")
+        
+        result = vlm_client.describe_images_batch(paths, 3)
+        
+        assert mock_call.call_count == 2
+        assert set(result.results) == set(paths)
+        assert vlm_client.logger.stats['dedup_saved'] == 4
+    
+    @patch.object(VLMClient, '_call_api')
+    def test_failure_fans_out_to_group(self, mock_call, vlm_client, tmp_path):
+        mock_call.return_value = (None, APIErrorType.SERVER_ERROR)
+        paths = {
+            "a.png": _write(tmp_path, "a.png", b"same"),
+            "b.png": _write(tmp_path, "b.png", b"same"),
+        }
+        
+        result = vlm_client.describe_images_batch(paths, 2)
+        
+        assert sorted(result.failed_paths) == ["a.png", "b.png"]
+    
+    @patch.object(VLMClient, '_call_api')
+    def test_concurrent_identical_requests_coalesced(self, mock_call, vlm_client, tmp_path):
+        def slow_call(path, body, images=1):
+            time.sleep(0.2)
+            return "```figure\nShared\n```", APIErrorType.SUCCESS
+        
+        mock_call.side_effect = slow_call
+        first = _write(tmp_path, "doc1.png", b"same")
+        second = _write(tmp_path, "doc2.png", b"same")
+        results = {}
+        
+        threads = [
+            threading.Thread(target=lambda p=p: results.setdefault(p, vlm_client.describe_image(p)))
+            for p in (first, second)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        assert mock_call.call_count == 1
+        assert results[first] == results[second] == ("Shared", APIErrorType.SUCCESS)
+        assert vlm_client.logger.stats['dedup_saved'] == 1
@@ -0,0 +1,132 @@
+import pytest
+import os
+import re
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ieeU.download import DownloadError, Downloader, download_file
+
+BLOB = os.urandom(3 * 1024 * 1024 + 123)
+
+
+class _RangeHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    supports_ranges = True
+    drop_after = None
+    ranges_seen = []
+    
+    def do_GET(self):
+        start, end = 0, len(BLOB) - 1
+        match = re.match(r'bytes=(\d+)-(\d*)', self.headers.get("Range", ""))
+        cls = type(self)
+        
+        if match and cls.supports_ranges:
+            start = int(match.group(1))
+            if match.group(2):
+                end = int(match.group(2))
+            cls.ranges_seen.append((start, end))
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{len(BLOB)}")
+        else:
+            self.send_response(200)
+        
+        data = BLOB[start:end + 1]
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        
+        if cls.drop_after is not None:
+            drop, cls.drop_after = cls.drop_after, None
+            self.wfile.write(data[:drop])
+            self.wfile.flush()
+            self.close_connection = True
+            return
+        self.wfile.write(data)
+    
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    _RangeHandler.supports_ranges = True
+    _RangeHandler.drop_after = None
+    _RangeHandler.ranges_seen = []
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _RangeHandler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}/result.zip"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def _read(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+class TestDownloadFile:
+    
+    def test_streams_to_disk(self, server, tmp_path):
+        dest = str(tmp_path / "result.zip")
+        size = download_file(requests.Session(), server, dest)
+        
+        assert size == len(BLOB)
+        assert _read(dest) == BLOB
+        assert not os.path.exists(dest + ".part")
+    
+    def test_resumes_after_dropped_connection(self, server, tmp_path):
+        _RangeHandler.drop_after = 1024 * 1024
+        dest = str(tmp_path / "result.zip")
+        
+        download_file(requests.Session(), server, dest)
+        
+        assert _read(dest) == BLOB
+        assert _RangeHandler.ranges_seen[-1][0] == 1024 * 1024
+    
+    def test_without_range_support_fails_cleanly(self, server, tmp_path):
+        _RangeHandler.supports_ranges = False
+        _RangeHandler.drop_after = 1024
+        dest = str(tmp_path / "result.zip")
+        
+        with pytest.raises(DownloadError):
+            download_file(requests.Session(), server, dest)
+        assert not os.path.exists(dest)
+        assert not os.path.exists(dest + ".part")
+    
+    def test_parallel_segments(self, server, tmp_path, monkeypatch):
+        monkeypatch.setattr("ieeU.download.MIN_SEGMENT_SIZE", 1024 * 1024)
+        dest = str(tmp_path / "result.zip")
+        
+        download_file(requests.Session(), server, dest, segments=3)
+        
+        assert _read(dest) == BLOB
+        segment_ranges = [r for r in _RangeHandler.ranges_seen if r != (0, len(BLOB) - 1)]
+        assert len(segment_ranges) == 3
+    
+    def test_short_segment_is_rejected(self, server, tmp_path, monkeypatch):
+        monkeypatch.setattr("ieeU.download.MIN_SEGMENT_SIZE", 1024 * 1024)
+        fetch_range = Downloader._fetch_range
+        
+        def short(self, url, dest_path, start, end, *args, **kwargs):
+            written = fetch_range(self, url, dest_path, start, end, *args, **kwargs)
+            return written - 1 if start > 0 else written
+        
+        monkeypatch.setattr(Downloader, "_fetch_range", short)
+        dest = str(tmp_path / "result.zip")
+        
+        with pytest.raises(DownloadError, match="segment"):
+            download_file(requests.Session(), server, dest, segments=3)
+        assert not os.path.exists(dest)
+    
+    def test_segments_split_evenly(self):
+        downloader = Downloader(requests.Session(), segments=4)
+        segments = downloader._segments(64 * 1024 * 1024)
+        
+        assert len(segments) == 4
+        assert segments[0][0] == 0
+        assert segments[-1][1] == 64 * 1024 * 1024 - 1
+        assert all(a[1] + 1 == b[0] for a, b in zip(segments, segments[1:]))
@@ -1,6 +1,7 @@
 import pytest
 import os
 import sys
+import time
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from ieeU.extractor import ImageExtractor, ImageReference
@@ -139,6 +140,106 @@ Desc2
         assert "images/fig1.jpg" in paths
 
 
+class TestImageReferenceSyntax:
+    
+    def test_alt_and_title(self):
+        refs = ImageExtractor.extract_image_references('![A plot](images/a.jpg "Figure 1")')
+        
+        assert refs[0].path == "images/a.jpg"
+        assert refs[0].alt == "A plot"
+        assert refs[0].title == "Figure 1"
+    
+    def test_single_quoted_title_and_angle_path(self):
+        refs = ImageExtractor.extract_image_references("![](<images/my fig.png> 'T')")
+        
+        assert refs[0].path == "images/my fig.png"
+        assert refs[0].title == "T"
+    
+    def test_path_with_spaces(self):
+        refs = ImageExtractor.extract_image_references("![](images/my fig.png)")
+        assert refs[0].path == "images/my fig.png"
+    
+    def test_html_img(self):
+        content = '<p><img alt="x" src="images/a.png" width=300></p>\n<IMG SRC=images/b.png>'
+        refs = ImageExtractor.extract_image_references(content)
+        
+        assert [r.path for r in refs] == ["images/a.png", "images/b.png"]
+        assert refs[0].html and refs[0].alt == "x"
+        assert [r.line for r in refs] == [1, 2]
+    
+    def test_html_img_without_src_is_skipped(self):
+        refs = ImageExtractor.extract_image_references('<img alt="x"> ![](a.jpg)')
+        assert [(r.path, r.figure_num) for r in refs] == [("a.jpg", 1)]
+    
+    def test_line_numbers(self):
+        content = "a\n\n![](1.jpg) ![](2.jpg)\n\n\n![](3.jpg)"
+        refs = ImageExtractor.extract_image_references(content)
+        assert [r.line for r in refs] == [3, 3, 6]
+    
+    @staticmethod
+    def _scan_seconds(figures):
+        content = "text line\n" * 200 + "".join(
+            f"para {i}\n![](images/{i}.jpg)\n" for i in range(figures)
+        )
+        best = float("inf")
+        for _ in range(3):
+            start = time.perf_counter()
+            refs = ImageExtractor.extract_image_references(content)
+            best = min(best, time.perf_counter() - start)
+        
+        assert len(refs) == figures
+        assert refs[-1].line == 200 + 2 * figures
+        return best
+    
+    def test_scan_is_linear(self):
+        small = self._scan_seconds(2500)
+        large = self._scan_seconds(20000)
+        
+        # 8x the input: about 8x the time if linear, 64x if quadratic
+        assert large < 24 * small
+
+
+class TestRewrite:
+    
+    @staticmethod
+    def _render(ref):
+        if ref.path.endswith("skip.jpg"):
+            return None
+        return f"[{ref.figure_num}:{ref.path}]"
+    
+    def test_rewrite_images_single_pass(self):
+        content = 'a ![x](1.jpg "t") b ![](skip.jpg) c <img src="2.png"> d'
+        result = ImageExtractor.rewrite_images(content, self._render)
+        assert result == 'a [1:1.jpg] b ![](skip.jpg) c [3:2.png] d'
+    
+    def test_rewrite_numbers_each_occurrence(self):
+        content = "![](a.jpg)\n![](a.jpg)"
+        assert ImageExtractor.rewrite_images(content, self._render) == "[1:a.jpg]\n[2:a.jpg]"
+    
+    def test_rewrite_without_matches_returns_input(self):
+        assert ImageExtractor.rewrite_images("plain", self._render) == "plain"
+    
+    def test_rewrite_file_matches_in_memory(self, tmp_path):
+        content = "# T\n\n![](1.jpg) and ![](skip.jpg)\n\n<img src='2.png'/>\ntail"
+        src = tmp_path / "full.md"
+        dst = tmp_path / "out.md"
+        src.write_text(content, encoding='utf-8')
+        
+        replaced = ImageExtractor.rewrite_file(str(src), str(dst), self._render)
+        
+        assert replaced == 2
+        assert dst.read_text(encoding='utf-8') == ImageExtractor.rewrite_images(content, self._render)
+    
+    def test_scan_file_numbers_like_in_memory(self, tmp_path):
+        content = "![](1.jpg)\ntext\n![](2.jpg) ![](3.jpg)\n"
+        src = tmp_path / "full.md"
+        src.write_text(content, encoding='utf-8')
+        
+        from_file = [(r.path, r.line, r.figure_num) for r in ImageExtractor.scan_file(str(src))]
+        in_memory = [(r.path, r.line, r.figure_num) for r in ImageExtractor.extract_image_references(content)]
+        assert from_file == in_memory
+
+
 class TestImageReference:
     
     def test_repr(self):
@@ -148,3 +249,8 @@ class TestImageReference:
         assert "test.jpg" in repr_str
         assert "10" in repr_str
         assert "1" in repr_str
+    
+    def test_slots(self):
+        ref = ImageReference("test.jpg", 10, 1)
+        with pytest.raises(AttributeError):
+            ref.extra = 1
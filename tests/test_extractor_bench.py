@@ -0,0 +1,60 @@
+import pytest
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.extractor_bench import (
+    CaseResult,
+    compare,
+    generate_markdown,
+    load_baseline,
+    save_baseline,
+)
+from ieeU.extractor import ImageExtractor
+
+
+class TestGenerateMarkdown:
+
+    def test_size_and_reference_count(self):
+        content, paths = generate_markdown(64 * 1024, 50)
+        refs = ImageExtractor.extract_image_references(content)
+
+        assert [ref.path for ref in refs] == paths
+        assert len(set(paths)) == 50
+        assert 64 * 1024 <= len(content) < 72 * 1024
+
+    def test_deterministic(self):
+        assert generate_markdown(8 * 1024, 10, seed=3) == generate_markdown(8 * 1024, 10, seed=3)
+        assert generate_markdown(8 * 1024, 10, seed=3) != generate_markdown(8 * 1024, 10, seed=4)
+
+    def test_mixes_reference_forms(self):
+        content, paths = generate_markdown(16 * 1024, 20)
+        assert "<img " in content
+        assert any(" " in path for path in paths)
+        assert any(path.endswith(".svg") for path in paths)
+
+
+class TestBaseline:
+
+    def test_compare_flags_regressions_beyond_threshold(self):
+        fast = CaseResult("1MB-1k", "scan_file", 1.1, 1.0)
+        slow = CaseResult("1MB-1k", "rewrite_images", 2.0, 1.0)
+        new = CaseResult("1MB-1k", "replace_images", 9.0, 1.0)
+        baseline = {"1MB-1k/scan_file": 1.0, "1MB-1k/rewrite_images": 1.0}
+
+        assert compare([fast, slow, new], baseline, 0.25) == [slow]
+        assert fast.change == pytest.approx(0.1)
+        assert new.change is None
+
+    def test_relative_to_calibration(self):
+        result = CaseResult("10KB-10", "scan_file", 0.004, 0.002)
+        assert result.relative == pytest.approx(2.0)
+
+    def test_save_merges_cases(self, tmp_path):
+        path = str(tmp_path / "baseline.json")
+        save_baseline(path, 0.001, [CaseResult("a", "f", 0.002, 0.001)])
+        save_baseline(path, 0.001, [CaseResult("b", "f", 0.003, 0.001)])
+
+        assert load_baseline(path) == {"a/f": 2.0, "b/f": 3.0}
+        assert load_baseline(str(tmp_path / "missing.json")) == {}
@@ -0,0 +1,180 @@
+import pytest
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ieeU.aio import AIOHTTP_AVAILABLE, AsyncVLMEngine
+from ieeU.bench import BenchRunner
+from ieeU.hedge import HedgePolicy, percentile
+from ieeU.logger import Logger
+from ieeU.mockserver import LatencyModel, MockVLMServer, synthetic_png
+from ieeU.vlm import VLMClient
+
+SLOW_SECONDS = 1.0
+
+
+def _warm(policy, seconds=0.05, samples=20):
+    for _ in range(samples):
+        policy.record(seconds)
+
+
+class TestHedgePolicy:
+
+    def test_percentile(self):
+        assert percentile([], 95) == 0.0
+        assert percentile([1.0, 2.0, 3.0, 4.0, 5.0], 50) == 3.0
+
+    @pytest.mark.parametrize("pct, ratio", [(0, 0.1), (100, 0.1), (95, 0)])
+    def test_disabled(self, pct, ratio):
+        policy = HedgePolicy(pct, ratio)
+        _warm(policy)
+
+        assert not policy.enabled
+        assert policy.delay() is None
+
+    def test_waits_for_samples(self):
+        policy = HedgePolicy(95, min_samples=3)
+        _warm(policy, samples=2)
+        assert policy.delay() is None
+
+        policy.record(0.05)
+        assert policy.delay() == pytest.approx(0.05)
+
+    def test_delay_is_percentile_per_image(self):
+        policy = HedgePolicy(90, min_samples=1)
+        for seconds in range(1, 11):
+            policy.record(float(seconds) * 2, images=2)
+
+        assert policy.delay(images=3) == pytest.approx(percentile(range(1, 11), 90) * 3)
+
+    def test_ratio_cap(self):
+        policy = HedgePolicy(95, max_ratio=0.25)
+        for _ in range(4):
+            policy.delay()
+
+        assert policy.try_hedge()
+        assert not policy.try_hedge()
+
+        for _ in range(4):
+            policy.delay()
+        assert policy.try_hedge()
+        assert policy.hedges == 2
+
+
+@pytest.fixture
+def image(tmp_path):
+    path = tmp_path / "fig.png"
+    path.write_bytes(synthetic_png(8, 8, 0))
+    return {"images/fig.png": str(path)}
+
+
+@pytest.fixture
+def servers():
+    slow = MockVLMServer(latency=LatencyModel.parse(f"fixed:{SLOW_SECONDS}"), seed=1)
+    fast = MockVLMServer(seed=2)
+    with slow, fast:
+        yield slow, fast
+
+
+def _client(slow, fast, logger):
+    config = BenchRunner.default_config()
+    config.hedge_percentile = 95
+    config.hedge_max_ratio = 1.0
+    config.backends = [
+        {"endpoint": slow.endpoint, "name": "slow"},
+        # Weight 0: never chosen first, only as the other backend for a duplicate
+        {"endpoint": fast.endpoint, "name": "fast", "weight": 0},
+    ]
+    client = VLMClient(config, logger)
+    _warm(client.hedge)
+    return client
+
+
+class TestHedgedRequests:
+
+    def test_duplicate_goes_to_other_backend_and_wins(self, servers, image):
+        slow, fast = servers
+        logger = Logger(verbose=False)
+        client = _client(slow, fast, logger)
+        try:
+            start = time.monotonic()
+            batch = client.describe_images_batch(image, batch_size=1)
+            elapsed = time.monotonic() - start
+        finally:
+            client.close()
+
+        assert list(batch.results) == ["images/fig.png"]
+        assert elapsed < SLOW_SECONDS
+        assert fast.stats["requests"] == 1
+        assert logger.stats['hedges'] == 1
+        assert logger.metrics.get('hedges_total', outcome="won") == 1
+
+    def test_fast_primary_is_not_hedged(self, servers, image):
+        slow, fast = servers
+        logger = Logger(verbose=False)
+        client = _client(slow, fast, logger)
+        client.hedge.percentile = 99
+        _warm(client.hedge, seconds=10.0, samples=50)
+        for backend in client.backends.backends:
+            backend.weight = 1 if backend.name == "fast" else 0
+        try:
+            client.describe_images_batch(image, batch_size=1)
+        finally:
+            client.close()
+
+        assert slow.stats.get("requests", 0) == 0
+        assert logger.stats['hedges'] == 0
+
+    def test_ratio_cap_stops_hedging(self, servers, image):
+        slow, fast = servers
+        logger = Logger(verbose=False)
+        client = _client(slow, fast, logger)
+        client.hedge.max_ratio = 0.5
+        try:
+            batch = client.describe_images_batch(image, batch_size=1)
+        finally:
+            client.close()
+
+        assert len(batch.results) == 1
+        assert fast.stats.get("requests", 0) == 0
+        assert logger.stats['hedges'] == 0
+
+    def test_single_backend_waiting_on_limiter_is_not_hedged(self, servers, image):
+        _, fast = servers
+        logger = Logger(verbose=False)
+        config = BenchRunner.default_config()
+        config.hedge_percentile = 95
+        config.hedge_max_ratio = 1.0
+        config.endpoint = fast.endpoint
+        client = VLMClient(config, logger)
+        _warm(client.hedge, seconds=0.01)
+        client.rate_limiter.block_for(0.3)
+        try:
+            batch = client.describe_images_batch(image, batch_size=1)
+        finally:
+            client.close()
+        
+        assert len(batch.results) == 1
+        assert fast.stats["requests"] == 1
+        assert logger.stats['hedges'] == 0
+    
+    @pytest.mark.skipif(not AIOHTTP_AVAILABLE, reason="aiohttp not installed")
+    def test_async_cancels_loser(self, servers, image):
+        slow, fast = servers
+        logger = Logger(verbose=False)
+        client = _client(slow, fast, logger)
+        try:
+            start = time.monotonic()
+            batch = AsyncVLMEngine(client).describe_images_batch(image, 1)
+            elapsed = time.monotonic() - start
+        finally:
+            client.close()
+
+        assert len(batch.results) == 1
+        assert elapsed < SLOW_SECONDS
+        assert logger.metrics.get('hedges_total', outcome="won") == 1
+        cancelled = logger.metrics.get('request_duration_seconds', endpoint="vlm", result="cancelled")
+        assert cancelled.count == 1
+        assert client.backends.report()[0]["requests"] == 0
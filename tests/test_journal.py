@@ -0,0 +1,88 @@
+import pytest
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ieeU.journal import Journal
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "jobs" / "doc.jsonl")
+
+
+class TestJournal:
+    
+    def test_records_survive_reopen(self, path):
+        journal = Journal(path)
+        journal.record_batch("B1", "3")
+        journal.record_zip("https://cdn/result.zip")
+        journal.record_figure("images/a.jpg", "A chart")
+        journal.record_figure("images/b.jpg", "A diagram")
+        journal.close()
+        
+        reopened = Journal(path)
+        assert reopened.batch_id == "B1"
+        assert reopened.data_id == "3"
+        assert reopened.zip_url == "https://cdn/result.zip"
+        assert reopened.figures == {"images/a.jpg": "A chart", "images/b.jpg": "A diagram"}
+        assert reopened.resumable
+        reopened.close()
+    
+    def test_visible_without_close(self, path):
+        journal = Journal(path)
+        journal.record_figure("a.jpg", "desc")
+        
+        # written through to the OS immediately, as after a crash
+        assert Journal(path).figures == {"a.jpg": "desc"}
+        journal.close()
+    
+    def test_torn_last_line_is_ignored(self, path):
+        journal = Journal(path)
+        journal.record_figure("a.jpg", "desc")
+        journal.close()
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write('{"type": "figure", "path": "b.j')
+        
+        assert Journal(path).figures == {"a.jpg": "desc"}
+    
+    def test_reset_forgets_parse(self, path):
+        journal = Journal(path)
+        journal.record_batch("B1", "0")
+        journal.record_zip("z")
+        journal.reset_parse()
+        journal.close()
+        
+        reopened = Journal(path)
+        assert reopened.batch_id is None
+        assert reopened.zip_url is None
+        assert not reopened.resumable
+    
+    def test_fresh_discards_old_records(self, path):
+        journal = Journal(path)
+        journal.record_figure("a.jpg", "desc")
+        journal.close()
+        
+        assert Journal(path, fresh=True).figures == {}
+    
+    def test_discard_removes_file(self, path):
+        journal = Journal(path)
+        journal.record_figure("a.jpg", "desc")
+        journal.discard()
+        
+        assert not os.path.exists(path)
+        journal.record_figure("b.jpg", "ignored after close")
+    
+    def test_file_created_on_first_record(self, path):
+        journal = Journal(path)
+        assert not os.path.exists(path)
+        
+        journal.record_batch("b", "0")
+        journal.close()
+        
+        assert Journal(path).batch_id == "b"
+    
+    def test_key_depends_on_all_parts(self):
+        assert Journal.key_for("process", "a", "m") != Journal.key_for("process", "a", "n")
+        assert Journal.key_for("process", None) == Journal.key_for("process", "")
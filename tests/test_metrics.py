@@ -0,0 +1,155 @@
+import pytest
+import functools
+import json
+import os
+import sys
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ieeU.bench import BenchRunner
+from ieeU.logger import Logger
+from ieeU.metrics import Metrics
+from ieeU.mineru import MinerUClient
+from ieeU.mockserver import MockMinerUServer, MockVLMServer, synthetic_png
+from ieeU.poller import AdaptivePoller
+from ieeU.vlm import VLMClient
+
+
+@pytest.fixture
+def metrics():
+    return Metrics()
+
+
+@pytest.fixture
+def image_paths(tmp_path):
+    paths = {}
+    for index in range(2):
+        path = tmp_path / f"fig{index}.png"
+        path.write_bytes(synthetic_png(8, 8, index))
+        paths[f"images/fig{index}.png"] = str(path)
+    return paths
+
+
+def _describe(endpoint, image_paths, retries=1):
+    config = BenchRunner.default_config()
+    config.endpoint = endpoint
+    config.retries = retries
+    logger = Logger(verbose=False)
+    client = VLMClient(config, logger)
+    try:
+        client.describe_images_batch(image_paths, batch_size=2)
+    finally:
+        client.close()
+    return logger.metrics
+
+
+class TestMetrics:
+
+    def test_counter_labels(self, metrics):
+        metrics.inc('retries_total', error_type="rate_limit")
+        metrics.inc('retries_total', 2, error_type="rate_limit")
+        metrics.inc('retries_total', error_type="timeout")
+
+        assert metrics.get('retries_total', error_type="rate_limit") == 3
+        assert metrics.get('retries_total', error_type="timeout") == 1
+        assert metrics.get('retries_total', error_type="server_error") is None
+
+    def test_wrong_kind_rejected(self, metrics):
+        with pytest.raises(ValueError):
+            metrics.observe('retries_total', 1.0)
+        with pytest.raises(ValueError):
+            metrics.inc('request_duration_seconds')
+
+    def test_histogram(self, metrics):
+        for value in (0.01, 0.3, 0.3, 500.0):
+            metrics.observe('request_duration_seconds', value, endpoint="vlm", result="success")
+
+        snapshot = metrics.as_dict()['request_duration_seconds']
+        series = snapshot['series'][0]
+        assert snapshot['type'] == "histogram"
+        assert series['labels'] == {"endpoint": "vlm", "result": "success"}
+        assert series['count'] == 4
+        assert series['sum'] == pytest.approx(500.61)
+        assert series['min'] == 0.01
+        assert series['max'] == 500.0
+        assert series['buckets']['0.05'] == 1
+        assert series['buckets']['0.5'] == 3
+        assert series['buckets']['120'] == 3
+        assert series['buckets']['+Inf'] == 4
+
+    def test_prometheus_text(self, metrics):
+        metrics.inc('tokens_total', 120, kind="prompt")
+        metrics.set('vlm_concurrency_limit', 4)
+        metrics.observe('mineru_phase_seconds', 2.0, phase="parse")
+
+        text = metrics.to_prometheus()
+
+        assert "# TYPE ieeu_tokens_total counter" in text
+        assert 'ieeu_tokens_total{kind="prompt"} 120' in text
+        assert "ieeu_vlm_concurrency_limit 4" in text
+        assert 'ieeu_mineru_phase_seconds_bucket{phase="parse",le="1"} 0' in text
+        assert 'ieeu_mineru_phase_seconds_bucket{phase="parse",le="2.5"} 1' in text
+        assert 'ieeu_mineru_phase_seconds_bucket{phase="parse",le="+Inf"} 1' in text
+        assert 'ieeu_mineru_phase_seconds_count{phase="parse"} 1' in text
+        assert "retries_total" not in text
+
+    def test_write_format_by_extension(self, metrics, tmp_path):
+        metrics.inc('images_total', result="success")
+        json_path = tmp_path / "out" / "metrics.json"
+        prom_path = tmp_path / "metrics.prom"
+
+        metrics.write(str(json_path))
+        metrics.write(str(prom_path))
+
+        data = json.loads(json_path.read_text(encoding='utf-8'))
+        assert data['images_total']['series'] == [{"labels": {"result": "success"}, "value": 1}]
+        assert 'ieeu_images_total{result="success"} 1' in prom_path.read_text(encoding='utf-8')
+        assert not os.path.exists(f"{prom_path}.tmp")
+
+
+class TestLoggerMetrics:
+
+    def test_vlm_requests(self, image_paths):
+        with MockVLMServer(seed=1) as server:
+            metrics = _describe(server.endpoint, image_paths)
+
+        latency = metrics.get('request_duration_seconds', endpoint="vlm", result="success")
+        assert latency.count == 2
+        assert metrics.get('uploaded_bytes_total', endpoint="vlm") > 0
+        assert metrics.get('tokens_total', kind="prompt") == 2000
+        assert metrics.get('tokens_total', kind="completion") == 200
+        assert metrics.get('images_total', result="success") == 2
+        assert metrics.get('vlm_inflight_requests').count == 2
+
+    def test_retries_by_error_type(self, image_paths):
+        one_image = dict(list(image_paths.items())[:1])
+        with MockVLMServer(error_rate=1.0, seed=1) as server:
+            metrics = _describe(server.endpoint, one_image, retries=2)
+
+        # each scheduled attempt makes two requests and backs off 1s between them
+        retries = metrics.get('retries_total', error_type="server_error")
+        assert retries >= 1
+        assert metrics.get('retry_sleep_seconds_total', error_type="server_error") == retries
+        latency = metrics.get('request_duration_seconds', endpoint="vlm", result="server_error")
+        assert latency.count == 2 * retries
+        # backoff sleeps are not part of request latency
+        assert latency.max < 1.0
+
+    def test_mineru_phases(self, tmp_path):
+        pdf = tmp_path / "doc.pdf"
+        pdf.write_bytes(b"%PDF-1.4 synthetic")
+        fast_poller = functools.partial(AdaptivePoller, min_interval=0.01, max_interval=0.01)
+        logger = Logger(verbose=False)
+
+        with MockMinerUServer(figures_per_doc=2, pages_per_second=1000, seed=1) as server:
+            client = MinerUClient("token", logger, base_url=server.api_url)
+            with patch('ieeU.mineru.AdaptivePoller', fast_poller):
+                list(client.parse_pdfs([str(pdf)], str(tmp_path / "work")))
+
+        metrics = logger.metrics
+        for phase in ("upload", "parse", "download"):
+            assert metrics.get('mineru_phase_seconds', phase=phase).count == 1
+        for endpoint in ("mineru_batch", "mineru_upload", "mineru_poll", "mineru_download"):
+            assert metrics.get('request_duration_seconds', endpoint=endpoint, result="success").count >= 1
+        assert metrics.get('uploaded_bytes_total', endpoint="mineru_upload") == len(b"%PDF-1.4 synthetic")
@@ -0,0 +1,185 @@
+import pytest
+import functools
+import os
+import sys
+import zipfile
+from unittest.mock import MagicMock, patch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ieeU.logger import Logger
+from ieeU.mineru import MinerUClient
+from ieeU.poller import AdaptivePoller
+
+
+@pytest.fixture
+def client():
+    return MinerUClient("token", Logger())
+
+
+def _make_zip(path, entries):
+    with zipfile.ZipFile(path, 'w') as zf:
+        for name, data in entries.items():
+            zf.writestr(name, data)
+
+
+class TestSelectiveExtraction:
+    
+    def test_find_markdown_prefers_full_md(self):
+        names = ["doc/layout.json", "doc/notes.md", "doc/full.md"]
+        assert MinerUClient._find_markdown_member(names) == "doc/full.md"
+    
+    def test_find_markdown_falls_back_to_shallowest(self):
+        names = ["a/b/deep.md", "top.md"]
+        assert MinerUClient._find_markdown_member(names) == "top.md"
+    
+    def test_find_markdown_none(self):
+        assert MinerUClient._find_markdown_member(["layout.json"]) is None
+    
+    def test_extracts_only_referenced_images(self, client, tmp_path):
+        zip_path = tmp_path / "result.zip"
+        _make_zip(zip_path, {
+            "doc/full.md": "# Title\n\n![](images/a.jpg)\n\n![](images/b.png)\n",
+            "doc/images/a.jpg": b"a",
+            "doc/images/b.png": b"b",
+            "doc/images/unused.jpg": b"u",
+            "doc/layout.json": "{}",
+            "doc/origin.pdf": b"%PDF",
+        })
+        extract_dir = tmp_path / "out"
+        
+        with zipfile.ZipFile(zip_path) as zf:
+            md_path = client._extract_selected(zf, str(extract_dir))
+        
+        assert md_path == os.path.join(str(extract_dir), "doc", "full.md")
+        assert os.path.isfile(md_path)
+        assert sorted(os.listdir(extract_dir / "doc")) == ["full.md", "images"]
+        assert sorted(os.listdir(extract_dir / "doc" / "images")) == ["a.jpg", "b.png"]
+    
+    def test_missing_reference_is_skipped(self, client, tmp_path):
+        zip_path = tmp_path / "result.zip"
+        _make_zip(zip_path, {"full.md": "![](images/missing.jpg)\n"})
+        extract_dir = tmp_path / "out"
+        
+        with zipfile.ZipFile(zip_path) as zf:
+            md_path = client._extract_selected(zf, str(extract_dir))
+        
+        assert os.listdir(extract_dir) == ["full.md"]
+        assert md_path == os.path.join(str(extract_dir), "full.md")
+
+
+def _response(payload=None, status_code=200):
+    response = MagicMock()
+    response.status_code = status_code
+    response.json.return_value = payload
+    return response
+
+
+class TestBatchParsing:
+    
+    @pytest.fixture
+    def pdfs(self, tmp_path):
+        paths = []
+        for name in ("a.pdf", "b.pdf", "c.pdf"):
+            path = tmp_path / name
+            path.write_bytes(b"%PDF-1.4")
+            paths.append(str(path))
+        return paths
+    
+    def test_one_batch_call_for_all_files(self, client, pdfs, tmp_path):
+        upload = {"code": 0, "data": {"batch_id": "B", "file_urls": ["u0", "u1", "u2"]}}
+        polls = [
+            {"code": 0, "data": {"extract_result": [
+                {"data_id": "1", "state": "done", "full_zip_url": "z1"},
+                {"data_id": "0", "state": "running", "extract_progress": {}},
+                {"data_id": "2", "state": "failed", "err_msg": "bad"},
+            ]}},
+            {"code": 0, "data": {"extract_result": [
+                {"data_id": "0", "state": "done", "full_zip_url": "z0"},
+            ]}},
+        ]
+        
+        with patch.object(client.session, 'post', return_value=_response(upload)) as post, \
+             patch.object(client.session, 'put', return_value=_response()) as put, \
+             patch.object(client.session, 'get', side_effect=[_response(p) for p in polls]), \
+             patch.object(client, '_download_and_extract', side_effect=lambda url, d: os.path.join(d, url + ".md")), \
+             patch('ieeU.mineru.time.sleep'):
+            results = list(client.parse_pdfs(pdfs, str(tmp_path)))
+        
+        assert post.call_count == 1
+        sent = post.call_args.kwargs["json"]["files"]
+        assert [f["data_id"] for f in sent] == ["0", "1", "2"]
+        assert put.call_count == 3
+        
+        assert [r[0] for r in results] == [pdfs[1], pdfs[2], pdfs[0]]
+        assert results[0][1].endswith(os.path.join("1", "z1.md"))
+        assert results[1][1] is None
+        assert results[2][1].endswith(os.path.join("0", "z0.md"))
+    
+    def test_failed_upload_is_reported_without_polling_it(self, client, pdfs, tmp_path):
+        upload = {"code": 0, "data": {"batch_id": "B", "file_urls": ["u0", "u1", "u2"]}}
+        poll = {"code": 0, "data": {"extract_result": [
+            {"data_id": "0", "state": "done", "full_zip_url": "z0"},
+            {"data_id": "2", "state": "done", "full_zip_url": "z2"},
+        ]}}
+        
+        def put(url, data):
+            return _response(status_code=500 if url == "u1" else 200)
+        
+        with patch.object(client.session, 'post', return_value=_response(upload)), \
+             patch.object(client.session, 'put', side_effect=put), \
+             patch.object(client.session, 'get', return_value=_response(poll)), \
+             patch.object(client, '_download_and_extract', return_value=None), \
+             patch('ieeU.mineru.time.sleep'):
+            results = list(client.parse_pdfs(pdfs, str(tmp_path)))
+        
+        assert results[0] == (pdfs[1], None, None)
+        assert sorted(r[0] for r in results) == sorted(pdfs)
+    
+    def test_splits_into_batches(self, client, pdfs, tmp_path, monkeypatch):
+        monkeypatch.setattr("ieeU.mineru.MINERU_BATCH_LIMIT", 2)
+        
+        with patch.object(client, '_upload_batch', return_value=(None, {})) as upload:
+            results = list(client.parse_pdfs(pdfs, str(tmp_path)))
+        
+        assert [call.args[0] for call in upload.call_args_list] == [
+            {"0": pdfs[0], "1": pdfs[1]},
+            {"2": pdfs[2]},
+        ]
+        assert results == [(path, None, None) for path in pdfs]
+    
+    def test_polls_all_batches_from_one_loop(self, client, pdfs, tmp_path, monkeypatch):
+        monkeypatch.setattr("ieeU.mineru.MINERU_BATCH_LIMIT", 2)
+        
+        def upload(chunk):
+            return "B" + min(chunk), dict(chunk)
+        
+        def get(url, headers):
+            batch_id = url.rsplit("/", 1)[1]
+            ids = ["0", "1"] if batch_id == "B0" else ["2"]
+            return _response({"code": 0, "data": {"extract_result": [
+                {"data_id": i, "state": "done", "full_zip_url": "z" + i} for i in ids
+            ]}})
+        
+        with patch.object(client, '_upload_batch', side_effect=upload), \
+             patch.object(client.session, 'get', side_effect=get) as poll, \
+             patch('ieeU.mineru.time.sleep'):
+            results = list(client.poll_pdfs(pdfs))
+        
+        assert poll.call_count == 2
+        assert sorted(results) == [("0", pdfs[0], "z0"), ("1", pdfs[1], "z1"), ("2", pdfs[2], "z2")]
+    
+    def test_times_out_without_progress(self, client, pdfs, tmp_path):
+        client.poll_timeout = 0.05
+        pending = {"code": 0, "data": {"extract_result": [
+            {"data_id": "0", "state": "pending"}
+        ]}}
+        
+        fast_poller = functools.partial(AdaptivePoller, min_interval=0.01, max_interval=0.01)
+        
+        with patch.object(client, '_upload_batch', return_value=("B", {"0": pdfs[0]})), \
+             patch.object(client.session, 'get', return_value=_response(pending)), \
+             patch('ieeU.mineru.AdaptivePoller', fast_poller):
+            results = list(client.poll_pdfs(pdfs[:1]))
+        
+        assert results == [("0", pdfs[0], None)]
@@ -0,0 +1,157 @@
+import pytest
+import base64
+import json
+import os
+import sys
+import threading
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ieeU.config import Config
+from ieeU.constants import PROMPT_TEMPLATE
+from ieeU.logger import Logger
+from ieeU.payload import BodyReader, ImageData, build_chat_body
+from ieeU.vlm import VLMClient, APIErrorType
+
+IMAGE_SIZE = 1024 * 1024
+BATCH = 16
+
+
+@pytest.fixture(scope="module")
+def image_files(tmp_path_factory):
+    directory = tmp_path_factory.mktemp("images")
+    paths = []
+    for i in range(BATCH):
+        path = directory / f"fig{i}.png"
+        path.write_bytes(os.urandom(IMAGE_SIZE))
+        paths.append(str(path))
+    return paths
+
+
+def _legacy_body(path):
+    """The previous path: read, b64encode, decode, f-string, json.dumps, encode."""
+    with open(path, 'rb') as f:
+        image_data = f.read()
+    encoded = base64.b64encode(image_data).decode('utf-8')
+    payload = {
+        "model": "test-model",
+        "messages": [{
+            "role": "user",
+            "content": [
+                {"type": "text", "text": PROMPT_TEMPLATE},
+                {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{encoded}"}}
+            ]
+        }],
+        "max_tokens": 4096
+    }
+    return payload, json.dumps(payload).encode('utf-8')
+
+
+def _peak(build):
+    tracemalloc.start()
+    try:
+        held = build()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del held
+    return peak
+
+
+class TestBuildChatBody:
+    
+    def test_matches_json_serialization(self, image_files):
+        body = build_chat_body(
+            "test-model", 
+            PROMPT_TEMPLATE, 
+            [ImageData(image_files[0], "image/png"), ImageData(b"xyz", "image/gif")]
+        )
+        payload = json.loads(body)
+        content = payload["messages"][0]["content"]
+        
+        with open(image_files[0], 'rb') as f:
+            expected = base64.b64encode(f.read()).decode()
+        assert content[0] == {"type": "text", "text": PROMPT_TEMPLATE}
+        assert content[1]["image_url"]["url"] == f"data:image/png;base64,{expected}"
+        assert content[2]["image_url"]["url"] == "data:image/gif;base64,eHl6"
+        assert payload["model"] == "test-model"
+        assert payload["max_tokens"] == 4096
+    
+    def test_body_is_exactly_presized(self):
+        for size in range(0, 8):
+            body = build_chat_body("m", "p", [ImageData(b"a" * size, "image/png")])
+            json.loads(body)
+    
+    def test_empty_file(self, tmp_path):
+        path = tmp_path / "empty.png"
+        path.write_bytes(b"")
+        body = build_chat_body("m", "p", [ImageData(str(path), "image/png")])
+        assert json.loads(body)["messages"][0]["content"][1]["image_url"]["url"] == (
+            "data:image/png;base64,"
+        )
+    
+    def test_peak_memory_for_large_batch(self, image_files):
+        """Hold BATCH in-flight requests at once, as the scheduler does."""
+        legacy_peak = _peak(lambda: [_legacy_body(path) for path in image_files])
+        new_peak = _peak(lambda: [
+            build_chat_body("test-model", PROMPT_TEMPLATE, [ImageData(path, "image/png")])
+            for path in image_files
+        ])
+        
+        encoded_size = (IMAGE_SIZE + 2) // 3 * 4
+        assert new_peak < BATCH * encoded_size * 1.05
+        assert new_peak < legacy_peak * 0.55
+
+
+class TestBodyReader:
+    
+    def test_read_and_rewind(self):
+        reader = BodyReader(bytearray(b"0123456789"))
+        assert len(reader) == 10
+        assert reader.read(4) == b"0123"
+        assert reader.read() == b"456789"
+        assert reader.read(1) == b""
+        reader.seek(0)
+        assert reader.read(2) == b"01"
+
+
+class _EchoHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    received = []
+    
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        type(self).received.append(json.loads(body))
+        reply = json.dumps({"choices": [{"message": {"content": "```figure\nok\n```"}}]}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(reply)))
+        self.end_headers()
+        self.wfile.write(reply)
+    
+    def log_message(self, *args):
+        pass
+
+
+class TestVLMClientSendsBody:
+    
+    def test_describe_image_round_trip(self, image_files):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), _EchoHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            config = Config()
+            config.endpoint = f"http://127.0.0.1:{server.server_address[1]}/v1/chat/completions"
+            config.key = "test-key"
+            config.model_name = "test-model"
+            client = VLMClient(config, Logger(verbose=False))
+            
+            assert client.describe_image(image_files[0]) == ("ok", APIErrorType.SUCCESS)
+        finally:
+            server.shutdown()
+            server.server_close()
+        
+        url = _EchoHandler.received[-1]["messages"][0]["content"][1]["image_url"]["url"]
+        with open(image_files[0], 'rb') as f:
+            assert url.endswith(base64.b64encode(f.read()).decode())
@@ -0,0 +1,99 @@
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ieeU.pipeline import Pipeline, Stage
+
+
+class TestPipeline:
+    
+    def test_passes_items_through_all_stages(self):
+        pipeline = Pipeline("source", [
+            Stage("double", lambda x: x * 2),
+            Stage("inc", lambda x: x + 1, workers=3),
+        ])
+        
+        outputs = pipeline.run(range(10))
+        
+        assert sorted(outputs) == [x * 2 + 1 for x in range(10)]
+        assert [s.items for s in pipeline.all_stages] == [10, 10, 10]
+    
+    def test_stages_overlap(self):
+        active = set()
+        overlapped = threading.Event()
+        lock = threading.Lock()
+        
+        def work(name):
+            def run(item):
+                with lock:
+                    active.add(name)
+                    if len(active) > 1:
+                        overlapped.set()
+                time.sleep(0.05)
+                with lock:
+                    active.discard(name)
+                return item
+            return run
+        
+        pipeline = Pipeline("source", [Stage("a", work("a")), Stage("b", work("b"))])
+        pipeline.run(range(5))
+        
+        assert overlapped.is_set()
+    
+    def test_queues_are_bounded(self):
+        produced = []
+        release = threading.Event()
+        
+        def source():
+            for i in range(20):
+                produced.append(i)
+                yield i
+        
+        def slow(item):
+            release.wait()
+            return item
+        
+        pipeline = Pipeline("source", [Stage("slow", slow)], queue_size=2)
+        thread = threading.Thread(target=pipeline.run, args=(source(),))
+        thread.start()
+        time.sleep(0.2)
+        
+        # one item in the stage, two queued, one blocked on put
+        assert len(produced) <= 4
+        release.set()
+        thread.join()
+        assert len(produced) == 20
+    
+    def test_errors_drop_item_and_continue(self):
+        failed = []
+        
+        def boom(x):
+            if x == 3:
+                raise ValueError("bad")
+            return x
+        
+        pipeline = Pipeline(
+            "source",
+            [Stage("boom", boom)],
+            on_error=lambda item, e: failed.append(item)
+        )
+        outputs = pipeline.run(range(5))
+        
+        assert sorted(outputs) == [0, 1, 2, 4]
+        assert failed == [3]
+        assert len(pipeline.errors) == 1
+    
+    def test_utilization(self):
+        pipeline = Pipeline("source", [Stage("sleep", lambda x: time.sleep(0.05) or x)])
+        pipeline.run(range(4))
+        
+        rows = {name: (busy, items, util) for name, busy, items, util in pipeline.utilization()}
+        busy, items, util = rows["sleep"]
+        
+        assert items == 4
+        assert busy >= 0.2
+        assert 0.5 < util <= 1.0
+        assert rows["source"][2] < 0.5
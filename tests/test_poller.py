@@ -0,0 +1,115 @@
+import pytest
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ieeU.poller import AdaptivePoller
+
+
+@pytest.fixture
+def poller(clock):
+    return AdaptivePoller(
+        timeout=100,
+        min_interval=2,
+        max_interval=30,
+        jitter=0,
+        clock=clock
+    )
+
+
+def _running(data_id, extracted, total):
+    return {
+        "data_id": data_id,
+        "state": "running",
+        "extract_progress": {"extracted_pages": extracted, "total_pages": total}
+    }
+
+
+class TestAdaptivePoller:
+    
+    def test_first_poll_is_immediate(self, poller):
+        poller.track("B", {"0": "a.pdf"})
+        batch, wait = poller.next_due()
+        assert batch.batch_id == "B"
+        assert wait == 0
+    
+    def test_backs_off_while_queued(self, poller, clock):
+        batch = poller.track("B", {"0": "a.pdf"})
+        intervals = []
+        for _ in range(10):
+            poller.update(batch, [{"data_id": "0", "state": "pending"}])
+            intervals.append(batch.interval)
+            clock.now = batch.next_poll
+        
+        assert intervals == sorted(intervals)
+        assert intervals[-1] == 30
+    
+    def test_interval_follows_page_rate(self, poller, clock):
+        batch = poller.track("B", {"0": "a.pdf"})
+        poller.update(batch, [_running("0", 0, 100)])
+        clock.now = 10
+        poller.update(batch, [_running("0", 50, 100)])
+        
+        # 5 pages/s and 50 pages left -> expected in 10s
+        assert batch.rate == pytest.approx(5)
+        assert batch.interval == pytest.approx(10)
+    
+    def test_interval_clamped(self, poller, clock):
+        batch = poller.track("B", {"0": "a.pdf"})
+        poller.update(batch, [_running("0", 0, 1000)])
+        clock.now = 10
+        poller.update(batch, [_running("0", 1, 1000)])
+        assert batch.interval == 30
+    
+    def test_finished_documents_are_returned_once(self, poller, clock):
+        batch = poller.track("B", {"0": "a.pdf", "1": "b.pdf"})
+        tasks = [
+            {"data_id": "0", "state": "done", "full_zip_url": "z0"},
+            {"data_id": "1", "state": "failed"},
+        ]
+        assert poller.update(batch, tasks) == [("0", "z0"), ("1", None)]
+        assert poller.update(batch, tasks) == []
+        assert not batch.pending
+    
+    def test_matches_by_file_name_without_data_id(self, poller):
+        batch = poller.track("B", {"0": "/x/a.pdf"})
+        tasks = [{"file_name": "a.pdf", "state": "done", "full_zip_url": "z"}]
+        assert poller.update(batch, tasks) == [("0", "z")]
+    
+    def test_timeout_is_progress_based(self, poller, clock):
+        batch = poller.track("B", {"0": "a.pdf"})
+        for step in range(1, 20):
+            clock.now = step * 20
+            poller.update(batch, [_running("0", step, 1000)])
+            assert not poller.expired(batch)
+        
+        clock.now += 100
+        poller.update(batch, [_running("0", 19, 1000)])
+        assert poller.expired(batch)
+    
+    def test_zero_timeout_never_expires(self, clock):
+        poller = AdaptivePoller(timeout=0, clock=clock)
+        batch = poller.track("B", {"0": "a.pdf"})
+        clock.now = 10 ** 6
+        assert not poller.expired(batch)
+    
+    def test_next_due_picks_earliest_batch(self, poller, clock):
+        first = poller.track("A", {"0": "a.pdf"})
+        second = poller.track("B", {"1": "b.pdf"})
+        poller.update(first, [{"data_id": "0", "state": "pending"}])
+        
+        batch, wait = poller.next_due()
+        assert batch is second
+        
+        poller.update(second, [{"data_id": "1", "state": "pending"}])
+        clock.now = 1
+        batch, wait = poller.next_due()
+        assert batch is first
+        assert wait == pytest.approx(first.next_poll - 1)
+    
+    def test_jitter_stays_within_bounds(self, clock):
+        poller = AdaptivePoller(min_interval=10, max_interval=10, jitter=0.2, clock=clock, rng=lambda: 1.0)
+        batch = poller.track("B", {"0": "a.pdf"})
+        poller.update(batch, [])
+        assert batch.next_poll == pytest.approx(12)
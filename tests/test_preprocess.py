@@ -0,0 +1,149 @@
+import pytest
+import io
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ieeU.config import Config
+from ieeU.logger import Logger
+from ieeU.preprocess import (
+    ImagePreprocessor,
+    PreprocessOptions,
+    detect_mime,
+    preprocess_image
+)
+from ieeU.vlm import VLMClient
+
+PNG_HEADER = b'\x89PNG\r\n\x1a\n'
+
+
+class TestDetectMime:
+    
+    def test_magic_bytes_win_over_extension(self):
+        assert detect_mime(PNG_HEADER + b'rest', "fig.jpg") == "image/png"
+        assert detect_mime(b'GIF89a...', "fig.png") == "image/gif"
+        assert detect_mime(b'RIFF\0\0\0\0WEBPVP8 ', "fig") == "image/webp"
+        assert detect_mime(b'\xff\xd8\xff\xe0', "fig.png") == "image/jpeg"
+    
+    def test_falls_back_to_extension(self):
+        assert detect_mime(b'', "fig.webp") == "image/webp"
+        assert detect_mime(b'', "fig.unknown") == "image/jpeg"
+
+
+class TestVLMClientEncoding:
+    
+    def test_data_url_uses_detected_mime(self, tmp_path):
+        path = tmp_path / "fig.jpg"
+        path.write_bytes(PNG_HEADER + b'data')
+        
+        client = VLMClient(Config(), Logger(verbose=False))
+        body = client._build_body([client._load_image(str(path))])
+        
+        assert b'"url": "data:image/png;base64,' in body
+
+
+class TestPreprocessImage:
+    
+    @pytest.fixture(autouse=True)
+    def pillow(self):
+        return pytest.importorskip("PIL.Image")
+    
+    def _save(self, image, path, fmt, **kwargs):
+        image.save(path, format=fmt, **kwargs)
+        return str(path)
+    
+    def test_downscales_to_pixel_budget(self, pillow, tmp_path):
+        image = pillow.new("RGB", (2000, 1000), (10, 20, 30))
+        path = self._save(image, tmp_path / "big.png", "PNG")
+        
+        data, mime = preprocess_image(path, PreprocessOptions(max_pixels=200_000, trim=False))
+        result = pillow.open(io.BytesIO(data))
+        
+        assert mime == "image/png"
+        assert result.size[0] * result.size[1] <= 200_000
+        assert result.size[0] == pytest.approx(2 * result.size[1], abs=2)
+    
+    def test_trims_whitespace_borders(self, pillow, tmp_path):
+        image = pillow.new("RGB", (400, 300), "white")
+        image.paste((0, 0, 0), (100, 50, 300, 250))
+        path = self._save(image, tmp_path / "padded.png", "PNG")
+        
+        data, _ = preprocess_image(path, PreprocessOptions(max_pixels=0))
+        
+        assert pillow.open(io.BytesIO(data)).size == (200, 200)
+    
+    def test_gif_first_frame_becomes_png(self, pillow, tmp_path):
+        frames = [pillow.new("P", (32, 32), color) for color in (1, 2, 3)]
+        path = str(tmp_path / "anim.gif")
+        frames[0].save(path, save_all=True, append_images=frames[1:])
+        
+        data, mime = preprocess_image(path, PreprocessOptions(max_pixels=0, trim=False))
+        
+        assert mime == "image/png"
+        assert data.startswith(PNG_HEADER)
+    
+    def test_transcodes_to_configured_format(self, pillow, tmp_path):
+        image = pillow.new("RGBA", (64, 64), (255, 0, 0, 128))
+        path = self._save(image, tmp_path / "fig.png", "PNG")
+        
+        data, mime = preprocess_image(
+            path, 
+            PreprocessOptions(max_pixels=0, image_format="jpeg", quality=70, trim=False)
+        )
+        
+        assert mime == "image/jpeg"
+        assert detect_mime(data) == "image/jpeg"
+    
+    def test_small_image_kept_as_is(self, pillow, tmp_path):
+        image = pillow.new("RGB", (64, 64), (1, 2, 3))
+        path = self._save(image, tmp_path / "fig.jpg", "JPEG", quality=50)
+        
+        data, mime = preprocess_image(path, PreprocessOptions(max_pixels=0, trim=False))
+        
+        with open(path, 'rb') as f:
+            assert data == f.read()
+        assert mime == "image/jpeg"
+    
+    def test_process_pool_prefetch(self, pillow, tmp_path):
+        paths = []
+        for i in range(4):
+            image = pillow.new("RGB", (800, 800), (i, i, i))
+            paths.append(self._save(image, tmp_path / f"fig{i}.png", "PNG"))
+        
+        preprocessor = ImagePreprocessor(PreprocessOptions(max_pixels=10_000), workers=2)
+        try:
+            preprocessor.prefetch(paths)
+            results = [preprocessor.load(path) for path in paths]
+        finally:
+            preprocessor.shutdown()
+        
+        for data, mime in results:
+            size = pillow.open(io.BytesIO(data)).size
+            assert size[0] * size[1] <= 10_000
+    
+    def test_discard_drops_unloaded_figures(self, pillow, tmp_path):
+        path = self._save(pillow.new("RGB", (8, 8)), tmp_path / "fig.png", "PNG")
+        
+        preprocessor = ImagePreprocessor(PreprocessOptions(), workers=1)
+        try:
+            preprocessor.prefetch([path])
+            preprocessor.discard()
+            
+            assert preprocessor._futures == {}
+            assert preprocessor.load(path)[1] == "image/png"
+        finally:
+            preprocessor.shutdown()
+    
+    def test_options_change_cache_key(self, tmp_path):
+        path = tmp_path / "fig.png"
+        path.write_bytes(PNG_HEADER)
+        config = Config()
+        plain = VLMClient(config, Logger(verbose=False))
+        processed = VLMClient(
+            config, 
+            Logger(verbose=False), 
+            preprocessor=ImagePreprocessor(PreprocessOptions())
+        )
+        
+        assert plain._cache_key(str(path)) != processed._cache_key(str(path))
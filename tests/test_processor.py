@@ -0,0 +1,282 @@
+import pytest
+import os
+import sys
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ieeU.cache import ParseCache, hash_file
+from ieeU.config import Config
+from ieeU.processor import Processor
+from ieeU.mineru import MinerUClient
+from ieeU.vlm import BatchResult
+
+
+@pytest.fixture
+def processor(tmp_path):
+    config = Config()
+    config.endpoint = "http://localhost"
+    config.key = "k"
+    config.model_name = "m"
+    config.cache_enabled = False
+    config.image_preprocess = False
+    config.parse_cache_enabled = False
+    processor = Processor(config)
+    processor.journal_dir = str(tmp_path / "jobs")
+    yield processor
+    processor.close()
+
+
+def _fake_fetch(self, data_id, zip_url, work_dir, pdf_path=None):
+    doc_dir = os.path.join(work_dir, data_id)
+    os.makedirs(os.path.join(doc_dir, "images"))
+    with open(os.path.join(doc_dir, "images", "a.jpg"), 'wb') as f:
+        f.write(b"img")
+    md_path = os.path.join(doc_dir, "full.md")
+    with open(md_path, 'w', encoding='utf-8') as f:
+        f.write(f"# {data_id}\n\n![](images/a.jpg)\n")
+    return md_path, os.path.join(doc_dir, "images")
+
+
+def _describe_all(image_paths, batch_size, on_complete=None, on_failed=None):
+    result = BatchResult()
+    result.results = {path: "described" for path in image_paths}
+    return result
+
+
+def _make_pdfs(tmp_path, *names):
+    paths = []
+    for name in names:
+        path = tmp_path / name
+        path.write_bytes(b"%PDF " + name.encode())
+        paths.append(str(path))
+    return paths
+
+
+class TestProcessPdfs:
+    
+    def test_pipeline_writes_each_document(self, processor, tmp_path):
+        pdfs = _make_pdfs(tmp_path, "a.pdf", "b.pdf", "c.pdf")
+        
+        def poll(self, pdf_paths, resume=None, on_uploaded=None):
+            yield "1", pdf_paths[1], "z1"
+            yield "2", pdf_paths[2], None
+            yield "0", pdf_paths[0], "z0"
+        
+        with patch.object(MinerUClient, 'poll_pdfs', poll), \
+             patch.object(MinerUClient, 'fetch_result', _fake_fetch), \
+             patch.object(processor.engine, 'describe_images_batch', side_effect=_describe_all):
+            results = processor.process_pdfs(pdfs, str(tmp_path))
+        
+        assert list(results) == pdfs
+        assert results[pdfs[2]].success is False
+        for pdf in (pdfs[0], pdfs[1]):
+            assert results[pdf].success
+            with open(results[pdf].output_path, encoding='utf-8') as f:
+                assert "```figure 1\ndescribed\n```" in f.read()
+        
+        stages = [row[0] for row in processor.logger.stats['stages']]
+        assert stages == ["parse", "fetch", "describe", "write"]
+    
+    def test_same_name_pdfs_get_separate_outputs(self, processor, tmp_path):
+        (tmp_path / "a").mkdir()
+        (tmp_path / "b").mkdir()
+        pdfs = _make_pdfs(tmp_path, "a/x.pdf", "b/x.pdf")
+        out = tmp_path / "out"
+        out.mkdir()
+        
+        def poll(self, pdf_paths, resume=None, on_uploaded=None):
+            for index, path in enumerate(pdf_paths):
+                yield str(index), path, f"z{index}"
+        
+        with patch.object(MinerUClient, 'poll_pdfs', poll), \
+             patch.object(MinerUClient, 'fetch_result', _fake_fetch), \
+             patch.object(processor.engine, 'describe_images_batch', side_effect=_describe_all):
+            results = processor.process_pdfs(pdfs, str(out))
+        
+        outputs = [results[pdf].output_path for pdf in pdfs]
+        assert outputs == [str(out / "x.md"), str(out / "x-2.md")]
+        for index, path in enumerate(outputs):
+            with open(path, encoding='utf-8') as f:
+                assert f.read().startswith(f"# {index}\n")
+    
+    def test_stage_error_marks_document_failed(self, processor, tmp_path):
+        pdfs = _make_pdfs(tmp_path, "a.pdf")
+        
+        def poll(self, pdf_paths, resume=None, on_uploaded=None):
+            yield "0", pdf_paths[0], "z0"
+        
+        with patch.object(MinerUClient, 'poll_pdfs', poll), \
+             patch.object(MinerUClient, 'fetch_result', _fake_fetch), \
+             patch.object(processor.engine, 'describe_images_batch', side_effect=RuntimeError("boom")):
+            results = processor.process_pdfs(pdfs, str(tmp_path))
+        
+        assert results[pdfs[0]].success is False
+        assert results[pdfs[0]].output_path is None
+
+
+class TestIncrementalOutput:
+    
+    def test_output_grows_as_figures_complete(self, processor, tmp_path):
+        md = tmp_path / "full.md"
+        md.write_text("intro\n![](a.jpg)\nmiddle\n![](b.jpg)\nend\n", encoding='utf-8')
+        (tmp_path / "a.jpg").write_bytes(b"a")
+        (tmp_path / "b.jpg").write_bytes(b"b")
+        output = tmp_path / "full_ie.md"
+        seen = []
+        
+        def describe(image_paths, batch_size, on_complete=None, on_failed=None):
+            on_complete("b.jpg", "B")
+            seen.append(output.read_text(encoding='utf-8') if output.exists() else None)
+            on_complete("a.jpg", "A")
+            seen.append(output.read_text(encoding='utf-8'))
+            result = BatchResult()
+            result.results = {"a.jpg": "A", "b.jpg": "B"}
+            return result
+        
+        with patch.object(processor.engine, 'describe_images_batch', side_effect=describe):
+            result = processor._process_single_file(str(md))
+        
+        assert seen[0] == "intro\n"
+        assert seen[1].endswith("```figure 2\nB\n```\n\nend\n")
+        assert result.output_path == str(output)
+    
+    def test_api_failure_leaves_no_output(self, processor, tmp_path):
+        md = tmp_path / "full.md"
+        md.write_text("![](a.jpg)\n", encoding='utf-8')
+        (tmp_path / "a.jpg").write_bytes(b"a")
+        
+        def describe(image_paths, batch_size, on_complete=None, on_failed=None):
+            result = BatchResult()
+            result.api_completely_failed = True
+            return result
+        
+        with patch.object(processor.engine, 'describe_images_batch', side_effect=describe):
+            result = processor._process_single_file(str(md))
+        
+        assert result.api_failed
+        assert not (tmp_path / "full_ie.md").exists()
+
+
+class TestResume:
+    
+    def test_run_skips_figures_from_journal(self, processor, tmp_path):
+        md = tmp_path / "full.md"
+        md.write_text("![](a.jpg)\n\n![](b.jpg)\n", encoding='utf-8')
+        (tmp_path / "a.jpg").write_bytes(b"a")
+        (tmp_path / "b.jpg").write_bytes(b"b")
+        
+        journal = processor._open_journal("run", str(md))
+        journal.record_figure("a.jpg", "from journal")
+        journal.close()
+        
+        with patch.object(processor.engine, 'describe_images_batch', side_effect=_describe_all) as describe:
+            result = processor._process_single_file(str(md))
+        
+        assert list(describe.call_args.args[0]) == ["b.jpg"]
+        with open(result.output_path, encoding='utf-8') as f:
+            content = f.read()
+        assert "from journal" in content
+        assert "described" in content
+        assert os.listdir(processor.journal_dir) == []
+    
+    def test_interrupted_run_keeps_completed_figures(self, processor, tmp_path):
+        md = tmp_path / "full.md"
+        md.write_text("![](a.jpg)\n\n![](b.jpg)\n", encoding='utf-8')
+        (tmp_path / "a.jpg").write_bytes(b"a")
+        (tmp_path / "b.jpg").write_bytes(b"b")
+        
+        def interrupted(image_paths, batch_size, on_complete=None, on_failed=None):
+            on_complete("a.jpg", "done before Ctrl-C")
+            result = BatchResult()
+            result.results = {"a.jpg": "done before Ctrl-C"}
+            result.cancelled = True
+            return result
+        
+        with patch.object(processor.engine, 'describe_images_batch', side_effect=interrupted):
+            result = processor._process_single_file(str(md))
+        
+        assert result.interrupted
+        assert result.output_path is None
+        assert processor._open_journal("run", str(md)).figures == {"a.jpg": "done before Ctrl-C"}
+    
+    def test_process_resumes_polling_and_download(self, processor, tmp_path):
+        pdfs = _make_pdfs(tmp_path, "a.pdf", "b.pdf")
+        
+        parsed = processor._open_journal("process", pdfs[0])
+        parsed.record_batch("OLD", "0")
+        parsed.record_zip("z-old")
+        parsed.close()
+        uploaded = processor._open_journal("process", pdfs[1])
+        uploaded.record_batch("OLD", "1")
+        uploaded.close()
+        
+        polled = {}
+        
+        def poll(self, pdf_paths, resume=None, on_uploaded=None):
+            polled["paths"] = pdf_paths
+            polled["resume"] = resume
+            yield "1", pdf_paths[0], "z1"
+        
+        with patch.object(MinerUClient, 'poll_pdfs', poll), \
+             patch.object(MinerUClient, 'fetch_result', _fake_fetch), \
+             patch.object(processor.engine, 'describe_images_batch', side_effect=_describe_all):
+            results = processor.process_pdfs(pdfs, str(tmp_path))
+        
+        assert polled["paths"] == [pdfs[1]]
+        assert polled["resume"] == {pdfs[1]: ("OLD", "1")}
+        assert all(r.success for r in results.values())
+        assert os.listdir(processor.journal_dir) == []
+
+
+class TestParseCache:
+    
+    def test_cached_pdf_skips_mineru(self, processor, tmp_path):
+        pdfs = _make_pdfs(tmp_path, "a.pdf")
+        processor.parse_cache = ParseCache(str(tmp_path / "cache"))
+        
+        def poll(self, pdf_paths, resume=None, on_uploaded=None):
+            yield "0", pdf_paths[0], "z0"
+        
+        def fetch(self, data_id, zip_url, work_dir, pdf_path=None):
+            md_path, images_dir = _fake_fetch(self, data_id, zip_url, work_dir)
+            key = self._parse_cache_key(pdf_path)
+            self.parse_cache.put(key, os.path.join(work_dir, data_id), md_path)
+            return md_path, images_dir
+        
+        with patch.object(MinerUClient, 'poll_pdfs', poll), \
+             patch.object(MinerUClient, 'fetch_result', fetch), \
+             patch.object(processor.engine, 'describe_images_batch', side_effect=_describe_all):
+            first = processor.process_pdfs(pdfs, str(tmp_path))[pdfs[0]]
+        
+        with patch.object(MinerUClient, 'poll_pdfs', side_effect=AssertionError("polled")), \
+             patch.object(processor.engine, 'describe_images_batch', side_effect=_describe_all):
+            second = processor.process_pdfs(pdfs, str(tmp_path))[pdfs[0]]
+        
+        assert first.success and second.success
+        
+        processor.config.refresh_parse = True
+        with patch.object(MinerUClient, 'poll_pdfs', poll) as polled, \
+             patch.object(MinerUClient, 'fetch_result', fetch), \
+             patch.object(processor.engine, 'describe_images_batch', side_effect=_describe_all):
+            third = processor.process_pdfs(pdfs, str(tmp_path))[pdfs[0]]
+        assert third.success
+    
+    def test_pdf_hashed_once(self, processor, tmp_path):
+        pdfs = _make_pdfs(tmp_path, "a.pdf", "b.pdf")
+        processor.parse_cache = ParseCache(str(tmp_path / "cache"))
+        
+        def poll(self, pdf_paths, resume=None, on_uploaded=None):
+            for index, path in enumerate(pdf_paths):
+                yield str(index), path, f"z{index}"
+        
+        with patch('ieeU.processor.hash_file', wraps=hash_file) as processor_hash, \
+             patch('ieeU.mineru.hash_file', wraps=hash_file) as mineru_hash, \
+             patch.object(MinerUClient, 'poll_pdfs', poll), \
+             patch.object(MinerUClient, 'fetch_result', _fake_fetch), \
+             patch.object(processor.engine, 'describe_images_batch', side_effect=_describe_all):
+            results = processor.process_pdfs(pdfs, str(tmp_path))
+        
+        assert all(r.success for r in results.values())
+        assert processor_hash.call_count == 2
+        assert mineru_hash.call_count == 0
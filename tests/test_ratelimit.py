@@ -0,0 +1,162 @@
+import pytest
+import os
+import sys
+import time
+from unittest.mock import Mock, patch
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ieeU.config import Config
+from ieeU.logger import Logger
+from ieeU.ratelimit import RateLimiter, parse_duration, parse_retry_after
+from ieeU.vlm import VLMClient, APIErrorType
+
+
+class TestParsing:
+    
+    def test_parse_duration(self):
+        assert parse_duration("20") == 20.0
+        assert parse_duration("1.5") == 1.5
+        assert parse_duration("20ms") == pytest.approx(0.02)
+        assert parse_duration("6m0s") == 360.0
+        assert parse_duration("1h2m") == 3720.0
+        assert parse_duration("soon") is None
+        assert parse_duration(None) is None
+    
+    def test_parse_retry_after_http_date(self):
+        now = 1_700_000_000.0
+        header = "Tue, 14 Nov 2023 22:13:40 GMT"
+        assert parse_retry_after(header, now) == pytest.approx(20.0)
+        assert parse_retry_after("7", now) == 7.0
+
+
+class TestRateLimiter:
+    
+    def test_unlimited_never_waits(self):
+        limiter = RateLimiter()
+        assert all(limiter.reserve(10_000) == 0 for _ in range(100))
+    
+    def test_requests_are_paced_after_burst(self):
+        limiter = RateLimiter(requests_per_minute=60)
+        with patch("ieeU.ratelimit.time.time", return_value=1000.0):
+            delays = [limiter.reserve() for _ in range(62)]
+        
+        assert delays[:60] == [0.0] * 60
+        assert delays[60] == pytest.approx(1.0)
+        assert delays[61] == pytest.approx(2.0)
+    
+    def test_tokens_per_minute(self):
+        limiter = RateLimiter(tokens_per_minute=6000)
+        with patch("ieeU.ratelimit.time.time", return_value=1000.0):
+            assert limiter.reserve(6000) == 0.0
+            assert limiter.reserve(100) == pytest.approx(1.0)
+    
+    def test_refill_over_time(self):
+        limiter = RateLimiter(requests_per_minute=60)
+        with patch("ieeU.ratelimit.time.time", return_value=1000.0):
+            for _ in range(60):
+                limiter.reserve()
+        with patch("ieeU.ratelimit.time.time", return_value=1005.0):
+            assert limiter.reserve() == 0.0
+    
+    def test_retry_after_blocks_everyone(self):
+        limiter = RateLimiter()
+        with patch("ieeU.ratelimit.time.time", return_value=1000.0):
+            assert limiter.update_from_headers({"Retry-After": "3"}) == 3.0
+            assert limiter.reserve() == pytest.approx(3.0)
+            assert limiter.reserve() == pytest.approx(3.0)
+    
+    def test_exhausted_quota_header_waits_for_reset(self):
+        limiter = RateLimiter(requests_per_minute=100)
+        headers = requests.structures.CaseInsensitiveDict({
+            "X-RateLimit-Remaining-Requests": "0",
+            "X-RateLimit-Reset-Requests": "2s",
+        })
+        with patch("ieeU.ratelimit.time.time", return_value=1000.0):
+            assert limiter.update_from_headers(headers) is None
+            assert limiter.reserve() == pytest.approx(2.0)
+    
+    def test_remaining_quota_drains_bucket(self):
+        limiter = RateLimiter(requests_per_minute=60)
+        with patch("ieeU.ratelimit.time.time", return_value=1000.0):
+            limiter.update_from_headers({"x-ratelimit-remaining-requests": "1"})
+            assert limiter.reserve() == 0.0
+            assert limiter.reserve() == pytest.approx(1.0)
+    
+    def test_shared_state_across_instances(self, tmp_path):
+        state_path = str(tmp_path / "limit.json")
+        first = RateLimiter(requests_per_minute=60, state_path=state_path)
+        second = RateLimiter(requests_per_minute=60, state_path=state_path)
+        
+        with patch("ieeU.ratelimit.time.time", return_value=1000.0):
+            for _ in range(30):
+                first.reserve()
+            delays = [second.reserve() for _ in range(31)]
+        
+        assert delays[29] == 0.0
+        assert delays[30] == pytest.approx(1.0)
+    
+    def test_shared_headroom_does_not_rewrite_state(self, tmp_path):
+        state_path = str(tmp_path / "limit.json")
+        limiter = RateLimiter(requests_per_minute=60, state_path=state_path)
+        
+        with patch("ieeU.ratelimit.time.time", return_value=1000.0):
+            for _ in range(30):
+                limiter.reserve()
+            with patch("ieeU.ratelimit.os.replace") as replace, \
+                 patch("ieeU.ratelimit.fcntl.flock") as flock:
+                assert limiter.headroom() == pytest.approx(0.5)
+        
+        replace.assert_not_called()
+        flock.assert_not_called()
+
+
+class TestVLMClientRateLimit:
+    
+    @pytest.fixture
+    def vlm_client(self):
+        config = Config()
+        config.endpoint = "https://api.example.com/v1/chat/completions"
+        config.key = "test-key"
+        config.model_name = "test-model"
+        config.retries = 2
+        return VLMClient(config, Logger(verbose=False))
+    
+    def _response(self, status, headers=None, body=None):
+        response = Mock()
+        response.status_code = status
+        response.headers = headers or {}
+        response.json.return_value = body or {}
+        if status >= 400:
+            response.raise_for_status.side_effect = requests.exceptions.HTTPError(
+                response=response
+            )
+        return response
+    
+    def test_429_retry_after_is_shared(self, vlm_client):
+        ok = self._response(200, body={
+            "choices": [{"message": {"content": "desc"}}]
+        })
+        throttled = self._response(429, {"Retry-After": "0.2"})
+        vlm_client.session.post = Mock(side_effect=[throttled, ok])
+        
+        start = time.monotonic()
+        content, error_type = vlm_client._call_api("img.png", bytearray(b"{}"))
+        
+        assert (content, error_type) == ("desc", APIErrorType.SUCCESS)
+        assert time.monotonic() - start >= 0.2
+    
+    def test_usage_corrects_token_reservation(self, vlm_client):
+        vlm_client.rate_limiter = RateLimiter(tokens_per_minute=100_000)
+        ok = self._response(200, body={
+            "choices": [{"message": {"content": "desc"}}],
+            "usage": {"total_tokens": 100}
+        })
+        vlm_client.session.post = Mock(return_value=ok)
+        
+        vlm_client._call_api("img.png", bytearray(b"{}"))
+        
+        remaining = vlm_client.rate_limiter._state['tokens']
+        assert remaining == pytest.approx(100_000 - 100, abs=50)
@@ -0,0 +1,211 @@
+import pytest
+import os
+import sys
+import threading
+import time
+from unittest.mock import Mock, patch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ieeU.config import Config
+from ieeU.controller import AIMDController
+from ieeU.logger import Logger
+from ieeU.results import APIErrorType
+from ieeU.scheduler import SlidingWindowScheduler
+from ieeU.vlm import VLMClient
+
+
+@pytest.fixture
+def vlm_client():
+    config = Config()
+    config.endpoint = "https://api.example.com/v1/chat/completions"
+    config.key = "test-key"
+    config.model_name = "test-model"
+    config.retries = 1
+    config.max_concurrency = 4
+    return VLMClient(config, Logger(verbose=False))
+
+
+def _controller(client, limit):
+    return AIMDController(limit, limit, client.logger)
+
+
+def _items(n):
+    return [(f"img{i}.jpg", f"/path/img{i}.jpg") for i in range(n)]
+
+
+class TestSlidingWindowScheduler:
+    
+    def test_fills_window_and_refills_on_completion(self, vlm_client):
+        scheduler = SlidingWindowScheduler(_items(5), _controller(vlm_client, 2), vlm_client, vlm_client.logger)
+        
+        first = scheduler.next_item()
+        second = scheduler.next_item()
+        assert not scheduler.has_capacity()
+        
+        scheduler.complete(first, "desc", APIErrorType.SUCCESS)
+        assert scheduler.has_capacity()
+        assert scheduler.next_item().rel_path == "img2.jpg"
+        assert second.rel_path == "img1.jpg"
+    
+    def test_failed_item_requeued(self, vlm_client):
+        scheduler = SlidingWindowScheduler(_items(3), _controller(vlm_client, 3), vlm_client, vlm_client.logger)
+        items = [scheduler.next_item() for _ in range(3)]
+        
+        scheduler.complete(items[0], None, APIErrorType.TIMEOUT)
+        retried = scheduler.next_item()
+        
+        assert retried.rel_path == "img0.jpg"
+        assert retried.attempts == 2
+        
+        scheduler.complete(retried, None, APIErrorType.TIMEOUT)
+        scheduler.complete(items[1], "desc", APIErrorType.SUCCESS)
+        scheduler.complete(items[2], "desc", APIErrorType.SUCCESS)
+        
+        assert scheduler.done()
+        result = scheduler.finish()
+        assert result.failed_paths == ["img0.jpg"]
+        assert set(result.results) == {"img1.jpg", "img2.jpg"}
+    
+    def test_retry_runs_before_later_figures(self, vlm_client):
+        scheduler = SlidingWindowScheduler(_items(4), _controller(vlm_client, 2), vlm_client, vlm_client.logger)
+        first = scheduler.next_item()
+        scheduler.next_item()
+        
+        scheduler.complete(first, None, APIErrorType.TIMEOUT)
+        
+        assert scheduler.next_item().rel_path == "img0.jpg"
+    
+    def test_throttled_item_waits_behind_fresh_work(self, vlm_client):
+        scheduler = SlidingWindowScheduler(_items(3), _controller(vlm_client, 2), vlm_client, vlm_client.logger)
+        first = scheduler.next_item()
+        scheduler.next_item()
+        
+        scheduler.complete(first, None, APIErrorType.RATE_LIMIT)
+        
+        assert scheduler.next_item().rel_path == "img2.jpg"
+        assert scheduler.pending[0].rel_path == "img0.jpg"
+    
+    def test_upcoming_follows_send_order(self, vlm_client):
+        scheduler = SlidingWindowScheduler(_items(4), _controller(vlm_client, 2), vlm_client, vlm_client.logger)
+        first = scheduler.next_item()
+        scheduler.complete(first, None, APIErrorType.RATE_LIMIT)
+        
+        assert [item.rel_path for item in scheduler.upcoming(3)] == ["img1.jpg", "img2.jpg", "img3.jpg"]
+        assert len(scheduler.pending) == 4
+    
+    def test_on_failed_called_once_retries_are_exhausted(self, vlm_client):
+        failed = []
+        scheduler = SlidingWindowScheduler(
+            _items(1), _controller(vlm_client, 1), vlm_client, vlm_client.logger,
+            on_failed=failed.append
+        )
+        
+        scheduler.complete(scheduler.next_item(), None, APIErrorType.TIMEOUT)
+        assert failed == []
+        scheduler.complete(scheduler.next_item(), None, APIErrorType.TIMEOUT)
+        assert failed == ["img0.jpg"]
+    
+    def test_auth_error_aborts_before_any_success(self, vlm_client):
+        scheduler = SlidingWindowScheduler(_items(4), _controller(vlm_client, 1), vlm_client, vlm_client.logger)
+        
+        scheduler.complete(scheduler.next_item(), None, APIErrorType.AUTH_ERROR)
+        
+        assert not scheduler.has_capacity()
+        assert scheduler.done()
+        result = scheduler.finish()
+        assert result.api_completely_failed is True
+        assert len(result.failed_paths) == 4
+
+
+class TestSlidingWindowBatch:
+    
+    @patch.object(VLMClient, 'describe_image')
+    def test_slow_item_does_not_stall_window(self, mock_describe, vlm_client):
+        lock = threading.Lock()
+        state = {"in_flight": 0, "peak": 0}
+        
+        def side_effect(path):
+            with lock:
+                state["in_flight"] += 1
+                state["peak"] = max(state["peak"], state["in_flight"])
+            time.sleep(0.5 if path.endswith("img0.jpg") else 0.05)
+            with lock:
+                state["in_flight"] -= 1
+            return "Description", APIErrorType.SUCCESS
+        
+        mock_describe.side_effect = side_effect
+        
+        start = time.monotonic()
+        result = vlm_client.describe_images_batch(dict(_items(24)), 4)
+        elapsed = time.monotonic() - start
+        
+        assert len(result.results) == 24
+        assert state["peak"] == 4
+        # Fixed batches would take 6 * 0.05 + 0.45 extra for the slow batch.
+        assert elapsed < 0.7
+    
+    @patch.object(VLMClient, 'describe_image')
+    def test_transient_failure_retried_in_window(self, mock_describe, vlm_client):
+        seen = set()
+        
+        def side_effect(path):
+            if path not in seen and path.endswith("img3.jpg"):
+                seen.add(path)
+                return None, APIErrorType.SERVER_ERROR
+            return "Description", APIErrorType.SUCCESS
+        
+        mock_describe.side_effect = side_effect
+        
+        result = vlm_client.describe_images_batch(dict(_items(8)), 3)
+        
+        assert len(result.results) == 8
+        assert result.failed_paths == []
+        assert result.should_fallback_sequential is False
+    
+    @patch.object(VLMClient, 'describe_image')
+    def test_on_complete_called_per_success(self, mock_describe, vlm_client):
+        mock_describe.return_value = ("Description", APIErrorType.SUCCESS)
+        completed = []
+        
+        vlm_client.describe_images_batch(
+            dict(_items(5)), 2, on_complete=lambda path, desc: completed.append(path)
+        )
+        
+        assert sorted(completed) == [f"img{i}.jpg" for i in range(5)]
+    
+    @patch.object(VLMClient, 'describe_image')
+    def test_prefetch_stays_ahead_of_window(self, mock_describe, vlm_client):
+        mock_describe.return_value = ("Description", APIErrorType.SUCCESS)
+        vlm_client.preprocessor = Mock()
+        vlm_client.preprocessor.options.signature.return_value = ""
+        vlm_client.config.max_concurrency = 2
+        
+        vlm_client.describe_images_batch(dict(_items(20)), 2)
+        
+        batches = [call.args[0] for call in vlm_client.preprocessor.prefetch.call_args_list]
+        # Two windows of two requests ahead of the scheduler, never the whole document
+        assert max(len(paths) for paths in batches) <= 4
+        assert sorted(sum(batches, [])) == sorted(path for _, path in _items(20))
+    
+    @patch.object(VLMClient, 'describe_image')
+    def test_cancel_returns_without_waiting(self, mock_describe, vlm_client):
+        release = threading.Event()
+        
+        def side_effect(path):
+            if path.endswith("img0.jpg"):
+                return "Description", APIErrorType.SUCCESS
+            release.wait(5)
+            return "Description", APIErrorType.SUCCESS
+        
+        mock_describe.side_effect = side_effect
+        threading.Timer(0.1, vlm_client.cancel).start()
+        
+        start = time.monotonic()
+        result = vlm_client.describe_images_batch(dict(_items(20)), 2)
+        elapsed = time.monotonic() - start
+        release.set()
+        
+        assert result.cancelled
+        assert list(result.results) == ["img0.jpg"]
+        assert elapsed < 1
@@ -0,0 +1,66 @@
+import pytest
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ieeU.session import PooledSession
+
+
+class _OkHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    
+    def do_GET(self):
+        body = b"ok"
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _OkHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/"
+    server.shutdown()
+    server.server_close()
+
+
+class TestPooledSession:
+    
+    def test_sequential_requests_reuse_one_connection(self, server_url):
+        session = PooledSession(2)
+        for _ in range(5):
+            assert session.get(server_url).text == "ok"
+        
+        assert session.connection_stats() == (5, 1)
+    
+    def test_concurrent_requests_bounded_by_pool(self, server_url):
+        session = PooledSession(4)
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            list(executor.map(lambda _: session.get(server_url), range(40)))
+        
+        requests_sent, connections = session.connection_stats()
+        assert requests_sent == 40
+        assert connections <= 4
+    
+    def test_resize_only_grows_and_keeps_stats(self, server_url):
+        session = PooledSession(2)
+        session.get(server_url)
+        
+        session.resize(1)
+        assert session.pool_size == 2
+        
+        session.resize(8)
+        assert session.pool_size == 8
+        session.get(server_url)
+        
+        assert session.connection_stats() == (2, 2)
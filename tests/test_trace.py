@@ -0,0 +1,162 @@
+import pytest
+import asyncio
+import json
+import os
+import sys
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ieeU.bench import BenchRunner
+from ieeU.logger import Logger
+from ieeU.mockserver import MockVLMServer, synthetic_png
+from ieeU.pipeline import Pipeline, Stage
+from ieeU.trace import Tracer
+from ieeU.vlm import VLMClient
+
+
+@pytest.fixture
+def tracer(clock):
+    return Tracer(clock=clock)
+
+
+def _spans(tracer, name=None):
+    return [
+        event for event in tracer.events
+        if event["ph"] == "X" and (name is None or event["name"] == name)
+    ]
+
+
+def _track_names(tracer):
+    return {
+        event["tid"]: event["args"]["name"]
+        for event in tracer.events if event["name"] == "thread_name"
+    }
+
+
+class TestTracer:
+
+    def test_span(self, tracer, clock):
+        clock.now = 1.0
+        with tracer.span("poll", "mineru", batch="b1") as args:
+            clock.now = 1.25
+            args["status"] = 200
+
+        span, = _spans(tracer)
+        assert span["ts"] == pytest.approx(1e6)
+        assert span["dur"] == pytest.approx(0.25e6)
+        assert span["cat"] == "mineru"
+        assert span["args"] == {"batch": "b1", "status": 200}
+        assert _track_names(tracer)[span["tid"]] == threading.current_thread().name
+
+    def test_span_records_exception(self, tracer):
+        with pytest.raises(TimeoutError):
+            with tracer.span("vlm request"):
+                raise TimeoutError()
+
+        assert _spans(tracer)[0]["args"] == {"error": "TimeoutError"}
+
+    def test_disabled_records_nothing(self):
+        tracer = Tracer(enabled=False)
+        with tracer.span("poll") as args:
+            assert args is None
+        tracer.instant("rate limited")
+        tracer.counter("VLM window", in_flight=1)
+
+        assert tracer.events == []
+
+    def test_instant_and_counter(self, tracer):
+        tracer.instant("rate limited", "retry", retry_after=5)
+        tracer.counter("VLM window", in_flight=3, idle=1)
+
+        instant = next(e for e in tracer.events if e["ph"] == "i")
+        counter = next(e for e in tracer.events if e["ph"] == "C")
+        assert instant["args"] == {"retry_after": 5}
+        assert counter["args"] == {"in_flight": 3, "idle": 1}
+
+    def test_threads_get_separate_tracks(self, tracer):
+        def work():
+            with tracer.span("load image"):
+                pass
+
+        thread = threading.Thread(target=work, name="worker-1")
+        thread.start()
+        thread.join()
+        work()
+
+        tids = {span["tid"] for span in _spans(tracer)}
+        assert len(tids) == 2
+        assert "worker-1" in _track_names(tracer).values()
+
+    def test_async_tasks_get_separate_tracks(self, tracer):
+        async def request():
+            with tracer.span("vlm request"):
+                await asyncio.sleep(0)
+
+        async def main():
+            await asyncio.gather(request(), request(), request())
+
+        asyncio.run(main())
+
+        assert len({span["tid"] for span in _spans(tracer)}) == 3
+
+    def test_write(self, tracer, clock, tmp_path):
+        clock.now = 2.0
+        with tracer.span("late"):
+            pass
+        clock.now = 1.0
+        with tracer.span("early"):
+            pass
+        path = tmp_path / "trace.json"
+
+        tracer.write(str(path))
+
+        data = json.loads(path.read_text(encoding='utf-8'))
+        assert data["displayTimeUnit"] == "ms"
+        names = [event["name"] for event in data["traceEvents"]]
+        assert names.index("early") < names.index("late")
+        assert names[0] in ("process_name", "thread_name")
+
+
+class TestTracedComponents:
+
+    def test_pipeline_stages(self, tracer):
+        pipeline = Pipeline(
+            "source",
+            [Stage("double", lambda x: x * 2), Stage("inc", lambda x: x + 1, workers=2)],
+            tracer=tracer
+        )
+
+        pipeline.run(range(3))
+
+        assert len(_spans(tracer, "source")) == 4
+        assert len(_spans(tracer, "double")) == 3
+        assert len(_spans(tracer, "inc")) == 3
+        names = set(_track_names(tracer).values())
+        assert {"source", "double"} <= names
+        assert names & {"inc-0", "inc-1"}
+
+    def test_vlm_request_attempts(self, tmp_path):
+        image = tmp_path / "fig.png"
+        image.write_bytes(synthetic_png(8, 8, 0))
+        config = BenchRunner.default_config()
+        logger = Logger(verbose=False)
+        logger.tracer = Tracer()
+
+        with MockVLMServer(seed=1) as server:
+            config.endpoint = server.endpoint
+            client = VLMClient(config, logger)
+            try:
+                client.describe_images_batch({"images/fig.png": str(image)}, batch_size=1)
+            finally:
+                client.close()
+
+        tracer = logger.tracer
+        request, = _spans(tracer, "vlm request")
+        assert request["args"] == {
+            "attempt": 1, "images": 1, "status": 200, "backend": client.backends.backends[0].name
+        }
+        assert len(_spans(tracer, "encode")) == 1
+        assert len(_spans(tracer, "load image")) == 1
+        window = [e["args"]["in_flight"] for e in tracer.events if e["name"] == "VLM window"]
+        assert window == [1, 0]
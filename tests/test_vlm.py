@@ -7,6 +7,7 @@ import requests
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from ieeU.vlm import VLMClient, APIErrorType, BatchResult
+from ieeU.cache import DescriptionCache
 from ieeU.config import Config
 from ieeU.logger import Logger
 
@@ -88,7 +89,7 @@ class TestVLMClientErrorClassification:
         assert result == APIErrorType.UNKNOWN
 
 
-class TestVLMClientFallbackLogic:
+class TestVLMClientFailureLogic:
     
     @pytest.fixture
     def vlm_client(self):
@@ -99,34 +100,6 @@ class TestVLMClientFallbackLogic:
         logger = Logger(verbose=False)
         return VLMClient(config, logger)
     
-    def test_should_fallback_empty_failures(self, vlm_client):
-        result = vlm_client._should_fallback_to_sequential([])
-        assert result is False
-    
-    def test_should_fallback_with_rate_limit_errors(self, vlm_client):
-        failures = [
-            ("path1", "/full/path1", APIErrorType.RATE_LIMIT),
-            ("path2", "/full/path2", APIErrorType.RATE_LIMIT),
-        ]
-        result = vlm_client._should_fallback_to_sequential(failures)
-        assert result is True
-    
-    def test_should_fallback_with_concurrency_errors(self, vlm_client):
-        failures = [
-            ("path1", "/full/path1", APIErrorType.CONCURRENCY_ERROR),
-            ("path2", "/full/path2", APIErrorType.CONCURRENCY_ERROR),
-        ]
-        result = vlm_client._should_fallback_to_sequential(failures)
-        assert result is True
-    
-    def test_should_not_fallback_with_auth_errors(self, vlm_client):
-        failures = [
-            ("path1", "/full/path1", APIErrorType.AUTH_ERROR),
-            ("path2", "/full/path2", APIErrorType.AUTH_ERROR),
-        ]
-        result = vlm_client._should_fallback_to_sequential(failures)
-        assert result is False
-    
     def test_is_api_completely_failed_all_auth(self, vlm_client):
         failures = [
             ("path1", "/full/path1", APIErrorType.AUTH_ERROR),
@@ -238,3 +211,118 @@ class TestVLMClientSimpleInterface:
         result = vlm_client.describe_images_batch_simple({"img.jpg": "/path/img.jpg"})
         
         assert result == {"img.jpg": "Description"}
+
+
+class TestPackedRequests:
+    
+    @pytest.fixture
+    def vlm_client(self):
+        config = Config()
+        config.endpoint = "https://api.example.com/v1/chat/completions"
+        config.key = "test-key"
+        config.model_name = "test-model"
+        config.retries = 1
+        config.images_per_request = 3
+        return VLMClient(config, Logger(verbose=False))
+    
+    @pytest.fixture
+    def image_files(self, tmp_path):
+        paths = []
+        for i in range(3):
+            path = tmp_path / f"fig{i}.png"
+            path.write_bytes(b"png" * (i + 1))
+            paths.append(str(path))
+        return paths
+    
+    def test_parse_numbered_blocks(self, vlm_client):
+        text = "```figure 2\nSecond\n```\n```figure 1\nFirst\n```"
+        assert vlm_client._parse_response(text, 2) == ["First", "Second"]
+    
+    def test_parse_rejects_missing_duplicate_and_out_of_range(self, vlm_client):
+        text = (
+            "```figure 1\nA\n```\n```figure 2\nB\n```\n```figure 2\nB again\n```\n"
+            "```figure 4\nD\n```\n```figure 3\n\n```"
+        )
+        assert vlm_client._parse_response(text, 4) == ["A", None, None, "D"]
+        assert vlm_client._parse_response("", 2) == [None, None]
+    
+    def test_single_image_parse_unchanged(self, vlm_client):
+        assert vlm_client._parse_response("```figure\nA chart\n```") == "A chart"
+    
+    def test_packed_body_uses_numbered_prompt(self, vlm_client, image_files):
+        images = [vlm_client._load_image(path) for path in image_files]
+        body = bytes(vlm_client._build_body(images))
+        
+        assert b"You will receive 3 images" in body
+        assert body.count(b"data:image/png;base64,") == 3
+        assert vlm_client._estimate_tokens(3) > vlm_client._estimate_tokens()
+    
+    def test_missing_blocks_fall_back_to_single_requests(self, vlm_client, image_files):
+        response = "```figure 1\nA\n```\n```figure 3\nC\n```"
+        
+        replies = [(response, APIErrorType.SUCCESS), ("```figure\nB single\n```", APIErrorType.SUCCESS)]
+        with patch.object(vlm_client, '_call_api', side_effect=replies) as call:
+            outcomes = vlm_client.describe_images(image_files)
+        
+        pack, single = call.call_args_list
+        assert pack.args[2] == 3
+        assert single.args[0] == image_files[1]
+        assert single.args[2] == 1
+        assert [description for description, _ in outcomes] == ["A", "B single", "C"]
+        assert vlm_client.logger.stats['pack_fallbacks'] == 1
+    
+    def test_packed_descriptions_cached_apart_from_single(self, vlm_client, image_files, tmp_path):
+        vlm_client.cache = DescriptionCache(str(tmp_path / "cache"))
+        response = "```figure 1\nA\n```\n```figure 2\nB\n```\n```figure 3\nC\n```"
+        
+        with patch.object(vlm_client, '_call_api', return_value=(response, APIErrorType.SUCCESS)):
+            vlm_client.describe_images(image_files)
+        
+        assert vlm_client._cache_key(image_files[0], True) in vlm_client.cache
+        assert vlm_client._cache_key(image_files[0]) not in vlm_client.cache
+        
+        with patch.object(vlm_client, '_call_api', return_value=("```figure\nA single\n```", APIErrorType.SUCCESS)) as call:
+            assert vlm_client.describe_image(image_files[0]) == ("A single", APIErrorType.SUCCESS)
+            assert [d for d, _ in vlm_client.describe_images(image_files)] == ["A single", "B", "C"]
+        
+        assert call.call_count == 1
+    
+    def test_failed_pack_reports_error_for_every_image(self, vlm_client, image_files):
+        with patch.object(vlm_client, '_call_api', return_value=(None, APIErrorType.TIMEOUT)):
+            outcomes = vlm_client.describe_images(image_files)
+        
+        assert outcomes == [(None, APIErrorType.TIMEOUT)] * 3
+    
+    def test_batch_sends_packs(self, vlm_client, tmp_path):
+        image_paths = {}
+        for i in range(7):
+            path = tmp_path / f"img{i}.png"
+            path.write_bytes(bytes([i]) * 10)
+            image_paths[f"img{i}.png"] = str(path)
+        packs = []
+        
+        def describe_images(paths):
+            packs.append(len(paths))
+            return [("Description", APIErrorType.SUCCESS)] * len(paths)
+        
+        with patch.object(vlm_client, 'describe_images', side_effect=describe_images), \
+             patch.object(vlm_client, 'describe_image', return_value=("Description", APIErrorType.SUCCESS)) as single:
+            result = vlm_client.describe_images_batch(image_paths, 1)
+        
+        assert packs == [3, 3]
+        assert single.call_count == 1
+        assert len(result.results) == 7
+    
+    def test_pack_bounded_by_bytes(self, vlm_client, tmp_path):
+        vlm_client.pack_max_bytes = 25
+        image_paths = {}
+        for i in range(3):
+            path = tmp_path / f"img{i}.png"
+            path.write_bytes(bytes([i]) * 10)
+            image_paths[f"img{i}.png"] = str(path)
+        
+        with patch.object(vlm_client, 'describe_images', side_effect=lambda paths: [("D", APIErrorType.SUCCESS)] * len(paths)) as packed, \
+             patch.object(vlm_client, 'describe_image', return_value=("D", APIErrorType.SUCCESS)):
+            vlm_client.describe_images_batch(image_paths, 1)
+        
+        assert [len(call.args[0]) for call in packed.call_args_list] == [2]
@@ -0,0 +1,84 @@
+import pytest
+import os
+import subprocess
+import sys
+import textwrap
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ieeU.workers import DaemonThreadPool
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SLOW_SECONDS = 30.0
+
+
+class TestDaemonThreadPool:
+
+    def test_runs_tasks_on_daemon_threads(self):
+        pool = DaemonThreadPool(max_workers=2)
+        try:
+            futures = [pool.submit(lambda x: (x * 2, threading.current_thread().daemon), i) for i in range(5)]
+            assert [f.result(timeout=5) for f in futures] == [(i * 2, True) for i in range(5)]
+            assert len(pool._threads) <= 2
+        finally:
+            pool.shutdown()
+
+    def test_exception_is_set_on_future(self):
+        with DaemonThreadPool(max_workers=1) as pool:
+            future = pool.submit(lambda: 1 / 0)
+            with pytest.raises(ZeroDivisionError):
+                future.result(timeout=5)
+
+    def test_shutdown_cancels_queued_futures(self):
+        release = threading.Event()
+        pool = DaemonThreadPool(max_workers=1)
+        running = pool.submit(release.wait)
+        queued = pool.submit(lambda: "never")
+
+        pool.shutdown(wait=False, cancel_futures=True)
+        release.set()
+
+        assert running.result(timeout=5) is True
+        assert queued.cancelled()
+        with pytest.raises(RuntimeError):
+            pool.submit(lambda: None)
+
+
+def test_ctrl_c_exits_without_waiting_for_in_flight_requests(tmp_path):
+    # Every request sleeps far longer than the test allows; after Ctrl-C the
+    # process must exit instead of joining workers blocked in session.post()
+    script = textwrap.dedent(f"""
+        import _thread, sys, threading
+        sys.path.insert(0, {ROOT!r})
+        from ieeU.bench import BenchRunner
+        from ieeU.logger import Logger
+        from ieeU.mockserver import LatencyModel, MockVLMServer, synthetic_png
+        from ieeU.vlm import VLMClient
+
+        server = MockVLMServer(latency=LatencyModel.parse("fixed:{SLOW_SECONDS}")).start()
+        config = BenchRunner.default_config()
+        config.endpoint = server.endpoint
+        config.timeout = {SLOW_SECONDS * 2}
+        client = VLMClient(config, Logger(verbose=False))
+        images = {{}}
+        for i in range(4):
+            path = {str(tmp_path)!r} + f"/fig{{i}}.png"
+            with open(path, "wb") as f:
+                f.write(synthetic_png(8, 8, i))
+            images[f"fig{{i}}.png"] = path
+
+        threading.Timer(0.5, _thread.interrupt_main).start()
+        try:
+            client.describe_images_batch(images, batch_size=4)
+        except KeyboardInterrupt:
+            sys.exit(130)
+    """)
+
+    start = time.monotonic()
+    proc = subprocess.run([sys.executable, "-c", script], capture_output=True, timeout=SLOW_SECONDS)
+    elapsed = time.monotonic() - start
+
+    assert proc.returncode == 130, proc.stderr.decode(errors="replace")
+    assert elapsed < 10
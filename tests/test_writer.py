@@ -0,0 +1,94 @@
+import pytest
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ieeU.writer import OrderedMarkdownWriter
+
+
+def _render(ref, description):
+    if description is None:
+        return None
+    return f"[{ref.figure_num}: {description}]"
+
+
+@pytest.fixture
+def source(tmp_path):
+    md = tmp_path / "full.md"
+    md.write_text(
+        "# Title\n\nintro\n![](a.jpg)\nmiddle\n![](b.jpg) ![](c.jpg)\nend\n",
+        encoding='utf-8'
+    )
+    return md
+
+
+def _writer(source, tmp_path, expected=("a.jpg", "b.jpg", "c.jpg")):
+    writer = OrderedMarkdownWriter(str(source), str(tmp_path / "out.md"), _render)
+    writer.expect(expected)
+    return writer
+
+
+def _output(tmp_path):
+    return (tmp_path / "out.md").read_text(encoding='utf-8')
+
+
+class TestOrderedMarkdownWriter:
+    
+    def test_not_created_before_first_description(self, source, tmp_path):
+        writer = _writer(source, tmp_path)
+        writer.fail("a.jpg")
+        
+        assert not (tmp_path / "out.md").exists()
+        writer.discard()
+    
+    def test_flushes_prefix_up_to_first_pending_figure(self, source, tmp_path):
+        writer = _writer(source, tmp_path)
+        
+        writer.resolve("b.jpg", "B")
+        assert _output(tmp_path) == "# Title\n\nintro\n"
+        
+        writer.resolve("a.jpg", "A")
+        assert _output(tmp_path) == "# Title\n\nintro\n[1: A]\nmiddle\n"
+        
+        writer.resolve("c.jpg", "C")
+        assert _output(tmp_path).endswith("[2: B] [3: C]\nend\n")
+        writer.close()
+    
+    def test_failed_figure_unblocks_and_keeps_reference(self, source, tmp_path):
+        writer = _writer(source, tmp_path)
+        writer.resolve("b.jpg", "B")
+        writer.resolve("c.jpg", "C")
+        
+        writer.fail("a.jpg")
+        
+        assert _output(tmp_path) == (
+            "# Title\n\nintro\n![](a.jpg)\nmiddle\n[2: B] [3: C]\nend\n"
+        )
+        assert writer.finish() == 2
+    
+    def test_finish_uses_final_descriptions(self, source, tmp_path):
+        writer = _writer(source, tmp_path)
+        writer.resolve("a.jpg", "A")
+        
+        replaced = writer.finish({"a.jpg": "A", "c.jpg": "C"})
+        
+        assert replaced == 2
+        assert _output(tmp_path).endswith("middle\n![](b.jpg) [3: C]\nend\n")
+    
+    def test_unexpected_references_do_not_block(self, source, tmp_path):
+        writer = _writer(source, tmp_path, expected=("b.jpg",))
+        
+        writer.resolve("b.jpg", "B")
+        
+        assert _output(tmp_path) == source.read_text(encoding='utf-8').replace("![](b.jpg)", "[2: B]")
+        writer.close()
+    
+    def test_discard_removes_partial_output(self, source, tmp_path):
+        writer = _writer(source, tmp_path)
+        writer.resolve("a.jpg", "A")
+        
+        writer.discard()
+        writer.resolve("b.jpg", "B")
+        
+        assert not (tmp_path / "out.md").exists()